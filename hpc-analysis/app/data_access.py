@@ -0,0 +1,259 @@
+# app/data_access.py
+"""
+Cached data access for the dashboard.
+
+Streamlit re-runs the whole script on every widget interaction and runs one
+copy of it per browser session. The loaders below keep the expensive parts
+out of those re-runs:
+
+- the jobs table is read once per dataset version (see
+  `jobs_dataset.dataset_version`: a new or rewritten part file is a new
+  version) and shared by all sessions through `st.cache_resource`, so the
+  process holds one copy however many analysts are connected. When the ETL
+  wrote a snapshot of that version (src/jobs_snapshot.py) the frame is a
+  view of the memory-mapped file instead: nothing is decoded and every
+  worker process behind a proxy shares the same page cache. Each run gets
+  the selected date range as a slice of it; with pandas copy-on-write,
+  columns a session adds or modifies never reach the shared frame;
+- the sidebar filters are answered by a `FilterIndex` over that frame
+  (src/filter_index.py), built once per dataset version as well;
+- downloads are written on request, chunk by chunk from the shared frame,
+  into an `ExportCache` shared by all sessions (src/export.py);
+- with HPC_QUERY_ENGINE=arrow or duckdb the raw-row paths (the download
+  tab) query the Parquet files instead (src/jobs_query.py): no jobs frame
+  or index is loaded, only the selected rows stream through;
+- the daily rollup cube the charts are computed from is shared the same
+  way and reloaded when its file changes, as are the monthly cube and the
+  wait-time sketch table written with it;
+- the occupancy step functions (src/occupancy.py) are built once per
+  dataset version from the few columns they need;
+- the `v_user_apps` metadata is read from a local snapshot that a
+  background thread refreshes every METADATA_TTL seconds through a small
+  connection pool (src/metadata_service.py): a slow or unreachable MySQL
+  never blocks a page, the last good snapshot keeps being served.
+"""
+
+import os
+import sys
+from functools import partial
+from pathlib import Path
+
+import mysql.connector
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+from export import ExportCache
+from filter_index import FilterIndex
+from instrument import timed
+from jobs_dataset import dataset_version, date_bounds, jobs_dataset, read_jobs
+from jobs_query import PandasQuery, open_query
+from jobs_snapshot import read_snapshot, snapshot_path, snapshot_version
+from metadata_service import ConnectionPool, MetadataService
+from occupancy import SOURCE_COLS as OCCUPANCY_COLS, Occupancy
+from user_meta import UserMeta
+from rollups import load_rollups, monthly_path
+from wait_times import load_waits, wait_path
+
+# HPC_DATA_DIR points the app at another processed directory (benchmarks, staging)
+DATA_DIR = Path(os.environ.get("HPC_DATA_DIR", Path(__file__).parent.parent / "data/processed"))
+DATA_PATH = DATA_DIR / "jobs_all"  # year=/month= partitioned
+ROLLUPS_PATH = DATA_DIR / "jobs_daily.parquet"
+# engine of the raw-row queries: pandas (jobs in memory), arrow or duckdb (out of core)
+QUERY_ENGINE = os.environ.get("HPC_QUERY_ENGINE", "pandas")
+METADATA_DIR = DATA_DIR / "user_meta"  # snapshots
+EXPORT_DIR = DATA_DIR / "exports"  # download cache
+
+MYSQL = dict(host="localhost", user="root", password="", database="hpc_stage",
+             connection_timeout=10)
+METADATA_TTL = 15 * 60  # seconds between background refreshes
+# last-modified column of v_user_apps; while the view has none, refreshes read it whole
+METADATA_CHANGED_COL = "updated_at"
+
+if int(pd.__version__.split(".")[0]) < 3:
+    # default from pandas 3 on; the shared frame relies on it
+    pd.set_option("mode.copy_on_write", True)
+
+
+def _current_snapshot(root, version):
+    """The memory-mapped snapshot of `root` if it was written from `version`, else None."""
+    path = snapshot_path(root)
+    return path if snapshot_version(path) == version else None
+
+
+@st.cache_resource(max_entries=1, show_spinner="Loading jobs…")
+@timed("jobs.load", rows=len)
+def _shared_jobs(root, version, columns):
+    """All jobs of one dataset `version`, sorted by Start (NaT last). Never mutate."""
+    snapshot = _current_snapshot(root, version)
+    if snapshot is not None:
+        return read_snapshot(snapshot, columns)  # sorted already
+    available = set(jobs_dataset(root).schema.names)
+    df = read_jobs(root, columns=[c for c in columns if c in available])
+    return df.sort_values("Start", kind="stable", na_position="last", ignore_index=True)
+
+
+@st.cache_resource(max_entries=1, show_spinner="Indexing jobs…")
+@timed("jobs.index")
+def _shared_index(root, version, columns):
+    return FilterIndex(_shared_jobs(root, version, columns))
+
+
+@st.cache_resource
+def export_cache():
+    return ExportCache(EXPORT_DIR)
+
+
+@st.cache_data(max_entries=2, show_spinner=False)
+def _date_bounds(root, version, end_col="End"):
+    return date_bounds(root, end_col=end_col)
+
+
+def select_jobs(columns, start=None, end=None, filters=None, root=DATA_PATH):
+    """
+    (shared frame, rows, dataset version) for the jobs whose Start is within
+    [start, end]: `rows` is a slice or an array of positions; nothing is copied.
+
+    filters: {column: allowed values} on the indexed columns (Partition,
+    UID, State), answered from the shared index instead of column scans.
+    """
+    root, columns = str(root), tuple(columns)
+    version = dataset_version(root)
+    shared = _shared_jobs(root, version, columns)
+    index = _shared_index(root, version, columns)
+    if not filters:
+        return shared, slice(*index.start_range(start, end)), version
+    return shared, index.select(start, end, **filters), version
+
+
+def load_jobs(columns, start=None, end=None, filters=None, root=DATA_PATH):
+    """Jobs whose Start is within [start, end], restricted to `columns` (see select_jobs)."""
+    shared, rows, _ = select_jobs(columns, start, end, filters, root)
+    return shared.iloc[rows]
+
+
+@st.cache_resource(max_entries=1, show_spinner=False)
+def _shared_query(engine, root, version, columns):
+    if engine == "pandas":
+        return PandasQuery(_shared_jobs(root, version, columns), _shared_index(root, version, columns))
+    return open_query(engine, root)
+
+
+def jobs_query(columns, root=DATA_PATH, engine=QUERY_ENGINE):
+    """
+    (query engine, dataset version) for the jobs at `root` (src/jobs_query.py),
+    shared by all sessions. The pandas engine reads `columns` into the shared
+    frame; the others read nothing until queried.
+    """
+    root, columns = str(root), tuple(columns)
+    version = dataset_version(root)
+    return _shared_query(engine, root, version, columns), version
+
+
+def jobs_version(root=DATA_PATH):
+    return dataset_version(str(root))
+
+
+@st.cache_resource(max_entries=1, show_spinner="Computing cluster occupancy…")
+@timed("jobs.occupancy")
+def _shared_occupancy(root, version):
+    snapshot = _current_snapshot(root, version)
+    if snapshot is not None:
+        return Occupancy(read_snapshot(snapshot, OCCUPANCY_COLS + ["Partition"]))
+    available = set(jobs_dataset(root).schema.names)
+    columns = [c for c in OCCUPANCY_COLS + ["Partition"] if c in available]
+    return Occupancy(read_jobs(root, columns=columns))
+
+
+def occupancy(root=DATA_PATH):
+    """Per-partition occupancy of the current dataset version (see occupancy.py), shared."""
+    root = str(root)
+    return _shared_occupancy(root, dataset_version(root))
+
+
+def jobs_date_bounds(root=DATA_PATH):
+    """(earliest Start, latest End) of the current dataset version."""
+    root = str(root)
+    return _date_bounds(root, dataset_version(root))
+
+
+def jobs_start_bounds(root=DATA_PATH):
+    """(earliest Start, latest Start) of the current dataset version."""
+    root = str(root)
+    return _date_bounds(root, dataset_version(root), end_col="Start")
+
+
+@st.cache_resource(max_entries=1, show_spinner=False)
+@timed("rollups.load", rows=len)
+def _shared_cube(path, mtime_ns):
+    return load_rollups(path)
+
+
+def cube_version(path=ROLLUPS_PATH):
+    """Changes whenever the rollup file is rewritten; part of the section cache keys."""
+    return os.stat(path).st_mtime_ns
+
+
+def load_cube(path=ROLLUPS_PATH):
+    """The rollup cube (see rollups.py), shared by all sessions. Never mutate."""
+    return _shared_cube(str(path), cube_version(path))
+
+
+@st.cache_resource(max_entries=1, show_spinner=False)
+@timed("rollups.load_monthly", rows=len)
+def _shared_monthly(path, mtime_ns):
+    return load_rollups(monthly_path(path))
+
+
+def load_monthly_cube(path=ROLLUPS_PATH):
+    """The rollup cube summed to months (rollups.month_rollups), shared. Never mutate."""
+    return _shared_monthly(str(path), cube_version(path))
+
+
+@st.cache_resource(max_entries=1, show_spinner=False)
+@timed("rollups.load_waits", rows=len)
+def _shared_waits(path, mtime_ns):
+    return load_waits(wait_path(path))
+
+
+def load_wait_sketches(path=ROLLUPS_PATH):
+    """Wait-time sketches of the rollup cube (see wait_times.py), shared. Never mutate."""
+    return _shared_waits(str(path), cube_version(path))
+
+
+@st.cache_resource(show_spinner="Fetching user metadata…")
+def metadata_service():
+    """The process-wide metadata service; its refresh thread starts with it."""
+    pool = ConnectionPool(partial(mysql.connector.connect, **MYSQL), size=2)
+    return MetadataService(pool, METADATA_DIR, changed_col=METADATA_CHANGED_COL,
+                           interval=METADATA_TTL).start()
+
+
+def load_user_meta():
+    """User → institution / application metadata from the `v_user_apps` snapshot."""
+    df = metadata_service().snapshot().rename(columns={
+        "id_utilisateur": "UID",
+        "concat(des_etablissement,' , ',lib_ville)": "institution_city_meta",
+    })
+    df["UID"] = pd.to_numeric(df["UID"], errors="coerce")
+    df["institution_city"] = df["institution_city_meta"].fillna("")
+    if "sujet_recherche" in df.columns:
+        df["sujet_recherche_cleaned"] = df["sujet_recherche"].replace(
+            r"sujet_recherche\d+", np.nan, regex=True
+        )
+    return df
+
+
+def meta_version():
+    return metadata_service().status()["version"]
+
+
+@st.cache_resource(max_entries=1, show_spinner=False)
+def _user_lookup(version):
+    return UserMeta(load_user_meta())
+
+
+def user_lookup():
+    """UID -> metadata lookup (src/user_meta.py) of the current snapshot, shared."""
+    return _user_lookup(meta_version())
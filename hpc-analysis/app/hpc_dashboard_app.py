@@ -1,82 +1,40 @@
+import threading
+
 import streamlit as st
 import pandas as pd
-import numpy as np
-import mysql.connector
-from pathlib import Path
-
-DATA_PATH = Path(__file__).parent.parent / "data/processed/jobs_all.parquet" 
-df = pd.read_parquet(DATA_PATH)
-
-conn = mysql.connector.connect(
-    host="localhost",
-    user="root",
-    password="",
-    database="hpc_stage",
+
+# cached, process-wide loaders (also puts src/ on sys.path)
+from data_access import (
+    cube_version, export_cache, jobs_date_bounds, jobs_query, jobs_version, load_user_meta,
+    metadata_service, user_lookup,
 )
-df_user_meta = pd.read_sql("SELECT * FROM v_user_apps", conn)
-conn.close()
-
-df_user_meta.rename(columns={
-    "id_utilisateur": "UID",
-    "concat(des_etablissement,' , ',lib_ville)": "institution_city_meta"
-}, inplace=True)
-
-df["UID"] = df["UID"].astype(str)
-df_user_meta["UID"] = df_user_meta["UID"].astype(str)
-
-df_merged = df.merge(df_user_meta, on="UID", how="left")
-
-df_user_meta.rename(columns={
-    "id_utilisateur": "UID",
-    "concat(des_etablissement,' , ',lib_ville)": "institution_city_meta"
-}, inplace=True)
-
-df_merged["institution_city"] = df_merged["institution_city_meta"].fillna("")
-
-import re
-
-def normalize_state(state):
-    # If it matches CANCELLED by XXXX, return 'CANCELLED'
-    if isinstance(state, str) and re.match(r"CANCELLED by \d+", state):
-        return "CANCELLED"
-    return state
-
-df["State_Clean"] = df["State"].apply(normalize_state)
-
-def main_partition(part):
-    if isinstance(part, str):
-        return part.split(",")[0].strip()
-    return part
-
-df["Partition_Main"] = df["Partition"].apply(main_partition)
-
-def group_jobname(name):
-    if isinstance(name, str):
-        name_lower = name.lower()
-        if name_lower.startswith("jupyter"):
-            return "jupyter"
-        elif name_lower.startswith("bash"):
-            return "bash"
-        elif name_lower.startswith("test"):
-            return "test"
-        elif name_lower.startswith("qe"):
-            return "qe"
-        elif name_lower in {"stream", "linpack", "osu", "iozone"}:
-            return name_lower  # keep known benchmarks as-is
-        elif len(name) < 4:
-            return "short_code"
-        else:
-            return "other"
-    return "unknown"
+from export import CHUNK_ROWS, FORMATS, export_key
+import instrument
+import sections
+from sections import APP_COLUMNS, Selection
+
+# occupancy metrics (src/occupancy.py) and their chart labels
+OCCUPANCY_METRICS = {
+    "cores": "Cores in use", "nodes": "Nodes in use", "mem_MB": "Memory reserved (MB)",
+    "running": "Running jobs", "pending": "Pending jobs", "pending_cores": "Cores requested by pending jobs",
+}
+
+# one tab per section; only the open tab computes (see render_* below)
+SECTIONS = [
+    "Overview", "Efficiency", "Queue Wait", "Failures & Memory", "Applications & Topics",
+    "Institutions", "Download", "Recommendations",
+]
 
-df["JobName_Grouped"] = df["JobName"].apply(group_jobname)
+st.set_page_config(page_title="HPC Job Dashboard", layout="wide")
 
-# --- NEW: Streamlit sidebar filters ---
+# stages recorded from here on belong to this run (HPC_PROFILE=1, see src/instrument.py)
+run_mark = instrument.mark()
+
+# --- Date range first ---
 st.sidebar.header("Filter Jobs")
 
-# Date range filter (use min/max from your data)
-date_min = df["Start"].min()
-date_max = df["End"].max()
+# Date range filter (min/max from the Parquet footers, no data read)
+date_min, date_max = jobs_date_bounds()
 date_range = st.sidebar.date_input(
     "Job Start Date Range", [date_min, date_max],
     min_value=date_min, max_value=date_max
@@ -88,295 +46,305 @@ else:
     # Handle the case where only a single date is returned
     start_date = end_date = date_range if isinstance(date_range, (pd.Timestamp, pd.datetime, pd.date, pd._libs.tslibs.timestamps.Timestamp)) else pd.to_datetime(date_range)
 
+# Charts are answered from the daily rollup cube (src/rollups.py): one row
+# per day × UID × partition × state × job group with additive measures.
+# Every section is a memoized function of the filter state (app/sections.py).
+cube_v = cube_version()
+choices = sections.options(cube_v, start_date, end_date)
+
+# local snapshot, refreshed in the background every data_access.METADATA_TTL seconds
+df_user_meta = load_user_meta()
+meta_status = metadata_service().status()
+meta_v = meta_status["version"]
+st.sidebar.caption(f"User metadata as of {meta_status['fetched_at']} (checked {meta_status['checked_at']})")
+if meta_status["last_error"]:
+    st.sidebar.warning(f"Metadata refresh failed, showing the last snapshot: {meta_status['last_error']}")
+
+# --- NEW: Streamlit sidebar filters ---
+# (date range is chosen above)
 
 # Partition filter
-# Partition filter
-partitions = df["Partition"].dropna().unique()
+partitions = choices["partitions"]
 partition_sel = st.sidebar.multiselect("Partition", partitions, default=list(partitions))
 st.sidebar.write("Partitions selected:", partition_sel)
 
 # User filter
-users = df["UID"].dropna().unique()
+users = choices["users"]
 user_sel = st.sidebar.multiselect("User ID", users, default=list(users))
 st.sidebar.write("Users selected:", user_sel)
 
 # Status filter
-statuses = df["State"].dropna().unique()
+statuses = choices["statuses"]
 status_sel = st.sidebar.multiselect("Job State", statuses, default=list(statuses))
 st.sidebar.write("States selected:", status_sel)
 
 # App filter (from SQL metadata)
-apps = df_merged["lib_application"].dropna().unique() if "lib_application" in df_merged.columns else []
+meta_in_range = df_user_meta[df_user_meta["UID"].isin(users)]
+apps = meta_in_range["lib_application"].dropna().unique() if "lib_application" in df_user_meta.columns else []
 app_sel = st.sidebar.multiselect("Application", apps, default=list(apps))
 st.sidebar.write("Apps selected:", app_sel)
 
-# --- DEBUG: Show what is available BEFORE filtering ---
-
 # --- APPLY FILTERS ---
-mask = (
-    (df["Start"].dt.date >= pd.to_datetime(start_date).date()) &
-    (df["Start"].dt.date <= pd.to_datetime(end_date).date()) &
-    (df["Partition"].isin(partition_sel)) &
-    (df["UID"].isin(user_sel)) &
-    (df["State"].isin(status_sel))
-)
-
-
-if app_sel and "lib_application" in df_merged.columns:
-    mask = mask & (df_merged["lib_application"].isin(app_sel))
-
-
-st.write("All possible UIDs:", df["UID"].unique())
-st.write("All possible Partitions:", df["Partition"].unique())
-st.write("All possible Job States:", df["State"].unique())
-st.write("Total jobs before filtering:", len(df))
-st.write("Start date:", start_date)
-st.write("End date:", end_date)
-
-df = df[mask]
-st.write("Number of jobs per UID after filtering:")
-st.write(df["UID"].value_counts())
+filters = dict(Partition=partition_sel, UID=user_sel, State=status_sel)
+if app_sel and "lib_application" in df_user_meta.columns:
+    # application is a property of the user: keep the users running a selected app
+    app_users = set(df_user_meta.loc[df_user_meta["lib_application"].isin(app_sel), "UID"])
+    filters["UID"] = [u for u in user_sel if u in app_users]
+sel = Selection(cube_v, start_date, end_date, tuple(filters["Partition"]), tuple(filters["UID"]),
+                tuple(filters["State"]))
 
-# --- DEBUG: Show what is left AFTER filtering ---
-st.write("Filtered UIDs:", df["UID"].unique())
-st.write("Filtered Partitions:", df["Partition"].unique())
-st.write("Filtered Job States:", df["State"].unique())
-st.write("Filtered number of jobs:", len(df))
 
-df_merged = df_merged.loc[mask]
-
-# --- rest of your code, but use filtered `df` and `df_merged` ---
-
-if "sujet_recherche" in df_merged.columns:
-    df_merged["sujet_recherche_cleaned"] = df_merged["sujet_recherche"].replace(
-        r"sujet_recherche\d+", np.nan, regex=True
-    )
-
-st.set_page_config(page_title="HPC Job Dashboard", layout="wide")
 st.title("HPC Cluster Job Dashboard")
 st.write("""
-_Analyze SLURM job usage and resource performance for the CNRST HPC cluster (MARWAN). 
+_Analyze SLURM job usage and resource performance for the CNRST HPC cluster (MARWAN).
 Use the sidebar filters to explore job efficiency, user behavior, and identify optimization opportunities._
 """)
 
 
-st.markdown(" Overview")
-st.metric("Total Jobs",     len(df))
-st.metric("Unique Users",   df["UID"].nunique())
+def render_overview():
+    ov = sections.overview(sel)
+    with st.expander("Filter details"):
+        st.write("All possible UIDs:", users)
+        st.write("All possible Partitions:", partitions)
+        st.write("All possible Job States:", statuses)
+        st.write("Total jobs before filtering:", choices["jobs"])
+        st.write("Start date:", start_date)
+        st.write("End date:", end_date)
+        st.write("Number of jobs per UID after filtering:")
+        st.write(ov["jobs_per_user"])
+        st.write("Filtered number of jobs:", ov["n_jobs"])
 
-st.markdown("Top 5 Partitions Used")
-part_counts = df["Partition_Main"].value_counts().head(5)
-st.bar_chart(part_counts)
-
-st.markdown("Top 10 Job Types (Grouped)")
-jobtype_counts = df["JobName_Grouped"].value_counts().head(10)
-st.bar_chart(jobtype_counts)
-
-
-st.markdown("Jobs Submitted per Month")
-jobs_per_month = (
-    df["Submit"].dt.to_period("M")
-      .value_counts()
-      .sort_index()
-)
-st.line_chart(jobs_per_month)
+    st.markdown(" Overview")
+    st.metric("Total Jobs",     ov["n_jobs"])
+    st.metric("Unique Users",   ov["n_users"])
 
+    st.markdown("Top 5 Partitions Used")
+    st.bar_chart(ov["partitions"])
 
-st.markdown(" Top 10 Users by Number of Jobs")
-user_counts = df["UID"].value_counts().head(10)
-st.bar_chart(user_counts)
+    st.markdown("Top 10 Job Types (Grouped)")
+    st.bar_chart(ov["job_types"])
 
+    st.markdown("Jobs Started per Month")
+    st.line_chart(ov["per_month"])
 
+    st.markdown("Cluster Occupancy per Partition (all users and states)")
+    col_metric, col_freq, col_stat = st.columns(3)
+    metric = col_metric.selectbox("Metric", list(OCCUPANCY_METRICS), format_func=OCCUPANCY_METRICS.get)
+    freq = col_freq.selectbox("Resolution", ["1h", "6h", "1D", "7D"], index=2)
+    stat = col_stat.radio("Per interval", ["mean", "max"], horizontal=True)
+    st.line_chart(sections.occupancy(jobs_version(), start_date, end_date, sel.partitions, metric, freq, stat))
 
-def parse_elapsed(el):
-    try:
-        h, m, s = map(int, el.split(":"))
-        return h*3600 + m*60 + s
-    except:
-        return np.nan
+    st.markdown(" Top 10 Users by Number of Jobs")
+    st.bar_chart(ov["top_users"])
 
-df["Elapsed_sec"] = df["Elapsed"].apply(parse_elapsed)
-st.markdown(" Top 10 Users by Avg Job Duration (seconds)")
-avg_dur = df.groupby("UID")["Elapsed_sec"].mean().sort_values(ascending=False).head(10)
-st.bar_chart(avg_dur)
+    st.markdown(" Top 10 Users by Avg Job Duration (seconds)")
+    st.bar_chart(ov["avg_duration"])
 
+    st.markdown("Job Status Overview")
+    st.bar_chart(ov["states"])
 
-st.markdown("Job Status Overview")
-state_counts = df["State_Clean"].value_counts().head(10)
-st.bar_chart(state_counts)
+    st.markdown(" Top 10 Users by Total CPU Time Used")
+    st.bar_chart(ov["cpu_top"])
 
 
-
-def parse_cputime(ct):
-    try:
-        h, m, s = map(int, str(ct).split(":"))
-        return h*3600 + m*60 + s
-    except:
-        return np.nan
-
-df["CPUTime_sec"] = df["CPUTime"].apply(parse_cputime)
-st.markdown(" Top 10 Users by Total CPU Time Used")
-cpu_top = df.groupby("UID")["CPUTime_sec"].sum().sort_values(ascending=False).head(10)
-st.bar_chart(cpu_top)
-
-st.markdown("## Job Efficiency Analysis")
-
-if "CPUTime_sec" in df.columns and "core_seconds" in df.columns:
+def render_efficiency():
+    st.markdown("## Job Efficiency Analysis")
+    eff = sections.efficiency(sel)
+    if eff is None:
+        st.info("No efficiency data available (missing CPUTime or core_seconds).")
+        return
     st.markdown("#### Distribution of Job Efficiency (CPUTime / Elapsed × NCPUS)")
     st.write("Values close to 1 mean efficient CPU usage. Values ≪1 mean underutilization (CPU idle).")
-    # Drop NaN/infinite
-    eff = df["CPUTime_sec"] / df["core_seconds"]
-    eff = eff.replace([np.inf, -np.inf], np.nan).dropna()
-    st.bar_chart(eff.value_counts(bins=10, sort=False))
+    st.bar_chart(eff["histogram"])
 
     st.markdown("#### Top 10 Most Efficient Users")
-    eff_by_user = df.groupby("UID").apply(
-        lambda g: np.nanmean(g["CPUTime_sec"] / g["core_seconds"])
-    ).sort_values(ascending=False).head(10)
-    st.bar_chart(eff_by_user)
-
-else:
-    st.info("No efficiency data available (missing CPUTime or core_seconds).")
-
-st.markdown("## Failed/Cancelled Jobs Overview")
-
-if "State" in df.columns:
-    fail_states = df["State"].value_counts().filter(like="FAIL").sum() + \
-                  df["State"].value_counts().filter(like="CANCEL").sum() + \
-                  df["State"].value_counts().get("OUT_OF_MEMORY", 0)
-    st.metric("Total Failed/Cancelled/OutOfMemory Jobs", int(fail_states))
-
-    fail_by_user = df[df["State"].isin(
-        ["FAILED", "CANCELLED", "OUT_OF_MEMORY"])].groupby("UID").size().sort_values(ascending=False).head(10)
-    st.bar_chart(fail_by_user)
-else:
-    st.info("No job state data available.")
-
-
-def mem_to_mb(mem):
-    try:
-        if "Mn" in mem:
-            return int(mem.replace("Mn",""))
-        if "Gn" in mem:
-            return int(mem.replace("Gn","")) * 1024
-        return np.nan
-    except:
-        return np.nan
-
-df["ReqMem_MB"] = df["ReqMem"].apply(mem_to_mb)
-st.markdown(" Average Requested Memory by Top Users")
-mem_avg = df.groupby("UID")["ReqMem_MB"].mean().sort_values(ascending=False).head(10)
-st.bar_chart(mem_avg)
-
-
-if "lib_application" in df_user_meta.columns:
-    unique_apps = df_user_meta["lib_application"].dropna().unique()
-    if len(unique_apps) == 0:
-        st.error("❌ No application data found in metadata.")
-    elif len(unique_apps) == 1:
-        st.warning(f"⚠️ Only one application value detected: {unique_apps[0]}. Check data quality.")
-else:
-    st.error("❌ Column 'lib_application' not found in SQL metadata.")
-
-
-st.markdown(" Jobs by Application Used")
-if "lib_application" in df_merged.columns:
-    app_counts = df_merged["lib_application"].value_counts().head(10)
-    st.bar_chart(app_counts)
-else:
-    st.error("❌ Column 'lib_application' not found in merged data.")
-
-
-st.markdown(" Jobs by Research Topic (raw placeholders)")
-if "sujet_recherche" in df_merged.columns:
-    raw_topics = df_merged["sujet_recherche"].value_counts().head(10)
-    st.bar_chart(raw_topics)
-else:
-    st.error("❌ Column 'sujet_recherche' not found in merged data.")
+    st.bar_chart(eff["top_users"])
+
+    st.markdown("#### Top 10 Users by Wasted Core-Hours (idle CPUs + failed jobs)")
+    st.bar_chart(eff["wasted_by_user"])
+
+
+def render_queue_wait():
+    st.markdown("## Queue Wait Times (Start − Submit)")
+    wait = sections.queue_wait(sel)
+    if wait is None:
+        st.info("No started jobs in the selection.")
+        return
+    if "overall" in wait["from_jobs"]:
+        st.write("Percentiles are computed from the selected jobs: the date range cuts a month that has "
+                 "jobs outside it, which the per-month sketches of the rollups cannot leave out.")
+    elif wait["from_jobs"]:
+        st.write("Percentiles are merged from the per-month sketches of the rollups (within 5% of the exact "
+                 "value); the hourly waits, sketched per partition only, are computed from the jobs of the "
+                 "selected users and states.")
+    else:
+        st.write("Percentiles are merged from the per-month sketches of the rollups (within 5% of the exact "
+                 "value).")
+    overall = wait["overall"]
+    col_50, col_90, col_99 = st.columns(3)
+    col_50.metric("Median wait (hours)", f"{overall['p50']:.2f}")
+    col_90.metric("p90 wait (hours)", f"{overall['p90']:.2f}")
+    col_99.metric("p99 wait (hours)", f"{overall['p99']:.2f}")
+
+    percentiles = ["p50", "p90", "p99"]
+    st.markdown("#### Wait per Partition (hours)")
+    st.bar_chart(wait["partition"][percentiles].head(10), stack=False)
+    st.markdown("#### Wait per Job Size (hours)")
+    st.bar_chart(wait["size_class"][percentiles], stack=False)
+    st.markdown("#### Wait by Hour of Submission (hours)")
+    st.line_chart(wait["hour"][percentiles])
+    st.markdown("#### Wait per Month (hours)")
+    st.line_chart(wait["month"][percentiles])
+
+
+def render_failures_and_memory():
+    fm = sections.failures_and_memory(sel)
+    st.markdown("## Failed/Cancelled Jobs Overview")
+    st.metric("Total Failed/Cancelled/OutOfMemory Jobs", fm["n_failed"])
+    st.bar_chart(fm["failed_by_user"])
+
+    st.markdown(" Average Requested Memory by Top Users")
+    st.bar_chart(fm["mem_avg"])
+
+    st.markdown("## Memory Over-Allocation (requested vs peak RSS)")
+    reserved, unused = fm["mem_reserved_gb_hours"], fm["mem_unused_gb_hours"]
+    st.metric("Reserved but unused memory (GB-hours)", f"{unused:,.0f}",
+              help=f"of {reserved:,.0f} GB-hours requested by jobs with a recorded MaxRSS")
+    st.markdown("#### Jobs by ReqMem / MaxRSS")
+    st.write("1–1.5× is a reasonable safety margin; above 2× the request blocks memory other jobs could use.")
+    st.bar_chart(fm["mem_ratio_hist"])
+    st.markdown("#### Top 10 Users by Unused Memory (GB-hours)")
+    st.bar_chart(fm["mem_unused_by_user"])
+    st.markdown("#### Partitions by Unused Memory (GB-hours)")
+    st.bar_chart(fm["mem_unused_by_partition"])
+
+
+def render_applications_and_topics():
+    if "lib_application" in df_user_meta.columns:
+        unique_apps = df_user_meta["lib_application"].dropna().unique()
+        if len(unique_apps) == 0:
+            st.error("❌ No application data found in metadata.")
+        elif len(unique_apps) == 1:
+            st.warning(f"⚠️ Only one application value detected: {unique_apps[0]}. Check data quality.")
+    else:
+        st.error("❌ Column 'lib_application' not found in SQL metadata.")
+
+    st.markdown(" Jobs by Application Used")
+    if "lib_application" in df_user_meta.columns:
+        app_counts = sections.jobs_by_meta(sel, meta_v, "lib_application")
+        st.bar_chart(app_counts.head(10))
+        n_jobs = sections.overview(sel)["n_jobs"]
+        st.markdown(f"ℹ️ _Jobs linked to SQL metadata: **{int(app_counts.sum())}** of {n_jobs}_")
+    else:
+        st.error("❌ Column 'lib_application' not found in merged data.")
 
-st.markdown("Cleaned Research Topics (placeholders removed)")
-if "sujet_recherche_cleaned" in df_merged.columns:
-    clean_topics = df_merged["sujet_recherche_cleaned"].value_counts()
-    if clean_topics.empty:
-        st.info("ℹ️ No meaningful research topics after cleaning.")
+    st.markdown(" Jobs by Research Topic (raw placeholders)")
+    if "sujet_recherche" in df_user_meta.columns:
+        st.bar_chart(sections.jobs_by_meta(sel, meta_v, "sujet_recherche").head(10))
     else:
-        st.bar_chart(clean_topics.head(10))
-else:
-    st.error("❌ Cleaned research topic column not found.")
+        st.error("❌ Column 'sujet_recherche' not found in merged data.")
 
+    st.markdown("Cleaned Research Topics (placeholders removed)")
+    if "sujet_recherche_cleaned" in df_user_meta.columns:
+        clean_topics = sections.jobs_by_meta(sel, meta_v, "sujet_recherche_cleaned")
+        if clean_topics.empty:
+            st.info("ℹ️ No meaningful research topics after cleaning.")
+        else:
+            st.bar_chart(clean_topics.head(10))
+    else:
+        st.error("❌ Cleaned research topic column not found.")
 
-st.markdown("Institutions & Cities (all users)")
-if "institution_city_meta" in df_user_meta.columns:
-    full_inst = (
-        df_user_meta["institution_city_meta"]
-        .value_counts()
-        .reset_index()
-        .rename(columns={"index": "Institution, City", "institution_city_meta": "User Count"})
-    )
-    st.dataframe(full_inst, use_container_width=True)
-else:
-    st.error("❌ Column 'institution_city_meta' not found in metadata.")
 
+def render_institutions():
+    st.markdown("Institutions & Cities (all users)")
+    if "institution_city_meta" in df_user_meta.columns:
+        st.dataframe(sections.institutions(meta_v), use_container_width=True)
+    else:
+        st.error("❌ Column 'institution_city_meta' not found in metadata.")
 
-st.markdown(" Institutions & Cities (linked jobs only)")
-if "institution_city" in df_merged.columns:
+    st.markdown(" Institutions & Cities (linked jobs only)")
     linked_inst = (
-        df_merged["institution_city"]
-        .value_counts()
+        sections.jobs_by_meta(sel, meta_v, "institution_city", fill="")
         .reset_index()
-        .rename(columns={"index": "Institution, City", "institution_city": "Job Count"})
+        .rename(columns={"institution_city": "Institution, City", "jobs": "Job Count"})
     )
     st.dataframe(linked_inst, use_container_width=True)
-else:
-    st.error("❌ Column 'institution_city' not found in merged data.")
-
-
-if "lib_application" in df_merged.columns:
-    num_linked = df_merged["lib_application"].notna().sum()
-    st.markdown(f"ℹ️ _Jobs linked to SQL metadata: **{num_linked}** of {len(df)}_")
 
 
-st.markdown("### Download Filtered Data")
-import io
-
-csv = df.to_csv(index=False)
-st.download_button(
-    label="Download jobs as CSV",
-    data=csv,
-    file_name="filtered_jobs.csv",
-    mime="text/csv"
-)
-
-if "df_merged" in locals():
-    merged_csv = df_merged.to_csv(index=False)
+def render_download():
+    st.markdown("### Download Filtered Data")
+    export_cols = st.multiselect("Columns to export", APP_COLUMNS, default=APP_COLUMNS)
+    export_fmt = st.radio("Format", list(FORMATS), horizontal=True)
+    suffix, mime = FORMATS[export_fmt]
+
+    # the only place raw job rows are needed, through the query engine (in memory
+    # or over the Parquet files, HPC_QUERY_ENGINE), same filters. Nothing is read
+    # or serialized until a button is clicked; the file is then written chunk by
+    # chunk and cached by selection (src/export.py).
+    query, jobs_version = jobs_query(APP_COLUMNS)
+    cache = export_cache()
+    lookup = user_lookup()
+    selection = dict(version=jobs_version, start=start_date, end=end_date, filters=filters,
+                     columns=export_cols, fmt=export_fmt)
+
+    def job_chunks(with_meta):
+        cols = export_cols + (["UID"] if with_meta and "UID" not in export_cols else [])
+        for chunk in query.scan(cols, start_date, end_date, filters, rows=CHUNK_ROWS):
+            yield lookup.join(chunk) if with_meta else chunk
+
+    def export_file(with_meta):
+        """Callable for st.download_button: runs only when the button is clicked."""
+        key = export_key(**selection, meta=meta_v if with_meta else None)
+        return lambda: cache.get(key, export_fmt, lambda: job_chunks(with_meta)).read_bytes()
+
+    st.write(f"{query.count(start_date, end_date, filters):,} jobs selected")
     st.download_button(
-        label="Download merged jobs+metadata as CSV",
-        data=merged_csv,
-        file_name="filtered_jobs_merged.csv",
-        mime="text/csv"
+        label=f"Download jobs as {export_fmt}",
+        data=export_file(with_meta=False),
+        file_name=f"filtered_jobs{suffix}",
+        mime=mime
+    )
+    st.download_button(
+        label=f"Download merged jobs+metadata as {export_fmt}",
+        data=export_file(with_meta=True),
+        file_name=f"filtered_jobs_merged{suffix}",
+        mime=mime
     )
 
 
-st.markdown("---")
-st.markdown("## 📋 Automated Recommendations")
-
-# Example logic (customize as you wish)
-high_fail_partitions = df["Partition"][df["State"] == "FAILED"].value_counts().head(3)
-high_mem_users = df.groupby("UID")["ReqMem_MB"].mean().sort_values(ascending=False).head(3)
-inefficient_users = df.groupby("UID").apply(
-    lambda g: np.nanmean(g["CPUTime_sec"] / g["core_seconds"])
-).sort_values().head(3)
-
-if high_fail_partitions.size > 0:
-    st.write(f"**Partitions with most failed jobs:** {', '.join(high_fail_partitions.index)}")
-
-if high_mem_users.size > 0:
-    st.write(f"**Users with highest average memory requests:** {', '.join(map(str, high_mem_users.index))}")
-
-if inefficient_users.size > 0:
-    st.write(f"**Users with lowest job efficiency:** {', '.join(map(str, inefficient_users.index))}")
-
-if (high_fail_partitions.size == 0 and high_mem_users.size == 0 and inefficient_users.size == 0):
-    st.info("No issues detected. Resource usage appears balanced.")
+def render_recommendations():
+    st.markdown("## 📋 Automated Recommendations")
+
+    # thresholds: analytics.THRESHOLDS; ranked by share of the cluster-wide waste
+    rec = sections.recommendations(sel)
+    for row in rec.itertuples():
+        st.write(f"**{row.scope.capitalize()} {row.key}** ({row.share:.0%} of the total): {row.message}")
+
+    if rec.empty:
+        st.info("No issues detected. Resource usage appears balanced.")
+
+
+RENDER = [
+    render_overview, render_efficiency, render_queue_wait, render_failures_and_memory,
+    render_applications_and_topics, render_institutions, render_download, render_recommendations,
+]
+# on_change="rerun": switching tabs reruns the script and only the open tab renders
+for tab, render in zip(st.tabs(SECTIONS, key="section", on_change="rerun"), RENDER):
+    if tab.open:
+        with tab, instrument.stage(f"render.{render.__name__.removeprefix('render_')}"):
+            render()
+
+if instrument.enabled():
+    with st.sidebar.expander("Performance"):
+        # cached steps do not run, so only what this rerun actually computed is listed; all
+        # sessions' script threads share one name, the ident tells them apart
+        runs = instrument.records(since=run_mark, thread_id=threading.get_ident())
+        perf = pd.DataFrame(runs, columns=["name", "wall_s", "rows", "rows_per_s", "peak_rss_mb"])
+        st.dataframe(
+            perf.rename(columns={"name": "stage", "wall_s": "seconds", "rows_per_s": "rows/s",
+                                 "peak_rss_mb": "peak RSS (MB)"}),
+            hide_index=True,
+        )
 
+st.markdown("---")
 st.markdown("_This dashboard is part of an internship project to analyze SLURM HPC job usage at CNRST._")
@@ -0,0 +1,263 @@
+# app/sections.py
+"""
+Memoized computations behind the dashboard's tabs.
+
+Each tab of hpc_dashboard_app.py renders from one function here, and only
+the open tab calls its function. The functions take the filter state as a
+`Selection` (plus the metadata snapshot version for the metadata charts)
+and are cached with `st.cache_data` on exactly those arguments, so:
+
+- switching back to a tab, or to a filter state seen before, is a lookup;
+- a new rollup file (`cube_version`) or metadata snapshot (`meta`) makes
+  new keys, so stale results are never served;
+- the institutions table of all users depends on the metadata only and
+  survives any filter change.
+
+Results are small (top-10 Series, a few numbers); the cube rows they are
+computed from are not cached per selection.
+"""
+
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+import analytics
+import wait_times
+import data_access
+from data_access import load_cube, load_monthly_cube, load_user_meta, load_wait_sketches, user_lookup
+from instrument import timed
+from memory_report import ratio_labels
+from rollups import EFF_BIN_COLS, EFF_BINS, MEM_RATIO_BIN_COLS, select, select_rollups, summarize
+
+CACHE = dict(max_entries=64, show_spinner=False)
+
+# columns of the raw-row downloads; everything else stays on disk
+APP_COLUMNS = [
+    "JobID", "ArrayTaskID", "HetJobOffset", "JobName", "UID", "Partition", "Account",
+    "Submit", "Start", "End",
+    "Elapsed", "CPUTime", "NCPUS", "NNODES", "ReqMem", "State", "ExitCode",
+    "wait_time_sec", "core_seconds", "efficiency",
+    # derived in the ETL (src/features.py)
+    "Elapsed_sec", "CPUTime_sec", "ReqMem_MB", "MaxRSS_MB", "State_Clean", "Partition_Main",
+    "JobName_Grouped",
+]
+
+
+class Selection(NamedTuple):
+    """The sidebar state the charts depend on (hashable, used as cache key)."""
+    cube_version: int
+    start: object
+    end: object
+    partitions: tuple
+    uids: tuple
+    states: tuple
+
+    @property
+    def filters(self):
+        return dict(Partition=list(self.partitions), UID=list(self.uids), State=list(self.states))
+
+
+def _cube(sel):
+    return select_rollups(load_cube(), load_monthly_cube(), sel.start, sel.end, **sel.filters)
+
+
+@st.cache_data(**CACHE)
+@timed("section.options")
+def options(cube_version, start, end):
+    """Partition / UID / State values present in the date range (sidebar choices)."""
+    cube = select_rollups(load_cube(), load_monthly_cube(), start, end)
+    return {
+        "partitions": cube["Partition"].dropna().unique().tolist(),
+        "users": cube["UID"].dropna().unique().tolist(),
+        "statuses": cube["State"].dropna().unique().tolist(),
+        "jobs": int(cube["jobs"].sum()),
+    }
+
+
+@st.cache_data(**CACHE)
+@timed("section.overview")
+def overview(sel):
+    cube = _cube(sel)
+    by_user = summarize(cube, "UID", ["jobs", "Elapsed_sec_sum", "Elapsed_sec_n", "CPUTime_sec_sum"])
+
+    def jobs(by):
+        return summarize(cube, by, ["jobs"])["jobs"]
+
+    return {
+        "n_jobs": int(cube["jobs"].sum()),
+        "n_users": int(cube["UID"].nunique()),
+        "jobs_per_user": by_user["jobs"].sort_values(ascending=False),
+        "partitions": jobs("Partition_Main").sort_values(ascending=False).head(5),
+        "job_types": jobs("JobName_Grouped").sort_values(ascending=False).head(10),
+        "per_month": jobs(cube["day"].dt.to_period("M")).sort_index(),
+        "top_users": by_user["jobs"].sort_values(ascending=False).head(10),
+        "avg_duration": by_user["Elapsed_sec_mean"].dropna().sort_values(ascending=False).head(10),
+        "states": jobs("State_Clean").sort_values(ascending=False).head(10),
+        "cpu_top": by_user["CPUTime_sec_sum"].sort_values(ascending=False).head(10),
+    }
+
+
+@st.cache_data(**CACHE)
+@timed("section.occupancy")
+def occupancy(jobs_version, start, end, partitions, metric="cores", freq="1D", stat="mean"):
+    """
+    `metric` per selected partition over [start, end] (dates, inclusive) in
+    `freq` buckets, from the step functions of every job (all users and states).
+    """
+    occ = data_access.occupancy()
+    end = pd.Timestamp(end) + pd.Timedelta(days=1) - pd.Timedelta(milliseconds=1)
+    groups = [p for p in partitions if p in occ.groups]
+    return occ.series(metric, freq, start, end, stat=stat, groups=groups)
+
+
+@st.cache_data(**CACHE)
+@timed("section.efficiency")
+def efficiency(sel):
+    cube = _cube(sel)
+    if cube["efficiency_n"].sum() == 0:
+        return None
+    hist = cube[EFF_BIN_COLS].sum()
+    hist.index = [f"{lo:.1f}–{hi:.1f}" if np.isfinite(hi) else f"≥{lo:.1f}"
+                  for lo, hi in zip(EFF_BINS[:-1], EFF_BINS[1:])]
+    users = analytics.user_metrics(cube)
+    return {
+        "histogram": hist,
+        "top_users": users["efficiency"].dropna().sort_values(ascending=False).head(10),
+        "wasted_by_user": users["wasted_core_hours"].sort_values(ascending=False).head(10),
+    }
+
+
+@st.cache_data(**CACHE)
+@timed("section.failures_and_memory")
+def failures_and_memory(sel):
+    cube = _cube(sel)
+    by_user = summarize(cube, "UID", ["ReqMem_MB_sum", "ReqMem_MB_n"])
+    users = analytics.user_metrics(cube)
+    ratio_hist = cube[MEM_RATIO_BIN_COLS].sum()
+    ratio_hist.index = ratio_labels()
+    reserved = float(cube["mem_reserved_mb_seconds"].sum()) / (1024 * 3600)
+    unused = float(cube["mem_unused_mb_seconds"].sum()) / (1024 * 3600)
+    return {
+        "n_failed": int(cube["failed"].sum()),
+        "failed_by_user": summarize(
+            select(cube, State=["FAILED", "CANCELLED", "OUT_OF_MEMORY"]), "UID", ["jobs"]
+        )["jobs"].sort_values(ascending=False).head(10),
+        "mem_avg": by_user["ReqMem_MB_mean"].dropna().sort_values(ascending=False).head(10),
+        "mem_reserved_gb_hours": reserved,
+        "mem_unused_gb_hours": unused,
+        "mem_ratio_hist": ratio_hist,
+        "mem_unused_by_user": users["mem_unused_gb_hours"].sort_values(ascending=False).head(10),
+        "mem_unused_by_partition": analytics.partition_metrics(cube)["mem_unused_gb_hours"]
+        .sort_values(ascending=False).head(10),
+    }
+
+
+def _sketch_month(start, end):
+    """
+    The first day of the month of `start` when the per-month wait sketches
+    hold exactly the jobs started in [start, end]: each end of the range is
+    on a month boundary, or no job starts between it and the boundary.
+    None when a partial month at either end has jobs outside the range.
+    """
+    start, end = pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize()
+    month = start.to_period("M").start_time
+    first, last = data_access.jobs_start_bounds()
+    if first is None:
+        return month
+    if start > month and first.normalize() < start:
+        return None
+    if end < end.to_period("M").end_time.normalize() and last.normalize() > end:
+        return None
+    return month
+
+
+def _wait_jobs(sel):
+    """The selected jobs' wait_times.SOURCE_COLS, read through the query engine."""
+    query, _ = data_access.jobs_query(APP_COLUMNS)
+    chunks = query.scan(wait_times.SOURCE_COLS, sel.start, sel.end, sel.filters)
+    return pd.concat(list(chunks), ignore_index=True)
+
+
+@st.cache_data(**CACHE)
+@timed("section.queue_wait")
+def queue_wait(sel):
+    """
+    p50/p90/p99 waits (hours) overall and per partition, size class, hour
+    and month. Merged from the wait sketches where they hold exactly the
+    selected jobs; otherwise computed from the job rows: all of them for a
+    range that cuts a month with jobs outside it, the hourly waits only when
+    the user or state filters leave out jobs (the hour sketch is per
+    partition). "from_jobs" lists the results computed from job rows.
+    """
+    waits = load_wait_sketches()
+    month = _sketch_month(sel.start, sel.end)
+    sizes = hours = jobs = None
+    if month is not None:
+        sizes = select(wait_times.wait_sketch(waits, "size_class"), month, sel.end, **sel.filters)
+        hours = select(wait_times.wait_sketch(waits, "hour"), month, sel.end, Partition=list(sel.partitions))
+        # no UID or State in the hour sketch: it holds the selected jobs when those filters drop none
+        if hours["jobs"].sum() != sizes["jobs"].sum():
+            hours = None
+    if sizes is None or hours is None:
+        jobs = _wait_jobs(sel)
+        jobs = jobs[jobs["wait_time_sec"].notna().to_numpy()]
+        sizes = jobs if sizes is None else sizes
+        hours = jobs if hours is None else hours
+    if sizes.empty:
+        return None
+
+    def in_hours(frame, by):
+        if frame is jobs:
+            q = wait_times.job_wait_quantiles(frame, by)
+        else:
+            q = wait_times.wait_quantiles(frame, by)
+        return q.assign(**{c: q[c] / 3600 for c in q.columns if c != "jobs"})
+
+    out = {
+        "overall": in_hours(sizes, pd.Series("all", index=sizes.index)).iloc[0],
+        "partition": in_hours(sizes, "Partition").sort_values("jobs", ascending=False),
+        "size_class": in_hours(sizes, "size_class").sort_index(),
+        "month": in_hours(sizes, "month").sort_index(),
+    }
+    from_jobs = list(out) if sizes is jobs else []
+    out["hour"] = in_hours(hours, "hour").sort_index()
+    out["from_jobs"] = from_jobs + (["hour"] if hours is jobs else [])
+    return out
+
+
+@st.cache_data(**CACHE)
+@timed("section.jobs_by_meta")
+def jobs_by_meta(sel, meta, col, fill=None):
+    """
+    Jobs per value of a metadata column (as counted on jobs merged with the
+    metadata); `meta` is the snapshot version. fill: label of the jobs of
+    users without metadata (left out when None).
+    """
+    by_user = summarize(_cube(sel), "UID", ["jobs"])
+    return user_lookup().totals(by_user.index, by_user["jobs"].to_numpy(), col, fill=fill)
+
+
+@st.cache_data(**CACHE)
+@timed("section.institutions")
+def institutions(meta):
+    """Users per institution and city, over all users of snapshot `meta`."""
+    return (
+        load_user_meta()["institution_city_meta"]
+        .value_counts()
+        .reset_index()
+        .rename(columns={"index": "Institution, City", "institution_city_meta": "User Count"})
+    )
+
+
+@st.cache_data(**CACHE)
+@timed("section.recommendations")
+def recommendations(sel, top=5):
+    """Ranked issues of users and partitions (src/analytics.py), `top` per issue and scope."""
+    cube = _cube(sel)
+    ranked = pd.concat([
+        analytics.recommendations(analytics.user_metrics(cube), "user", top=top),
+        analytics.recommendations(analytics.partition_metrics(cube), "partition", top=top),
+    ], ignore_index=True)
+    return ranked.sort_values("share", ascending=False, kind="stable", ignore_index=True)
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark: sidebar filters through FilterIndex vs the column scans they replace.
+
+Usage (from hpc-analysis/):
+    python benchmarks/bench_filter_index.py [--rows 20000000]
+
+`--rows` jobs are drawn from the shipped 2018-2021 table (Start, Partition,
+UID, State only) and sorted by Start, as the dashboard holds them. For a
+few typical selections the script reports the best-of time of the old
+mask (date comparison + `isin` per column) and of `FilterIndex.select`,
+plus the index build time and size.
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+from filter_index import FilterIndex  # noqa: E402
+from jobs_schema import jobs_to_pandas  # noqa: E402
+
+LEGACY = ROOT / "data/processed/jobs_2018_2021_clean.parquet"
+COLS = ["Start", "Partition", "UID", "State"]
+
+
+def best_of(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def scan(df, start, end, values):
+    """The dashboard's old filter: a full pass over every filtered column."""
+    day = df["Start"].dt.date
+    mask = (day >= start.date()) & (day <= end.date())
+    for col, allowed in values.items():
+        mask &= df[col].isin(allowed)
+    return np.flatnonzero(mask)
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    p.add_argument("--rows", type=int, default=20_000_000, help="Jobs to generate")
+    args = p.parse_args()
+
+    legacy = jobs_to_pandas(pq.read_table(LEGACY, columns=COLS))
+    rng = np.random.default_rng(0)
+    df = legacy.iloc[rng.integers(0, len(legacy), args.rows)].reset_index(drop=True)
+    df = df.sort_values("Start", na_position="last", ignore_index=True)
+
+    t0 = time.perf_counter()
+    index = FilterIndex(df)
+    build_s = time.perf_counter() - t0
+    index_mb = sum(a.nbytes for a in [*index.rows.values(), *index.offsets.values()]) / 2**20
+
+    lo, hi = df["Start"].min(), df["Start"].max()
+    users = df["UID"].cat.categories
+    parts = df["Partition"].cat.categories
+    selections = {
+        "everything": (lo, hi, dict(Partition=list(parts), UID=list(users),
+                                    State=list(df["State"].cat.categories))),
+        "one_user_year": (hi - pd.Timedelta(days=365), hi, dict(UID=list(users[:1]))),
+        "two_thirds_each": (lo, hi, dict(Partition=list(parts[::3]) + list(parts[1::3]),
+                                         UID=list(users[::3]) + list(users[1::3]),
+                                         State=["COMPLETED", "FAILED", "TIMEOUT"])),
+        "failed_month": (hi - pd.Timedelta(days=30), hi, dict(State=["FAILED"])),
+    }
+    report = {"rows": len(df), "build_s": round(build_s, 3), "index_mb": round(index_mb, 1)}
+    for name, (start, end, values) in selections.items():
+        scan_s, expected = best_of(lambda: scan(df, start, end, values), repeat=3)
+        index_s, got = best_of(lambda: index.select(start, end, **values))
+        assert np.array_equal(got, expected), name
+        report[name] = {"matches": len(got), "scan_s": round(scan_s, 4), "index_s": round(index_s, 4)}
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
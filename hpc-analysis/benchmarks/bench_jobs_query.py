@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Benchmark: the query engines of jobs_query.py (wall time, peak RSS).
+
+Usage (from hpc-analysis/):
+    python benchmarks/bench_jobs_query.py [--rows 5000000] [--engines pandas arrow duckdb]
+
+A synthetic sacct export of `--rows` jobs is cleaned into a partitioned
+dataset; each engine then answers the same queries (a count, jobs and CPU
+time per month and partition, the same per user over one quarter, and a
+scan of one month's rows) in its own subprocess, so peak RSS is the
+engine's alone. Engines whose package is not installed are skipped.
+"""
+
+import argparse
+import importlib.util
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+from parallel_etl import run_etl  # noqa: E402
+from synthetic_jobs import write_synthetic  # noqa: E402
+
+QUERIES = """
+import sys
+sys.path.insert(0, sys.argv[2])
+from jobs_query import PandasQuery, open_query
+columns = ["JobID", "UID", "Start", "Partition", "State", "Elapsed_sec", "CPUTime_sec", "wait_time_sec"]
+# in memory: only the columns the queries use, as the dashboard does
+q = PandasQuery.from_dataset(sys.argv[3], columns) if sys.argv[1] == "pandas" else open_query(sys.argv[1], sys.argv[3])
+measures = {"jobs": (None, "size"), "cpu": ("CPUTime_sec", "sum"), "wait": ("wait_time_sec", "mean")}
+completed = {"State": ["COMPLETED"]}
+q.count("2024-01-01", "2024-12-31", completed)
+q.aggregate(["month", "Partition"], measures, filters=completed)
+q.aggregate(["UID"], measures, "2024-04-01", "2024-06-30")
+sum(len(c) for c in q.scan(["JobID", "UID", "Start", "Elapsed_sec"], "2024-03-01", "2024-03-31"))
+print([l.split()[1] for l in open("/proc/self/status") if l.startswith("VmHWM")][0])
+"""
+
+
+def run(engine, root):
+    """Run the queries with `engine` in a fresh interpreter; returns (wall seconds, peak RSS MiB)."""
+    t0 = time.perf_counter()
+    out = subprocess.run([sys.executable, "-c", QUERIES, engine, str(ROOT / "src"), str(root)],
+                         check=True, capture_output=True, text=True).stdout
+    return time.perf_counter() - t0, int(out.split()[-1]) / 1024
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    p.add_argument("--rows", type=int, default=5_000_000, help="Synthetic jobs")
+    p.add_argument("--engines", nargs="+", default=["pandas", "arrow", "duckdb"])
+    args = p.parse_args()
+
+    engines = [e for e in args.engines if e != "duckdb" or importlib.util.find_spec("duckdb")]
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        inputs = write_synthetic(tmp / "raw", rows=args.rows, legacy_rows=0,
+                                 start="2024-01-01", end="2025-01-01")
+        run_etl(inputs, tmp / "jobs_all", workers=1)
+        results = {e: run(e, tmp / "jobs_all") for e in engines}
+
+    print(json.dumps({
+        "rows": args.rows,
+        "engines": {e: {"wall_s": round(w, 2), "peak_rss_mb": round(r, 1)} for e, (w, r) in results.items()},
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Benchmark: dashboard workers loading the jobs from Parquet vs the snapshot.
+
+Usage (from hpc-analysis/):
+    python benchmarks/bench_jobs_snapshot.py [--rows 2000000] [--workers 4]
+
+A synthetic sacct export of `--rows` jobs is cleaned into a partitioned
+dataset and its memory-mapped snapshot (jobs_snapshot.py). Then `--workers`
+processes load the whole jobs table at the same time, as data_access.py
+does (read_jobs + sort by Start, or read_snapshot), and read every column
+once. Per worker: the load time, the private RSS (RssAnon: its own heap)
+and the PSS (pages shared between workers counted once across them), i.e.
+what the host pays per worker.
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+from jobs_snapshot import snapshot_path, write_snapshot  # noqa: E402
+from parallel_etl import run_etl  # noqa: E402
+from synthetic_jobs import write_synthetic  # noqa: E402
+
+WORKER = """
+import json, os, sys, time
+from pathlib import Path
+sys.path.insert(0, sys.argv[2])
+from jobs_dataset import read_jobs
+from jobs_snapshot import read_snapshot, snapshot_path
+source, root, ready, workers = sys.argv[1], sys.argv[3], Path(sys.argv[4]), int(sys.argv[5])
+t0 = time.perf_counter()
+if source == "snapshot":
+    df = read_snapshot(snapshot_path(root))
+else:
+    df = read_jobs(root).sort_values("Start", kind="stable", na_position="last", ignore_index=True)
+load_s = time.perf_counter() - t0
+for col in df.columns:
+    s = df[col]
+    s.min() if s.dtype.kind in "iufM" else s.isna().sum()
+# measure once every worker holds its frame
+(ready / str(os.getpid())).touch()
+while len(list(ready.iterdir())) < workers:
+    time.sleep(0.05)
+mem = {}
+for name in ("/proc/self/status", "/proc/self/smaps_rollup"):
+    for line in open(name):
+        key, _, value = line.partition(":")
+        if key in ("RssAnon", "RssFile", "Pss"):
+            mem[key] = int(value.split()[0]) / 1024
+print(json.dumps({"load_s": load_s, **mem}))
+"""
+
+
+def run(source, root, workers, tmp):
+    """Load with `source` in `workers` concurrent interpreters; returns their measurements."""
+    ready = Path(tempfile.mkdtemp(dir=tmp))
+    procs = [subprocess.Popen([sys.executable, "-c", WORKER, source, str(ROOT / "src"), str(root),
+                               str(ready), str(workers)], stdout=subprocess.PIPE, text=True)
+             for _ in range(workers)]
+    # the others would wait for a dead worker forever
+    while any(p.poll() is None for p in procs):
+        if any(p.poll() for p in procs):
+            for p in procs:
+                p.kill()
+            raise SystemExit(f"a {source} worker failed")
+        time.sleep(0.1)
+    if any(p.returncode for p in procs):
+        raise SystemExit(f"a {source} worker failed")
+    return [json.loads(p.stdout.read()) for p in procs]
+
+
+def mean(results, key):
+    return round(sum(r[key] for r in results) / len(results), 2)
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    p.add_argument("--rows", type=int, default=2_000_000, help="Synthetic jobs")
+    p.add_argument("--workers", type=int, default=4, help="Concurrent worker processes")
+    args = p.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        inputs = write_synthetic(tmp / "raw", rows=args.rows, legacy_rows=0,
+                                 start="2024-01-01", end="2025-01-01")
+        root = tmp / "jobs_all"
+        run_etl(inputs, root, workers=1)
+        t0 = time.perf_counter()
+        write_snapshot(root)
+        write_s = time.perf_counter() - t0
+        size_mb = snapshot_path(root).stat().st_size / 2**20
+        results = {source: run(source, root, args.workers, tmp) for source in ("parquet", "snapshot")}
+
+    print(json.dumps({
+        "rows": args.rows,
+        "workers": args.workers,
+        "snapshot": {"write_s": round(write_s, 2), "size_mb": round(size_mb, 1)},
+        "load": {s: {"load_s": mean(r, "load_s"), "rss_anon_mb": mean(r, "RssAnon"),
+                     "rss_file_mb": mean(r, "RssFile"), "pss_mb": mean(r, "Pss")}
+                 for s, r in results.items()},
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark: streaming merge_jobs_all vs the previous in-memory script.
+
+Usage (from hpc-analysis/):
+    python benchmarks/bench_merge.py [--scale 10] [--batch-rows 250000]
+
+Both inputs are built from the shipped 2018-2021 table, tiled `--scale`
+times with shifted dates: one copy keeps the legacy dtypes, the other is
+converted to the string-heavy dtypes of make_dataset.py output. Each merge
+runs in its own subprocess so wall time and peak RSS are measured cleanly.
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+LEGACY = ROOT / "data/processed/jobs_2018_2021_clean.parquet"
+
+# the merge as it was before the streaming rewrite
+IN_MEMORY = """
+import sys, pandas as pd
+from pathlib import Path
+df1 = pd.read_parquet(sys.argv[1])
+df2 = pd.read_parquet(sys.argv[2])
+for col in ["JobID", "UID", "Partition", "Account", "ExitCode", "State"]:
+    if col in df1.columns:
+        df1[col] = df1[col].astype(str)
+    if col in df2.columns:
+        df2[col] = df2[col].astype(str)
+df_all = pd.concat([df1, df2], ignore_index=True).sort_values("Start")
+df_all.to_parquet(Path(sys.argv[3]) / "jobs_all.parquet", index=False)
+"""
+
+STREAMING = """
+import sys
+sys.path.insert(0, sys.argv[4])
+from pathlib import Path
+from merge_jobs_all import merge_jobs
+merge_jobs([Path(sys.argv[1]), Path(sys.argv[2])], Path(sys.argv[3]) / "jobs_all",
+           batch_rows=int(sys.argv[5]))
+"""
+
+
+def make_inputs(tmp, scale):
+    legacy = pd.read_parquet(LEGACY)
+    copies = []
+    for i in range(scale):
+        part = legacy.copy()
+        shift = pd.Timedelta(days=37 * i)
+        for col in ("Submit", "Start", "End"):
+            part[col] = part[col] + shift
+        part["JobID"] = part["JobID"] + i * 10_000_000
+        copies.append(part)
+    legacy = pd.concat(copies, ignore_index=True)
+    legacy = legacy.sample(frac=1, random_state=0).reset_index(drop=True)
+    legacy.to_parquet(tmp / "legacy.parquet", index=False)
+
+    # same rows shaped like make_dataset.py output (ids and codes as text);
+    # TimeLimit stays numeric, the in-memory script cannot write a column
+    # mixing ints and strings
+    sacct = legacy.copy()
+    for col in ("Submit", "Start", "End"):
+        sacct[col] = sacct[col] + pd.Timedelta(days=3 * 365)
+    sacct["JobID"] = sacct["JobID"].astype(str) + "_0"
+    sacct["ExitCode"] = "0:0"
+    sacct["wait_time_sec"] = (sacct["Start"] - sacct["Submit"]).dt.total_seconds()
+    sacct["efficiency"] = np.random.default_rng(0).random(len(sacct))
+    sacct.to_parquet(tmp / "sacct.parquet", index=False)
+    return len(legacy) + len(sacct)
+
+
+def run(code, args):
+    """Run `code` in a fresh interpreter; returns (wall seconds, peak RSS MiB)."""
+    # VmHWM is per address space; ru_maxrss would carry over this (large)
+    # parent process's peak across fork/exec
+    code += (
+        "\nprint([l.split()[1] for l in open('/proc/self/status')"
+        " if l.startswith('VmHWM')][0])\n"
+    )
+    t0 = time.perf_counter()
+    out = subprocess.run([sys.executable, "-c", code, *map(str, args)],
+                         check=True, capture_output=True, text=True).stdout
+    wall = time.perf_counter() - t0
+    return wall, int(out.split()[-1]) / 1024  # KiB -> MiB
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    p.add_argument("--scale", type=int, default=10, help="Copies of the legacy table per input")
+    p.add_argument("--batch-rows", type=int, default=250_000)
+    args = p.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        rows = make_inputs(tmp, args.scale)
+        src = [tmp / "sacct.parquet", tmp / "legacy.parquet"]
+        (tmp / "out_stream").mkdir()
+        (tmp / "out_memory").mkdir()
+        s_wall, s_rss = run(STREAMING, [*src, tmp / "out_stream", ROOT / "src", args.batch_rows])
+        m_wall, m_rss = run(IN_MEMORY, [*src, tmp / "out_memory"])
+
+    print(json.dumps({
+        "rows": rows,
+        "streaming": {"wall_s": round(s_wall, 2), "peak_rss_mb": round(s_rss, 1)},
+        "in_memory": {"wall_s": round(m_wall, 2), "peak_rss_mb": round(m_rss, 1)},
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Benchmark: parallel_etl.py wall time and speedup by number of workers.
+
+Usage (from hpc-analysis/):
+    python benchmarks/bench_parallel_etl.py [--files 12] [--workers 1 2 4 8]
+
+The shipped 2018-2021 table is written out as `--files` pipe-delimited sacct
+exports, one per shifted copy (a month-per-file layout of about 120k rows
+each). Each worker count cleans all of them into a fresh dataset; the
+speedup is against the 1-worker (in-process) run.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+from make_dataset import READ_CSV_KW, REQUIRED_COLS  # noqa: E402
+from parallel_etl import run_etl  # noqa: E402
+
+LEGACY = ROOT / "data/processed/jobs_2018_2021_clean.parquet"
+
+
+def make_inputs(raw_dir, n_files):
+    """`n_files` sacct exports built from the legacy table, dates shifted per file."""
+    legacy = pd.read_parquet(LEGACY)
+    raw_dir.mkdir()
+    paths = []
+    for i in range(n_files):
+        part = legacy.copy()
+        for col in ("Submit", "Start", "End"):
+            part[col] = (part[col] + pd.Timedelta(days=31 * i)).dt.strftime("%Y-%m-%dT%H:%M:%S")
+        part["JobID"] = part["JobID"] + i * 10_000_000
+        part["ReqMem"] = "4000Mn"
+        path = raw_dir / f"sacct_{i:03d}.csv"
+        part[REQUIRED_COLS + ["NNODES", "NTASKS", "TimeLimit"]].to_csv(
+            path, sep=READ_CSV_KW["sep"], index=False)
+        paths.append(path)
+    return paths, len(legacy) * n_files
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    p.add_argument("--files", type=int, default=12, help="Raw files to clean")
+    p.add_argument("--workers", type=int, nargs="+",
+                   default=sorted({1, 2, 4, os.cpu_count() or 1}), help="Worker counts to time")
+    args = p.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        inputs, rows = make_inputs(tmp / "raw", args.files)
+        results = {}
+        for workers in args.workers:
+            summary = run_etl(inputs, tmp / f"out_{workers}", workers=workers)
+            results[workers] = summary["seconds"]
+
+    base = results.get(1)
+    print(json.dumps({
+        "rows": rows,
+        "files": args.files,
+        "cores": os.cpu_count(),
+        "runs": [
+            {"workers": w, "wall_s": round(s, 2), "speedup": round(base / s, 2) if base else None}
+            for w, s in results.items()
+        ],
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Benchmark: compact jobs schema vs object-string columns in the dashboard process.
+
+Usage (from hpc-analysis/):
+    python benchmarks/bench_schema.py [--scale 10]
+
+The shipped 2018-2021 table is tiled `--scale` times and held in memory the
+way the app used to get it (JobID/UID/Partition/Account/ExitCode/State as
+Python strings) and in the compact schema of jobs_schema.py. Reported:
+DataFrame memory and the time of the dashboard's sidebar filter mask.
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+from jobs_schema import compact_table, jobs_to_pandas  # noqa: E402
+
+LEGACY = ROOT / "data/processed/jobs_2018_2021_clean.parquet"
+STR_COLS = ["JobID", "UID", "Partition", "Account", "ExitCode", "State"]
+
+
+def filter_time(df, repeat=5):
+    """Best-of time of the app's Partition/UID/State mask keeping ~2/3 of the values."""
+    sel = {c: df[c].dropna().unique()[::3].tolist() for c in ("Partition", "UID", "State")}
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        mask = (
+            df["Partition"].isin(sel["Partition"])
+            & df["UID"].isin(sel["UID"])
+            & df["State"].isin(sel["State"])
+        )
+        df[mask]
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    p.add_argument("--scale", type=int, default=10, help="Copies of the legacy table")
+    args = p.parse_args()
+
+    legacy = pd.read_parquet(LEGACY)
+    legacy = pd.concat([legacy] * args.scale, ignore_index=True)
+    legacy["JobID"] = legacy["JobID"] + legacy.index // (len(legacy) // args.scale) * 10_000_000
+
+    old = legacy.astype({c: object for c in STR_COLS})
+    for col in STR_COLS:
+        old[col] = old[col].map(str)  # what `.astype(str)` produced before pandas 3
+    compact = jobs_to_pandas(compact_table(pa.Table.from_pandas(legacy, preserve_index=False)))
+
+    print(json.dumps({
+        "rows": len(legacy),
+        "object": {"memory_mb": round(old.memory_usage(deep=True).sum() / 2**20, 1),
+                   "filter_s": round(filter_time(old), 4)},
+        "compact": {"memory_mb": round(compact.memory_usage(deep=True).sum() / 2**20, 1),
+                    "filter_s": round(filter_time(compact), 4)},
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite: the ETL steps and every dashboard computation on synthetic
+data, appended to a machine-readable history and checked for regressions.
+
+Usage (from hpc-analysis/):
+    python benchmarks/run_benchmarks.py [--rows 1000000] [--legacy-rows 200000] \
+        [--stages make_dataset convert_jobs2018_2021 merge_jobs_all rollups dashboard] \
+        [--cache-dir /tmp/hpc-bench] [--history benchmarks/history.jsonl] \
+        [--tolerance 0.2] [--fail-on-regression]
+
+The raw inputs come from src/synthetic_jobs.py and are kept in --cache-dir
+per (rows, legacy rows, seed), since generating 50M rows takes longer than
+some of the steps timed. The stages run in order, each in a fresh
+interpreter, and each one reads the previous one's output:
+
+    make_dataset           build_dataset on the sacct export
+    convert_jobs2018_2021  convert_legacy on the jobs_table export
+    merge_jobs_all         merge_jobs of both into the partitioned dataset
+    rollups                build_rollups (cube and wait sketches)
+    dashboard              load_cube, options, overview, occupancy, efficiency,
+                           queue_wait, failures_and_memory, recommendations and
+                           the jobs table filter, over the full date range with
+                           every partition, user and state selected (the
+                           metadata charts need MySQL and are not timed)
+
+Every measurement is a stage of src/instrument.py, with wall seconds,
+rows/s (rows read or written by an ETL step and the loaders, jobs covered
+by a dashboard computation) and peak RSS. The peak is reset when the stage
+starts, so a dashboard entry is the process peak during that computation
+alone, including what the earlier ones loaded.
+
+A run is one JSON line in --history with the commit, host, library versions
+and sizes. Each measurement is compared to the median of the last
+--baseline runs on the same host and sizes; slower by more than --tolerance
+(and by more than MIN_DELTA seconds) is reported as a regression.
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+import instrument  # noqa: E402
+
+HISTORY = ROOT / "benchmarks/history.jsonl"
+CACHE_DIR = Path("/tmp/hpc-bench")
+STAGES = ["make_dataset", "convert_jobs2018_2021", "merge_jobs_all", "rollups", "dashboard"]
+TOLERANCE = 0.2
+BASELINE_RUNS = 5
+MIN_DELTA = 0.05  # seconds; differences below this are timer noise
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    p.add_argument("--rows", type=int, default=1_000_000, help="Jobs in the synthetic sacct export")
+    p.add_argument("--legacy-rows", type=int, default=None, help="Jobs in the legacy export (default rows / 5)")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--stages", nargs="+", default=STAGES, choices=STAGES)
+    p.add_argument("--cache-dir", type=Path, default=CACHE_DIR, help="Synthetic inputs and stage outputs")
+    p.add_argument("--history", type=Path, default=HISTORY, help="JSON-lines file the run is appended to")
+    p.add_argument("--no-history", action="store_true", help="Compare but do not record this run")
+    p.add_argument("--tolerance", type=float, default=TOLERANCE, help="Allowed slowdown vs the baseline")
+    p.add_argument("--baseline", type=int, default=BASELINE_RUNS, help="Earlier runs the baseline is taken from")
+    p.add_argument("--fail-on-regression", action="store_true", help="Exit with status 1 on a regression")
+    p.add_argument("--run-stage", help=argparse.SUPPRESS)  # internal: run one stage in this process
+    p.add_argument("--work-dir", type=Path, help=argparse.SUPPRESS)
+    return p.parse_args()
+
+
+# --- measurements (inside a stage process) ---------------------------------
+
+def measure(results, name, fn):
+    """Run `fn` (returning a row count or None) as stage `name`, append its measurement to `results`."""
+    mark = instrument.mark()
+    with instrument.stage(name) as s:
+        s.rows = fn()
+    rec = instrument.records(since=mark)[-1]  # the enclosing stage finishes last
+    results.append({
+        "name": name,
+        "wall_s": round(rec["wall_s"], 4),
+        "rows": rec["rows"],
+        "rows_per_s": round(rec["rows_per_s"]) if rec["rows"] and rec["rows_per_s"] else None,
+        "peak_rss_mb": round(rec["peak_rss_mb"], 1) if rec["peak_rss_mb"] else None,
+    })
+    return results[-1]
+
+
+# --- stages ------------------------------------------------------------------
+
+def stage_make_dataset(work, results):
+    from make_dataset import build_dataset
+    measure(results, "make_dataset",
+            lambda: build_dataset(work / "raw/sacct.csv", work / "processed/jobs_clean.parquet"))
+
+
+def stage_convert_jobs2018_2021(work, results):
+    from convert_jobs2018_2021 import convert_legacy, read_legacy
+
+    def run():
+        df = convert_legacy(read_legacy(work / "raw/jobs_table.csv"))
+        df.to_parquet(work / "processed/jobs_2018_2021_clean.parquet", index=False)
+        return len(df)
+    measure(results, "convert_jobs2018_2021", run)
+
+
+def stage_merge_jobs_all(work, results):
+    from merge_jobs_all import merge_jobs
+    processed = work / "processed"
+    sources = [processed / "jobs_clean.parquet", processed / "jobs_2018_2021_clean.parquet"]
+    measure(results, "merge_jobs_all", lambda: merge_jobs([s for s in sources if s.exists()], processed / "jobs_all"))
+
+
+def stage_rollups(work, results):
+    from rollups import build_rollups
+    processed = work / "processed"
+    measure(results, "rollups", lambda: len(build_rollups(processed / "jobs_all", processed / "jobs_daily.parquet")))
+
+
+def stage_dashboard(work, results):
+    import logging
+    os.environ["HPC_DATA_DIR"] = str(work / "processed")
+    sys.path.insert(0, str(ROOT / "app"))
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    import data_access
+    import sections
+
+    # the computations themselves, not st.cache_data's lookup
+    def call(name, *args):
+        return getattr(sections, name).__wrapped__(*args)
+
+    cube_v = data_access.cube_version()
+    measure(results, "dashboard.load_cube", lambda: len(data_access.load_cube()))
+    measure(results, "dashboard.load_monthly_cube", lambda: len(data_access.load_monthly_cube()))
+    measure(results, "dashboard.load_wait_sketches", lambda: len(data_access.load_wait_sketches()))
+    start, end = (t.date() for t in data_access.jobs_date_bounds())
+    opts = {}
+    measure(results, "dashboard.options", lambda: opts.update(call("options", cube_v, start, end)) or opts["jobs"])
+    sel = sections.Selection(cube_v, start, end, tuple(opts["partitions"]), tuple(opts["users"]),
+                             tuple(opts["statuses"]))
+    n_jobs = opts["jobs"]
+    measure(results, "dashboard.overview", lambda: call("overview", sel) and n_jobs)
+    measure(results, "dashboard.occupancy_build", lambda: data_access.occupancy() and n_jobs)
+    measure(results, "dashboard.occupancy", lambda: call(
+        "occupancy", data_access.jobs_version(), start, end, sel.partitions) is not None and n_jobs)
+    for name in ["efficiency", "queue_wait", "failures_and_memory", "recommendations"]:
+        measure(results, f"dashboard.{name}", lambda name=name: call(name, sel) is not None and n_jobs)
+    measure(results, "dashboard.load_jobs", lambda: len(data_access.load_jobs(sections.APP_COLUMNS)))
+    # the jobs table of the Download tab with half of the users deselected
+    filters = dict(sel.filters, UID=list(sel.uids)[::2])
+    measure(results, "dashboard.filter_jobs",
+            lambda: len(data_access.load_jobs(sections.APP_COLUMNS, start, end, filters)))
+
+
+# --- driver ------------------------------------------------------------------
+
+def run_stage(name, work):
+    """Run one stage in a fresh interpreter; returns its measurements."""
+    out = subprocess.run(
+        [sys.executable, __file__, "--run-stage", name, "--work-dir", str(work)],
+        check=True, capture_output=True, text=True, cwd=ROOT,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def prepare_inputs(args):
+    """Synthetic raw files for these sizes, generated once per (rows, legacy rows, seed)."""
+    from synthetic_jobs import write_synthetic
+    legacy_rows = args.rows // 5 if args.legacy_rows is None else args.legacy_rows
+    work = args.cache_dir / f"rows{args.rows}_legacy{legacy_rows}_seed{args.seed}"
+    raw = work / "raw"
+    if not (raw / "sacct.csv").exists():
+        t0 = time.perf_counter()
+        shutil.rmtree(raw, ignore_errors=True)
+        write_synthetic(raw, args.rows, legacy_rows, seed=args.seed)
+        print(f"Generated {args.rows:,} + {legacy_rows:,} synthetic jobs in {time.perf_counter() - t0:.0f}s")
+    (work / "processed").mkdir(exist_ok=True)
+    return work, legacy_rows
+
+
+def environment():
+    import pandas as pd
+    import pyarrow as pa
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=ROOT).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "commit": commit,
+        "host": platform.node(),
+        "cpus": os.cpu_count(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "pyarrow": pa.__version__,
+        "numpy": np.__version__,
+    }
+
+
+def load_history(path):
+    if not path.exists():
+        return []
+    return [json.loads(line) for line in path.read_text().splitlines() if line.strip()]
+
+
+def compare(run, history, tolerance, n_baseline):
+    """
+    Per measurement: the baseline (median wall time of the last `n_baseline`
+    comparable runs), the ratio to it and whether it is a regression.
+    """
+    same = [r for r in history
+            if (r["host"], r["rows"], r["legacy_rows"]) == (run["host"], run["rows"], run["legacy_rows"])]
+    rows = []
+    for m in run["results"]:
+        past = [p["wall_s"] for r in same for p in r["results"] if p["name"] == m["name"]][-n_baseline:]
+        base = float(np.median(past)) if past else None
+        ratio = m["wall_s"] / base if base else None
+        slower = base is not None and m["wall_s"] > base * (1 + tolerance) and m["wall_s"] - base > MIN_DELTA
+        rows.append(dict(m, baseline_s=base, ratio=ratio, regression=slower))
+    return rows
+
+
+def report(rows):
+    print(f"{'measurement':34} {'wall s':>9} {'baseline':>9} {'ratio':>6} {'rows/s':>12} {'peak MB':>9}")
+    for r in rows:
+        base = f"{r['baseline_s']:.3f}" if r["baseline_s"] is not None else "-"
+        ratio = f"{r['ratio']:.2f}" if r["ratio"] is not None else "-"
+        rate = f"{r['rows_per_s']:,}" if r["rows_per_s"] else "-"
+        peak = f"{r['peak_rss_mb']:,.0f}" if r["peak_rss_mb"] else "-"
+        flag = "  ⚠ regression" if r["regression"] else ""
+        print(f"{r['name']:34} {r['wall_s']:9.3f} {base:>9} {ratio:>6} {rate:>12} {peak:>9}{flag}")
+
+
+def main():
+    args = parse_args()
+    if args.run_stage:
+        instrument.enable()
+        results = []
+        globals()[f"stage_{args.run_stage}"](args.work_dir, results)
+        print(json.dumps(results))
+        return
+
+    work, legacy_rows = prepare_inputs(args)
+    run = dict(environment(), timestamp=time.strftime("%Y-%m-%dT%H:%M:%S"), rows=args.rows,
+               legacy_rows=legacy_rows, seed=args.seed, results=[])
+    for stage in STAGES:
+        if stage in args.stages:
+            run["results"] += run_stage(stage, work)
+
+    rows = compare(run, load_history(args.history), args.tolerance, args.baseline)
+    report(rows)
+    if not args.no_history:
+        args.history.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.history, "a") as f:
+            f.write(json.dumps(run) + "\n")
+    regressions = [r["name"] for r in rows if r["regression"]]
+    if regressions:
+        print(f"{len(regressions)} regression(s) over {args.tolerance:.0%}: {', '.join(regressions)}")
+        if args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
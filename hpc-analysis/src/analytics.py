@@ -0,0 +1,136 @@
+# src/analytics.py
+"""
+Per-user / per-partition usage metrics and ranked recommendations.
+
+Everything is computed from the rollup cube (rollups.py) with grouped sums,
+so the cost depends on the number of cube rows in the selection, not on
+the number of jobs, and there is no Python call per user:
+
+    jobs, failed, failure_rate       failed / jobs
+    core_hours                       Elapsed × NCPUS
+    efficiency                       mean CPUTime / (Elapsed × NCPUS) per job
+    idle_core_hours                  core-hours not used by the CPU, non-failed jobs
+    failed_core_hours                core-hours of failed jobs
+    wasted_core_hours                idle + failed
+    mem_overrequest                  requested / peak memory (ReqMem_MB / MaxRSS_MB)
+                                     over the jobs that have both
+    mem_unused_gb                    requested minus peak memory over those jobs
+    mem_reserved_gb_hours            requested memory × Elapsed over those jobs
+    mem_unused_gb_hours              (requested - peak memory) × Elapsed: memory
+                                     held on the nodes but never used
+
+`recommendations` turns the metrics into a ranked table of issues using
+THRESHOLDS. Each issue has an `impact` (core-hours, or unused memory
+GB-hours) and its `share` of that total over all groups, which ranks
+issues of different units against each other: the biggest savings first.
+"""
+
+import numpy as np
+import pandas as pd
+
+from rollups import AGGREGATIONS
+
+THRESHOLDS = {
+    "min_jobs": 10,               # ignore groups with fewer jobs
+    "low_efficiency": 0.5,        # mean efficiency below this
+    "memory_overrequest": 2.0,    # requesting more than twice the peak RSS
+    "high_failure_rate": 0.3,     # share of failed/cancelled/OOM jobs
+}
+
+METRIC_COLS = [
+    "jobs", "failed", "failure_rate", "core_hours", "efficiency", "idle_core_hours",
+    "failed_core_hours", "wasted_core_hours", "mem_overrequest", "mem_unused_gb", "mem_paired_n",
+    "mem_reserved_gb_hours", "mem_unused_gb_hours",
+]
+
+_SUMS = [
+    "jobs", "failed", "core_seconds_sum", "efficiency_sum", "efficiency_n", "idle_core_seconds",
+    "failed_core_seconds", "mem_req_paired_sum", "mem_rss_paired_sum", "mem_paired_n",
+    "mem_reserved_mb_seconds", "mem_unused_mb_seconds",
+]
+
+
+def _ratio(num, den):
+    den = np.asarray(den, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(den > 0, np.asarray(num, dtype=float) / den, np.nan)
+
+
+def group_metrics(cube, by):
+    """METRIC_COLS per value of `by` (cube column name(s)), one row per group."""
+    missing = [c for c in _SUMS if c not in cube.columns]
+    if missing:
+        raise KeyError(f"Rollup cube lacks {missing}; rebuild it with rollups.py")
+    sums = cube.groupby(by, observed=True, sort=False)[_SUMS].agg(
+        {c: AGGREGATIONS.get(c, "sum") for c in _SUMS}
+    )
+    out = pd.DataFrame(index=sums.index)
+    out["jobs"] = sums["jobs"]
+    out["failed"] = sums["failed"]
+    out["failure_rate"] = _ratio(sums["failed"], sums["jobs"])
+    out["core_hours"] = sums["core_seconds_sum"] / 3600
+    out["efficiency"] = _ratio(sums["efficiency_sum"], sums["efficiency_n"])
+    out["idle_core_hours"] = sums["idle_core_seconds"] / 3600
+    out["failed_core_hours"] = sums["failed_core_seconds"] / 3600
+    out["wasted_core_hours"] = out["idle_core_hours"] + out["failed_core_hours"]
+    out["mem_overrequest"] = _ratio(sums["mem_req_paired_sum"], sums["mem_rss_paired_sum"])
+    out["mem_unused_gb"] = np.clip(sums["mem_req_paired_sum"] - sums["mem_rss_paired_sum"], 0, None) / 1024
+    out["mem_paired_n"] = sums["mem_paired_n"]
+    out["mem_reserved_gb_hours"] = sums["mem_reserved_mb_seconds"] / (1024 * 3600)
+    out["mem_unused_gb_hours"] = sums["mem_unused_mb_seconds"] / (1024 * 3600)
+    return out[METRIC_COLS]
+
+
+def user_metrics(cube):
+    return group_metrics(cube, "UID")
+
+
+def partition_metrics(cube):
+    return group_metrics(cube, "Partition")
+
+
+# issue -> (metric, flagged when, impact column, message template)
+RULES = {
+    "low_efficiency": (
+        "efficiency", lambda m, t: m < t["low_efficiency"], "idle_core_hours",
+        "mean CPU efficiency {value:.0%}: {impact:,.0f} idle core-hours",
+    ),
+    "memory_overrequest": (
+        "mem_overrequest", lambda m, t: m > t["memory_overrequest"], "mem_unused_gb_hours",
+        "requests {value:.1f}× its peak memory: {impact:,.0f} GB-hours reserved but unused",
+    ),
+    "high_failure_rate": (
+        "failure_rate", lambda m, t: m > t["high_failure_rate"], "failed_core_hours",
+        "{value:.0%} of jobs failed: {impact:,.0f} core-hours lost",
+    ),
+}
+
+
+def recommendations(metrics, scope, thresholds=None, top=None):
+    """
+    Ranked issues of one metrics table (e.g. user_metrics(cube), scope="user").
+
+    Returns a DataFrame with columns scope, key, issue, value, impact, share
+    and message, largest share first; `top` keeps the first rows per issue.
+    Groups with fewer than thresholds["min_jobs"] jobs are not flagged
+    (the memory rule counts the jobs having both ReqMem and MaxRSS).
+    """
+    t = dict(THRESHOLDS, **(thresholds or {}))
+    parts = []
+    for issue, (metric, flagged, impact, message) in RULES.items():
+        enough = metrics["mem_paired_n" if metric == "mem_overrequest" else "jobs"] >= t["min_jobs"]
+        hit = metrics[enough & flagged(metrics[metric], t)]
+        hit = hit.sort_values(impact, ascending=False, kind="stable")
+        if top is not None:
+            hit = hit.head(top)
+        parts.append(pd.DataFrame({
+            "scope": scope,
+            "key": hit.index.to_numpy(dtype=object),
+            "issue": issue,
+            "value": hit[metric].to_numpy(dtype=float),
+            "impact": hit[impact].to_numpy(dtype=float),
+            "share": _ratio(hit[impact], np.full(len(hit), metrics[impact].sum())),
+            "message": [message.format(value=v, impact=i) for v, i in zip(hit[metric], hit[impact])],
+        }))
+    out = pd.concat(parts, ignore_index=True)
+    return out.sort_values("share", ascending=False, kind="stable", ignore_index=True)
@@ -2,34 +2,189 @@
 import re
 import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from decode_tres import decode_reqmem
+
+# [D-]HH:MM:SS, MM:SS and MM:SS.mmm (TotalCPU/UserCPU use the latter)
+_duration_re = re.compile(
+    r"^(?:(?:(?P<days>\d+)-)?(?P<hours>\d+):)?(?P<minutes>\d+):(?P<seconds>\d+(?:\.\d+)?)$"
+)
 
 def parse_hms_or_dhms(s):
     """
-    Convert 'DD-HH:MM:SS' or 'HH:MM:SS' into seconds (float).
-    Returns np.nan for blanks or NaT.
+    Convert 'DD-HH:MM:SS', 'HH:MM:SS' or 'MM:SS.mmm' into seconds (float).
+    Returns np.nan for blanks, NaT, 'UNLIMITED' and anything unparsable.
 
     Examples:
         "01:02:03"     -> 3723
         "2-00:00:00"   -> 172800
+        "05:30.250"    -> 330.25
         "" / None      -> np.nan
         "bad"          -> np.nan
     """
     if pd.isna(s) or s == "":
         return np.nan
-    s = str(s)
-    try:
-        if "-" in s:
-            days, rest = s.split("-")
-            h, m, sec = map(int, rest.split(":"))
-            total = int(days) * 86400 + h * 3600 + m * 60 + sec
-        else:
-            h, m, sec = map(int, s.split(":"))
-            total = h * 3600 + m * 60 + sec
-        return float(total)
-    except Exception:
+    m = _duration_re.match(str(s).strip())
+    if not m:
         return np.nan
+    total = (
+        int(m["days"] or 0) * 86400
+        + int(m["hours"] or 0) * 3600
+        + int(m["minutes"]) * 60
+        + float(m["seconds"])
+    )
+    return float(total)
+
+def _utf8_column(values):
+    """Series -> (large_string Arrow array, int64 offsets, uint8 data)."""
+    try:
+        arr = pa.array(values, from_pandas=True, type=pa.large_string())
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # mixed/numeric column: stringify like the scalar parser does
+        arr = pa.array(
+            [None if pd.isna(v) else str(v) for v in values], type=pa.large_string()
+        )
+    if isinstance(arr, pa.ChunkedArray):
+        chunks = [c.cast(pa.large_string()) for c in arr.chunks]
+        arr = pa.concat_arrays(chunks) if chunks else pa.array([], pa.large_string())
+    _, offsets, data = arr.buffers()
+    offsets = np.frombuffer(offsets, dtype=np.int64)[arr.offset:arr.offset + len(arr) + 1]
+    data = np.frombuffer(data, dtype=np.uint8) if data is not None else np.zeros(0, np.uint8)
+    return arr, offsets, data
+
+def parse_hms_or_dhms_series(values):
+    """
+    Column-at-once version of `parse_hms_or_dhms`; same results, float64 Series.
+
+    The layouts sacct actually emits ('HH:MM:SS', 'D-HH:MM:SS', 'MM:SS.mmm')
+    are decoded straight from the Arrow UTF-8 buffer with numpy byte gathers.
+    Anything else (blanks, UNLIMITED, unpadded fields) goes through the same
+    regex as the scalar parser, evaluated by Arrow.
+    """
+    values = pd.Series(values, copy=False)
+    arr, offsets, data = _utf8_column(values)
+    start, end = offsets[:-1], offsets[1:]
+    # null slots may still cover bytes in the data buffer
+    length = np.where(arr.is_valid().to_numpy(zero_copy_only=False), end - start, 0)
+    out = np.full(len(values), np.nan)
+
+    # left-pad so look-backs past the start of the buffer stay in bounds; bytes
+    # borrowed from a neighbouring string are masked out by the length checks
+    pad = 16
+    data = np.concatenate([np.zeros(pad, np.uint8), data])
+    b = {k: data[end - k + pad] for k in range(1, 14)}
+    dig = {k: v.astype(np.int64) - 48 for k, v in b.items()}
+    isdig = {k: (v >= 48) & (v <= 57) for k, v in b.items()}
+
+    def all_digits(*ks):
+        return np.logical_and.reduce([isdig[k] for k in ks])
+
+    # HH:MM:SS, optionally preceded by 1-4 day digits and '-'
+    hms = (length >= 8) & all_digits(8, 7, 5, 4, 2, 1) & (b[6] == 58) & (b[3] == 58)
+    day_len = length - 9
+    days = np.zeros(len(values), dtype=np.int64)
+    day_ok = (b[9] == 45) & (day_len >= 1) & (day_len <= 4)
+    for i in range(4):
+        inside = i < day_len
+        day_ok &= ~inside | isdig[10 + i]
+        days += np.where(inside, dig[10 + i] * 10 ** i, 0)
+    hms = hms & ((length == 8) | day_ok)
+    hms_secs = (
+        days * 86400
+        + (dig[8] * 10 + dig[7]) * 3600
+        + (dig[5] * 10 + dig[4]) * 60
+        + dig[2] * 10 + dig[1]
+    )
+    out[hms] = hms_secs[hms]
+
+    # MM:SS.mmm
+    mmss = (length == 9) & all_digits(9, 8, 6, 5, 3, 2, 1) & (b[7] == 58) & (b[4] == 46)
+    mmss_secs = (dig[9] * 10 + dig[8]) * 60 + (
+        ((dig[6] * 10 + dig[5]) * 1000 + dig[3] * 100 + dig[2] * 10 + dig[1]) / 1000.0
+    )
+    out[mmss] = mmss_secs[mmss]
 
-_mem_re = re.compile(r"(?P<val>\d+)(?P<unit>[GMK]?)n?c?")
+    rest = ~hms & ~mmss & (length > 0)
+    if rest.any():
+        out[rest] = _parse_durations_regex(arr.filter(pa.array(rest)))
+    return pd.Series(out, index=values.index, name=values.name)
+
+def _parse_durations_regex(arr):
+    """Arrow-evaluated `_duration_re` for the layouts the fast path skips."""
+    parts = pc.extract_regex(pc.utf8_trim_whitespace(arr), _duration_re.pattern)
+
+    def field(name, type_):
+        f = pc.struct_field(parts, name)
+        return pc.cast(pc.if_else(pc.equal(f, ""), "0", f), type_)
+
+    whole = pc.add(
+        pc.add(pc.multiply(field("days", pa.int64()), 86400),
+               pc.multiply(field("hours", pa.int64()), 3600)),
+        pc.multiply(field("minutes", pa.int64()), 60),
+    )
+    total = pc.add(pc.cast(whole, pa.float64()), field("seconds", pa.float64()))
+    return total.to_numpy(zero_copy_only=False).astype(float)
+
+def seconds_to_slurm_str(secs):
+    """
+    Convert seconds into a SLURM duration string ('HH:MM:SS' or 'D-HH:MM:SS').
+    Fractions are truncated; NaN -> "".
+    """
+    if pd.isna(secs):
+        return ""
+    secs = int(secs)
+    days, rem = divmod(secs, 86400)
+    h, rem = divmod(rem, 3600)
+    m, s = divmod(rem, 60)
+    if days > 0:
+        return f"{days}-{h:02}:{m:02}:{s:02}"
+    else:
+        return f"{h:02}:{m:02}:{s:02}"
+
+def seconds_to_slurm_str_series(values):
+    """
+    Column-at-once version of `seconds_to_slurm_str`; same results.
+
+    The UTF-8 buffer of the output is laid out directly with numpy (fixed
+    'HH:MM:SS' tail, optional day digits + '-') and wrapped as an Arrow
+    string array, so no per-row Python string is built until the final
+    conversion to an object Series.
+    """
+    values = pd.Series(values, copy=False)
+    secs = values.to_numpy(dtype=float, na_value=np.nan)
+    valid = ~np.isnan(secs)
+    secs = np.trunc(np.where(valid, secs, 0)).astype(np.int64)
+    days, rem = np.divmod(secs, 86400)
+    h, rem = np.divmod(rem, 3600)
+    m, s = np.divmod(rem, 60)
+
+    n_day_digits = np.zeros(len(secs), dtype=np.int64)
+    for i in range(19):
+        n_day_digits += days >= 10 ** i
+    n_day_digits[days <= 0] = 0
+    lengths = np.where(valid, 8 + n_day_digits + (n_day_digits > 0), 0)
+    offsets = np.zeros(len(secs) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    buf = np.empty(offsets[-1], dtype=np.uint8)
+    end = offsets[1:][valid]
+
+    tail = [h // 10, h % 10, None, m // 10, m % 10, None, s // 10, s % 10]
+    for i, digit in enumerate(tail):
+        buf[end - 8 + i] = 58 if digit is None else 48 + digit[valid]
+    has_days = n_day_digits[valid] > 0
+    buf[end[has_days] - 9] = 45
+    d, nd, e = days[valid][has_days], n_day_digits[valid][has_days], end[has_days]
+    for i in range(int(nd.max()) if len(nd) else 0):
+        inside = i < nd
+        buf[e[inside] - 10 - i] = 48 + (d[inside] // 10 ** i) % 10
+
+    arr = pa.LargeStringArray.from_buffers(
+        len(secs), pa.py_buffer(offsets), pa.py_buffer(buf)
+    )
+    out = arr.to_numpy(zero_copy_only=False).astype(object)
+    return pd.Series(out, index=values.index, name=values.name)
 
 def parse_reqmem(mem, nnodes, ncpus):
     """
@@ -40,28 +195,7 @@ def parse_reqmem(mem, nnodes, ncpus):
     '8000'   -> 8000   (already total)
     ''/NaN   -> np.nan
     Handles both 'n' (per-node) and 'c' (per-cpu) scopes.
+    Scalar wrapper around `decode_tres.decode_reqmem`; use that on columns.
     """
-    if pd.isna(mem) or mem == "" or mem == "0":
-        return np.nan
-
-    m = re.match(r"(?P<val>\d+)(?P<unit>[GMK]?)(?P<scope>[nc]?)", str(mem))
-    if not m:
-        return np.nan
-
-    val = int(m["val"])
-    unit = m["unit"].upper()
-    scope = m["scope"].lower()
-
-    mb = val
-    if unit == "G":
-        mb *= 1024
-    elif unit == "K":
-        mb = mb / 1024  # K → MB
-
-    # scale if per-node or per-cpu
-    if scope == "n":
-        mb *= nnodes if pd.notna(nnodes) else 1
-    elif scope == "c":
-        mb *= ncpus if pd.notna(ncpus) else 1
-
-    return float(mb)
+    decoded = decode_reqmem(pd.Series([mem], dtype=object), [nnodes], [ncpus])
+    return float(decoded["ReqMem_MB"].iloc[0])
@@ -3,6 +3,10 @@ import numpy as np
 import re
 from pathlib import Path
 
+from clean_jobs import seconds_to_slurm_str_series
+from decode_tres import decode_tres
+from instrument import stage
+
 # Column mappings and state translation based on your supervisor's email
 STATE_MAP = {
     0: "PENDING",
@@ -18,49 +22,57 @@ STATE_MAP = {
 }
 
 def parse_tres_alloc(tres_str):
-    """Parses tres_alloc column to extract NCPUS and NNODES."""
-    if pd.isna(tres_str) or tres_str == "":
-        return np.nan, np.nan
-    ncpus = np.nan
-    nnodes = np.nan
+    """Parses tres_alloc column to extract NCPUS and NNODES (scalar wrapper around decode_tres)."""
     # Format: "1=16,4=3" where 1=cpu, 4=node
-    for entry in str(tres_str).split(","):
-        if "=" in entry:
-            k, v = entry.split("=")
-            if k == "1": ncpus = int(v)
-            if k == "4": nnodes = int(v)
-    return ncpus, nnodes
+    decoded = decode_tres(pd.Series([tres_str], dtype=object)).iloc[0]
+    return decoded["tres_cpu"], decoded["tres_node"]
 
-def main():
-    # Adjust path as needed!
-    IN_FILE = Path("data/raw/jobs_table_2018-2021.csv")
-    OUT_FILE = Path("data/processed/jobs_2018_2021_clean.parquet")
-    
+# legacy `jobs_table` columns -> names of the 2021-2025 jobs table
+LEGACY_COLUMNS = {
+    "id_job": "JobID",
+    "job_name": "JobName",
+    "id_user": "UID",
+    "partition": "Partition",
+    "account": "Account",
+    "from_unixtime(time_submit)": "Submit",
+    "from_unixtime(time_start)": "Start",
+    "from_unixtime(time_end)": "End",
+    "timelimit": "TimeLimit",
+    "state": "State",
+    "exit_code": "ExitCode"
+    # "tres_alloc": handled in convert_legacy
+}
+
+# Reorder columns to match your 2021-2025 jobs table
+FINAL_COLS = [
+    "JobID","JobName","UID","Partition","Account",
+    "Submit","Start","End","TimeLimit","Elapsed",
+    "UserCPU","SystemCPU","TotalCPU","CPUTime",
+    "NCPUS","NTASKS","NNODES","ReqMem",
+    "AveRSS","MaxRSS","AveDiskRead","MaxDiskRead",
+    "AveDiskWrite","MaxDiskWrite","AvePages","MaxPages",
+    "State","ExitCode"
+]
+
+def read_legacy(path):
+    """Read an export of the legacy jobs_table (CSV, or XLSX)."""
+    path = Path(path)
     # If your file is XLSX, use read_excel. For real data, use read_csv!
-    df = pd.read_excel(IN_FILE) if IN_FILE.suffix == ".xlsx" else pd.read_csv(IN_FILE)
-    
+    return pd.read_excel(path) if path.suffix == ".xlsx" else pd.read_csv(path)
+
+def convert_legacy(df):
+    """Legacy jobs_table rows -> FINAL_COLS of the 2021-2025 jobs table."""
     # Rename columns to match your new/clean jobs table
-    df = df.rename(columns={
-        "id_job": "JobID",
-        "job_name": "JobName",
-        "id_user": "UID",
-        "partition": "Partition",
-        "account": "Account",
-        "from_unixtime(time_submit)": "Submit",
-        "from_unixtime(time_start)": "Start",
-        "from_unixtime(time_end)": "End",
-        "timelimit": "TimeLimit",
-        "state": "State",
-        "exit_code": "ExitCode"
-        # "tres_alloc": handled below
-    })
+    df = df.rename(columns=LEGACY_COLUMNS)
 
     # Parse datetimes (if not already done)
     for col in ("Submit", "Start", "End"):
         df[col] = pd.to_datetime(df[col], errors="coerce")
     
     # Parse NCPUS/NNODES from tres_alloc
-    df[["NCPUS", "NNODES"]] = df["tres_alloc"].apply(lambda s: pd.Series(parse_tres_alloc(s)))
+    tres = decode_tres(df["tres_alloc"])
+    df["NCPUS"] = tres["tres_cpu"]
+    df["NNODES"] = tres["tres_node"]
     
     # Map state codes to labels
     df["State"] = df["State"].map(STATE_MAP)
@@ -69,18 +81,7 @@ def main():
     df["Elapsed_sec"] = (df["End"] - df["Start"]).dt.total_seconds()
     
     # Your unified cleaned jobs expects Elapsed as SLURM-style string (HH:MM:SS or D-HH:MM:SS)
-    def seconds_to_slurm_str(secs):
-        if pd.isna(secs):
-            return ""
-        secs = int(secs)
-        days, rem = divmod(secs, 86400)
-        h, rem = divmod(rem, 3600)
-        m, s = divmod(rem, 60)
-        if days > 0:
-            return f"{days}-{h:02}:{m:02}:{s:02}"
-        else:
-            return f"{h:02}:{m:02}:{s:02}"
-    df["Elapsed"] = df["Elapsed_sec"].apply(seconds_to_slurm_str)
+    df["Elapsed"] = seconds_to_slurm_str_series(df["Elapsed_sec"])
     
     # CPUTime, ReqMem, etc. not available: fill as NaN or blank
     df["CPUTime"] = np.nan
@@ -95,20 +96,22 @@ def main():
         if col not in df:
             df[col] = np.nan
     
-    # Reorder columns to match your 2021-2025 jobs table
-    FINAL_COLS = [
-        "JobID","JobName","UID","Partition","Account",
-        "Submit","Start","End","TimeLimit","Elapsed",
-        "UserCPU","SystemCPU","TotalCPU","CPUTime",
-        "NCPUS","NTASKS","NNODES","ReqMem",
-        "AveRSS","MaxRSS","AveDiskRead","MaxDiskRead",
-        "AveDiskWrite","MaxDiskWrite","AvePages","MaxPages",
-        "State","ExitCode"
-    ]
-    df = df[FINAL_COLS]
+    return df[FINAL_COLS]
+
+def main():
+    # Adjust path as needed!
+    IN_FILE = Path("data/raw/jobs_table_2018-2021.csv")
+    OUT_FILE = Path("data/processed/jobs_2018_2021_clean.parquet")
     
+    with stage("convert_legacy.read") as s:
+        df = read_legacy(IN_FILE)
+        s.rows = len(df)
+    with stage("convert_legacy.convert", rows=len(df)):
+        df = convert_legacy(df)
+
     OUT_FILE.parent.mkdir(exist_ok=True, parents=True)
-    df.to_parquet(OUT_FILE, index=False)
+    with stage("convert_legacy.write_parquet", rows=len(df)):
+        df.to_parquet(OUT_FILE, index=False)
     print(f"✅ Saved {len(df):,} rows → {OUT_FILE}")
 
 if __name__ == "__main__":
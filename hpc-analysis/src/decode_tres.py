@@ -0,0 +1,175 @@
+# src/decode_tres.py
+"""
+Vectorized decoders for SLURM resource strings.
+
+ReqMem   '4000Mn', '2Gc', '8000', '16G'           -> value / unit / scope / MB
+MaxRSS   '2536K', '1.5G', '0'                      -> bytes (SIZE_COLS: RSS and disk I/O)
+TRES     '1=16,2=64000,4=1,1001=2'  (slurmdbd ids) -> cpu / mem / node / gpu / billing
+         'cpu=16,mem=64G,node=1,gres/gpu=2'        (sacct AllocTRES / ReqTRES)
+
+The columns have few distinct values compared to the number of jobs, so each
+distinct string is decoded once with vectorized string ops and the results are
+scattered back to the rows with a single take.
+"""
+
+import numpy as np
+import pandas as pd
+
+# fixed TRES ids from the slurmdbd tres_table; gres ids (>= 1000) are site
+# specific, 1001 is the first one created, which is gres/gpu on our cluster
+TRES_IDS = {
+    "1": "cpu",
+    "2": "mem",
+    "3": "energy",
+    "4": "node",
+    "5": "billing",
+    "6": "fs/disk",
+    "7": "vmem",
+    "8": "pages",
+    "1001": "gres/gpu",
+}
+
+TRES_COLUMNS = {
+    "cpu": "tres_cpu",
+    "mem": "tres_mem_MB",
+    "node": "tres_node",
+    "gres/gpu": "tres_gpu",
+    "billing": "tres_billing",
+}
+
+# sacct usage columns holding sizes (a number with an optional K/M/G/T suffix)
+SIZE_COLS = ["AveRSS", "MaxRSS", "AveDiskRead", "MaxDiskRead", "AveDiskWrite", "MaxDiskWrite"]
+
+# size suffix -> MB
+_UNIT_MB = {"": 1.0, "K": 1 / 1024, "M": 1.0, "G": 1024.0, "T": 1024.0 ** 2}
+# size suffix -> bytes (sacct sizes are binary: 1K = 1024)
+_UNIT_BYTES = {"": 1.0, "K": 1024.0, "M": 1024.0 ** 2, "G": 1024.0 ** 3, "T": 1024.0 ** 4}
+
+_reqmem_re = r"^(?P<val>\d+(?:\.\d+)?)(?P<unit>[KMGT]?)(?P<scope>[nc]?)"
+_tres_re = r"(?P<key>[^=,]+)=(?P<val>[^,]*)"
+_size_re = r"^(?P<num>\d+(?:\.\d+)?)(?P<unit>[KMGT]?)$"
+
+
+def _factorize(values):
+    """Series -> (row codes, distinct values as a str Series)."""
+    values = pd.Series(values, copy=False)
+    codes, uniques = pd.factorize(values)
+    return codes, pd.Series(uniques, dtype=object).astype(str).str.strip()
+
+
+def _take(column, codes, fill=np.nan):
+    """Scatter per-distinct-value results back to rows; -1 codes get `fill`."""
+    column = np.asarray(column)
+    out = np.full(len(codes), fill, dtype=object if isinstance(fill, str) else float)
+    known = codes >= 0
+    out[known] = column[codes[known]]
+    return out
+
+
+def decode_reqmem(mem, nnodes=None, ncpus=None):
+    """
+    Decode a ReqMem column into value, unit, scope and total MB.
+
+    mem     : ReqMem strings ('4000Mn', '2Gc', '8000', '16G')
+    nnodes  : per-row node counts, used for the 'n' (per-node) scope
+    ncpus   : per-row CPU counts, used for the 'c' (per-cpu) scope
+
+    Returns a DataFrame aligned with `mem` with columns
+    ReqMem_value (float), ReqMem_unit ('', 'K', 'M', 'G', 'T'),
+    ReqMem_scope ('', 'n', 'c') and ReqMem_MB (float, NaN when unknown).
+    Missing counts scale by 1. Blank, unparsable and zero ('--mem=0',
+    i.e. whole node) requests give NaN.
+    """
+    mem = pd.Series(mem, copy=False)
+    codes, uniques = _factorize(mem)
+    parts = uniques.str.extract(_reqmem_re)
+    value = parts["val"].astype(float)
+    value = value.where(value != 0).to_numpy()
+    unit = parts["unit"].fillna("").to_numpy(dtype=object)
+    scope = parts["scope"].fillna("").to_numpy(dtype=object)
+    base_mb = value * pd.Series(unit).map(_UNIT_MB).fillna(1.0).to_numpy()
+
+    row_scope = _take(scope, codes, fill="")
+
+    def counts(c):
+        if c is None:
+            return np.ones(len(mem))
+        c = pd.Series(c, copy=False).to_numpy(dtype=float, na_value=np.nan)
+        return np.where(np.isnan(c), 1.0, c)
+
+    factor = np.where(
+        row_scope == "n", counts(nnodes),
+        np.where(row_scope == "c", counts(ncpus), 1.0),
+    )
+    return pd.DataFrame(
+        {
+            "ReqMem_value": _take(value, codes),
+            "ReqMem_unit": _take(unit, codes, fill=""),
+            "ReqMem_scope": row_scope,
+            "ReqMem_MB": _take(base_mb, codes) * factor,
+        },
+        index=mem.index,
+    )
+
+
+def decode_size_bytes(values):
+    """
+    Size strings with an optional K/M/G/T suffix ('2536K', '1.5G', '0') -> bytes.
+
+    For the sacct usage columns (SIZE_COLS). Bare numbers are bytes;
+    blank and unparsable values give NaN. Returns a float Series aligned
+    with `values`.
+    """
+    values = pd.Series(values, copy=False)
+    codes, uniques = _factorize(values)
+    size = uniques.str.extract(_size_re)
+    nbytes = size["num"].astype(float) * size["unit"].fillna("").map(_UNIT_BYTES).fillna(1.0)
+    return pd.Series(_take(nbytes.to_numpy(dtype=float), codes), index=values.index)
+
+
+def decode_tres(tres, gpu_ids=("1001",)):
+    """
+    Decode TRES strings (numeric slurmdbd ids or sacct names) into numeric columns.
+
+    Returns a float DataFrame aligned with `tres` with columns
+    tres_cpu, tres_mem_MB, tres_node, tres_gpu and tres_billing.
+    tres_gpu is the untyped 'gres/gpu' total; sacct lists it next to the
+    typed counts ('gres/gpu=3,gres/gpu:a100=2,gres/gpu:v100=1'), which are
+    only summed when it is absent. mem values without a suffix are MB, as
+    slurmdbd stores them.
+    """
+    tres = pd.Series(tres, copy=False)
+    codes, uniques = _factorize(tres)
+
+    pairs = uniques.str.extractall(_tres_re)
+    out_cols = list(TRES_COLUMNS.values())
+    if pairs.empty:
+        table = pd.DataFrame(np.nan, index=range(len(uniques)), columns=out_cols)
+    else:
+        ids = dict(TRES_IDS, **{str(i): "gres/gpu" for i in gpu_ids})
+        key = pairs["key"].str.strip()
+        key = key.map(ids).fillna(key)
+        typed = key.str.startswith("gres/gpu:").to_numpy()
+        # the typed counts repeat the untyped total: keep them only without it
+        units = pairs.index.get_level_values(0)
+        keep = ~(typed & np.isin(units, units[(key == "gres/gpu").to_numpy()]))
+        pairs, key = pairs[keep], key[keep].where(~typed[keep], "gres/gpu")
+        size = pairs["val"].str.strip().str.extract(_size_re)
+        val = size["num"].astype(float) * size["unit"].fillna("").map(_UNIT_MB).fillna(1.0)
+        # only mem carries a size suffix; "cpu=16" etc. are plain counts
+        val = val.where(key == "mem", size["num"].astype(float).where(size["unit"].fillna("") == ""))
+        long = pd.DataFrame({
+            "u": pairs.index.get_level_values(0),
+            "col": key.map(TRES_COLUMNS),
+            "val": val,
+        }).dropna(subset=["col"])
+        table = (
+            long.groupby(["u", "col"])["val"].sum(min_count=1)
+            .unstack("col")
+            .reindex(index=range(len(uniques)), columns=out_cols)
+        )
+
+    return pd.DataFrame(
+        {c: _take(table[c].to_numpy(dtype=float), codes) for c in out_cols},
+        index=tres.index,
+    )
@@ -0,0 +1,114 @@
+# src/export.py
+"""
+On-demand, chunked exports of job rows (the dashboard's download buttons).
+
+The page used to serialize the filtered jobs to CSV strings on every rerun,
+whether or not anybody downloaded them. Exports are now built only when a
+download is requested, from an iterator of DataFrame chunks, straight into
+a file:
+
+    csv        plain CSV
+    csv.gz     gzip-compressed CSV
+    parquet    Parquet (one row group per chunk)
+
+`ExportCache` keeps the last few files under a directory, named by a hash
+of everything that defines their content (`export_key`: dataset version,
+date range, filters, columns, format), so a second click, or another
+analyst asking for the same selection, gets the existing file.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+FORMATS = {
+    # name: (file suffix, MIME type)
+    "csv": (".csv", "text/csv"),
+    "csv.gz": (".csv.gz", "application/gzip"),
+    "parquet": (".parquet", "application/vnd.apache.parquet"),
+}
+CHUNK_ROWS = 100_000
+
+
+def iter_chunks(df, rows=CHUNK_ROWS):
+    """`df` in slices of `rows` rows; an empty frame yields itself once."""
+    for i in range(0, max(len(df), 1), rows):
+        yield df.iloc[i:i + rows]
+
+
+def export_key(**parts):
+    """Stable hash of the keyword arguments (lists, dates, dicts of lists...)."""
+    blob = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha1(blob.encode()).hexdigest()[:20]
+
+
+def write_export(chunks, path, fmt):
+    """
+    Write an iterable of DataFrame chunks (same columns) to `path` in `fmt`.
+
+    At most one chunk is held at a time. Returns the number of rows written.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r} (one of {', '.join(FORMATS)})")
+    n_rows = 0
+    if fmt == "parquet":
+        writer = None
+        try:
+            for chunk in chunks:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema)
+                writer.write_table(table.cast(writer.schema))
+                n_rows += len(chunk)
+        finally:
+            if writer is not None:
+                writer.close()
+        return n_rows
+
+    opener = gzip.open if fmt == "csv.gz" else open
+    with opener(path, "wt", newline="", encoding="utf-8") as f:
+        for i, chunk in enumerate(chunks):
+            chunk.to_csv(f, index=False, header=i == 0)
+            n_rows += len(chunk)
+    return n_rows
+
+
+class ExportCache:
+    """The last `max_files` export files under `root`, by `export_key`."""
+
+    def __init__(self, root, max_files=8):
+        self.root = Path(root)
+        self.max_files = max_files
+
+    def path(self, key, fmt):
+        return self.root / f"{key}{FORMATS[fmt][0]}"
+
+    def get(self, key, fmt, chunks):
+        """
+        Path of the export `key`; built from `chunks()` (a callable returning
+        the chunk iterator) only when it is not cached yet.
+        """
+        path = self.path(key, fmt)
+        if path.exists():
+            os.utime(path)  # most recently used
+            return path
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        try:
+            write_export(chunks(), tmp, fmt)
+            os.replace(tmp, path)
+        finally:
+            tmp.unlink(missing_ok=True)
+        self._evict()
+        return path
+
+    def _evict(self):
+        files = sorted((p for p in self.root.iterdir() if not p.name.endswith(".tmp")),
+                       key=lambda p: p.stat().st_mtime_ns, reverse=True)
+        for old in files[self.max_files:]:
+            old.unlink(missing_ok=True)
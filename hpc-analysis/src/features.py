@@ -0,0 +1,132 @@
+# src/features.py
+"""
+Derived job features, computed once in the ETL and stored in the Parquet.
+
+    wait_time_sec    Start - Submit
+    Elapsed_sec      Elapsed   ([D-]HH:MM:SS) in seconds
+    CPUTime_sec      CPUTime   in seconds
+    ReqMem_MB        ReqMem    scaled to the whole job (per-node / per-cpu)
+    MaxRSS_MB        MaxRSS    (peak resident memory) in MB
+    <col>_bytes      AveRSS, MaxRSS, Ave/MaxDiskRead, Ave/MaxDiskWrite in bytes
+    core_seconds     Elapsed_sec × NCPUS (NaN when 0)
+    efficiency       CPUTime_sec / core_seconds
+    State_Clean      State with 'CANCELLED by <uid>' folded into 'CANCELLED'
+    Partition_Main   first partition of a comma-separated list
+    JobName_Grouped  coarse job type (jupyter, bash, test, qe, benchmarks, ...)
+
+The three label columns are categoricals. Labels are derived from the
+distinct values only (a few thousand job names for millions of jobs) and
+mapped back to the rows by code.
+"""
+
+import numpy as np
+import pandas as pd
+
+from clean_jobs import parse_hms_or_dhms_series
+from decode_tres import SIZE_COLS, decode_reqmem, decode_size_bytes
+
+FEATURE_COLS = [
+    "wait_time_sec", "Elapsed_sec", "CPUTime_sec", "ReqMem_MB", "MaxRSS_MB", "core_seconds",
+    "efficiency", "State_Clean", "Partition_Main", "JobName_Grouped",
+] + [f"{c}_bytes" for c in SIZE_COLS]
+
+# job names kept as their own group
+BENCHMARK_NAMES = {"stream", "linpack", "osu", "iozone"}
+
+
+def _by_value(values, label):
+    """
+    Apply `label` (str Series -> Series) to the distinct values of `values`.
+
+    Returns a categorical aligned with `values`; missing values get NaN.
+    """
+    values = pd.Series(values, copy=False)
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        codes, uniques = values.cat.codes.to_numpy(), values.cat.categories
+    else:
+        codes, uniques = pd.factorize(values)
+    labels = np.asarray(label(pd.Series(uniques, dtype=object).astype(str)), dtype=object)
+    out = np.full(len(codes), np.nan, dtype=object)
+    known = codes >= 0
+    out[known] = labels[codes[known]]
+    return pd.Series(pd.Categorical(out), index=values.index)
+
+
+def state_clean(state):
+    """'CANCELLED by 1234' -> 'CANCELLED'; other states unchanged."""
+    return _by_value(state, lambda s: s.mask(s.str.match(r"CANCELLED by \d+"), "CANCELLED"))
+
+
+def partition_main(partition):
+    """'gpu,defq' -> 'gpu'."""
+    return _by_value(partition, lambda s: s.str.split(",").str[0].str.strip())
+
+
+def _jobname_group(name):
+    lower = name.str.lower()
+    conditions = [
+        lower.str.startswith("jupyter"),
+        lower.str.startswith("bash"),
+        lower.str.startswith("test"),
+        lower.str.startswith("qe"),
+        lower.isin(BENCHMARK_NAMES),
+        name.str.len() < 4,
+    ]
+    choices = ["jupyter", "bash", "test", "qe", lower.to_numpy(dtype=object), "short_code"]
+    return np.select([c.to_numpy() for c in conditions], choices, default="other")
+
+
+def jobname_grouped(name):
+    """Coarse job type from JobName; 'unknown' when there is no name."""
+    grouped = _by_value(name, _jobname_group)
+    if grouped.isna().any():
+        grouped = grouped.cat.add_categories(["unknown"]).fillna("unknown")
+    return grouped
+
+
+def _get(df, col):
+    """Column `col`, or all-missing when the source does not have it."""
+    if col not in df.columns:
+        return pd.Series(np.nan, index=df.index, dtype=object)
+    return df[col]
+
+
+def _numeric(df, col):
+    return pd.to_numeric(_get(df, col), errors="coerce").astype(float)
+
+
+def _duration_sec(values):
+    """Durations in seconds; categoricals are parsed once per category."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        seconds = np.asarray(parse_hms_or_dhms_series(pd.Series(values.cat.categories, dtype=object)))
+        codes = values.cat.codes.to_numpy()
+        return pd.Series(np.where(codes >= 0, seconds[codes], np.nan), index=values.index)
+    return parse_hms_or_dhms_series(values)
+
+
+def add_features(df):
+    """
+    Add FEATURE_COLS to a jobs frame with parsed Submit/Start/End.
+
+    Works on the cleaned sacct export and on the legacy table alike; inputs
+    a source does not have (the legacy CPUTime, ReqMem, MaxRSS, ...) give NaN. Returns `df`.
+    """
+    submit = pd.to_datetime(_get(df, "Submit"))
+    df["wait_time_sec"] = (pd.to_datetime(_get(df, "Start")) - submit).dt.total_seconds()
+    df["Elapsed_sec"] = _duration_sec(_get(df, "Elapsed"))
+    df["CPUTime_sec"] = _duration_sec(_get(df, "CPUTime"))
+    df["ReqMem_MB"] = decode_reqmem(
+        _get(df, "ReqMem"), _numeric(df, "NNODES"), _numeric(df, "NCPUS")
+    )["ReqMem_MB"]
+    for col in SIZE_COLS:
+        df[f"{col}_bytes"] = decode_size_bytes(_get(df, col))
+    df["MaxRSS_MB"] = df["MaxRSS_bytes"] / 1024 ** 2
+
+    df["core_seconds"] = df["Elapsed_sec"] * _numeric(df, "NCPUS").fillna(0)
+    df.loc[df["core_seconds"] == 0, "core_seconds"] = np.nan  # avoid /0
+    df["efficiency"] = df["CPUTime_sec"] / df["core_seconds"]
+
+    df["State_Clean"] = state_clean(_get(df, "State"))
+    df["Partition_Main"] = partition_main(_get(df, "Partition"))
+    df["JobName_Grouped"] = jobname_grouped(_get(df, "JobName"))
+    return df
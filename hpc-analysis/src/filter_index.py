@@ -0,0 +1,118 @@
+# src/filter_index.py
+"""
+Inverted index over the jobs table for the dashboard's sidebar filters.
+
+The shared jobs frame is sorted by Start (see app/data_access.py), so a date
+range is a contiguous block of row positions found by binary search. For
+each indexed column (Partition, UID, State) the index keeps, per value, the
+sorted positions of the rows holding it:
+
+    rows[offsets[k]:offsets[k + 1]]    rows whose code is k - 1 (0: missing)
+
+A selection then costs the number of rows it touches, not a scan of every
+column: the positions of the selected values are clipped to the date range
+by binary search and scattered into one boolean mask per column, and the
+masks are and-ed. When a selection is most of the table the rows of the
+other values are scattered instead, and a column whose selection covers
+every row is skipped, so the default "everything selected" sidebar costs a
+binary search.
+
+Application is a property of the user (SQL metadata): it is resolved to a
+set of UIDs first and looked up through the UID lists.
+"""
+
+import numpy as np
+import pandas as pd
+
+from jobs_dataset import start_bounds
+
+INDEX_COLS = ["Partition", "UID", "State"]
+
+
+class FilterIndex:
+    """Row positions by Start range and by value of INDEX_COLS for a Start-sorted frame."""
+
+    def __init__(self, df, columns=INDEX_COLS):
+        self.n_rows = len(df)
+        self.starts = df["Start"].to_numpy()[: df["Start"].notna().sum()]
+        if len(self.starts) and not (self.starts[1:] >= self.starts[:-1]).all():
+            raise ValueError("FilterIndex needs a frame sorted by Start (NaT last)")
+        dtype = np.int32 if self.n_rows < np.iinfo(np.int32).max else np.int64
+        self.values, self.rows, self.offsets = {}, {}, {}
+        for col in columns:
+            if col not in df.columns:
+                continue
+            values = df[col]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                codes, uniques = values.cat.codes.to_numpy(), values.cat.categories
+            else:
+                codes, uniques = pd.factorize(values)
+            codes = codes.astype(np.int64) + 1  # 0: missing
+            # stable: positions stay ascending within each value
+            self.rows[col] = np.argsort(codes, kind="stable").astype(dtype)
+            self.offsets[col] = np.r_[0, np.cumsum(np.bincount(codes, minlength=len(uniques) + 1))]
+            self.values[col] = pd.Index(uniques)
+
+    def start_range(self, start=None, end=None):
+        """(lo, hi): rows lo..hi-1 start on [start, end] (dates, inclusive)."""
+        return start_bounds(self.starts, start, end)
+
+    def _codes(self, col, allowed):
+        """Bucket numbers (code + 1) of the values in `allowed` that the table has."""
+        k = np.unique(self.values[col].get_indexer(list(allowed)))
+        return k[k >= 0] + 1
+
+    def _bucket_rows(self, col, buckets, lo, hi):
+        rows, offsets = self.rows[col], self.offsets[col]
+        parts = []
+        for b in buckets:
+            ids = rows[offsets[b]:offsets[b + 1]]
+            parts.append(ids[ids.searchsorted(lo):ids.searchsorted(hi)])
+        return np.concatenate(parts) if parts else np.empty(0, dtype=rows.dtype)
+
+    def value_rows(self, col, allowed, lo=0, hi=None):
+        """Sorted positions in [lo, hi) of the rows whose `col` is in `allowed`."""
+        hi = self.n_rows if hi is None else hi
+        return np.sort(self._bucket_rows(col, self._codes(col, allowed), lo, hi))
+
+    def _mask(self, col, allowed, lo, hi):
+        """
+        Boolean mask over rows lo..hi-1 of `col` in `allowed`, or None when
+        every row matches. Built from the selected values' rows or, when the
+        selection is most of the table, from the rows of the other values.
+        """
+        selected = np.zeros(len(self.offsets[col]) - 1, dtype=bool)
+        selected[self._codes(col, allowed)] = True
+        sizes = np.diff(self.offsets[col])
+        others = np.flatnonzero(~selected & (sizes > 0))
+        if not len(others):
+            return None
+        if sizes[selected].sum() <= sizes[others].sum():
+            hit = np.zeros(hi - lo, dtype=bool)
+            hit[self._bucket_rows(col, np.flatnonzero(selected), lo, hi) - lo] = True
+        else:
+            hit = np.ones(hi - lo, dtype=bool)
+            hit[self._bucket_rows(col, others, lo, hi) - lo] = False
+        return hit
+
+    def select(self, start=None, end=None, **values):
+        """
+        Positions (ascending) of the rows starting on [start, end] whose
+        columns are in the given value lists, e.g.
+        index.select("2024-01-01", "2024-03-31", Partition=["gpu"], UID=[1001]).
+        None for a list means no filter on that column; a column that is not
+        indexed raises KeyError.
+        """
+        lo, hi = self.start_range(start, end)
+        mask = None
+        for col, allowed in values.items():
+            if allowed is None:
+                continue
+            if col not in self.rows:
+                raise KeyError(f"{col} is not indexed (indexed: {list(self.rows)})")
+            hit = self._mask(col, allowed, lo, hi)
+            if hit is not None:
+                mask = hit if mask is None else mask & hit
+        if mask is None:
+            return np.arange(lo, hi)
+        return np.flatnonzero(mask) + lo
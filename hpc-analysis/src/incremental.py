@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Incremental, append-only ETL for nightly sacct pulls.
+
+Usage:
+    python incremental.py \
+        --raw-file data/raw/sacct_2025-03-02.csv \
+        --out-dir data/processed/jobs_clean \
+        [--state-file data/processed/jobs_clean/_ingest_state.json] \
+        [--rollups data/processed/jobs_daily.parquet] [--snapshot]
+
+Each run cleans one raw pull with the same `transform` as make_dataset.py and
+writes only the rows that were not ingested before as new
+`part-NNNNNN-BBBB.parquet` files in the year/month partitions of --out-dir
+(see jobs_dataset.py). A small JSON state file keeps
+
+    last_end         the high-water mark: latest End already ingested
+    last_end_jobids  JobIDs ingested with End == last_end (ties on the mark)
+    open_jobs        JobID -> part file for jobs still RUNNING/PENDING/...
+
+A job listed in open_jobs that shows up again replaces its earlier row: the
+new row goes to the new part and the old part file is rewritten without it.
+Only parts holding open jobs (i.e. recent ones) are ever rewritten, so the
+cost of a refresh follows the size of the pull, not of the history. Part
+files use the compact schema of jobs_schema.py; jobs are identified by their
+sacct id string ('123_7'), rebuilt with `job_keys`.
+
+--out-dir can be the merged dataset written by merge_jobs_all.py: without a
+state file the mark is bootstrapped once from the data already there.
+Read the result with `jobs_dataset.read_jobs(out_dir)`. With --rollups the
+daily rollup cube (rollups.py) is refreshed for the months the pull touched,
+and with --snapshot the memory-mapped copy the app reads (jobs_snapshot.py)
+is rewritten.
+"""
+
+import argparse
+import json
+import logging
+import os
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from jobs_dataset import (
+    PARTITION_COLS, arrow_schema, jobs_dataset, partition_of, partition_path, temp_path,
+    write_partitioned,
+)
+from jobs_schema import JOBID_PARTS, compact_frame, compact_schema, job_keys, jobs_to_pandas
+from jobs_snapshot import snapshot_path, write_snapshot
+from make_dataset import raw_batches, setup_logging, transform
+from rollups import build_rollups
+
+# states whose sacct record will still change in a later pull
+OPEN_STATES = {"PENDING", "RUNNING", "SUSPENDED", "REQUEUED", "RESIZING", "REQUEUE_HOLD"}
+
+STATE_FILE_NAME = "_ingest_state.json"
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Append a new sacct pull to the cleaned dataset")
+    p.add_argument("--raw-file", type=Path, required=True, help="Path to raw CSV of the new pull")
+    p.add_argument("--out-dir", type=Path, required=True, help="Dataset directory of part files")
+    p.add_argument("--state-file", type=Path, default=None,
+                   help=f"High-water mark state (default: <out-dir>/{STATE_FILE_NAME})")
+    p.add_argument("--chunksize", type=int, default=None,
+                   help="Stream the raw file in batches of this many rows")
+    p.add_argument("--rollups", type=Path, default=None,
+                   help="Rollup cube to refresh for the months this pull touched")
+    p.add_argument("--snapshot", action="store_true",
+                   help="Rewrite the memory-mapped snapshot of --out-dir the app reads")
+    return p.parse_args()
+
+
+def load_state(path, out_dir):
+    if path.exists():
+        with open(path) as f:
+            return json.load(f)
+    return bootstrap_state(out_dir)
+
+
+def bootstrap_state(out_dir):
+    """Initial state: empty, or derived from a dataset already in `out_dir`."""
+    state = {"last_end": None, "last_end_jobids": [], "open_jobs": {}, "next_part": 0}
+    if not any(out_dir.rglob("*.parquet")):
+        return state
+    # one scan of JobID/State/End over the existing history
+    last_end, at_end = None, set()
+    for frag in jobs_dataset(out_dir).get_fragments():
+        names = frag.physical_schema.names
+        rows = jobs_to_pandas(frag.to_table(columns=[c for c in JOBID_PARTS if c in names] + ["State", "End"]))
+        keys = job_keys(rows)
+        rel = str(Path(frag.path).relative_to(out_dir))
+        open_mask = is_open(rows)
+        state["open_jobs"].update({j: rel for j in keys[open_mask]})
+        ends = rows.loc[~open_mask, "End"].dropna()
+        if ends.empty:
+            continue
+        frag_max = ends.max()
+        ids = set(keys[~open_mask & (rows["End"] == frag_max)])
+        if last_end is None or frag_max > last_end:
+            last_end, at_end = frag_max, ids
+        elif frag_max == last_end:
+            at_end |= ids
+    state["last_end"] = last_end.isoformat() if last_end is not None else None
+    state["last_end_jobids"] = sorted(at_end)
+    # part numbers of this run must not collide with the files already there
+    state["next_part"] = 1 + max(
+        (int(p.name.split("-")[1].split(".")[0]) for p in out_dir.rglob("part-*.parquet")),
+        default=-1,
+    )
+    return state
+
+
+def save_state(state, path):
+    # write-then-rename so a crash never leaves a half-written state file
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, path)
+
+
+def is_open(batch):
+    """Rows whose record may still change: open state or no End yet."""
+    state = batch["State"].astype(str).str.split(" ").str[0]
+    return state.isin(OPEN_STATES) | batch["End"].isna()
+
+
+def select_new_rows(batch, state):
+    """Mask of rows not ingested yet, plus updates of previously open jobs."""
+    jobid = job_keys(batch)
+    if state["last_end"] is None:
+        return pd.Series(True, index=batch.index)
+    mask = jobid.isin(list(state["open_jobs"])) | is_open(batch)
+    last_end = pd.Timestamp(state["last_end"])
+    tie = (batch["End"] == last_end) & ~jobid.isin(state["last_end_jobids"])
+    return mask | (batch["End"] > last_end) | tie
+
+
+def drop_superseded(out_dir, part_name, jobids):
+    """Rewrite one earlier part file without the rows of `jobids`."""
+    path = out_dir / part_name
+    if not path.exists():
+        return
+    table = pq.ParquetFile(path).read()
+    keys = job_keys(jobs_to_pandas(table.select([c for c in JOBID_PARTS if c in table.column_names])))
+    table = table.filter(pa.array(~keys.isin(jobids).to_numpy()))
+    if table.num_rows == 0:
+        path.unlink()
+        return
+    tmp = temp_path(path)
+    pq.write_table(table, tmp)
+    os.replace(tmp, path)
+
+
+def ingest_increment(raw_csv, out_dir, state_file=None, chunksize=None):
+    """
+    Append the new rows of `raw_csv` to the dataset in `out_dir`.
+
+    Returns a summary dict (part file, rows written, jobs updated, open jobs,
+    and the (year, month) partitions written or rewritten).
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    state_file = state_file or out_dir / STATE_FILE_NAME
+    state = load_state(state_file, out_dir)
+    part = f"part-{state['next_part']:06d}"
+
+    batches = raw_batches(raw_csv, chunksize)
+
+    schema = None
+    written = []
+    n_rows = 0
+    updated = {}        # old part file -> JobIDs replaced by this pull
+    now_open = {}       # JobID -> part file of its new row
+    closed = set()
+    max_end = pd.Timestamp(state["last_end"]) if state["last_end"] else None
+    max_end_jobids = set(state["last_end_jobids"])
+    for batch_no, batch in enumerate(batches):
+        batch = compact_frame(transform(batch))
+        batch = batch[select_new_rows(batch, state)]
+        if batch.empty:
+            continue
+
+        jobid = job_keys(batch)
+        for jid in jobid[jobid.isin(list(state["open_jobs"]))]:
+            updated.setdefault(state["open_jobs"][jid], set()).add(jid)
+        basename = f"{part}-{batch_no:04d}.parquet"
+        open_mask = is_open(batch)
+        for jid, year, month in zip(jobid[open_mask], batch.loc[open_mask, "year"],
+                                    batch.loc[open_mask, "month"]):
+            now_open[jid] = str(partition_path(year, month) / basename)
+        closed.update(jobid[~open_mask])
+
+        ends = batch.loc[~open_mask, "End"].dropna()
+        if not ends.empty:
+            batch_max = ends.max()
+            at_max = set(jobid[~open_mask & (batch["End"] == batch_max)])
+            if max_end is None or batch_max > max_end:
+                max_end, max_end_jobids = batch_max, at_max
+            elif batch_max == max_end:
+                max_end_jobids |= at_max
+
+        if schema is None:
+            schema = compact_schema(arrow_schema(batch.drop(columns=PARTITION_COLS)))
+        written += write_partitioned(batch, out_dir, basename=basename, schema=schema)
+        n_rows += len(batch)
+
+    if written:
+        state["next_part"] += 1
+    for old_part, jobids in updated.items():
+        drop_superseded(out_dir, old_part, jobids)
+
+    open_jobs = {j: p for j, p in state["open_jobs"].items() if j not in closed | now_open.keys()}
+    open_jobs.update(now_open)
+    state["open_jobs"] = open_jobs
+    state["last_end"] = max_end.isoformat() if max_end is not None else None
+    state["last_end_jobids"] = sorted(max_end_jobids)
+    save_state(state, state_file)
+
+    return {
+        "part": part if written else None,
+        "files": [str(p) for p in written],
+        "rows_written": n_rows,
+        "jobs_updated": sum(len(j) for j in updated.values()),
+        "open_jobs": len(open_jobs),
+        "months": sorted({m for m in map(partition_of, written + list(updated)) if m}),
+    }
+
+
+def main():
+    setup_logging()
+    args = parse_args()
+    logging.info(f"Ingesting new rows from {args.raw_file}")
+    summary = ingest_increment(args.raw_file, args.out_dir, args.state_file, args.chunksize)
+    if args.rollups and summary["files"]:
+        build_rollups(args.out_dir, args.rollups, months=summary["months"])
+        logging.info(f"Refreshed {args.rollups} for {len(summary['months'])} month(s)")
+    if args.snapshot and summary["files"]:
+        write_snapshot(args.out_dir)
+        logging.info(f"Rewrote {snapshot_path(args.out_dir)}")
+    logging.info(
+        f"Wrote {summary['rows_written']:,} rows to {len(summary['files'])} {summary['part']} files "
+        f"({summary['jobs_updated']:,} updated jobs, {summary['open_jobs']:,} still open)"
+    )
+    logging.info("✅ Done.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+# src/instrument.py
+"""
+Stage-level timing and memory instrumentation for the ETL and the dashboard.
+
+    with stage("make_dataset.read_csv") as s:
+        df = pd.read_csv(...)
+        s.rows = len(df)
+
+    @timed("section.overview")
+    def overview(sel): ...
+
+Each finished stage is a record:
+
+    name         dotted stage name ("merge.spill", "section.overview", ...)
+    parent       enclosing stage in the same thread, or None
+    start        epoch seconds
+    wall_s       wall time
+    rows         rows handled (set by the stage; None when not meaningful)
+    rows_per_s   rows / wall_s
+    peak_rss_mb  peak resident memory of the process while the stage ran
+    rss_delta_mb resident memory at the end minus at the start
+    thread       thread name (not unique: every Streamlit script run is
+                 named "ScriptRunner.scriptThread", whichever session it serves)
+    thread_id    threading.get_ident() of the thread: tells concurrent runs
+                 apart (filter on it with `records(thread_id=...)`)
+
+Peak RSS is the kernel's high-water mark (VmHWM), reset when a stage starts
+(Linux /proc/self/clear_refs); the peak of an enclosing stage is carried
+over the reset, so nested stages all get their own correct peak. Where the
+reset is not allowed the process peak so far is reported. Memory is
+process-wide: stages running at the same time in other threads count too.
+
+Instrumentation is off by default, and then `stage` returns one shared
+no-op object and `timed` adds one flag test per call: nothing is measured,
+nothing is recorded. It is switched on by `enable()` or by the environment:
+
+    HPC_PROFILE=1           record stages (records(), the dashboard's panel)
+    HPC_TRACE=trace.json    also write a JSON trace at exit
+
+The trace is in the Chrome trace event format (one complete "X" event per
+stage with the record in its args), viewable in chrome://tracing or
+ui.perfetto.dev, and plain JSON for scripts.
+"""
+
+import atexit
+import functools
+import itertools
+import json
+import os
+import resource
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+MAX_RECORDS = 100_000  # kept in memory; the oldest are dropped first
+
+_enabled = False
+_trace_path = None
+_records = deque(maxlen=MAX_RECORDS)
+_seq = itertools.count()
+_local = threading.local()
+_can_reset = None
+
+
+def _status_kb(field):
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def _rss_kb():
+    return _status_kb("VmRSS:") or 0
+
+
+def _peak_kb():
+    peak = _status_kb("VmHWM:")
+    return peak if peak is not None else resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _reset_peak():
+    """Reset VmHWM to the current RSS; False where the kernel does not allow it."""
+    global _can_reset
+    if _can_reset is False:
+        return False
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        _can_reset = True
+    except OSError:
+        _can_reset = False
+    return _can_reset
+
+
+class _NoStage:
+    """What `stage` returns while disabled: accepts rows, measures nothing."""
+    __slots__ = ()
+    rows = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_NO_STAGE = _NoStage()
+
+
+class Stage:
+    """One running stage; use through `stage()`."""
+
+    def __init__(self, name, rows=None):
+        self.name = name
+        self.rows = rows
+
+    def __enter__(self):
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        if stack:
+            # the reset below would lose the enclosing stage's peak so far
+            stack[-1]._peak = max(stack[-1]._peak, _peak_kb())
+        self.parent = stack[-1].name if stack else None
+        stack.append(self)
+        _reset_peak()
+        self._rss = _rss_kb()
+        self._peak = 0
+        self.start = time.time()
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.perf_counter() - self._t0
+        peak = max(self._peak, _peak_kb())
+        stack = _local.stack
+        stack.pop()
+        if stack:
+            stack[-1]._peak = max(stack[-1]._peak, peak)
+        rows = int(self.rows) if self.rows is not None else None
+        _records.append({
+            "seq": next(_seq),
+            "name": self.name,
+            "parent": self.parent,
+            "start": self.start,
+            "wall_s": wall,
+            "rows": rows,
+            "rows_per_s": rows / wall if rows is not None and wall > 0 else None,
+            "peak_rss_mb": peak / 1024,
+            "rss_delta_mb": (_rss_kb() - self._rss) / 1024,
+            "thread": threading.current_thread().name,
+            "thread_id": threading.get_ident(),
+            "error": exc_type.__name__ if exc_type is not None else None,
+        })
+        return False
+
+
+def stage(name, rows=None):
+    """Context manager measuring the enclosed block as stage `name`; set `.rows` inside."""
+    if not _enabled:
+        return _NO_STAGE
+    return Stage(name, rows)
+
+
+def timed(name=None, rows=None):
+    """
+    Decorator: every call of the function is a stage (default name: module.qualname).
+    rows: function of the return value giving the rows handled, e.g. `len`.
+    """
+    def decorate(func):
+        label = name or f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with Stage(label) as s:
+                result = func(*args, **kwargs)
+                if rows is not None and result is not None:
+                    s.rows = rows(result)
+            return result
+        return wrapper
+
+    if callable(name):  # used bare: @timed
+        func, name = name, None
+        return decorate(func)
+    return decorate
+
+
+def timed_iter(name, iterable, rows=len):
+    """`iterable` with the production of each item (e.g. reading a chunk) timed as stage `name`."""
+    if not _enabled:
+        return iterable
+    return _timed_iter(name, iter(iterable), rows)
+
+
+def _timed_iter(name, it, rows):
+    while True:
+        with Stage(name) as s:
+            item = next(it, _NO_STAGE)
+            if item is not _NO_STAGE and rows is not None:
+                s.rows = rows(item)
+        if item is _NO_STAGE:
+            return
+        yield item
+
+
+def enabled():
+    return _enabled
+
+
+def enable(trace=None):
+    """Start recording; with `trace`, write the JSON trace there at exit (and on write_trace())."""
+    global _enabled, _trace_path
+    _enabled = True
+    if trace is not None:
+        if _trace_path is None:
+            atexit.register(lambda: _trace_path and write_trace(_trace_path))
+        _trace_path = Path(trace)
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def mark():
+    """Sequence number of the next record: pass to `records(since=...)`."""
+    return _records[-1]["seq"] + 1 if _records else 0
+
+
+def records(since=0, thread_id=None):
+    """
+    Finished stages (oldest first) from sequence number `since`, optionally
+    of the thread `thread_id` (threading.get_ident()) only.
+    """
+    return [r for r in list(_records)
+            if r["seq"] >= since and (thread_id is None or r["thread_id"] == thread_id)]
+
+
+def clear():
+    _records.clear()
+
+
+def write_trace(path=None, since=0):
+    """Write the records as a Chrome trace event JSON file; returns the path."""
+    path = Path(path or _trace_path)
+    events = [{
+        "name": r["name"],
+        "cat": r["name"].split(".")[0],
+        "ph": "X",
+        "ts": r["start"] * 1e6,
+        "dur": r["wall_s"] * 1e6,
+        "pid": os.getpid(),
+        "tid": r["thread_id"],
+        "args": {k: v for k, v in r.items() if k not in ("name", "start", "thread_id")},
+    } for r in records(since)]
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}))
+    os.replace(tmp, path)
+    return path
+
+
+def summary(recs):
+    """Records aggregated per stage name: calls, total/max wall time, rows, max peak RSS."""
+    out = {}
+    for r in recs:
+        s = out.setdefault(r["name"], {"calls": 0, "wall_s": 0.0, "max_wall_s": 0.0, "rows": 0,
+                                       "peak_rss_mb": 0.0})
+        s["calls"] += 1
+        s["wall_s"] += r["wall_s"]
+        s["max_wall_s"] = max(s["max_wall_s"], r["wall_s"])
+        s["rows"] += r["rows"] or 0
+        s["peak_rss_mb"] = max(s["peak_rss_mb"], r["peak_rss_mb"])
+    return out
+
+
+if os.environ.get("HPC_PROFILE") or os.environ.get("HPC_TRACE"):
+    enable(trace=os.environ.get("HPC_TRACE") or None)
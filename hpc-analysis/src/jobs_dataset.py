@@ -0,0 +1,294 @@
+# src/jobs_dataset.py
+"""
+Year/month Hive-partitioned layout of the processed jobs table.
+
+    jobs_all/
+        year=2021/month=3/part-000000.parquet
+        year=2021/month=4/part-000000.parquet
+        ...
+        year=__HIVE_DEFAULT_PARTITION__/month=__HIVE_DEFAULT_PARTITION__/...   (no Start)
+
+Partition keys come from `Start`. Inside a partition rows are sorted by
+`Start` and written in fixed-size row groups, so the per-row-group min/max
+statistics of `Start` are tight and a date-range read skips both whole
+partitions (from the directory names) and row groups (from the footers).
+Use `read_jobs` rather than `pd.read_parquet` on the directory: it applies
+the partition schema and handles the null partition.
+"""
+
+import hashlib
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from jobs_schema import jobs_to_pandas
+
+PARTITION_COLS = ["year", "month"]
+PARTITIONING = ds.partitioning(
+    pa.schema([("year", pa.int16()), ("month", pa.int8())]), flavor="hive"
+)
+NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+ROW_GROUP_ROWS = 64_000
+
+
+def partition_path(year, month):
+    """Relative directory of one partition ('year=2021/month=3')."""
+    y = NULL_PARTITION if pd.isna(year) else int(year)
+    m = NULL_PARTITION if pd.isna(month) else int(month)
+    return Path(f"year={y}") / f"month={m}"
+
+
+def partition_of(rel_path):
+    """(year, month) of a file path under the dataset root; None for the no-Start partition."""
+    keys = dict(part.split("=", 1) for part in Path(rel_path).parts if "=" in part)
+    if NULL_PARTITION in (keys.get("year"), keys.get("month")):
+        return None
+    return int(keys["year"]), int(keys["month"])
+
+
+def temp_path(path):
+    """
+    Where to write `path` before renaming it into place: a hidden name that
+    `jobs_dataset` and `dataset_version` skip, so a file left by a crash is
+    never read as data.
+    """
+    path = Path(path)
+    return path.with_name(f".{path.name}.tmp")
+
+
+def arrow_schema(df):
+    """Arrow schema for a jobs frame; all-null text columns stay strings."""
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    for i, field in enumerate(schema):
+        if pa.types.is_null(field.type):
+            schema = schema.set(i, field.with_type(pa.string()))
+    return schema
+
+
+def write_partitioned(df, root, basename="part-000000.parquet", overwrite=False,
+                      row_group_size=ROW_GROUP_ROWS, schema=None):
+    """
+    Write `df` under `root` as year/month partitions, one `basename` file each.
+
+    overwrite=True clears `root` first (full rebuild); otherwise files are
+    added next to the existing ones, so callers appending must pick a new
+    `basename`. All partitions share one `schema` (default: from `df`).
+    Returns the written paths relative to `root`.
+    """
+    root = Path(root)
+    if overwrite and root.exists():
+        shutil.rmtree(root)
+
+    start = df["Start"]
+    df = df.drop(columns=[c for c in PARTITION_COLS if c in df.columns])
+    # by position: the index of frames concatenated from chunks repeats labels
+    keys = pd.DataFrame({
+        "year": start.dt.year.astype("Int16").to_numpy(),
+        "month": start.dt.month.astype("Int8").to_numpy(),
+    })
+
+    schema = schema or arrow_schema(df)
+    written = []
+    for (year, month), rows in keys.groupby(PARTITION_COLS, dropna=False, sort=True).indices.items():
+        part = df.iloc[rows].sort_values("Start", kind="stable")
+        table = pa.Table.from_pandas(part, schema=schema, preserve_index=False)
+        rel = partition_path(year, month) / basename
+        (root / rel).parent.mkdir(parents=True, exist_ok=True)
+        pq.write_table(table, root / rel, row_group_size=row_group_size)
+        written.append(rel)
+    return written
+
+
+class PartitionedWriter:
+    """
+    Streaming counterpart of `write_partitioned` for tables arriving sorted by Start.
+
+    Because the input is sorted, partitions arrive one after the other, so
+    only one Parquet file is open at a time. Rows are buffered up to
+    `row_group_size` so every row group (except the last of a partition)
+    has the same size whatever the size of the incoming batches.
+    """
+
+    def __init__(self, root, schema, basename="part-000000.parquet",
+                 row_group_size=ROW_GROUP_ROWS, overwrite=False):
+        self.root = Path(root)
+        if overwrite and self.root.exists():
+            shutil.rmtree(self.root)
+        self.schema = pa.schema([f for f in schema if f.name not in PARTITION_COLS],
+                                metadata=schema.metadata)
+        self.basename = basename
+        self.row_group_size = row_group_size
+        self.written = []
+        self.rows = 0
+        self._key = None
+        self._writer = None
+        self._buffer = []
+        self._buffered = 0
+
+    def write(self, table):
+        """Append a table sorted by Start (nulls last) that continues the previous ones."""
+        if table.num_rows == 0:
+            return
+        table = table.select(self.schema.names)
+        year = pc.year(table["Start"]).to_numpy(zero_copy_only=False)
+        month = pc.month(table["Start"]).to_numpy(zero_copy_only=False)
+        key = np.where(np.isnan(year.astype(float)), -1, year * 100 + month).astype(np.int64)
+        cuts = np.flatnonzero(np.diff(key)) + 1
+        for lo, hi in zip(np.r_[0, cuts], np.r_[cuts, len(key)]):
+            k = int(key[lo])
+            if k != self._key:
+                self._open(k)
+            self._buffer.append(table.slice(lo, hi - lo))
+            self._buffered += hi - lo
+            self._flush(final=False)
+        self.rows += table.num_rows
+
+    def _open(self, key):
+        self._close_current()
+        year, month = (None, None) if key == -1 else divmod(key, 100)
+        rel = partition_path(year, month) / self.basename
+        (self.root / rel).parent.mkdir(parents=True, exist_ok=True)
+        self._writer = pq.ParquetWriter(self.root / rel, self.schema)
+        self._key = key
+        self.written.append(rel)
+
+    def _flush(self, final):
+        if not self._buffered or (self._buffered < self.row_group_size and not final):
+            return
+        data = pa.concat_tables(self._buffer)
+        n_full = data.num_rows if final else data.num_rows // self.row_group_size * self.row_group_size
+        for lo in range(0, n_full, self.row_group_size):
+            self._writer.write_table(data.slice(lo, min(self.row_group_size, n_full - lo)))
+        rest = data.slice(n_full)
+        self._buffer = [rest] if rest.num_rows else []
+        self._buffered = rest.num_rows
+
+    def _close_current(self):
+        if self._writer is not None:
+            self._flush(final=True)
+            self._writer.close()
+            self._writer = None
+
+    def close(self):
+        self._close_current()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def jobs_dataset(root):
+    """pyarrow Dataset over a partitioned jobs directory."""
+    return ds.dataset(root, format="parquet", partitioning=PARTITIONING)
+
+
+def date_filter(start=None, end=None):
+    """
+    Expression selecting jobs whose Start falls on [start, end] (dates, inclusive).
+
+    Combines a (year, month) test that prunes partition directories with a
+    Start test that prunes row groups and does the exact filtering.
+    """
+    expr = None
+    if start is not None:
+        start = pd.Timestamp(start).normalize()
+        expr = (
+            (ds.field("year") > start.year)
+            | ((ds.field("year") == start.year) & (ds.field("month") >= start.month))
+        ) & (ds.field("Start") >= start.to_datetime64())
+    if end is not None:
+        end = pd.Timestamp(end).normalize()
+        stop = end + pd.Timedelta(days=1)
+        cond = (
+            (ds.field("year") < end.year)
+            | ((ds.field("year") == end.year) & (ds.field("month") <= end.month))
+        ) & (ds.field("Start") < stop.to_datetime64())
+        expr = cond if expr is None else expr & cond
+    return expr
+
+
+def read_jobs(root, start=None, end=None, columns=None, filter=None):
+    """
+    Read the jobs whose Start is within [start, end] as a DataFrame.
+
+    Only the partitions and row groups overlapping the range are scanned and
+    only `columns` (default: all) are decoded. `filter` is an extra pyarrow
+    expression ANDed to the date range. Dictionary columns come back as
+    categoricals and integer columns as nullable integers (`jobs_to_pandas`).
+    """
+    expr = date_filter(start, end)
+    if filter is not None:
+        expr = filter if expr is None else expr & filter
+    table = jobs_dataset(root).to_table(columns=columns, filter=expr)
+    return jobs_to_pandas(table)
+
+
+def dataset_version(root):
+    """
+    Fingerprint of the files under `root` (names, sizes, mtimes).
+
+    Changes whenever a part file is added, rewritten or removed, e.g. by the
+    nightly ingest; a stat per file, no data read. Used as cache key.
+    """
+    root = Path(root)
+    h = hashlib.sha1()
+    for path in sorted(root.rglob("*.parquet")):
+        st = path.stat()
+        h.update(f"{path.relative_to(root)}:{st.st_size}:{st.st_mtime_ns}\n".encode())
+    return h.hexdigest()[:16]
+
+
+def start_range(df, start=None, end=None):
+    """
+    Rows of `df` whose Start falls on [start, end] (dates, inclusive).
+
+    `df` must be sorted by Start with NaT last; the rows are found by binary
+    search and returned as a slice, without copying the data.
+    """
+    lo, hi = start_bounds(df["Start"].to_numpy()[: df["Start"].notna().sum()], start, end)
+    return df.iloc[lo:hi]
+
+
+def start_bounds(starts, start=None, end=None):
+    """(lo, hi) such that sorted `starts[lo:hi]` falls on [start, end] (dates, inclusive)."""
+    lo, hi = 0, len(starts)
+    if start is not None:
+        lo = int(starts.searchsorted(pd.Timestamp(start).normalize().to_datetime64(), "left"))
+    if end is not None:
+        stop = pd.Timestamp(end).normalize() + pd.Timedelta(days=1)
+        hi = int(starts.searchsorted(stop.to_datetime64(), "left"))
+    return lo, hi
+
+
+def date_bounds(root, start_col="Start", end_col="End"):
+    """
+    (earliest Start, latest End) of the dataset from Parquet footer statistics.
+
+    Reads no data pages; used to seed the dashboard's date picker.
+    """
+    lo = hi = None
+    for frag in jobs_dataset(root).get_fragments():
+        md = frag.metadata
+        names = md.schema.names
+        for i in range(md.num_row_groups):
+            rg = md.row_group(i)
+            for col, pick in ((start_col, "min"), (end_col, "max")):
+                if col not in names:
+                    continue
+                stats = rg.column(names.index(col)).statistics
+                if stats is None or not stats.has_min_max:
+                    continue
+                value = pd.Timestamp(getattr(stats, pick))
+                if pick == "min":
+                    lo = value if lo is None or value < lo else lo
+                else:
+                    hi = value if hi is None or value > hi else hi
+    return lo, hi
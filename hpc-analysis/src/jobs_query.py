@@ -0,0 +1,296 @@
+# src/jobs_query.py
+"""
+Filters and aggregations over the jobs dataset, behind one interface with
+three engines:
+
+    pandas   the whole table in memory (the dashboard's shared frame, with
+             its FilterIndex when given); the reference the others are
+             checked against
+    arrow    pyarrow Acero plans over the Parquet dataset: the date range
+             prunes partition directories and row groups, only the columns
+             a query uses are decoded, and the rows stream through
+             filter -> project -> hash aggregate, so only the aggregated
+             result is ever held
+    duckdb   the same as SQL over the Parquet files (optional dependency:
+             `pip install duckdb`)
+
+Every engine answers, for jobs whose Start is on [start, end] (dates,
+inclusive; jobs that never started are never selected, as in the
+dashboard) and whose columns are in `filters` ({column: allowed values},
+None for no filter on a column):
+
+    count(start, end, filters)                    number of jobs
+    aggregate(by, measures, start, end, filters)  DataFrame indexed by `by`
+    scan(columns, start, end, filters, rows)      DataFrame chunks of the jobs
+
+`by` lists columns, plus the Start buckets "day" and "month". `measures` is
+{name: (column, function)} with function one of size (rows, column
+ignored), count (non-null), sum, mean, min, max. Groups with a missing key
+are left out, as in pandas. `scan` yields at most `rows` rows at a time
+(one empty chunk when nothing matches) in the engine's order: by Start for
+the pandas engine, by file for the others.
+
+    q = open_query("arrow", "data/processed/jobs_all")
+    q.aggregate(["month", "Partition"], {"jobs": (None, "size"), "cpu": ("CPUTime_sec", "sum")},
+                start="2024-01-01", end="2024-06-30", filters={"State": ["COMPLETED"]})
+"""
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from pyarrow import acero
+
+from jobs_dataset import date_filter, jobs_dataset, read_jobs
+from jobs_schema import jobs_to_pandas
+
+FUNCTIONS = ("size", "count", "sum", "mean", "min", "max")
+TIME_KEYS = {"day": "D", "month": "M"}  # Start buckets usable in `by` (pandas period codes)
+SCAN_ROWS = 100_000
+
+
+def _check(by, measures):
+    for name, (col, fn) in measures.items():
+        if fn not in FUNCTIONS:
+            raise ValueError(f"Unknown function {fn!r} for {name!r} (one of {', '.join(FUNCTIONS)})")
+        if fn != "size" and col is None:
+            raise ValueError(f"{name!r}: {fn} needs a column")
+    return list(by), dict(measures)
+
+
+def _finish(df, by, measures):
+    """Aggregated rows -> frame indexed by `by` (sorted), measures in order, no missing keys."""
+    df = df.dropna(subset=by)
+    for col in by:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype(df[col].cat.categories.dtype)
+    for name, (_, fn) in measures.items():
+        if fn in ("size", "count"):
+            df[name] = df[name].astype(np.int64)
+    return df.set_index(by).sort_index()[list(measures)]
+
+
+class PandasQuery:
+    """Queries on a jobs DataFrame in memory; `index` (a FilterIndex of `df`) answers the filters."""
+
+    name = "pandas"
+
+    def __init__(self, df, index=None):
+        self.df = df
+        self.index = index
+        self.columns = list(df.columns)
+
+    @classmethod
+    def from_dataset(cls, root, columns=None):
+        return cls(read_jobs(root, columns=columns))
+
+    def rows(self, start=None, end=None, filters=None):
+        """Positions (ascending) of the selected jobs in `df`."""
+        filters = {c: v for c, v in (filters or {}).items() if v is not None}
+        if self.index is not None and all(c in self.index.rows for c in filters):
+            return self.index.select(start, end, **filters)
+        starts = self.df["Start"].to_numpy()
+        mask = self.df["Start"].notna().to_numpy().copy()
+        if start is not None:
+            mask &= starts >= pd.Timestamp(start).normalize().to_datetime64()
+        if end is not None:
+            mask &= starts < (pd.Timestamp(end).normalize() + pd.Timedelta(days=1)).to_datetime64()
+        for col, allowed in filters.items():
+            mask &= self.df[col].isin(allowed).to_numpy()
+        return np.flatnonzero(mask)
+
+    def count(self, start=None, end=None, filters=None):
+        return len(self.rows(start, end, filters))
+
+    def aggregate(self, by, measures, start=None, end=None, filters=None):
+        by, measures = _check(by, measures)
+        df = self.df.iloc[self.rows(start, end, filters)]
+        keys = [
+            df["Start"].dt.to_period(TIME_KEYS[k]).dt.start_time.rename(k) if k in TIME_KEYS else df[k]
+            for k in by
+        ]
+        groups = df.groupby(keys, observed=True, dropna=True, sort=True)
+        out = pd.DataFrame({
+            name: groups.size() if fn == "size" else groups[col].agg(fn)
+            for name, (col, fn) in measures.items()
+        })
+        return _finish(out.reset_index(), by, measures)
+
+    def scan(self, columns, start=None, end=None, filters=None, rows=SCAN_ROWS):
+        positions = self.rows(start, end, filters)
+        cols = [self.df.columns.get_loc(c) for c in columns if c in self.columns]
+        for i in range(0, max(len(positions), 1), rows):
+            yield self.df.iloc[positions[i:i + rows], cols]
+
+
+class ArrowQuery:
+    """Queries as pyarrow Acero plans over the partitioned dataset at `root`; nothing is loaded up front."""
+
+    name = "arrow"
+
+    def __init__(self, root):
+        self.dataset = jobs_dataset(root)
+        self.columns = self.dataset.schema.names
+
+    def expression(self, start=None, end=None, filters=None):
+        # jobs that never started: the null partition, skipped without being opened
+        expr = pc.field("year").is_valid() & pc.field("Start").is_valid()
+        dates = date_filter(start, end)
+        if dates is not None:
+            expr &= dates
+        for col, allowed in (filters or {}).items():
+            if allowed is not None:
+                expr &= pc.field(col).isin(pa.array(list(allowed), self._value_type(col)))
+        return expr
+
+    def _value_type(self, col):
+        kind = self.dataset.schema.field(col).type
+        return kind.value_type if pa.types.is_dictionary(kind) else kind
+
+    def count(self, start=None, end=None, filters=None):
+        return self.dataset.count_rows(filter=self.expression(start, end, filters))
+
+    def aggregate(self, by, measures, start=None, end=None, filters=None):
+        by, measures = _check(by, measures)
+        expr = self.expression(start, end, filters)
+        keys, names = [], []
+        for k in by:
+            if k in TIME_KEYS:
+                keys.append(pc.floor_temporal(pc.field("Start"), unit=k))
+            else:
+                # plain values: dictionaries of different files do not hash together
+                keys.append(pc.field(k).cast(self._value_type(k)))
+            names.append(k)
+        values = sorted({col for col, fn in measures.values() if fn != "size"})
+        needed = sorted({"Start", *values, *(k for k in by if k not in TIME_KEYS), *_filtered(filters)})
+        aggregates = []
+        for name, (col, fn) in measures.items():
+            if fn == "size":
+                aggregates.append(([], "hash_count_all", None, name))
+            elif fn == "sum":
+                aggregates.append((col, "hash_sum", pc.ScalarAggregateOptions(min_count=0), name))
+            else:
+                aggregates.append((col, f"hash_{fn}", None, name))
+        plan = acero.Declaration.from_sequence([
+            acero.Declaration("scan", acero.ScanNodeOptions(self.dataset, filter=expr, columns=needed)),
+            acero.Declaration("filter", acero.FilterNodeOptions(expr)),
+            acero.Declaration("project", acero.ProjectNodeOptions(
+                keys + [pc.field(c) for c in values], names + values)),
+            acero.Declaration("aggregate", acero.AggregateNodeOptions(aggregates, keys=names)),
+        ])
+        return _finish(plan.to_table().to_pandas(), by, measures)
+
+    def scan(self, columns, start=None, end=None, filters=None, rows=SCAN_ROWS):
+        cols = [c for c in columns if c in self.columns]
+        scanner = self.dataset.scanner(columns=cols, filter=self.expression(start, end, filters),
+                                       batch_size=rows)
+        yield from _rechunk(scanner.to_batches(), scanner.projected_schema, rows)
+
+
+def _filtered(filters):
+    return [c for c, v in (filters or {}).items() if v is not None]
+
+
+def _rechunk(batches, schema, rows):
+    """Record batches -> DataFrames of `rows` rows (the last one shorter; one empty if none)."""
+    pending, n, emitted = [], 0, False
+    for batch in batches:
+        while batch.num_rows:
+            take = batch.slice(0, rows - n)
+            batch = batch.slice(take.num_rows)
+            pending.append(take)
+            n += take.num_rows
+            if n == rows:
+                yield jobs_to_pandas(pa.Table.from_batches(pending, schema))
+                pending, n, emitted = [], 0, True
+    if pending or not emitted:
+        yield jobs_to_pandas(pa.Table.from_batches(pending, schema))
+
+
+class DuckDBQuery:
+    """Queries as DuckDB SQL over the Parquet files under `root` (requires the duckdb package)."""
+
+    name = "duckdb"
+
+    SQL_FUNCTIONS = {"count": "count", "mean": "avg", "min": "min", "max": "max"}
+
+    def __init__(self, root):
+        try:
+            import duckdb
+        except ImportError as e:
+            raise ImportError("the duckdb query engine needs the duckdb package (pip install duckdb)") from e
+        self.con = duckdb.connect()
+        self.source = f"read_parquet('{_sql_path(root)}/**/*.parquet', hive_partitioning = false, union_by_name = true)"
+        self.columns = [d[0] for d in self.con.execute(f"SELECT * FROM {self.source} LIMIT 0").description]
+
+    def where(self, start=None, end=None, filters=None):
+        """WHERE clause and its parameters; the Start test lets DuckDB skip row groups."""
+        conds, params = ['"Start" IS NOT NULL'], []
+        if start is not None:
+            conds.append('"Start" >= ?')
+            params.append(pd.Timestamp(start).normalize().to_pydatetime())
+        if end is not None:
+            conds.append('"Start" < ?')
+            params.append((pd.Timestamp(end).normalize() + pd.Timedelta(days=1)).to_pydatetime())
+        for col, allowed in (filters or {}).items():
+            if allowed is None:
+                continue
+            allowed = list(allowed)
+            if not allowed:
+                conds.append("false")
+                continue
+            conds.append(f"{_quote(col)} IN ({', '.join('?' * len(allowed))})")
+            params += [v.item() if isinstance(v, np.generic) else v for v in allowed]
+        return " WHERE " + " AND ".join(conds), params
+
+    def count(self, start=None, end=None, filters=None):
+        where, params = self.where(start, end, filters)
+        return self.con.cursor().execute(f"SELECT count(*) FROM {self.source}{where}", params).fetchone()[0]
+
+    def aggregate(self, by, measures, start=None, end=None, filters=None):
+        by, measures = _check(by, measures)
+        keys = [
+            f"date_trunc('{k}', \"Start\") AS {_quote(k)}"
+            if k in TIME_KEYS else _quote(k)
+            for k in by
+        ]
+        exprs = []
+        for name, (col, fn) in measures.items():
+            if fn == "size":
+                exprs.append(f"count(*) AS {_quote(name)}")
+            elif fn == "sum":
+                exprs.append(f"coalesce(sum({_quote(col)}), 0) AS {_quote(name)}")
+            else:
+                exprs.append(f"{self.SQL_FUNCTIONS[fn]}({_quote(col)}) AS {_quote(name)}")
+        where, params = self.where(start, end, filters)
+        sql = (f"SELECT {', '.join(keys + exprs)} FROM {self.source}{where} "
+               f"GROUP BY {', '.join(str(i + 1) for i in range(len(by)))}")
+        return _finish(self.con.cursor().execute(sql, params).df(), by, measures)
+
+    def scan(self, columns, start=None, end=None, filters=None, rows=SCAN_ROWS):
+        cols = [c for c in columns if c in self.columns]
+        where, params = self.where(start, end, filters)
+        cur = self.con.cursor()
+        cur.execute(f"SELECT {', '.join(map(_quote, cols))} FROM {self.source}{where}", params)
+        # to_arrow_reader: DuckDB >= 1.4; fetch_record_batch before
+        reader = getattr(cur, "to_arrow_reader", None) or cur.fetch_record_batch
+        reader = reader(rows)
+        yield from _rechunk(reader, reader.schema, rows)
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _sql_path(path):
+    return str(path).replace("'", "''")
+
+
+ENGINES = {"pandas": PandasQuery.from_dataset, "arrow": ArrowQuery, "duckdb": DuckDBQuery}
+
+
+def open_query(engine, root):
+    """Query engine `engine` (pandas, arrow or duckdb) over the jobs dataset at `root`."""
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown query engine {engine!r} (one of {', '.join(ENGINES)})")
+    return ENGINES[engine](root)
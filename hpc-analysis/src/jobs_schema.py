@@ -0,0 +1,276 @@
+# src/jobs_schema.py
+"""
+Compact on-disk schema of the processed jobs table, and its pandas loader.
+
+    JobID          int64      base job id ('123' of '123_7' / '123+1')
+    ArrayTaskID    int32      array index ('7' of '123_7'), null otherwise
+    HetJobOffset   int8       heterogeneous component ('1' of '123+1'), null otherwise
+                              (a pending array record '123_[1-5]' keeps the base id only)
+    UID            dictionary<int32>
+    State, Partition, Account, JobName, ExitCode, ...
+                   dictionary<string>  (few distinct values per row group)
+    Submit/Start/End            timestamp[ms] (Parquet has no seconds unit)
+    NCPUS/NNODES/NTASKS         int32/int16/int32, null when unknown
+    Elapsed_sec, wait_time_sec  int32 seconds
+    CPUTime_sec, core_seconds   float64 (fractional, can exceed int32)
+    ReqMem_MB, MaxRSS_MB,
+    efficiency                  float32
+    <size>_bytes                int64, parsed AveRSS, MaxRSS, Ave/MaxDisk... (SIZE_COLS)
+
+Columns not listed keep their type. `compact_table` casts any cleaned table
+(make_dataset.py output, the legacy table, merged batches) to this layout;
+`jobs_to_pandas` turns it back into a frame with categoricals and nullable
+integers instead of object strings and float64, which is what `read_jobs`
+returns. Use `job_keys` where the original sacct id string is needed.
+"""
+
+import logging
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from decode_tres import SIZE_COLS, decode_size_bytes
+
+# text columns with few distinct values -> dictionary encoded
+DICTIONARY_COLS = [
+    "UID", "JobName", "Partition", "Account", "State", "ExitCode", "TimeLimit",
+    "Elapsed", "CPUTime", "UserCPU", "SystemCPU", "TotalCPU", "ReqMem",
+    "AveRSS", "MaxRSS", "AveDiskRead", "MaxDiskRead", "AveDiskWrite",
+    "MaxDiskWrite", "AvePages", "MaxPages", "State_Clean", "Partition_Main",
+    "JobName_Grouped",
+]
+
+# value types; columns in DICTIONARY_COLS get dictionary<int32, type>
+COLUMN_TYPES = {
+    "JobID": pa.int64(),
+    "ArrayTaskID": pa.int32(),
+    "HetJobOffset": pa.int8(),
+    "UID": pa.int32(),
+    "Submit": pa.timestamp("ms"),
+    "Start": pa.timestamp("ms"),
+    "End": pa.timestamp("ms"),
+    "NCPUS": pa.int32(),
+    "NNODES": pa.int16(),
+    "NTASKS": pa.int32(),
+    "wait_time_sec": pa.int32(),
+    "Elapsed_sec": pa.int32(),
+    "CPUTime_sec": pa.float64(),
+    "core_seconds": pa.float64(),
+    "ReqMem_MB": pa.float32(),
+    "MaxRSS_MB": pa.float32(),
+    "efficiency": pa.float32(),
+}
+COLUMN_TYPES.update({f"{c}_bytes": pa.int64() for c in SIZE_COLS})
+
+JOBID_PARTS = ["JobID", "ArrayTaskID", "HetJobOffset"]
+
+# '123', '123_7', '123_[1-5%2]' (pending array), '123+1'; steps ('.batch') are not jobs
+_jobid_re = r"^(?P<JobID>\d+)(?:_(?P<ArrayTaskID>\d+)|_\[[^\]]*\])?(?:\+(?P<HetJobOffset>\d+))?$"
+# job steps ('123.batch', '123_7.extern', '123+1.0'), listed by sacct without -X
+_step_re = r"^\s*\d+(?:_\d+|_\[[^\]]*\])?(?:\+\d+)?\.\S+\s*$"
+
+_PANDAS_INTS = {
+    pa.int8(): pd.Int8Dtype(),
+    pa.int16(): pd.Int16Dtype(),
+    pa.int32(): pd.Int32Dtype(),
+    pa.int64(): pd.Int64Dtype(),
+}
+
+
+def _target_type(name, current):
+    value = COLUMN_TYPES.get(name)
+    if value is None:
+        if name not in DICTIONARY_COLS:
+            return current
+        value = pa.string()
+    if name in DICTIONARY_COLS:
+        return pa.dictionary(pa.int32(), value)
+    return value
+
+
+def compact_schema(schema):
+    """Compact version of `schema`; a JobID column is followed by its id parts."""
+    fields = []
+    for field in schema:
+        if field.name in JOBID_PARTS[1:]:
+            continue
+        if field.name == "JobID":
+            fields += [pa.field(n, COLUMN_TYPES[n]) for n in JOBID_PARTS]
+        else:
+            fields.append(pa.field(field.name, _target_type(field.name, field.type)))
+    return pa.schema(fields)
+
+
+def is_step(jobid):
+    """Boolean mask of the job step rows of a JobID Series (see `drop_steps`)."""
+    if pd.api.types.is_numeric_dtype(jobid):
+        return pd.Series(False, index=jobid.index)
+    return jobid.astype("string").str.match(_step_re, na=False).astype(bool)
+
+
+def rollup_steps(df):
+    """
+    `df` with the usage of its job steps carried over to their jobs. In
+    exports made without -X, sacct reports MaxRSS, AveRSS and the disk
+    columns (SIZE_COLS) on the steps ('123.batch', '123.0') and leaves them
+    empty on the job: each job takes the largest value of its steps where
+    that is above its own, as the text sacct printed. Call before
+    `drop_steps`; steps whose job is not in `df` are ignored.
+    """
+    steps = is_step(df["JobID"]).to_numpy()
+    cols = [c for c in SIZE_COLS if c in df.columns]
+    if not steps.any() or not cols:
+        return df
+    # the job id of every row: '123_7.batch' -> '123_7'
+    key = df["JobID"].astype("string").str.strip().str.replace(r"\..*$", "", regex=True).to_numpy()
+    for col in cols:
+        nbytes = decode_size_bytes(df[col]).to_numpy()
+        found = pd.DataFrame({"key": key[steps], "bytes": nbytes[steps], "pos": np.flatnonzero(steps)})
+        found = found.dropna(subset=["bytes"])
+        if found.empty:
+            continue
+        # the first largest step of each job
+        found = found.sort_values("bytes", ascending=False, kind="stable").drop_duplicates("key")
+        found = found.set_index("key").reindex(key)
+        take = ~steps & (found["bytes"].to_numpy() > np.nan_to_num(nbytes, nan=-1.0))
+        if take.any():
+            rows = np.flatnonzero(take)
+            values = df[col].to_numpy()[found["pos"].to_numpy()[rows].astype(np.int64)]
+            df.iloc[rows, df.columns.get_loc(col)] = values
+    return df
+
+
+def drop_steps(df):
+    """
+    `df` without its job step rows. sacct exports made without -X list each
+    step ('123.batch', '123.extern', '123.0') after its job; they are not
+    jobs and `split_jobid` would reject them.
+    """
+    steps = is_step(df["JobID"])
+    if not steps.any():
+        return df
+    logging.info(f"Dropped {int(steps.sum()):,} job step rows (e.g. {df['JobID'][steps].iloc[0]})")
+    return df[~steps.to_numpy()]
+
+
+def split_jobid(jobid):
+    """
+    sacct job ids -> (JobID, ArrayTaskID, HetJobOffset) arrays.
+
+    Integer input is already a plain JobID. Ids that do not parse raise,
+    rather than silently becoming nulls.
+    """
+    if isinstance(jobid, pa.ChunkedArray):
+        jobid = jobid.combine_chunks()
+    if pa.types.is_dictionary(jobid.type):
+        jobid = jobid.cast(jobid.type.value_type)
+    if pa.types.is_integer(jobid.type) or pa.types.is_floating(jobid.type):
+        return [jobid.cast(pa.int64()), pa.nulls(len(jobid), pa.int32()), pa.nulls(len(jobid), pa.int8())]
+    text = pc.utf8_trim_whitespace(jobid.cast(pa.string()))
+    parts = pc.extract_regex(text, _jobid_re)
+    bad = pc.and_(pc.is_valid(text), pc.is_null(parts))
+    if pc.any(bad).as_py():
+        sample = pc.filter(text, bad)[:3].to_pylist()
+        raise ValueError(f"Unparsable JobID values, e.g. {sample}")
+    out = []
+    for name in JOBID_PARTS:
+        field = pc.struct_field(parts, name)
+        # optional groups that did not match come back as ''
+        field = pc.if_else(pc.equal(field, ""), pa.scalar(None, pa.string()), field)
+        out.append(field.cast(COLUMN_TYPES[name]))
+    return out
+
+
+def _cast(column, target):
+    if isinstance(column, pa.ChunkedArray):
+        column = column.combine_chunks()
+    if column.type == target:
+        return column
+    if pa.types.is_dictionary(column.type):
+        column = column.cast(column.type.value_type)
+    if pa.types.is_floating(column.type):
+        # pandas NaN means missing
+        column = pc.if_else(pc.is_nan(column), pa.scalar(None, column.type), column)
+        if pa.types.is_integer(target):
+            column = pc.round(column)
+    if pa.types.is_dictionary(target):
+        return _cast(column, target.value_type).dictionary_encode().cast(target)
+    if pa.types.is_timestamp(target):
+        # sacct times are whole seconds; finer digits are not kept
+        return column.cast(target, safe=False)
+    # safe: overflow or lost digits raise instead of wrapping
+    return column.cast(target)
+
+
+def compact_table(table):
+    """Cast a cleaned jobs table to the compact schema (see module docstring)."""
+    schema = compact_schema(table.schema)
+    columns = []
+    for field in schema:
+        if field.name in JOBID_PARTS:
+            if field.name == "JobID":
+                columns += split_jobid(table["JobID"])
+            continue
+        columns.append(_cast(table[field.name], field.type))
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
+def conform_table(table, schema):
+    """
+    Cast a compact table to `schema` (another compact schema): columns in
+    the order of `schema`, missing ones as nulls, extra ones dropped.
+
+    Used where tables cleaned from different sources must share one file
+    schema, e.g. sacct and legacy files in parallel_etl.py.
+    """
+    columns = []
+    for field in schema:
+        if field.name in table.column_names:
+            columns.append(_cast(table[field.name], field.type))
+        else:
+            columns.append(pa.nulls(table.num_rows, field.type))
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
+def compact_frame(df):
+    """`compact_table` for a DataFrame; returns a DataFrame with the compact dtypes."""
+    return jobs_to_pandas(compact_table(pa.Table.from_pandas(df, preserve_index=False)))
+
+
+def jobs_to_pandas(table):
+    """
+    Arrow jobs table -> DataFrame keeping the compact types.
+
+    Dictionaries become categoricals, integer columns nullable integers
+    (not float64 when they hold nulls) and timestamps keep their unit.
+    Parquet only keeps the dictionary of text columns, so integer
+    DICTIONARY_COLS (UID) are turned back into categoricals here.
+    """
+    df = table.to_pandas(types_mapper=_PANDAS_INTS.get)
+    for col in DICTIONARY_COLS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype("category")
+    return df
+
+
+def job_keys(df):
+    """The sacct id string of every row ('123', '123_7', '123+1') as a str Series."""
+    key = df["JobID"].astype("Int64").astype(str)
+    if "ArrayTaskID" in df.columns:
+        task = df["ArrayTaskID"]
+        key = key.where(task.isna(), key + "_" + task.astype("Int64").astype(str))
+    if "HetJobOffset" in df.columns:
+        het = df["HetJobOffset"]
+        key = key.where(het.isna(), key + "+" + het.astype("Int64").astype(str))
+    return key.astype(str)
+
+
+def drop_unused_categories(df):
+    """After filtering: forget categories no row uses any more (value_counts, widgets)."""
+    df = df.copy()
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].cat.remove_unused_categories()
+    return df
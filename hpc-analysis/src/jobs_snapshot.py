@@ -0,0 +1,148 @@
+# src/jobs_snapshot.py
+"""
+Memory-mapped Arrow IPC snapshot of the jobs dataset, shared by app workers.
+
+    data/processed/jobs_all/        year=/month= partitioned Parquet (jobs_dataset.py)
+    data/processed/jobs_all.arrow   the same jobs as one uncompressed IPC (Feather v2) file
+
+Several Streamlit processes behind a proxy each used to decode the Parquet
+files into their own heap. The ETL now also writes the snapshot, which the
+app opens with `pa.memory_map`: the frame's columns are views of the mapped
+file, so opening it decodes nothing and all workers share the same pages of
+the OS page cache instead of holding a private copy each.
+
+For pandas to use the buffers as they are, the file is laid out like the
+app's frame:
+
+- one record batch, so one contiguous buffer per column, with the rows
+  sorted by Start (NaT last);
+- floats hold NaN and timestamps NaT (int64 min) instead of Arrow nulls;
+- strings are large_string (what pandas' Arrow strings hold) and the
+  dictionary columns, UID included, have one dictionary for the whole file.
+
+Integer columns come back as nullable integers over the mapped values (only
+their null mask is allocated) and dictionary columns as categoricals whose
+codes are copied, 1-4 bytes a row. Read the file with `read_snapshot`: other
+Arrow readers would take the NaT sentinels for dates.
+
+The file records the `dataset_version` of the directory it was written
+from; the app only uses it while that version is current and reads the
+Parquet files otherwise (e.g. after a nightly ingest run without
+--snapshot). It is replaced atomically, so workers that mapped the previous
+file keep reading it until they reload. Writing it needs the jobs in memory
+once, one column at a time.
+"""
+
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from instrument import stage, timed
+from jobs_dataset import dataset_version, jobs_dataset
+from jobs_schema import DICTIONARY_COLS
+
+VERSION_KEY = b"hpc.dataset_version"
+NAT = np.iinfo(np.int64).min  # what pandas stores for NaT
+
+
+def snapshot_path(root):
+    """The snapshot of the dataset directory `root` (jobs_all -> jobs_all.arrow)."""
+    root = Path(root)
+    return root.with_name(root.name + ".arrow")
+
+
+def _pandas_layout(name, col):
+    """Column `col` (ChunkedArray) as one array laid out for pandas (see module docstring)."""
+    arr = col.combine_chunks()
+    if pa.types.is_dictionary(arr.type):
+        return arr
+    if name in DICTIONARY_COLS:
+        # Parquet only keeps the dictionary of text columns; sorted like astype("category")
+        values = arr.drop_null().unique().sort()
+        return pa.DictionaryArray.from_arrays(pc.index_in(arr, value_set=values), values)
+    if pa.types.is_floating(arr.type):
+        return arr.fill_null(pa.scalar(np.nan, arr.type))
+    if pa.types.is_timestamp(arr.type):
+        return arr.cast(pa.int64()).fill_null(NAT).cast(arr.type)
+    if pa.types.is_string(arr.type):
+        return arr.cast(pa.large_string())
+    return arr
+
+
+@timed("snapshot.write", rows=int)
+def write_snapshot(root, path=None):
+    """
+    Write the snapshot of the dataset at `root` to `path` (default:
+    `snapshot_path(root)`); returns the rows written.
+    """
+    root = Path(root)
+    path = Path(path) if path is not None else snapshot_path(root)
+    # taken first: files changed while reading make the snapshot stale, not wrong
+    version = dataset_version(root)
+    dataset = jobs_dataset(root)
+    start = dataset.to_table(columns=["Start"])
+    order = pc.sort_indices(start, [("Start", "ascending")])  # nulls last
+
+    arrays = []
+    for name in dataset.schema.names:
+        with stage(f"snapshot.{name}", rows=len(order)):
+            col = dataset.to_table(columns=[name])[name].take(order)
+            arrays.append(_pandas_layout(name, col))
+    batch = pa.RecordBatch.from_arrays(arrays, names=dataset.schema.names)
+    batch = batch.replace_schema_metadata({VERSION_KEY: version.encode()})
+
+    tmp = path.with_name(path.name + ".tmp")
+    with pa.OSFile(str(tmp), "wb") as sink, pa.ipc.new_file(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+    # a new file, never rewritten in place: mapped readers keep the old one
+    os.replace(tmp, path)
+    return batch.num_rows
+
+
+def snapshot_version(path):
+    """`dataset_version` the snapshot at `path` was written from; None without a snapshot."""
+    try:
+        with pa.memory_map(str(path)) as source:
+            metadata = pa.ipc.open_file(source).schema.metadata or {}
+    except FileNotFoundError:
+        return None
+    version = metadata.get(VERSION_KEY)
+    return version.decode() if version else None
+
+
+def _to_pandas(arr):
+    """One snapshot column as a pandas array, viewing the mapped buffers where pandas can."""
+    if pa.types.is_integer(arr.type):
+        values = np.frombuffer(arr.buffers()[1], dtype=arr.type.to_pandas_dtype(),
+                               count=len(arr), offset=arr.offset * arr.type.byte_width)
+        if arr.null_count:
+            mask = arr.is_null().to_numpy(zero_copy_only=False)
+        else:
+            mask = np.zeros(len(arr), dtype=bool)
+        return pd.arrays.IntegerArray(values, mask)
+    if pa.types.is_dictionary(arr.type) and pa.types.is_integer(arr.type.value_type):
+        # categories as nullable integers, like jobs_to_pandas
+        categories = pd.Index(_to_pandas(arr.dictionary))
+        return pd.Categorical.from_codes(arr.indices.fill_null(-1).to_numpy(), categories=categories)
+    # floats, timestamps and strings are zero copy, categoricals copy their codes
+    return arr.to_pandas().array
+
+
+def read_snapshot(path, columns=None):
+    """
+    The jobs of the snapshot at `path` as a DataFrame over the mapped file,
+    restricted to `columns` (default: all; missing ones are skipped).
+
+    Same frame as `read_jobs` sorted by Start with NaT last. Its arrays are
+    read-only views, so writing into the frame itself raises; slices and
+    copies of it copy on write as usual.
+    """
+    batch = pa.ipc.open_file(pa.memory_map(str(path))).get_batch(0)
+    names = batch.schema.names
+    if columns is not None:
+        names = [c for c in columns if c in names]
+    return pd.DataFrame({name: _to_pandas(batch.column(name)) for name in names}, copy=False)
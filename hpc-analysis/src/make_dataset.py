@@ -5,17 +5,31 @@ ETL for SLURM job logs → cleaned Parquet.
 Usage:
     python make_dataset.py \
         --raw-file data/raw/JOBS_2021_2025.csv \
-        --out-file data/processed/jobs_clean.parquet
+        --out-file data/processed/jobs_clean.parquet \
+        [--chunksize 1000000] [--engine polars]
+
+With --chunksize the raw file is streamed in batches of that many rows and
+each batch is written as its own Parquet row group, so peak memory depends
+on the batch size only. The output is the same as the in-memory run.
+
+--engine polars runs the same cleaning as one lazy, multithreaded Polars
+query streamed to the Parquet file (make_dataset_polars.py; needs polars).
 """
 
 import argparse
 import logging
+import os
 from pathlib import Path
 
 import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 
-from clean_jobs import parse_hms_or_dhms, parse_reqmem
+from features import add_features
+from instrument import stage, timed, timed_iter
+from jobs_dataset import arrow_schema, temp_path
+from jobs_schema import compact_table, drop_steps, is_step, rollup_steps
 
 # required columns from `sacct -P` export
 REQUIRED_COLS = [
@@ -34,6 +48,15 @@ COLUMN_ALIASES = {
     "TimeLimit": ["TimeLimit", "TIMELIMIT", "timelimit", "time_limit"]
 }
 
+# Explicit raw dtypes so every batch of a chunked read parses the same way;
+# everything not listed here is read as text.
+NUMERIC_DTYPES = {"UID": "Int64", "NCPUS": "float64"}
+NUMERIC_DTYPES.update({a: "float64" for a in COLUMN_ALIASES["NNODES"] + COLUMN_ALIASES["NTASKS"]})
+
+READ_CSV_KW = dict(sep="|", encoding="latin1")
+
+ENGINES = ("pandas", "polars")
+
 
 def setup_logging():
     logging.basicConfig(
@@ -46,6 +69,10 @@ def parse_args():
     p = argparse.ArgumentParser(description="Clean SLURM logs to Parquet")
     p.add_argument("--raw-file",  type=Path, required=True, help="Path to raw CSV")
     p.add_argument("--out-file",  type=Path, required=True, help="Parquet output path")
+    p.add_argument("--chunksize", type=int, default=None,
+                   help="Stream the raw file in batches of this many rows")
+    p.add_argument("--engine", choices=ENGINES, default="pandas",
+                   help="pandas (batches) or polars (lazy streaming query on all cores)")
     return p.parse_args()
 
 def find_col(df, aliases):
@@ -54,15 +81,38 @@ def find_col(df, aliases):
             return a
     return None
 
-def main():
-    setup_logging()
-    args = parse_args()
-    raw_csv = args.raw_file
-    out_parquet = args.out_file
-
-    logging.info(f"Reading raw data from {raw_csv}")
-    df = pd.read_csv(raw_csv, sep="|", encoding="latin1", low_memory=False)
-
+def raw_dtypes(raw_csv):
+    """dtype mapping for `pd.read_csv` built from the raw file's header."""
+    header = pd.read_csv(raw_csv, nrows=0, **READ_CSV_KW).columns
+    return {c: NUMERIC_DTYPES.get(c, str) for c in header}
+
+def raw_batches(raw_csv, chunksize=None):
+    """
+    The raw file as frames of text columns: one, or batches of about
+    `chunksize` rows. A batch's leading job steps are moved to the batch
+    before, with their job, so `transform` sees every job with its steps.
+    """
+    dtypes = raw_dtypes(raw_csv)
+    if not chunksize:
+        yield pd.read_csv(raw_csv, dtype=dtypes, **READ_CSV_KW)
+        return
+    pending = None
+    for batch in pd.read_csv(raw_csv, dtype=dtypes, chunksize=chunksize, **READ_CSV_KW):
+        if pending is not None:
+            steps = is_step(batch["JobID"]).to_numpy()
+            lead = len(steps) if steps.all() else int(steps.argmin())
+            if lead:
+                pending = pd.concat([pending, batch.iloc[:lead]])
+                batch = batch.iloc[lead:]
+            if batch.empty:
+                continue
+            yield pending
+        pending = batch
+    if pending is not None:
+        yield pending
+
+def transform(df):
+    """Alias mapping, job step roll-up and removal, timestamp parsing and derived features for one batch of raw rows."""
     # --- Map in possible variants for missing columns (aliases) ---
     for canonical, variants in COLUMN_ALIASES.items():
         actual = find_col(df, variants)
@@ -76,38 +126,80 @@ def main():
     if missing:
         logging.error(f"Missing columns in raw data: {missing}")
         raise RuntimeError("Raw file schema mismatch")
+    df = drop_steps(rollup_steps(df))
     # --- parse timestamps -------------------------------------------------
     for col in ("Submit", "Start", "End"):
-        df[col] = pd.to_datetime(df[col], errors="coerce")
+        df[col] = pd.to_datetime(df[col], errors="coerce", format="ISO8601").astype("datetime64[ns]")
 
-    # --- compute wait time ------------------------------------------------
-    df["wait_time_sec"] = (df["Start"] - df["Submit"]).dt.total_seconds()
-
-    # --- durations / CPUTime ----------------------------------------------
-    df["Elapsed_sec"] = df["Elapsed"].apply(parse_hms_or_dhms)
-    df["CPUTime_sec"] = df["CPUTime"].apply(parse_hms_or_dhms)
-
-    # --- memory -----------------------------------------------------------
-    df["ReqMem_MB"] = df.apply(
-        lambda r: parse_reqmem(
-            r["ReqMem"], r.get("NNODES", np.nan), r.get("NCPUS", np.nan)
-        ), axis=1
-    )
-
-    # --- derived metrics -------------------------------------------------
-    df["core_seconds"] = df["Elapsed_sec"] * df["NCPUS"].fillna(0)
-    df.loc[df["core_seconds"] == 0, "core_seconds"] = np.nan  # avoid /0
-    df["efficiency"]   = df["CPUTime_sec"] / df["core_seconds"]
+    # --- durations, memory, efficiency and labels (features.py) ---------
+    add_features(df)
 
     # --- date parts for filtering/grouping -------------------------------
-    df["year"]  = df["Start"].dt.year
-    df["month"] = df["Start"].dt.month
+    df["year"]  = df["Start"].dt.year.astype("Int16")
+    df["month"] = df["Start"].dt.month.astype("Int8")
+    return df
+
+@timed("make_dataset", rows=int)
+def build_dataset(raw_csv, out_parquet, chunksize=None, engine="pandas"):
+    """
+    Clean `raw_csv` into `out_parquet` and return the number of rows written.
+
+    Without `chunksize` the whole file is cleaned in one batch; with it the
+    file is streamed and every batch becomes one row group. Both go through
+    the same dtypes, `transform` and schema, so the outputs are identical.
+    The file is written in the compact schema of jobs_schema.py, and only
+    replaces `out_parquet` once every batch has been written.
+    engine="polars" hands the file to make_dataset_polars.py instead.
+    """
+    if engine == "polars":
+        from make_dataset_polars import build_dataset_polars
+        return build_dataset_polars(raw_csv, out_parquet, chunksize=chunksize)
+    if engine != "pandas":
+        raise ValueError(f"Unknown engine {engine!r} (one of {', '.join(ENGINES)})")
+    batches = timed_iter("make_dataset.read_csv", raw_batches(raw_csv, chunksize))
 
     # ensure output directory exists
     out_parquet.parent.mkdir(parents=True, exist_ok=True)
 
-    logging.info(f"Saving cleaned data ({len(df):,} rows) to {out_parquet}")
-    df.to_parquet(out_parquet, index=False)
+    # written under a temporary name, so a failed batch leaves the old file as it was
+    tmp = temp_path(out_parquet)
+    writer = None
+    schema = None
+    n_rows = 0
+    try:
+        for batch in batches:
+            with stage("make_dataset.transform", rows=len(batch)):
+                batch = transform(batch)
+            with stage("make_dataset.compact", rows=len(batch)):
+                # the first batch fixes the schema, so all-null batches still cast the same way
+                schema = schema or arrow_schema(batch)
+                table = compact_table(pa.Table.from_pandas(batch, schema=schema, preserve_index=False))
+            with stage("make_dataset.write_parquet", rows=len(batch)):
+                if writer is None:
+                    writer = pq.ParquetWriter(tmp, table.schema)
+                writer.write_table(table)
+            n_rows += len(batch)
+            if chunksize:
+                logging.info(f"  wrote batch of {len(batch):,} rows ({n_rows:,} total)")
+    except BaseException:
+        if writer is not None:
+            writer.close()
+        tmp.unlink(missing_ok=True)
+        raise
+    if writer is not None:
+        writer.close()
+        os.replace(tmp, out_parquet)
+    return n_rows
+
+def main():
+    setup_logging()
+    args = parse_args()
+    raw_csv = args.raw_file
+    out_parquet = args.out_file
+
+    logging.info(f"Reading raw data from {raw_csv}")
+    n_rows = build_dataset(raw_csv, out_parquet, chunksize=args.chunksize, engine=args.engine)
+    logging.info(f"Saved cleaned data ({n_rows:,} rows) to {out_parquet}")
 
     logging.info("✅ Done.")
 
@@ -0,0 +1,279 @@
+# src/make_dataset_polars.py
+"""
+make_dataset.py as one lazy Polars query (`make_dataset.py --engine polars`).
+
+    scan_csv -> with_columns (aliases, timestamps, features, date parts)
+             -> select (compact types) -> sink_parquet
+
+The plan is run by Polars' streaming engine on all cores: the raw file is
+read in morsels, every step is a column expression, and batches go to the
+Parquet writer as they are finished, so no intermediate table of the whole
+file is ever built. It computes the same columns as the pandas engine
+(`transform`, features.py and jobs_schema.compact_table) with the same
+regular expressions and unit tables, and the output reads back to the same
+frame. Differences:
+
+- Polars only reads UTF-8: a raw file with non-ASCII bytes is first copied
+  as UTF-8, decoded as latin1 like the pandas engine does (one streamed
+  pass; ASCII files are read in place);
+- timestamps must be in sacct's layout (2024-01-31T23:59:59); anything
+  else becomes null, like the pandas engine's unparsable values;
+- dictionary columns are stored with uint32 indices (Polars categoricals)
+  instead of int32; values and pandas dtypes are the same.
+
+Requires the polars package (pip install polars).
+"""
+
+import logging
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import polars as pl
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from clean_jobs import _duration_re
+from decode_tres import SIZE_COLS, _UNIT_BYTES, _UNIT_MB, _reqmem_re, _size_re
+from features import BENCHMARK_NAMES
+from jobs_dataset import temp_path
+from jobs_schema import COLUMN_TYPES, DICTIONARY_COLS, JOBID_PARTS, _jobid_re, _step_re
+from make_dataset import COLUMN_ALIASES, NUMERIC_DTYPES, READ_CSV_KW, REQUIRED_COLS
+
+# what pd.read_csv reads as missing by default, so both engines see the same nulls
+PANDAS_NA_VALUES = [
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+]
+SACCT_TIME = "%Y-%m-%dT%H:%M:%S"
+COPY_BLOCK = 1 << 24
+
+POLARS_TYPES = {
+    pa.int8(): pl.Int8, pa.int16(): pl.Int16, pa.int32(): pl.Int32, pa.int64(): pl.Int64,
+    pa.float32(): pl.Float32, pa.float64(): pl.Float64, pa.timestamp("ms"): pl.Datetime("ms"),
+}
+
+
+def _groups(col, pattern):
+    """Named groups of `pattern` in the stripped text of `col` (null fields when it does not match)."""
+    return pl.col(col).str.strip_chars().str.extract_groups(pattern)
+
+
+def duration_sec(col):
+    """features._duration_sec: [D-]HH:MM:SS / MM:SS.mmm -> seconds (float)."""
+    parts = _groups(col, _duration_re.pattern)
+
+    def whole(name):
+        return parts.struct.field(name).cast(pl.Int64, strict=False)
+
+    days_hours = whole("days").fill_null(0) * 86400 + whole("hours").fill_null(0) * 3600
+    return (days_hours + whole("minutes") * 60).cast(pl.Float64) + parts.struct.field("seconds").cast(pl.Float64)
+
+
+def reqmem_mb():
+    """decode_tres.decode_reqmem(...)["ReqMem_MB"]: ReqMem scaled to the whole job."""
+    parts = _groups("ReqMem", _reqmem_re)
+    value = parts.struct.field("val").cast(pl.Float64)
+    unit = parts.struct.field("unit").replace_strict(_UNIT_MB, default=1.0, return_dtype=pl.Float64)
+    scope = parts.struct.field("scope")
+    factor = (
+        pl.when(scope == "n").then(pl.col("NNODES").cast(pl.Float64).fill_null(1.0))
+        .when(scope == "c").then(pl.col("NCPUS").cast(pl.Float64).fill_null(1.0))
+        .otherwise(1.0)
+    )
+    # '--mem=0' (whole node) is no amount
+    return pl.when(value != 0).then(value) * unit * factor
+
+
+def size_bytes(col):
+    """decode_tres.decode_size_bytes: '2536K', '1.5G', '0' -> bytes (float)."""
+    parts = _groups(col, _size_re)
+    unit = parts.struct.field("unit").replace_strict(_UNIT_BYTES, default=1.0, return_dtype=pl.Float64)
+    return parts.struct.field("num").cast(pl.Float64) * unit
+
+
+def jobname_grouped():
+    """features.jobname_grouped."""
+    name = pl.col("JobName")
+    lower = name.str.to_lowercase()
+    return (
+        pl.when(name.is_null()).then(pl.lit("unknown"))
+        .when(lower.str.starts_with("jupyter")).then(pl.lit("jupyter"))
+        .when(lower.str.starts_with("bash")).then(pl.lit("bash"))
+        .when(lower.str.starts_with("test")).then(pl.lit("test"))
+        .when(lower.str.starts_with("qe")).then(pl.lit("qe"))
+        .when(lower.is_in(sorted(BENCHMARK_NAMES))).then(lower)
+        .when(name.str.len_chars() < 4).then(pl.lit("short_code"))
+        .otherwise(pl.lit("other"))
+    )
+
+
+FEATURES = {
+    "wait_time_sec": lambda: (pl.col("Start") - pl.col("Submit")).dt.total_seconds(),
+    "Elapsed_sec": lambda: duration_sec("Elapsed"),
+    "CPUTime_sec": lambda: duration_sec("CPUTime"),
+    "ReqMem_MB": reqmem_mb,
+    **{f"{c}_bytes": (lambda c=c: size_bytes(c)) for c in SIZE_COLS},
+}
+
+
+def _split_jobid():
+    """jobs_schema.split_jobid; an id that does not parse fails the query."""
+    text = pl.col("JobID").str.strip_chars()
+    parts = text.str.extract_groups(_jobid_re)
+    jobid = parts.struct.field("JobID")
+    # the strict cast of the unparsable text is what raises
+    bad = pl.when(text.is_not_null() & jobid.is_null()).then(text).cast(pl.Int64)
+    return [pl.coalesce(jobid.cast(pl.Int64), bad).alias("JobID")] + [
+        parts.struct.field(name).replace("", None).cast(POLARS_TYPES[COLUMN_TYPES[name]]).alias(name)
+        for name in JOBID_PARTS[1:]
+    ]
+
+
+def _compact(name, dtype):
+    """jobs_schema._cast to the compact type of `name` (see jobs_schema.py)."""
+    col = pl.col(name)
+    target = COLUMN_TYPES.get(name)
+    if target is not None:
+        target = POLARS_TYPES[target]
+        if dtype.is_float() and target.is_integer():
+            col = col.round(mode="half_to_even")
+        # integer dictionaries (UID) are plain integers in Parquet anyway
+        return col.cast(target)
+    if name in DICTIONARY_COLS:
+        return col.cast(pl.String).cast(pl.Categorical)
+    return col
+
+
+def utf8_source(raw_csv, tmp_dir):
+    """`raw_csv` if it is ASCII, else a UTF-8 copy in `tmp_dir` decoded as READ_CSV_KW's encoding."""
+    with open(raw_csv, "rb") as f:
+        if all(block.isascii() for block in iter(lambda: f.read(COPY_BLOCK), b"")):
+            return raw_csv
+    out = Path(tmp_dir) / "raw-utf8.csv"
+    with open(raw_csv, encoding=READ_CSV_KW["encoding"], newline="") as src, \
+            open(out, "w", encoding="utf-8", newline="") as dst:
+        shutil.copyfileobj(src, dst, COPY_BLOCK)
+    return out
+
+
+def scan_raw(raw_csv):
+    """The UTF-8 file `raw_csv` as a LazyFrame of text columns, read like pd.read_csv would."""
+    return pl.scan_csv(
+        raw_csv, separator=READ_CSV_KW["sep"], infer_schema=False, null_values=PANDAS_NA_VALUES,
+    )
+
+
+def is_step():
+    """jobs_schema.is_step: the job step rows ('123.batch')."""
+    return pl.col("JobID").str.contains(_step_re).fill_null(False)
+
+
+def rollup_steps(lf):
+    """jobs_schema.rollup_steps: each job takes the largest SIZE_COLS value of its steps above its own."""
+    job = pl.col("JobID").str.strip_chars().str.replace(r"\..*$", "").alias("_job")
+    cols = [c for c in SIZE_COLS if c in lf.collect_schema().names()]
+    best = lf.filter(is_step()).group_by(job).agg(
+        agg
+        for c in cols
+        for agg in (
+            # the first largest step of each job
+            pl.col(c).filter(size_bytes(c).is_not_null())
+            .sort_by(size_bytes(c).filter(size_bytes(c).is_not_null()), descending=True, maintain_order=True)
+            .first().alias(f"_{c}"),
+            size_bytes(c).max().alias(f"_{c}_bytes"),
+        )
+    )
+    lf = lf.with_columns(job).join(best, on="_job", how="left", maintain_order="left")
+    return lf.with_columns(
+        pl.when(pl.col(f"_{c}_bytes") > size_bytes(c).fill_null(-1.0)).then(pl.col(f"_{c}"))
+        .otherwise(pl.col(c)).alias(c)
+        for c in cols
+    ).drop("_job", *(f"_{c}" for c in cols), *(f"_{c}_bytes" for c in cols))
+
+
+def lazy_dataset(lf, steps=True):
+    """
+    The cleaned, compact jobs of the raw LazyFrame `lf` (`scan_raw`; nothing
+    is read yet). steps=False leaves out `rollup_steps`, for a file known to
+    have no job steps.
+    """
+    header = lf.collect_schema().names()
+    numeric = {c: pl.Float64 if t == "float64" else pl.Int64 for c, t in NUMERIC_DTYPES.items()}
+    lf = lf.with_columns(pl.col(c).cast(numeric[c]) for c in header if c in numeric)
+
+    aliases = []
+    for canonical, variants in COLUMN_ALIASES.items():
+        actual = next((a for a in variants if a in header), None)
+        if actual is None:
+            aliases.append(pl.lit(None, pl.Float64).alias(canonical))
+        elif actual != canonical:
+            aliases.append(pl.col(actual).alias(canonical))
+    missing = set(REQUIRED_COLS) - set(header)
+    if missing:
+        logging.error(f"Missing columns in raw data: {missing}")
+        raise RuntimeError("Raw file schema mismatch")
+
+    if steps:
+        lf = rollup_steps(lf)
+    lf = lf.filter(~is_step()).with_columns(aliases).with_columns(
+        pl.col(c).str.strptime(pl.Datetime("ms"), SACCT_TIME, strict=False) for c in ("Submit", "Start", "End")
+    )
+    lf = lf.with_columns(expr().alias(name) for name, expr in FEATURES.items())
+    core_seconds = pl.col("Elapsed_sec") * pl.col("NCPUS").fill_null(0)
+    lf = lf.with_columns(
+        (pl.col("MaxRSS_bytes") / 1024 ** 2).alias("MaxRSS_MB"),
+        pl.when(core_seconds != 0).then(core_seconds).alias("core_seconds"),  # avoid /0
+    ).with_columns(
+        (pl.col("CPUTime_sec") / pl.col("core_seconds")).alias("efficiency"),
+        pl.when(pl.col("State").str.contains(r"^CANCELLED by \d+")).then(pl.lit("CANCELLED"))
+        .otherwise(pl.col("State")).alias("State_Clean"),
+        pl.col("Partition").str.split(",").list.first().str.strip_chars().alias("Partition_Main"),
+        jobname_grouped().alias("JobName_Grouped"),
+        pl.col("Start").dt.year().cast(pl.Int16).alias("year"),
+        pl.col("Start").dt.month().cast(pl.Int8).alias("month"),
+    )
+
+    columns = []
+    for name, dtype in lf.collect_schema().items():
+        if name in JOBID_PARTS[1:]:
+            continue
+        if name == "JobID":
+            columns += _split_jobid()
+        else:
+            columns.append(_compact(name, dtype))
+    return lf.select(columns)
+
+
+def build_dataset_polars(raw_csv, out_parquet, chunksize=None):
+    """
+    make_dataset.build_dataset with the Polars engine; returns the rows written.
+
+    chunksize: rows per Parquet row group (the streaming engine sizes its
+    own batches).
+    """
+    out_parquet.parent.mkdir(parents=True, exist_ok=True)
+    tmp = temp_path(out_parquet)
+    with tempfile.TemporaryDirectory(dir=out_parquet.parent) as tmp_dir:
+        raw = scan_raw(utf8_source(raw_csv, tmp_dir))
+        # a quick pass over JobID only: the step roll-up costs a join on every row
+        steps = raw.select(is_step().sum()).collect().item()
+        try:
+            # The sink gets a file we opened rather than a path: after a failed
+            # query Polars can still be opening its own output file in the
+            # background, which would clobber `out_parquet` or recreate a
+            # removed temp file. Writes to our handle end when it is closed.
+            with open(tmp, "wb") as f:
+                lazy_dataset(raw, steps=steps > 0).sink_parquet(f, row_group_size=chunksize)
+        except pl.exceptions.InvalidOperationError as e:
+            # a strict cast of raw text (JobID, UID, NCPUS) failed
+            tmp.unlink(missing_ok=True)
+            raise ValueError(f"{raw_csv}: {str(e).splitlines()[0]}") from e
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+    os.replace(tmp, out_parquet)
+    if steps:
+        logging.info(f"Dropped {steps:,} job step rows")
+    return pq.ParquetFile(out_parquet).metadata.num_rows
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Memory over-allocation report: requested memory vs peak RSS.
+
+Usage:
+    python memory_report.py [--jobs-dir data/processed/jobs_all] \
+                            [--out-dir data/processed/memory_report] \
+                            [--start 2024-01-01] [--end 2024-12-31]
+
+Memory requests, not CPUs, are what keep us from packing more jobs on a
+node: a job holding 64 GB for ten hours while peaking at 4 GB blocks 600
+GB-hours that nobody else can use. Per job (`job_memory`):
+
+    req_MB             ReqMem_MB (whole job)
+    peak_MB            MaxRSS_MB (parsed from sacct MaxRSS, see features.py)
+    ratio              req_MB / peak_MB (inf when the peak is 0)
+    unused_MB          req_MB - peak_MB, 0 when the job used all it asked for
+    reserved_gb_hours  req_MB × Elapsed
+    unused_gb_hours    unused_MB × Elapsed: reserved but never used
+
+Jobs without both ReqMem and MaxRSS (the legacy table, pending jobs) are
+left out of the memory figures. `memory_waste` sums these per user,
+partition or any other column and adds the distribution of the per-job
+ratio (quantiles, and counts per MEM_RATIO_BINS bin); all grouped, with no
+Python call per group. The dashboard shows the same GB-hours and
+histogram from the rollup cube (rollups.py, analytics.py); this script
+writes the exact per-job quantiles as CSV files:
+
+    memory_by_user.csv, memory_by_partition.csv, memory_ratio_hist.csv
+"""
+
+import argparse
+import logging
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from jobs_dataset import read_jobs
+from rollups import MEM_RATIO_BIN_COLS, MEM_RATIO_BINS
+
+JOBS_DIR = Path("data/processed/jobs_all")
+OUT_DIR = Path("data/processed/memory_report")
+
+SOURCE_COLS = ["UID", "Partition", "Elapsed_sec", "ReqMem_MB", "MaxRSS_MB"]
+QUANTILES = [0.5, 0.9]
+
+REPORT_COLS = [
+    "jobs", "paired_jobs", "reserved_gb_hours", "peak_gb_hours", "unused_gb_hours", "unused_share",
+    "overrequest", "ratio_p50", "ratio_p90",
+] + MEM_RATIO_BIN_COLS
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Requested vs peak memory per user and partition")
+    p.add_argument("--jobs-dir", type=Path, default=JOBS_DIR, help="Partitioned jobs dataset")
+    p.add_argument("--out-dir", type=Path, default=OUT_DIR, help="Directory of the CSV reports")
+    p.add_argument("--start", help="First Start date (inclusive)")
+    p.add_argument("--end", help="Last Start date (inclusive)")
+    return p.parse_args()
+
+
+def job_memory(df):
+    """Per-job memory figures (see module docstring), aligned with `df`; NaN when unpaired."""
+    req = df["ReqMem_MB"].astype(float).to_numpy()
+    peak = df["MaxRSS_MB"].astype(float).to_numpy()
+    hours = df["Elapsed_sec"].astype(float).fillna(0).to_numpy() / 3600
+    paired = ~np.isnan(req) & ~np.isnan(peak)
+    req, peak = np.where(paired, req, np.nan), np.where(paired, peak, np.nan)
+    unused = np.clip(req - peak, 0, None)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = req / peak
+    return pd.DataFrame({
+        "req_MB": req,
+        "peak_MB": peak,
+        "ratio": ratio,
+        "unused_MB": unused,
+        "reserved_gb_hours": req / 1024 * hours,
+        "unused_gb_hours": unused / 1024 * hours,
+    }, index=df.index)
+
+
+def ratio_histogram(ratio):
+    """Job counts per MEM_RATIO_BINS bin of a ratio Series (NaN not counted), labelled."""
+    ratio = pd.Series(ratio, copy=False).astype(float)
+    bins = np.digitize(ratio.dropna().to_numpy(), MEM_RATIO_BINS[:-1]) - 1
+    counts = np.bincount(bins, minlength=len(MEM_RATIO_BIN_COLS))
+    return pd.Series(counts, index=ratio_labels())
+
+
+def ratio_labels():
+    """'<1×', '1–1.5×', ..., '≥16×' for MEM_RATIO_BINS."""
+    edges = MEM_RATIO_BINS
+    return ["<1×"] + [f"{lo:g}–{hi:g}×" for lo, hi in zip(edges[1:-2], edges[2:-1])] + [f"≥{edges[-2]:g}×"]
+
+
+def memory_waste(df, by):
+    """
+    REPORT_COLS per value of `by` (column name(s) of `df`), most unused GB-hours first.
+
+    overrequest is sum(req) / sum(peak) over the paired jobs; ratio_p50 and
+    ratio_p90 are quantiles of the per-job ratio (actual job values, no
+    interpolation, so a group with idle jobs can show inf).
+    """
+    mem = job_memory(df)
+    keys = [by] if isinstance(by, str) else list(by)
+    mem = pd.concat([df[keys], mem], axis=1)
+    mem["jobs"] = 1
+    mem["paired_jobs"] = mem["req_MB"].notna().astype(np.int64)
+    mem["peak_gb_hours"] = mem["reserved_gb_hours"] - mem["unused_gb_hours"]
+    bins = np.digitize(mem["ratio"].to_numpy(), MEM_RATIO_BINS[:-1]) - 1
+    for i, col in enumerate(MEM_RATIO_BIN_COLS):
+        mem[col] = ((bins == i) & mem["ratio"].notna().to_numpy()).astype(np.int64)
+
+    g = mem.groupby(keys, observed=True, sort=False)
+    sums = ["jobs", "paired_jobs", "reserved_gb_hours", "peak_gb_hours", "unused_gb_hours",
+            "req_MB", "peak_MB"] + MEM_RATIO_BIN_COLS
+    out = g[sums].sum()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out["unused_share"] = out["unused_gb_hours"] / out["reserved_gb_hours"].where(out["reserved_gb_hours"] > 0)
+        out["overrequest"] = out["req_MB"] / out["peak_MB"].where(out["peak_MB"] > 0)
+    q = g["ratio"].quantile(QUANTILES, interpolation="lower").unstack()
+    for p in QUANTILES:
+        out[f"ratio_p{int(p * 100)}"] = q[p]
+    out = out[REPORT_COLS]
+    return out.sort_values("unused_gb_hours", ascending=False, kind="stable")
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    args = parse_args()
+    df = read_jobs(args.jobs_dir, start=args.start, end=args.end, columns=SOURCE_COLS)
+    args.out_dir.mkdir(parents=True, exist_ok=True)
+    for name, by in [("user", "UID"), ("partition", "Partition")]:
+        report = memory_waste(df, by)
+        report.to_csv(args.out_dir / f"memory_by_{name}.csv")
+        logging.info(f"✅ {len(report):,} {name}s → {args.out_dir / f'memory_by_{name}.csv'}")
+    hist = ratio_histogram(job_memory(df)["ratio"]).rename_axis("ReqMem / MaxRSS").rename("jobs")
+    hist.to_csv(args.out_dir / "memory_ratio_hist.csv")
+    total = memory_waste(df.assign(all="all"), "all").iloc[0]
+    logging.info(f"{total['unused_gb_hours']:,.0f} of {total['reserved_gb_hours']:,.0f} reserved "
+                 f"GB-hours unused ({total['unused_share']:.0%}) over {int(total['paired_jobs']):,} jobs")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,242 @@
-import pandas as pd
+#!/usr/bin/env python3
+"""
+Merge the cleaned 2021-2025 export and the 2018-2021 legacy table into the
+year/month partitioned `jobs_all` dataset, sorted by Start.
+
+Usage:
+    python merge_jobs_all.py [--batch-rows 250000]
+
+Also rebuilds the daily rollup cube of the dashboard (rollups.py) and the
+memory-mapped snapshot of the dataset its workers share (jobs_snapshot.py).
+
+The merge streams in bounded memory (an external sort):
+
+1. the schemas of the sources are reconciled into one target schema
+   (columns both sides disagree on become strings, as before);
+2. each source is read in batches of --batch-rows, every batch is conformed
+   to the target schema, sorted by Start and spilled to a temporary Arrow
+   IPC "run" file (rows without a Start go to a separate tail file);
+3. the runs are k-way merged block by block; each block gets the derived
+   columns of features.py (the legacy table has none), is cast to the
+   compact schema of jobs_schema.py and is written to the partitioned
+   dataset as it comes out, one partition file open at a time.
+
+At any moment memory holds one batch per run plus one output row group,
+never a full copy of either source.
+"""
+
+import argparse
+import tempfile
 from pathlib import Path
 
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from features import add_features
+from instrument import stage, timed
+from jobs_dataset import PARTITION_COLS, ROW_GROUP_ROWS, PartitionedWriter
+from jobs_schema import compact_table
+from jobs_snapshot import snapshot_path, write_snapshot
+from rollups import OUT as ROLLUPS, build_rollups
+
 JOBS_1 = Path("data/processed/jobs_clean.parquet")
 JOBS_2 = Path("data/processed/jobs_2018_2021_clean.parquet")
-OUT = Path("data/processed/jobs_all.parquet")
+OUT = Path("data/processed/jobs_all")  # year=/month= partitioned dataset
+
+# Standardize columns likely to cause issues as string (in the sort runs;
+# the output is compacted)
+STR_COLS = ["JobID", "UID", "Partition", "Account", "ExitCode", "State"]
+SORT_KEY = "Start"
+BATCH_ROWS = 250_000
+RUN_BATCH_ROWS = 8_192  # granularity at which runs are read back during the merge
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Merge cleaned job tables into jobs_all")
+    p.add_argument("--batch-rows", type=int, default=BATCH_ROWS,
+                   help="Rows sorted in memory at a time")
+    return p.parse_args()
+
+
+def unify_schemas(schemas):
+    """
+    One target schema for all sources.
+
+    Columns keep their first-seen position. STR_COLS and columns whose types
+    disagree (other than int vs float, which widen to float64) become
+    strings; a column missing or all-null on one side takes the other's type.
+    """
+    fields = {}
+    for schema in schemas:
+        for field in schema:
+            if field.name in PARTITION_COLS:
+                continue
+            t = field.type
+            if pa.types.is_dictionary(t):
+                t = t.value_type
+            if field.name in STR_COLS:
+                t = pa.string()
+            prev = fields.get(field.name)
+            if prev is None or pa.types.is_null(prev) or prev == t:
+                fields[field.name] = t
+            elif pa.types.is_null(t):
+                continue
+            elif (pa.types.is_integer(prev) or pa.types.is_floating(prev)) and \
+                    (pa.types.is_integer(t) or pa.types.is_floating(t)):
+                fields[field.name] = pa.float64()
+            elif pa.types.is_timestamp(prev) and pa.types.is_timestamp(t):
+                fields[field.name] = pa.timestamp("ns")
+            else:
+                fields[field.name] = pa.string()
+    return pa.schema(
+        [pa.field(n, pa.string() if pa.types.is_null(t) else t) for n, t in fields.items()]
+    )
+
+
+def conform(table, schema):
+    """Cast `table` to `schema`, adding missing columns as nulls."""
+    columns = []
+    for field in schema:
+        if field.name in table.column_names:
+            col = table[field.name]
+            if pa.types.is_dictionary(col.type):
+                col = col.cast(col.type.value_type)
+            columns.append(col.cast(field.type))
+        else:
+            columns.append(pa.nulls(table.num_rows, field.type))
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
+def iter_batches(source, batch_rows):
+    """
+    Record batches of a Parquet file or directory, decoded `batch_rows` at a time.
+
+    ParquetFile with pre_buffer off decodes pages incrementally; the dataset
+    scanner would materialize whole row groups (and read ahead of them).
+    """
+    source = Path(source)
+    files = sorted(source.rglob("*.parquet")) if source.is_dir() else [source]
+    for path in files:
+        pf = pq.ParquetFile(path, pre_buffer=False, buffer_size=1 << 20)
+        yield from pf.iter_batches(batch_size=batch_rows, use_threads=False)
+
+
+def spill_runs(source, schema, tmp_dir, batch_rows, tag):
+    """Sort `source` batch by batch into IPC run files; returns (runs, null-Start tail)."""
+    runs = []
+    tail_path = Path(tmp_dir) / f"{tag}-nulls.arrow"
+    tail = None
+    for i, batch in enumerate(iter_batches(source, batch_rows)):
+        table = conform(pa.Table.from_batches([batch]), schema)
+        missing = table[SORT_KEY].is_null()
+        nulls = table.filter(missing)
+        if nulls.num_rows:
+            if tail is None:
+                tail = pa.ipc.new_file(tail_path, schema)
+            tail.write_table(nulls)
+        table = table.filter(pc.invert(missing)).sort_by(SORT_KEY)
+        if table.num_rows == 0:
+            continue
+        path = Path(tmp_dir) / f"{tag}-{i:06d}.arrow"
+        with pa.ipc.new_file(path, schema) as writer:
+            writer.write_table(table, max_chunksize=RUN_BATCH_ROWS)
+        runs.append(path)
+    if tail is not None:
+        tail.close()
+        return runs, tail_path
+    return runs, None
+
+
+def read_run(path):
+    """Yield the record batches of an IPC run file, one at a time."""
+    reader = pa.ipc.open_file(pa.OSFile(str(path)))
+    for i in range(reader.num_record_batches):
+        yield pa.Table.from_batches([reader.get_batch(i)])
+
+
+def kway_merge(runs):
+    """
+    Merge sorted runs into a stream of sorted tables.
+
+    Each round takes the smallest "last key" among the buffered run heads:
+    every buffered row up to that key can be emitted, because no run can
+    still produce a smaller one. That run's buffer is always fully consumed,
+    so every round makes progress.
+    """
+    iters = [read_run(r) for r in runs]
+    heads = {}
+
+    def refill(i):
+        for table in iters[i]:
+            if table.num_rows:
+                heads[i] = table
+                return
+        heads.pop(i, None)
+
+    for i in range(len(iters)):
+        refill(i)
+    while heads:
+        keys = {i: t[SORT_KEY].to_numpy() for i, t in heads.items()}
+        threshold = min(k[-1] for k in keys.values())
+        parts = []
+        for i in list(heads):
+            n = int(np.searchsorted(keys[i], threshold, side="right"))
+            parts.append(heads[i].slice(0, n))
+            if n < heads[i].num_rows:
+                heads[i] = heads[i].slice(n)
+            else:
+                refill(i)
+        yield pa.concat_tables(parts).sort_by(SORT_KEY)
+
+
+def finish(table, schema=None):
+    """Add the derived features to a merged block and cast it to the compact schema."""
+    df = add_features(table.to_pandas())
+    table = compact_table(pa.Table.from_pandas(df, preserve_index=False))
+    return table if schema is None else table.cast(schema)
+
+
+@timed("merge", rows=int)
+def merge_jobs(sources, out, batch_rows=BATCH_ROWS, row_group_size=ROW_GROUP_ROWS):
+    """Stream-merge the Parquet `sources` into the partitioned dataset `out`; returns rows."""
+    schema = unify_schemas([ds.dataset(s, format="parquet").schema for s in sources])
+    with tempfile.TemporaryDirectory(dir=Path(out).parent) as tmp_dir:
+        runs, tails = [], []
+        for n, source in enumerate(sources):
+            with stage(f"merge.spill.src{n}"):
+                source_runs, tail = spill_runs(source, schema, tmp_dir, batch_rows, f"src{n}")
+            runs += source_runs
+            tails += [tail] if tail else []
+
+        out_schema = finish(schema.empty_table()).schema
+        with PartitionedWriter(out, out_schema, row_group_size=row_group_size,
+                               overwrite=True) as writer:
+            with stage("merge.kway_write") as s:
+                for table in kway_merge(runs):
+                    writer.write(finish(table, out_schema))
+                s.rows = writer.rows
+            merged = writer.rows
+            with stage("merge.tails") as s:
+                for tail in tails:  # jobs that never started sort last
+                    for table in read_run(tail):
+                        writer.write(finish(table, out_schema))
+                s.rows = writer.rows - merged
+        return writer.rows
 
-df1 = pd.read_parquet(JOBS_1)
-df2 = pd.read_parquet(JOBS_2)
 
-# Standardize columns likely to cause issues as string
-cols_to_str = ["JobID", "UID", "Partition", "Account", "ExitCode", "State"]
-for col in cols_to_str:
-    if col in df1.columns:
-        df1[col] = df1[col].astype(str)
-    if col in df2.columns:
-        df2[col] = df2[col].astype(str)
+def main():
+    args = parse_args()
+    OUT.parent.mkdir(parents=True, exist_ok=True)
+    n_rows = merge_jobs([JOBS_1, JOBS_2], OUT, batch_rows=args.batch_rows)
+    print(f"✅ Merged {n_rows:,} rows → {OUT}")
+    cube = build_rollups(OUT, ROLLUPS)
+    print(f"✅ {len(cube):,} rollup rows → {ROLLUPS}")
+    n_rows = write_snapshot(OUT)
+    print(f"✅ {n_rows:,} rows → {snapshot_path(OUT)}")
 
-df_all = pd.concat([df1, df2], ignore_index=True)
-df_all = df_all.sort_values("Start")  # Sort by job start time
 
-OUT.parent.mkdir(parents=True, exist_ok=True)
-df_all.to_parquet(OUT, index=False)
-print(f"✅ Merged {len(df_all):,} rows → {OUT}")
+if __name__ == "__main__":
+    main()
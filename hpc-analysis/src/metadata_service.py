@@ -0,0 +1,260 @@
+# src/metadata_service.py
+"""
+User metadata (`v_user_apps`) served from a local snapshot, refreshed in the background.
+
+The dashboard used to open a MySQL connection and run
+`SELECT * FROM v_user_apps` on every script run, blocking the page until
+it returned. `MetadataService` instead keeps versioned Parquet snapshots
+of the view under `snapshot_dir`:
+
+    _snapshot.json                  current version, watermark, fetch times
+    v_user_apps-000042.parquet      one file per version (the last `keep` kept)
+
+`snapshot()` reads the current version (once per version, then from
+memory) and never touches the database. A background thread refreshes
+every `interval` seconds through a small `ConnectionPool`:
+
+- with `changed_col` (a last-modified column of the view), only the users
+  having a row changed since the snapshot's watermark are fetched and
+  their rows replaced; every `full_every`-th refresh re-reads the whole
+  view so deleted users disappear too. Without it, or while the view does
+  not have that column, every refresh reads the whole view;
+- a new version is written only when the content changed;
+- when the database is slow or down the refresh fails, the error is kept
+  in `status()` and the last good snapshot keeps being served.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from instrument import timed
+
+MANIFEST = "_snapshot.json"
+
+
+class ConnectionPool:
+    """
+    Up to `size` DB-API connections from `connect()`, reused across queries.
+
+    A connection that raised while in use is closed instead of returned,
+    so a dropped server connection is replaced on the next checkout.
+    """
+
+    def __init__(self, connect, size=2):
+        self._connect = connect
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    @contextmanager
+    def connection(self):
+        with self._slots:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._connect()
+            try:
+                yield conn
+            except BaseException:
+                _close_quietly(conn)
+                raise
+            self._idle.put(conn)
+
+    def close(self):
+        while True:
+            try:
+                _close_quietly(self._idle.get_nowait())
+            except queue.Empty:
+                return
+
+
+def _close_quietly(conn):
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+def content_hash(df):
+    """Row-order independent fingerprint of a frame's values."""
+    rows = np.sort(pd.util.hash_pandas_object(df, index=False).to_numpy())
+    h = hashlib.sha1(",".join(map(str, df.columns)).encode())
+    h.update(rows.tobytes())
+    return h.hexdigest()[:16]
+
+
+class MetadataService:
+    """Versioned local snapshot of a metadata view (see the module docstring)."""
+
+    def __init__(self, pool, snapshot_dir, table="v_user_apps", user_col="id_utilisateur",
+                 changed_col=None, placeholder="%s", interval=900, full_every=24, keep=3):
+        self.pool = pool
+        self.snapshot_dir = Path(snapshot_dir)
+        self.table = table
+        self.user_col = user_col
+        self.changed_col = changed_col
+        self.placeholder = placeholder  # DB-API paramstyle: %s (MySQL), ? (SQLite)
+        self.interval = interval
+        self.full_every = full_every
+        self.keep = keep
+        self.last_error = None
+        self.last_attempt = None
+        self._refresh_lock = threading.Lock()
+        self._cache = (None, None)  # (version, frame)
+        self._stop = threading.Event()
+        self._thread = None
+
+    # --- reading -------------------------------------------------------
+
+    def manifest(self):
+        path = self.snapshot_dir / MANIFEST
+        if not path.exists():
+            return None
+        return json.loads(path.read_text())
+
+    def snapshot(self):
+        """The current snapshot (a copy); raises FileNotFoundError before the first refresh."""
+        manifest = self.manifest()
+        if manifest is None:
+            raise FileNotFoundError(f"No metadata snapshot in {self.snapshot_dir}")
+        version, frame = self._cache
+        if version != manifest["version"]:
+            frame = pq.read_table(self.snapshot_dir / manifest["file"]).to_pandas()
+            self._cache = (manifest["version"], frame)
+        return frame.copy()
+
+    def status(self):
+        """Version and age of the snapshot being served, and the last refresh error."""
+        manifest = self.manifest() or {}
+        return {
+            "version": manifest.get("version"),
+            "fetched_at": manifest.get("fetched_at"),
+            "checked_at": manifest.get("checked_at"),
+            "rows": manifest.get("rows"),
+            "last_attempt": self.last_attempt,
+            "last_error": self.last_error,
+        }
+
+    # --- refreshing ----------------------------------------------------
+
+    @timed("metadata.query", rows=len)
+    def _query(self, sql, params=()):
+        with self.pool.connection() as conn:
+            cur = conn.cursor()
+            try:
+                cur.execute(sql, params)
+                columns = [d[0] for d in cur.description]
+                rows = cur.fetchall()
+            finally:
+                cur.close()
+        return pd.DataFrame.from_records(rows, columns=columns)
+
+    def _fetch_changed(self, watermark):
+        """Rows of the users having a row changed at or after `watermark`."""
+        return self._query(
+            f"SELECT * FROM {self.table} WHERE {self.user_col} IN "
+            f"(SELECT {self.user_col} FROM {self.table} WHERE {self.changed_col} >= {self.placeholder})",
+            (watermark,),
+        )
+
+    def refresh(self, full=False):
+        """
+        Fetch from the database and write a new snapshot version if the
+        content changed. Returns True when a new version was written, False
+        otherwise (unchanged, or the fetch failed: see `status()`).
+        """
+        with self._refresh_lock:
+            self.last_attempt = pd.Timestamp.now().isoformat(timespec="seconds")
+            manifest = self.manifest()
+            incremental = (
+                not full and manifest is not None and manifest.get("watermark") is not None
+                and manifest["n_incremental"] + 1 < self.full_every
+            )
+            try:
+                if incremental:
+                    changed = self._fetch_changed(manifest["watermark"])
+                    old = self.snapshot()
+                    df = pd.concat([old[~old[self.user_col].isin(changed[self.user_col])], changed],
+                                   ignore_index=True)
+                else:
+                    df = self._query(f"SELECT * FROM {self.table}")
+            except Exception as exc:
+                self.last_error = f"{type(exc).__name__}: {exc}"
+                logging.warning(f"Metadata refresh failed, serving the last snapshot: {self.last_error}")
+                return False
+            self.last_error = None
+            return self._write(df, manifest, incremental)
+
+    def _write(self, df, manifest, incremental):
+        now = pd.Timestamp.now().isoformat(timespec="seconds")
+        digest = content_hash(df)
+        self.snapshot_dir.mkdir(parents=True, exist_ok=True)
+        new = dict(manifest or {"version": 0, "file": None, "fetched_at": None})
+        new.update(
+            checked_at=now,
+            n_incremental=new.get("n_incremental", 0) + 1 if incremental else 0,
+            watermark=self._watermark(df),
+        )
+        written = manifest is None or manifest.get("hash") != digest
+        if written:
+            new.update(version=new["version"] + 1, fetched_at=now, hash=digest, rows=len(df))
+            new["file"] = f"{self.table}-{new['version']:06d}.parquet"
+            tmp = self.snapshot_dir / (new["file"] + ".tmp")
+            pq.write_table(pa.Table.from_pandas(df, preserve_index=False), tmp)
+            os.replace(tmp, self.snapshot_dir / new["file"])
+        # write-then-rename so a reader never sees a half-written manifest
+        tmp = self.snapshot_dir / (MANIFEST + ".tmp")
+        tmp.write_text(json.dumps(new, indent=2))
+        os.replace(tmp, self.snapshot_dir / MANIFEST)
+        if written:
+            self._prune(new["version"])
+        return written
+
+    def _watermark(self, df):
+        if not self.changed_col or self.changed_col not in df.columns:
+            return None
+        latest = df[self.changed_col].max()
+        return None if pd.isna(latest) else str(latest)
+
+    def _prune(self, version):
+        for path in self.snapshot_dir.glob(f"{self.table}-*.parquet"):
+            if int(path.stem.rsplit("-", 1)[1]) <= version - self.keep:
+                path.unlink()
+
+    # --- background refresh --------------------------------------------
+
+    def start(self):
+        """
+        Start the background refresh. Without any snapshot yet the first
+        fetch is made here (and its error raised): there is nothing to serve.
+        """
+        if self.manifest() is None and not self.refresh():
+            raise ConnectionError(f"No metadata snapshot and the fetch failed: {self.last_error}")
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="metadata-refresh", daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            started = time.monotonic()
+            self.refresh()
+            logging.debug(f"Metadata refresh took {time.monotonic() - started:.2f}s")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.pool.close()
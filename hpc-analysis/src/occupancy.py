@@ -0,0 +1,198 @@
+# src/occupancy.py
+"""
+Cluster occupancy and queue depth over time, per partition.
+
+Every job contributes two intervals:
+
+    running    [Start, End)     NCPUS cores, NNODES nodes, ReqMem_MB of memory, 1 job
+    pending    [Submit, Start)  1 job and its NCPUS (demand waiting in the queue)
+
+A job that never started is pending until its End (cancelled in the
+queue); an interval without an end (still running or pending) lasts until
+`now`. Each interval becomes a +value event at its start and a -value
+event at its end. The events are sorted once by (partition, time), and a
+cumulative sum over them gives the exact step function of every METRIC in
+every partition: the value after each event. That is one O(n log n) sort
+for the whole history; there is no pass over the jobs per time bucket.
+Step functions are computed on first use, one metric at a time.
+
+`Occupancy.series` then reads the step functions on any grid with binary
+searches: the time-weighted mean over each bucket (from the running
+integral of the steps), the peak within it, or the value at its start.
+"""
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.frequencies import to_offset
+
+METRICS = ["cores", "nodes", "mem_MB", "running", "pending", "pending_cores"]
+STATS = ["mean", "max", "start"]
+
+SOURCE_COLS = ["Submit", "Start", "End", "NCPUS", "NNODES", "ReqMem_MB"]
+
+# metric -> (job amount column, sign per event kind: running +/-, pending +/-)
+_DELTAS = {
+    "cores": ("NCPUS", [1, -1, 0, 0]),
+    "nodes": ("NNODES", [1, -1, 0, 0]),
+    "mem_MB": ("ReqMem_MB", [1, -1, 0, 0]),
+    "running": (None, [1, -1, 0, 0]),
+    "pending": (None, [0, 0, 1, -1]),
+    "pending_cores": ("NCPUS", [0, 0, 1, -1]),
+}
+
+_MS = 1000  # times are int64 ms, the unit of the stored timestamps
+_NAT = np.iinfo(np.int64).min  # NaT as int64
+
+
+def _int(df, col):
+    """Integer amounts per job (missing: 0; col None: 1); memory is rounded to whole MB."""
+    if col is None:
+        return np.ones(len(df), dtype=np.int64)
+    if col not in df.columns:
+        return np.zeros(len(df), dtype=np.int64)
+    values = pd.to_numeric(df[col], errors="coerce").astype(float).to_numpy()
+    return np.rint(np.nan_to_num(values)).astype(np.int64)
+
+
+def _ms(values):
+    """Timestamps as int64 ms; missing -> _NAT."""
+    values = pd.to_datetime(pd.Series(values, copy=False)).astype("datetime64[ms]")
+    return values.to_numpy().view(np.int64)
+
+
+def _sort_order(codes, times):
+    """Positions sorted by (code, time), through one int64 key when it fits."""
+    if not len(times):
+        return np.zeros(0, dtype=np.int64)
+    t0, span = times.min(), int(times.max() - times.min()) + 1
+    if (int(codes.max()) + 1) * span < np.iinfo(np.int64).max:
+        return np.argsort(codes * span + (times - t0))
+    return np.lexsort((times, codes))
+
+
+class Occupancy:
+    """Step functions of METRICS per value of `by`, from a jobs frame (SOURCE_COLS + by)."""
+
+    def __init__(self, df, by="Partition", now=None):
+        if by is None:
+            groups = pd.Series(pd.Categorical(np.full(len(df), "all")))
+        else:
+            groups = df[by].astype("category")
+        if groups.isna().any():
+            groups = groups.cat.add_categories(["unknown"]).fillna("unknown")
+        self.by = by
+        self.groups = pd.Index(groups.cat.categories)
+        group = groups.cat.codes.to_numpy().astype(np.int64)
+
+        submit, start, end = _ms(df["Submit"]), _ms(df["Start"]), _ms(df["End"])
+        if now is None:
+            known = np.concatenate([submit, start, end])
+            known = known[known != _NAT]
+            now = int(known.max()) if len(known) else 0
+        else:
+            now = pd.Timestamp(now).as_unit("ms").value // 10 ** 6
+        self.now = now
+
+        # running [Start, End or now)
+        run_end = np.where(end != _NAT, end, now)
+        run = np.flatnonzero((start != _NAT) & (run_end > start))
+        # pending [Submit, Start or End or now)
+        pend_end = np.where(start != _NAT, start, run_end)
+        pend = np.flatnonzero((submit != _NAT) & (pend_end > submit))
+
+        times = np.concatenate([start[run], run_end[run], submit[pend], pend_end[pend]])
+        jobs = np.concatenate([run, run, pend, pend])
+        kinds = np.repeat(np.arange(4, dtype=np.int8), [len(run), len(run), len(pend), len(pend)])
+        codes = group[jobs]
+        order = _sort_order(codes, times)
+        self._jobs, self._kinds = jobs[order], kinds[order]
+        self._all_times, codes = times[order], codes[order]
+
+        # of the events at one time in a group only the last is kept (the value
+        # after all of them): the states in between never existed
+        same = (self._all_times[1:] == self._all_times[:-1]) & (codes[1:] == codes[:-1])
+        self._last = np.r_[~same, True] if len(codes) else np.zeros(0, dtype=bool)
+        self.times = self._all_times[self._last]
+        self.offsets = np.searchsorted(codes[self._last], np.arange(len(self.groups) + 1))
+        self._amounts = {col: _int(df, col) for col, _ in _DELTAS.values()}
+        self._steps = {}
+
+    def steps(self, metric):
+        """
+        (values, integrals) of `metric` at self.times: the value after each
+        event and the integral (value × seconds) before it, cumulative over
+        the groups in order. Computed once per metric.
+        """
+        if metric not in self._steps:
+            col, signs = _DELTAS[metric]
+            deltas = self._amounts[col][self._jobs] * np.asarray(signs, dtype=np.int64)[self._kinds]
+            # every interval is closed, so the sum is back to 0 after the last
+            # event of each group and nothing leaks into the next one
+            values = np.cumsum(deltas)
+            times = self._all_times
+            seconds = np.diff(times, append=times[-1:]) / _MS if len(times) else np.zeros(0)
+            step = values * seconds
+            area = np.cumsum(step) - step
+            self._steps[metric] = values[self._last], area[self._last]
+        return self._steps[metric]
+
+    def _group(self, key, metric):
+        k = self.groups.get_loc(key)
+        lo, hi = self.offsets[k], self.offsets[k + 1]
+        values, area = self.steps(metric)
+        return self.times[lo:hi], values[lo:hi], area[lo:hi] - (area[lo] if hi > lo else 0)
+
+    def _at(self, key, metric, t):
+        """Value and integral of one group's step function at times `t` (int64 ms)."""
+        times, values, area = self._group(key, metric)
+        if not len(times):
+            return np.zeros(len(t)), np.zeros(len(t))
+        i = np.searchsorted(times, t, side="right") - 1
+        before = i < 0
+        i = np.clip(i, 0, None)
+        value = np.where(before, 0, values[i])
+        integral = np.where(before, 0.0, area[i] + values[i] * (t - times[i]) / _MS)
+        return value, integral
+
+    def series(self, metric="cores", freq="1h", start=None, end=None, stat="mean", groups=None):
+        """
+        `metric` on a grid of `freq` buckets within [start, end], one column per group.
+
+        stat: "mean"   time-weighted mean over each bucket
+              "max"    peak within each bucket
+              "start"  value at the bucket start
+        Buckets are labelled by their start; the default range covers every event.
+        """
+        if metric not in METRICS:
+            raise KeyError(f"Unknown metric {metric!r} (one of {', '.join(METRICS)})")
+        if stat not in STATS:
+            raise ValueError(f"Unknown stat {stat!r} (one of {', '.join(STATS)})")
+        first = int(self.times.min()) if len(self.times) else self.now
+        start = pd.Timestamp(first, unit="ms") if start is None else pd.Timestamp(start)
+        end = pd.Timestamp(self.now, unit="ms") if end is None else pd.Timestamp(end)
+        grid = pd.date_range(start.floor(freq), end, freq=freq).as_unit("ms")
+        if not len(grid):
+            grid = pd.DatetimeIndex([start.floor(freq)]).as_unit("ms")
+        edges = np.r_[grid.asi8, (grid[-1] + to_offset(freq)).as_unit("ms").value // 10 ** 6]
+        out = {}
+        for key in self.groups if groups is None else groups:
+            value, integral = self._at(key, metric, edges)
+            if stat == "mean":
+                out[key] = np.diff(integral) / (np.diff(edges) / _MS)
+            elif stat == "start":
+                out[key] = value[:-1]
+            else:
+                out[key] = self._peaks(key, metric, edges, value[:-1])
+        return pd.DataFrame(out, index=grid, columns=pd.Index(list(out), name=self.by))
+
+    def _peaks(self, key, metric, edges, at_start):
+        """Max of the value at each bucket start and after each event inside the bucket."""
+        times, values, _ = self._group(key, metric)
+        if not len(times):
+            return at_start.astype(float)
+        v = np.r_[values, 0]  # sentinel: hi can be len(times)
+        lo = np.searchsorted(times, edges[:-1], side="right")
+        hi = np.searchsorted(times, edges[1:], side="left")
+        # reduceat over (lo0, hi0, lo1, hi1, ...): even results are max(v[lo:hi]) when lo < hi
+        peaks = np.maximum.reduceat(v, np.column_stack([lo, hi]).ravel())[::2]
+        return np.where(hi > lo, np.maximum(at_start, peaks), at_start).astype(float)
@@ -0,0 +1,417 @@
+#!/usr/bin/env python3
+"""
+Parallel ETL of many raw job files into the partitioned jobs dataset.
+
+Usage:
+    python parallel_etl.py --inputs 'data/raw/sacct_*.csv' data/raw/legacy/ \
+                           [--out-dir data/processed/jobs_all] [--workers 8] \
+                           [--chunksize 1000000] [--rebuild] \
+                           [--rollups data/processed/jobs_daily.parquet] [--snapshot]
+
+--inputs takes globs and directories (every file in it). Each file is
+recognised from its header (`detect_format`):
+
+    sacct   pipe-delimited `sacct -P` export (make_dataset.py)
+    legacy  export of the 2018-2021 jobs_table, CSV or XLSX (convert_jobs2018_2021.py)
+
+Files are independent, so each one is cleaned by its own worker process:
+read, `transform` / `convert_legacy` + `add_features`, compact schema, and
+written straight into the year/month partitions of --out-dir as
+`part-<input id>-<batch>.parquet` (jobs_dataset.write_partitioned). Workers
+share nothing but the output schema, which is fixed up front
+(`output_schema`) so sacct and legacy files land in the same layout.
+Largest files are scheduled first so a big file does not end up running
+alone at the end. Each worker keeps Arrow single-threaded: the parallelism
+is across files, one core per worker.
+
+A manifest, <out-dir>/_manifest.json, lists every input with its size,
+mtime, format, rows and the part files it produced. A re-run only
+processes inputs that are new or changed (their old part files are
+removed first); inputs not given again are kept. The manifest is written
+after every finished file, so an interrupted run resumes where it stopped.
+The partitions hold one file per input rather than one sorted file, which
+`read_jobs`, the filter index and the rollups handle like the part files
+of the nightly ingest (incremental.py).
+
+Inputs may overlap (two exports of the same period, a job exported while
+running and again once finished). After the workers are done, one row is
+kept per job (`job_keys`) across the whole dataset: the one with the
+latest End, open jobs (no End) counting as oldest. The part files holding
+the others are rewritten without them, as incremental.py does for updated
+jobs. The manifest records the rows left and, per input, the inputs that
+kept its dropped jobs ("superseded_by"): when one of those is cleaned
+again (changed, or its part files are gone), the inputs that lost rows to
+it are cleaned again too, so a job missing from a newer export comes back
+from the older one. --rollups refreshes the rollup cube and --snapshot the
+memory-mapped copy the app reads (jobs_snapshot.py).
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from glob import glob
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from convert_jobs2018_2021 import convert_legacy, read_legacy
+from features import add_features
+from jobs_dataset import (
+    PARTITION_COLS, arrow_schema, jobs_dataset, partition_of, temp_path, write_partitioned,
+)
+from jobs_schema import JOBID_PARTS, compact_schema, compact_table, conform_table, job_keys, jobs_to_pandas
+from jobs_snapshot import snapshot_path, write_snapshot
+from make_dataset import (
+    NUMERIC_DTYPES, READ_CSV_KW, REQUIRED_COLS, raw_batches, setup_logging, transform,
+)
+from rollups import build_rollups
+
+JOBS_DIR = Path("data/processed/jobs_all")
+MANIFEST_NAME = "_manifest.json"
+FORMATS = ["sacct", "legacy"]
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Clean many raw job files in parallel into one dataset")
+    p.add_argument("--inputs", nargs="+", required=True,
+                   help="Raw files: globs and/or directories (sacct and legacy exports)")
+    p.add_argument("--out-dir", type=Path, default=JOBS_DIR, help="Partitioned dataset directory")
+    p.add_argument("--workers", type=int, default=os.cpu_count(),
+                   help="Worker processes (default: all cores; 1 runs in this process)")
+    p.add_argument("--chunksize", type=int, default=None,
+                   help="Stream sacct files in batches of this many rows")
+    p.add_argument("--rebuild", action="store_true",
+                   help="Clear --out-dir and process every input again")
+    p.add_argument("--rollups", type=Path, default=None,
+                   help="Rollup cube to refresh for the months the run touched")
+    p.add_argument("--snapshot", action="store_true",
+                   help="Rewrite the memory-mapped snapshot of --out-dir the app reads")
+    return p.parse_args()
+
+
+def expand_inputs(patterns):
+    """Files named by globs, paths and directories (their files), sorted, without duplicates."""
+    files = set()
+    for pattern in patterns:
+        path = Path(pattern)
+        if path.is_dir():
+            files.update(p for p in path.iterdir() if p.is_file() and not p.name.startswith("."))
+        else:
+            matches = [Path(m) for m in glob(pattern)] or ([path] if path.exists() else [])
+            if not matches:
+                logging.warning(f"No input matches {pattern!r}")
+            files.update(m for m in matches if m.is_file())
+    return sorted(files)
+
+
+def detect_format(path):
+    """'sacct' or 'legacy' from the header of a raw file; ValueError otherwise."""
+    path = Path(path)
+    if path.suffix == ".xlsx":
+        header = pd.read_excel(path, nrows=0).columns
+        if "id_job" in header:
+            return "legacy"
+    else:
+        with open(path, encoding=READ_CSV_KW["encoding"]) as f:
+            line = f.readline().strip()
+        if "JobID" in line.split(READ_CSV_KW["sep"]):
+            return "sacct"
+        if "id_job" in line.split(","):
+            return "legacy"
+    raise ValueError(f"{path}: neither a sacct export (JobID|...) nor a legacy jobs_table (id_job,...)")
+
+
+def output_schema():
+    """
+    The compact schema every part file is written in: the one of a cleaned
+    sacct export, which has all columns of the legacy table and more.
+    """
+    empty = pd.DataFrame({c: pd.Series(dtype=NUMERIC_DTYPES.get(c, str)) for c in REQUIRED_COLS})
+    schema = compact_schema(arrow_schema(transform(empty)))
+    return pa.schema([f for f in schema if f.name not in PARTITION_COLS])
+
+
+def schema_fingerprint(schema):
+    return hashlib.sha1(schema.to_string().encode()).hexdigest()[:16]
+
+
+def input_key(path):
+    """Manifest key of an input: its absolute path."""
+    return str(Path(path).resolve())
+
+
+def part_prefix(key):
+    """Part file prefix of an input, stable across runs."""
+    return f"part-{hashlib.sha1(key.encode()).hexdigest()[:12]}"
+
+
+def clean_batches(path, fmt, chunksize=None):
+    """Cleaned frames (features added) of one raw file."""
+    if fmt == "sacct":
+        yield from map(transform, raw_batches(path, chunksize))
+    elif fmt == "legacy":
+        yield add_features(convert_legacy(read_legacy(path)))
+    else:
+        raise ValueError(f"Unknown format {fmt!r} (one of {', '.join(FORMATS)})")
+
+
+def process_file(path, fmt, out_dir, schema, chunksize=None):
+    """
+    Clean one raw file into the partitions of `out_dir`; returns its manifest
+    entry. Runs in a worker process. On error the files already written for
+    this input are removed, so a failed input leaves nothing behind.
+    """
+    t0 = time.perf_counter()
+    path, out_dir = Path(path), Path(out_dir)
+    key = input_key(path)
+    stat = path.stat()
+    prefix = part_prefix(key)
+    written, rows = [], 0
+    try:
+        for i, batch in enumerate(clean_batches(path, fmt, chunksize)):
+            table = conform_table(compact_table(pa.Table.from_pandas(batch, preserve_index=False)), schema)
+            written += write_partitioned(jobs_to_pandas(table), out_dir, basename=f"{prefix}-{i:04d}.parquet",
+                                         schema=schema)
+            rows += table.num_rows
+    except Exception:
+        _remove(out_dir, written)
+        raise
+    return key, {
+        "format": fmt,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "rows": rows,
+        "files": sorted(str(p) for p in written),
+        "seconds": round(time.perf_counter() - t0, 3),
+    }
+
+
+def _init_worker():
+    # parallelism is across files: keep Arrow from starting a thread pool per worker
+    pa.set_cpu_count(1)
+    pa.set_io_thread_count(1)
+
+
+def _remove(out_dir, files):
+    for rel in files:
+        (Path(out_dir) / rel).unlink(missing_ok=True)
+
+
+def drop_duplicate_jobs(out_dir):
+    """
+    Keep one row per job across the part files of `out_dir`: the one with
+    the latest End (no End counts as oldest; ties keep the row of the last
+    file by name). Rewrites the files holding the others; returns
+    {part file: {part file of the kept rows: rows dropped}}.
+    """
+    out_dir = Path(out_dir)
+    frames = []
+    for frag in jobs_dataset(out_dir).get_fragments():
+        names = frag.physical_schema.names
+        rows = jobs_to_pandas(frag.to_table(columns=[c for c in JOBID_PARTS if c in names] + ["End"]))
+        frames.append(pd.DataFrame({
+            "key": job_keys(rows).to_numpy(),
+            "End": rows["End"].to_numpy(),
+            "file": str(Path(frag.path).relative_to(out_dir)),
+            "row": np.arange(len(rows)),
+        }))
+    if not frames:
+        return {}
+    rows = pd.concat(frames, ignore_index=True)
+    rows = rows[rows["key"].duplicated(keep=False)]
+    rows = rows.sort_values(["key", "End", "file", "row"], na_position="first", kind="stable")
+    rows["winner"] = rows.groupby("key", sort=False)["file"].transform("last")
+    dropped = rows[rows["key"].duplicated(keep="last")]
+    for rel, positions in dropped.groupby("file")["row"]:
+        path = out_dir / rel
+        table = pq.ParquetFile(path).read()
+        keep = np.ones(table.num_rows, dtype=bool)
+        keep[positions.to_numpy()] = False
+        if not keep.any():
+            path.unlink()
+            continue
+        tmp = temp_path(path)
+        pq.write_table(table.filter(pa.array(keep)), tmp)
+        os.replace(tmp, path)
+    counts = dropped.groupby(["file", "winner"]).size()
+    return {rel: counts[rel].to_dict() for rel in counts.index.unique(level="file")}
+
+
+def load_manifest(out_dir):
+    path = Path(out_dir) / MANIFEST_NAME
+    if path.exists():
+        return json.loads(path.read_text())
+    return {"schema": None, "inputs": {}}
+
+
+def save_manifest(manifest, out_dir):
+    # write-then-rename so a crash never leaves a half-written manifest
+    path = Path(out_dir) / MANIFEST_NAME
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    os.replace(tmp, path)
+
+
+def run_etl(inputs, out_dir, workers=None, chunksize=None, rebuild=False):
+    """
+    Clean the raw files `inputs` into `out_dir` with `workers` processes.
+
+    Returns a summary: processed / skipped inputs, rows written, rows
+    dropped as duplicates of jobs in other inputs, wall seconds, and the
+    (year, month) partitions touched. Raises the first
+    worker error after the other files have finished and been recorded.
+    """
+    t0 = time.perf_counter()
+    out_dir = Path(out_dir)
+    workers = max(1, workers or os.cpu_count() or 1)
+    if rebuild and out_dir.exists():
+        shutil.rmtree(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    schema = output_schema()
+    manifest = load_manifest(out_dir)
+    managed = {f for entry in manifest["inputs"].values() for f in entry["files"]}
+    unmanaged = [p for p in out_dir.rglob("*.parquet") if str(p.relative_to(out_dir)) not in managed]
+    if unmanaged:
+        raise RuntimeError(f"{out_dir} holds {len(unmanaged)} Parquet file(s) this driver did not write "
+                           f"(e.g. {unmanaged[0]}); use --rebuild to replace them")
+    if manifest["schema"] != schema_fingerprint(schema):
+        # written by a version with another output schema: every input is redone
+        for entry in manifest["inputs"].values():
+            entry["mtime_ns"] = None
+        manifest["schema"] = schema_fingerprint(schema)
+
+    todo, touched, skipped = [], set(), set()
+    for path in inputs:
+        path = Path(path)
+        key, stat = input_key(path), path.stat()
+        entry = manifest["inputs"].get(key)
+        if entry and (entry["size"], entry["mtime_ns"]) == (stat.st_size, stat.st_mtime_ns) \
+                and all((out_dir / f).exists() for f in entry["files"]):
+            skipped.add(key)
+            continue
+        todo.append((stat.st_size, path, detect_format(path)))
+        if entry:
+            _remove(out_dir, entry["files"])
+            touched.update(entry["files"])
+            del manifest["inputs"][key]
+    # inputs that lost rows to a changed one are cleaned again, so the jobs it
+    # no longer has come back from them
+    redo = {input_key(path) for _, path, _ in todo}
+    for key, entry in list(manifest["inputs"].items()):
+        if not redo & set(entry.get("superseded_by", [])):
+            continue
+        path = Path(key)
+        if not path.exists():
+            logging.warning(f"{key} lost rows to a changed input and is gone: they cannot be restored")
+            continue
+        todo.append((path.stat().st_size, path, entry["format"]))
+        skipped.discard(key)
+        _remove(out_dir, entry["files"])
+        touched.update(entry["files"])
+        del manifest["inputs"][key]
+    save_manifest(manifest, out_dir)
+    todo.sort(key=lambda t: -t[0])  # largest first
+    logging.info(f"{len(todo)} input(s) to clean, {len(skipped)} unchanged, {min(workers, len(todo) or 1)} worker(s)")
+
+    done, error = [], None
+    if workers == 1 or len(todo) <= 1:
+        # the serial baseline: same code path without a pool
+        for _, path, fmt in todo:
+            done.append(process_file(path, fmt, out_dir, schema, chunksize))
+            _record(manifest, out_dir, *done[-1])
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(todo)), initializer=_init_worker,
+                                 mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = [pool.submit(process_file, str(path), fmt, str(out_dir), schema, chunksize)
+                       for _, path, fmt in todo]
+            for future in as_completed(futures):
+                try:
+                    done.append(future.result())
+                except Exception as exc:
+                    logging.error(f"❌ {exc}")
+                    error = error or exc
+                    continue
+                _record(manifest, out_dir, *done[-1])
+
+    rows = sum(entry["rows"] for _, entry in done)
+    touched.update(f for _, entry in done for f in entry["files"])
+    duplicates = drop_duplicate_jobs(out_dir) if done else {}
+    dropped = sum(sum(by_winner.values()) for by_winner in duplicates.values())
+    if duplicates:
+        _forget(manifest, out_dir, duplicates)
+        touched.update(duplicates)
+        logging.info(f"Dropped {dropped:,} rows of jobs also in another input "
+                     f"(kept the latest End) from {len(duplicates)} file(s)")
+    manifest["rows"] = sum(entry["rows"] for entry in manifest["inputs"].values())
+    manifest["updated_at"] = pd.Timestamp.now().isoformat(timespec="seconds")
+    save_manifest(manifest, out_dir)
+    if error is not None:
+        raise error
+    return {
+        "processed": len(done),
+        "skipped": len(skipped),
+        "rows": rows,
+        "duplicates": dropped,
+        "seconds": round(time.perf_counter() - t0, 3),
+        "months": sorted({m for m in map(partition_of, touched) if m}),
+    }
+
+
+def _record(manifest, out_dir, key, entry):
+    manifest["inputs"][key] = entry
+    save_manifest(manifest, out_dir)
+    rate = entry["rows"] / entry["seconds"] if entry["seconds"] else 0
+    logging.info(f"  {Path(key).name}: {entry['rows']:,} {entry['format']} rows in "
+                 f"{entry['seconds']:.1f}s ({rate:,.0f} rows/s), {len(entry['files'])} file(s)")
+
+
+def _forget(manifest, out_dir, dropped):
+    """
+    Take the rows dropped from part files (drop_duplicate_jobs) off their
+    inputs' manifest entries, and list the inputs that kept those jobs in
+    the entries' "superseded_by".
+    """
+    owner = {f: key for key, entry in manifest["inputs"].items() for f in entry["files"]}
+    for key, entry in manifest["inputs"].items():
+        winners = set(entry.get("superseded_by", []))
+        for f in entry["files"]:
+            for winner, rows in dropped.get(f, {}).items():
+                entry["rows"] -= rows
+                winners.add(owner.get(winner, key))
+        winners.discard(key)
+        if winners:
+            entry["superseded_by"] = sorted(winners)
+        entry["files"] = [f for f in entry["files"] if (Path(out_dir) / f).exists()]
+
+
+def main():
+    setup_logging()
+    args = parse_args()
+    inputs = expand_inputs(args.inputs)
+    if not inputs:
+        raise SystemExit("No input files")
+    summary = run_etl(inputs, args.out_dir, workers=args.workers, chunksize=args.chunksize,
+                      rebuild=args.rebuild)
+    logging.info(f"✅ {summary['rows']:,} rows from {summary['processed']} file(s) in "
+                 f"{summary['seconds']:.1f}s ({summary['skipped']} unchanged) → {args.out_dir}")
+    if args.rollups and (summary["processed"] or args.rebuild):
+        months = None if args.rebuild else summary["months"]
+        build_rollups(args.out_dir, args.rollups, months=months)
+        logging.info(f"Refreshed {args.rollups}")
+    if args.snapshot and (summary["processed"] or args.rebuild):
+        write_snapshot(args.out_dir)
+        logging.info(f"Rewrote {snapshot_path(args.out_dir)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# src/quantile_sketch.py
+"""
+Mergeable quantile sketch stored as (bucket, count) rows.
+
+Values are counted in logarithmic buckets (the DDSketch layout): bucket
+k + 1 holds the values in MIN_VALUE·(γ^(k-1), γ^k] with γ = (1 + α) / (1 - α),
+and is reported as MIN_VALUE·2γ^k / (γ + 1), which is within a relative
+error α of every value in it. Values below MIN_VALUE (e.g. jobs that did
+not wait) share bucket 0, reported as 0.
+
+A sketch is a set of (bucket, count) rows, so sketches are merged by adding
+the counts of equal buckets: a groupby-sum, like the other measures of the
+rollup cube. A quantile is read from the cumulative counts of the merged
+buckets: the bucket holding the ⌈q·n⌉-th value, i.e. the exact quantile
+(inverted CDF) up to α. The size does not depend on the number of values:
+with α = 5% a range of 1 s to a year takes about 175 buckets (870 with
+1%). Queue waits are read in hours and vary far more than 5% from one
+month to the next, so the coarser buckets cost no visible precision and
+keep the sketch tables several times smaller.
+"""
+
+import numpy as np
+import pandas as pd
+
+RELATIVE_ACCURACY = 0.05
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+MIN_VALUE = 1.0
+
+
+def bucket_of(values):
+    """Bucket index (int16) of every value; NaN -> -1 (not counted), < MIN_VALUE -> 0."""
+    values = np.asarray(values, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        k = np.ceil(np.log(values / MIN_VALUE) / np.log(GAMMA)) + 1
+    k = np.where(values < MIN_VALUE, 0, k)
+    return np.where(np.isnan(values), -1, k).astype(np.int16)
+
+
+def bucket_value(buckets):
+    """Representative value of bucket indices (0 for bucket 0)."""
+    k = np.asarray(buckets, dtype=float) - 1
+    return np.where(k < 0, 0.0, MIN_VALUE * 2 * GAMMA ** k / (GAMMA + 1))
+
+
+def quantiles(sketch, by, qs, bucket="bucket", count="jobs"):
+    """
+    Quantiles `qs` of merged sketches, one row per value of `by`.
+
+    sketch: rows with a bucket column, a count column and the `by` columns
+    (or Series aligned with it, e.g. sketch["day"].dt.to_period("M")).
+    Returns a DataFrame with the total count (`count`) and one column per
+    quantile, "p50" for 0.5 etc.; groups without values are left out.
+    """
+    keys = [by] if isinstance(by, (str, pd.Series)) else list(by)
+    merged = sketch.groupby(keys + [bucket], observed=True, sort=True)[count].sum()
+    merged = merged[merged > 0]
+    levels = list(range(len(keys)))
+    groups = merged.groupby(level=levels, observed=True, sort=False)
+    cum, total = groups.cumsum(), groups.transform("sum")
+    values = pd.Series(bucket_value(merged.index.get_level_values(-1)), index=merged.index)
+    out = {count: groups.sum()}
+    for q in qs:
+        # first bucket whose cumulative count reaches the ⌈q·n⌉-th value
+        reached = cum >= np.ceil(q * total.to_numpy()).clip(min=1)
+        out[f"p{q * 100:g}"] = values.where(reached).groupby(level=levels, observed=True, sort=False).first()
+    return pd.DataFrame(out)
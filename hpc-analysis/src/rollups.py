@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+Daily rollup cube of the jobs table for the dashboard's charts.
+
+Usage:
+    python rollups.py [--jobs-dir data/processed/jobs_all] \
+                      [--out data/processed/jobs_daily.parquet]
+
+Grain: day (of Start) × UID × Partition × State × JobName_Grouped. Each row
+holds additive measures, so any filter on those dimensions followed by any
+grouping is a sum (or min/max) over a few thousand cube rows instead of a
+pass over millions of jobs:
+
+    jobs, failed                                    job counts
+    <m>_sum, <m>_min, <m>_max, <m>_n                for m in MEASURES
+    efficiency_sum, efficiency_n                    mean efficiency = sum / n
+    eff_bin_00 .. eff_bin_10                        efficiency histogram (EFF_BINS)
+    failed_core_seconds                             core_seconds of failed jobs
+    idle_core_seconds                               core_seconds - CPUTime_sec of the others
+    mem_req_paired_sum, mem_rss_paired_sum,         ReqMem_MB / MaxRSS_MB sums over the
+    mem_paired_n                                    jobs having both (over-request ratio)
+    mem_reserved_mb_seconds, mem_unused_mb_seconds  ReqMem_MB and ReqMem_MB - MaxRSS_MB
+                                                    times Elapsed_sec over those jobs
+    mem_ratio_bin_00 .. mem_ratio_bin_06            ReqMem / MaxRSS histogram (MEM_RATIO_BINS)
+
+Alongside the cube, the wait sketch table of wait_times.py (quantile
+sketches of wait_time_sec per month × partition × size class and per month
+× hour) is written to `<out>_wait.parquet`, from the same pass over the jobs,
+and the cube re-aggregated to months to `<out>_monthly.parquet`.
+
+The daily grain is close to one row per job (most users run a handful of
+jobs a day in a given partition and state), so the charts do not scan it
+over a whole date range: `select_rollups` takes the whole months of the
+range from the monthly cube and only the days of the partial months at
+either end from the daily one. The sums are the same; the rows scanned
+follow the number of months rather than of jobs.
+
+State_Clean and Partition_Main are functions of State and Partition and are
+stored alongside them. Application is a property of the user (SQL
+metadata), so it is not part of the grain: filter and group on it by
+joining the UID column of the cube with the metadata.
+
+The cube is built from the partitioned dataset one file at a time and can
+be refreshed for a few months only (`months=`), which is what the nightly
+ingest does.
+"""
+
+import argparse
+import logging
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from features import partition_main, state_clean
+from instrument import timed
+from jobs_dataset import jobs_dataset
+from jobs_schema import jobs_to_pandas
+from wait_times import SOURCE_COLS as WAIT_SOURCE_COLS, WAIT_DIMENSIONS, combine_waits, finish_waits, \
+    load_waits, wait_frame, wait_path
+
+JOBS_DIR = Path("data/processed/jobs_all")
+OUT = Path("data/processed/jobs_daily.parquet")
+
+DIMENSIONS = ["day", "UID", "Partition", "State", "JobName_Grouped"]
+LABELS = ["State_Clean", "Partition_Main"]  # derived from dimensions
+MEASURES = ["Elapsed_sec", "CPUTime_sec", "core_seconds", "ReqMem_MB", "MaxRSS_MB"]
+
+# states counted in `failed` (same test as the dashboard's failure metric)
+FAILURE_RE = r"FAIL|CANCEL|OUT_OF_MEMORY"
+
+# efficiency histogram: [0, .1), [.1, .2), ..., [.9, 1), [1, inf)
+EFF_BINS = np.r_[np.linspace(0, 1, 11), np.inf]
+EFF_BIN_COLS = [f"eff_bin_{i:02d}" for i in range(len(EFF_BINS) - 1)]
+
+# memory over-request (ReqMem / MaxRSS) histogram: [0, 1), [1, 1.5), ..., [16, inf]
+MEM_RATIO_BINS = np.array([0, 1, 1.5, 2, 4, 8, 16, np.inf])
+MEM_RATIO_BIN_COLS = [f"mem_ratio_bin_{i:02d}" for i in range(len(MEM_RATIO_BINS) - 1)]
+
+# how each measure column combines when cube rows are merged
+AGGREGATIONS = {"jobs": "sum", "failed": "sum", "efficiency_sum": "sum", "efficiency_n": "sum",
+                "failed_core_seconds": "sum", "idle_core_seconds": "sum",
+                "mem_req_paired_sum": "sum", "mem_rss_paired_sum": "sum", "mem_paired_n": "sum",
+                "mem_reserved_mb_seconds": "sum", "mem_unused_mb_seconds": "sum"}
+for _m in MEASURES:
+    AGGREGATIONS.update({f"{_m}_sum": "sum", f"{_m}_min": "min", f"{_m}_max": "max", f"{_m}_n": "sum"})
+AGGREGATIONS.update({c: "sum" for c in EFF_BIN_COLS + MEM_RATIO_BIN_COLS})
+
+SOURCE_COLS = ["Start", "UID", "Partition", "State", "JobName_Grouped", "efficiency"] + MEASURES
+READ_COLS = SOURCE_COLS + [c for c in WAIT_SOURCE_COLS if c not in SOURCE_COLS]
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Build the daily rollup cube of the jobs dataset")
+    p.add_argument("--jobs-dir", type=Path, default=JOBS_DIR, help="Partitioned jobs dataset")
+    p.add_argument("--out", type=Path, default=OUT, help="Rollup Parquet file")
+    return p.parse_args()
+
+
+def rollup_frame(df):
+    """Cube rows of one jobs frame (SOURCE_COLS, any number of rows)."""
+    keys = pd.DataFrame({
+        "day": df["Start"].dt.floor("D"),
+        "UID": df["UID"],
+        "Partition": df["Partition"],
+        "State": df["State"],
+        "JobName_Grouped": df["JobName_Grouped"],
+    })
+    eff = df["efficiency"].astype(float)
+    eff = eff.where(np.isfinite(eff))
+    state = df["State"].astype("category")
+    failed = np.asarray(state.cat.categories.astype(str).str.contains(FAILURE_RE), dtype=bool)
+    codes = state.cat.codes.to_numpy()
+    failed = np.where(codes >= 0, failed[codes], False)
+    core = df["core_seconds"].astype(float).to_numpy()
+    idle = np.clip(core - df["CPUTime_sec"].astype(float).to_numpy(), 0, None)
+    req, rss = df["ReqMem_MB"].astype(float).to_numpy(), df["MaxRSS_MB"].astype(float).to_numpy()
+    paired = ~np.isnan(req) & ~np.isnan(rss)
+    elapsed = np.nan_to_num(df["Elapsed_sec"].astype(float).to_numpy())
+    values = {
+        "jobs": np.ones(len(df), dtype=np.int64),
+        "failed": failed.astype(np.int64),
+        "efficiency_sum": eff.fillna(0).to_numpy(),
+        "efficiency_n": eff.notna().to_numpy(dtype=np.int64),
+        "failed_core_seconds": np.where(failed, np.nan_to_num(core), 0.0),
+        "idle_core_seconds": np.where(failed, 0.0, np.nan_to_num(idle)),
+        "mem_req_paired_sum": np.where(paired, req, 0.0),
+        "mem_rss_paired_sum": np.where(paired, rss, 0.0),
+        "mem_paired_n": paired.astype(np.int64),
+        "mem_reserved_mb_seconds": np.where(paired, req * elapsed, 0.0),
+        "mem_unused_mb_seconds": np.where(paired, np.clip(req - rss, 0, None) * elapsed, 0.0),
+    }
+    for m in MEASURES:
+        v = df[m].astype(float)
+        values.update({f"{m}_sum": v.fillna(0).to_numpy(), f"{m}_min": v.to_numpy(),
+                       f"{m}_max": v.to_numpy(), f"{m}_n": v.notna().to_numpy(dtype=np.int64)})
+    bins = np.digitize(eff.to_numpy(), EFF_BINS) - 1  # NaN -> last index + 1
+    for i, col in enumerate(EFF_BIN_COLS):
+        values[col] = (bins == i).astype(np.int64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = req / rss  # x/0 -> inf, in the last bin
+    bins = np.where(paired, np.digitize(ratio, MEM_RATIO_BINS[:-1]) - 1, -1)
+    for i, col in enumerate(MEM_RATIO_BIN_COLS):
+        values[col] = (bins == i).astype(np.int64)
+    frame = pd.concat([keys, pd.DataFrame(values, index=df.index)], axis=1)
+    return combine(frame)
+
+
+def combine(cube, by=DIMENSIONS):
+    """Merge cube rows sharing the same `by` values (additive re-aggregation)."""
+    aggs = {c: a for c, a in AGGREGATIONS.items() if c in cube.columns}
+    return (
+        cube.groupby(by, observed=True, dropna=False, sort=False)
+        .agg(aggs)
+        .reset_index()
+    )
+
+
+def _finish(cube):
+    """Categorical dimensions plus the derived labels."""
+    for col in DIMENSIONS[1:]:
+        cube[col] = cube[col].astype("category")
+    cube["State_Clean"] = state_clean(cube["State"])
+    cube["Partition_Main"] = partition_main(cube["Partition"])
+    return cube[DIMENSIONS + LABELS + list(AGGREGATIONS)].sort_values("day", ignore_index=True)
+
+
+def month_rollups(cube):
+    """`cube` re-aggregated to months: `day` is the first day of each month."""
+    month = cube["day"].dt.to_period("M").dt.start_time.astype(cube["day"].dtype)
+    return _finish(combine(cube[DIMENSIONS + list(AGGREGATIONS)].assign(day=month)))
+
+
+def monthly_path(cube_path):
+    """The monthly cube file written next to the rollup cube `cube_path`."""
+    cube_path = Path(cube_path)
+    return cube_path.with_name(f"{cube_path.stem}_monthly{cube_path.suffix}")
+
+
+def _month_key(day):
+    return day.dt.year * 100 + day.dt.month
+
+
+@timed("rollups", rows=len)
+def build_rollups(jobs_dir, out, months=None):
+    """
+    Write the rollup cube of `jobs_dir` to `out`, its wait sketch table to
+    wait_path(out) and its monthly cube to monthly_path(out); returns the cube.
+
+    months: iterable of (year, month) to recompute; the other months are
+    kept from the existing files. None rebuilds everything. Jobs without a
+    Start are always recomputed.
+    """
+    out = Path(out)
+    dataset = jobs_dataset(jobs_dir)
+    names = set(dataset.schema.names)
+    keep = keep_waits = None
+    frags = list(dataset.get_fragments())
+    if months is not None and out.exists() and wait_path(out).exists():
+        keep, wait_cols = load_rollups(out), pq.read_schema(wait_path(out)).names
+        if set(AGGREGATIONS) - set(keep.columns) or set(WAIT_DIMENSIONS) - set(wait_cols):
+            keep = None  # written before a measure or sketch was changed: rebuild everything
+        else:
+            keep_waits = load_waits(wait_path(out))
+    if keep is not None:
+        wanted = {y * 100 + m for y, m in months}
+        keep = keep[keep["day"].notna() & ~_month_key(keep["day"]).isin(wanted)]
+        keep_waits = keep_waits[keep_waits["day"].notna() & ~_month_key(keep_waits["day"]).isin(wanted)]
+        frags = [f for f in frags if _fragment_month(f) in wanted | {None}]
+
+    parts = [] if keep is None else [keep[DIMENSIONS + list(AGGREGATIONS)]]
+    waits = [] if keep is None else [keep_waits]
+    for frag in frags:
+        cols = [c for c in READ_COLS if c in names]
+        df = jobs_to_pandas(frag.to_table(columns=cols))
+        if df.empty:
+            continue
+        for col in set(READ_COLS) - set(cols):
+            df[col] = np.nan
+        parts.append(rollup_frame(df))
+        waits.append(wait_frame(df))
+    if not parts:
+        empty = pd.DataFrame({c: pd.Series(dtype=float) for c in READ_COLS})
+        empty = empty.astype({"Start": "datetime64[ms]", "Submit": "datetime64[ms]"})
+        parts, waits = [rollup_frame(empty)], [wait_frame(empty)]
+    # object keys: categoricals of different files do not concatenate
+    cube = pd.concat([p.astype({c: object for c in DIMENSIONS[1:]}) for p in parts], ignore_index=True)
+    cube = _finish(combine(cube))
+    waits = pd.concat([w.astype({c: object for c in WAIT_DIMENSIONS[1:]}) for w in waits], ignore_index=True)
+    waits = finish_waits(combine_waits(waits))
+
+    out.parent.mkdir(parents=True, exist_ok=True)
+    # the cube last: a new cube file (cube_version) means the others are current
+    for table, path in [(waits, wait_path(out)), (month_rollups(cube), monthly_path(out)), (cube, out)]:
+        tmp = path.with_suffix(".tmp")
+        pq.write_table(pa.Table.from_pandas(table, preserve_index=False), tmp)
+        os.replace(tmp, path)
+    return cube
+
+
+def _fragment_month(frag):
+    """(year*100 + month) of a fragment from its partition keys; None for no Start."""
+    keys = ds.get_partition_keys(frag.partition_expression)
+    if keys.get("year") is None or keys.get("month") is None:
+        return None
+    return keys["year"] * 100 + keys["month"]
+
+
+def load_rollups(path):
+    """Rollup cube as a DataFrame (categorical dimensions, `day` as datetime)."""
+    cube = pq.read_table(path).to_pandas()
+    for col in DIMENSIONS[1:] + LABELS:
+        if col in cube.columns and not isinstance(cube[col].dtype, pd.CategoricalDtype):
+            cube[col] = cube[col].astype("category")
+    return cube
+
+
+def select(cube, start=None, end=None, **values):
+    """
+    Cube rows within [start, end] (days, inclusive) whose dimension columns
+    are in the given value lists, e.g. select(cube, UID=[1001], State=["FAILED"]).
+    None for a list means no filter on that column.
+    """
+    mask = np.ones(len(cube), dtype=bool)
+    if start is not None:
+        mask &= (cube["day"] >= pd.Timestamp(start).normalize()).to_numpy()
+    if end is not None:
+        mask &= (cube["day"] <= pd.Timestamp(end).normalize()).to_numpy()
+    for col, allowed in values.items():
+        if allowed is not None:
+            mask &= cube[col].isin(allowed).to_numpy()
+    return cube if mask.all() else cube[mask]
+
+
+def select_rollups(cube, monthly, start=None, end=None, **values):
+    """
+    The rows of select(cube, start, end, **values) summed to months where
+    the whole month is in [start, end]: those come from `monthly`
+    (month_rollups(cube), `day` the first of the month), the days of the
+    partial months at either end from the daily `cube`. Any sum or min/max
+    over the result equals the one over select(cube, ...).
+    """
+    start = None if start is None else pd.Timestamp(start).normalize()
+    end = None if end is None else pd.Timestamp(end).normalize()
+    # [first, stop): the whole months of the range
+    first = None if start is None else start + pd.offsets.MonthBegin(0)
+    stop = None if end is None else (end + pd.Timedelta(days=1)).to_period("M").start_time
+    if first is not None and stop is not None and first >= stop:
+        return select(cube, start, end, **values)
+    last = None if stop is None else stop - pd.Timedelta(days=1)
+    parts = [select(monthly, first, last, **values)]
+    if start is not None and start < first:
+        parts.append(select(cube, start, first - pd.Timedelta(days=1), **values))
+    if end is not None and end > last:
+        parts.append(select(cube, stop, end, **values))
+    return pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0]
+
+
+def summarize(cube, by, columns=None):
+    """
+    Aggregate cube rows by `by` (column name(s) or a Series aligned with the
+    cube, e.g. cube["day"].dt.to_period("M")) and add the mean of every
+    measure (`<m>_mean`) and `efficiency_mean`.
+
+    columns: the measure columns to aggregate (default all of them); a mean
+    is added when both its `_sum` and `_n` columns are among them.
+    """
+    aggs = {c: a for c, a in AGGREGATIONS.items() if c in cube.columns}
+    if columns is not None:
+        aggs = {c: a for c, a in aggs.items() if c in columns}
+    out = cube.groupby(by, observed=True, sort=False).agg(aggs)
+    for m in MEASURES + ["efficiency"]:
+        if f"{m}_sum" in out and f"{m}_n" in out:
+            out[f"{m}_mean"] = out[f"{m}_sum"] / out[f"{m}_n"].where(out[f"{m}_n"] > 0)
+    return out
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    args = parse_args()
+    cube = build_rollups(args.jobs_dir, args.out)
+    logging.info(f"✅ {len(cube):,} rollup rows ({int(cube['jobs'].sum()):,} jobs) → {args.out}")
+    logging.info(f"✅ monthly cube → {monthly_path(args.out)}")
+    logging.info(f"✅ wait-time sketches → {wait_path(args.out)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,439 @@
+#!/usr/bin/env python3
+"""
+Synthetic job logs in both raw formats, for benchmarks and load tests.
+
+Usage:
+    python synthetic_jobs.py --rows 10000000 --out-dir data/raw/synthetic \
+                             [--legacy-rows 1000000] [--users 600] [--accounts 80] \
+                             [--start 2021-07-01] [--end 2025-06-30] [--seed 0] [--monthly]
+
+Writes
+    sacct.csv        pipe-delimited `sacct -P` export (make_dataset.py input);
+                     with --monthly one sacct_YYYY-MM.csv per month of Submit
+                     (parallel_etl.py input)
+    jobs_table.csv   legacy jobs_table export (convert_jobs2018_2021.py input),
+                     over the 2018-2021 period before --start
+
+The shapes follow the real logs rather than uniform noise, since the cost
+of most steps depends on them (distinct values per column, group sizes,
+share of jobs that never started):
+
+    users      Zipf-like activity: a few dozen users submit most jobs;
+               each user has an account, a home partition and 1-3 applications
+    job names  the user's applications, half with a numbered suffix
+               (vasp_std_0042...), a few thousand distinct names in total
+    times      Submit follows a day/night and weekday cycle, waits are
+               log-normal, Elapsed a share of the partition's time limits
+    resources  cores and memory per partition (multi-node jobs on defq and
+               longq), MaxRSS a log-normal share of the request
+    states     mostly COMPLETED; FAILED, CANCELLED by <uid>, TIMEOUT,
+               OUT_OF_MEMORY, NODE_FAIL; PENDING/RUNNING in the last days
+
+Rows are generated and written in chunks of --chunk-rows with vectorized
+numpy and Arrow string kernels, so 50M rows take minutes and bounded memory.
+The output only depends on --seed and the other arguments.
+"""
+
+import argparse
+import logging
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+
+from clean_jobs import seconds_to_slurm_str_series
+from convert_jobs2018_2021 import LEGACY_COLUMNS, STATE_MAP
+from make_dataset import READ_CSV_KW, REQUIRED_COLS
+
+CHUNK_ROWS = 500_000
+
+# partition -> share of jobs, cores per job (choices, weights), time limits in hours
+PARTITIONS = {
+    "defq": (0.45, [1, 2, 4, 8, 16, 28, 56, 112, 224], [18, 6, 10, 10, 14, 8, 20, 9, 5], [1, 12, 24, 72]),
+    "shortq": (0.20, [1, 2, 4, 8, 16], [40, 15, 20, 15, 10], [1, 2, 4]),
+    "longq": (0.10, [1, 8, 28, 56, 112], [20, 15, 20, 35, 10], [72, 168, 336]),
+    "gpu": (0.12, [1, 4, 8, 16, 32], [25, 30, 25, 15, 5], [4, 12, 24, 48]),
+    "bigmem": (0.05, [1, 8, 16, 32, 64], [20, 20, 25, 25, 10], [12, 24, 72]),
+    "debug": (0.08, [1, 2, 4], [60, 20, 20], [0.5]),
+}
+CORES_PER_NODE = 56
+# memory requests: MB per core ("Mc") or GB per node ("Gn"), with their shares;
+# bigmem jobs take the largest per-node request
+MEM_PER_CORE_MB = [1000, 2000, 4000, 8000]
+MEM_PER_CORE_SHARE = [0.2, 0.4, 0.3, 0.1]
+MEM_PER_NODE_GB = [16, 32, 64, 128, 256]
+MEM_PER_NODE_SHARE = [0.3, 0.3, 0.2, 0.15, 0.05]
+
+# application -> typical CPU efficiency (beta distribution a, b)
+APPLICATIONS = {
+    "jupyter": (1.0, 6.0), "bash": (1.2, 4.0), "test": (1.0, 3.0), "qe_pw": (8.0, 1.5),
+    "qe_ph": (7.0, 1.8), "vasp_std": (9.0, 1.2), "lmp": (8.0, 1.5), "gmx_mpi": (9.0, 1.3),
+    "orca": (5.0, 2.0), "g16": (6.0, 2.0), "python": (2.0, 3.0), "R": (2.0, 4.0),
+    "matlab": (2.0, 3.0), "cp2k": (8.0, 1.5), "nwchem": (6.0, 2.0), "openfoam": (8.0, 1.4),
+    "wrf": (8.5, 1.4), "alphafold": (3.0, 2.0), "stream": (9.0, 1.0), "linpack": (9.5, 1.0),
+    "ai": (3.0, 3.0), "md": (7.0, 2.0), "sbatch": (3.0, 3.0), "train_gpu": (2.5, 3.0),
+}
+NAME_SUFFIXES = 200  # numbered variants per application (vasp_std_0042 style)
+
+# state -> (share, ExitCode choices); PENDING/RUNNING are only given to recent jobs
+STATES = {
+    "COMPLETED": (0.70, ["0:0"]),
+    "FAILED": (0.12, ["1:0", "2:0", "127:0", "134:0", "139:0"]),
+    "CANCELLED": (0.09, ["0:15", "0:9"]),
+    "TIMEOUT": (0.05, ["0:0"]),
+    "OUT_OF_MEMORY": (0.025, ["0:125"]),
+    "NODE_FAIL": (0.005, ["0:0"]),
+}
+OPEN_DAYS = 3  # jobs submitted in the last days of the range can still be pending/running
+LEGACY_STATE_CODES = {name: code for code, name in STATE_MAP.items()}
+
+# relative submit rate per hour of the day and per weekday (Mon..Sun)
+HOURLY = np.array([2, 1.5, 1, 1, 1, 1.5, 3, 5, 8, 10, 11, 11, 9, 10, 11, 11, 10, 9, 7, 6, 5, 4, 3, 2.5])
+WEEKDAY = np.array([1.0, 1.05, 1.05, 1.0, 0.95, 0.45, 0.4])
+
+SACCT_COLS = REQUIRED_COLS + ["NNodes", "NTasks", "TimeLimit"]
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Write synthetic sacct and legacy job exports")
+    p.add_argument("--rows", type=int, default=1_000_000, help="Jobs in the sacct export")
+    p.add_argument("--legacy-rows", type=int, default=None,
+                   help="Jobs in the legacy jobs_table export (default: rows / 5; 0 to skip)")
+    p.add_argument("--out-dir", type=Path, default=Path("data/raw/synthetic"))
+    p.add_argument("--users", type=int, default=600)
+    p.add_argument("--accounts", type=int, default=80)
+    p.add_argument("--start", default="2021-07-01", help="First Submit date of the sacct export")
+    p.add_argument("--end", default="2025-06-30", help="Last Submit date of the sacct export")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--monthly", action="store_true", help="One sacct file per month of Submit")
+    p.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS, help="Rows generated at a time")
+    return p.parse_args()
+
+
+def make_population(rng, n_users=600, n_accounts=80):
+    """Users with their activity weight, UID, account, home partition and applications."""
+    rank = rng.permutation(n_users) + 1
+    weight = 1.0 / rank ** 1.1
+    partitions = list(PARTITIONS)
+    shares = np.array([PARTITIONS[p][0] for p in partitions])
+    apps = rng.integers(0, len(APPLICATIONS), (n_users, 3))
+    return {
+        "weight": weight / weight.sum(),
+        "uid": rng.choice(np.arange(10_000, 60_000), n_users, replace=False),
+        "account": rng.integers(0, n_accounts, n_users),
+        "home": rng.choice(len(partitions), n_users, p=shares),
+        "apps": apps,
+        "n_apps": rng.integers(1, 4, n_users),
+    }
+
+
+def _submit_times(rng, n, t0, t1):
+    """n sorted Submit times (epoch seconds) in [t0, t1) following HOURLY and WEEKDAY."""
+    lo, hi = pd.Timestamp(t0).value // 10 ** 9, pd.Timestamp(t1).value // 10 ** 9
+    days = pd.date_range(pd.Timestamp(t0).floor("D"), pd.Timestamp(t1), freq="D")
+    day_w = WEEKDAY[days.dayofweek] / WEEKDAY[days.dayofweek].sum()
+    day_start = days.as_unit("s").asi8
+    t = np.zeros(0, dtype=np.int64)
+    while len(t) < n:  # the first and last day can fall partly outside the window
+        m = n - len(t)
+        draw = day_start[rng.choice(len(days), m, p=day_w)] + rng.choice(24, m, p=HOURLY / HOURLY.sum()) * 3600
+        draw += rng.integers(0, 3600, m)
+        t = np.r_[t, draw[(draw >= lo) & (draw < hi)]]
+    return np.sort(t[:n])
+
+
+def sample_jobs(rng, pop, n, t0, t1, now, first_id=100_000):
+    """
+    n jobs submitted in [t0, t1) as numbers: one row per job with epoch
+    seconds (NaN when the job has not started / ended), cores, memory and
+    indices into the name tables. Formatting is left to sacct_table and
+    legacy_table.
+    """
+    partitions = list(PARTITIONS)
+    user = rng.choice(len(pop["weight"]), n, p=pop["weight"])
+    shares = np.array([PARTITIONS[p][0] for p in partitions])
+    part = np.where(rng.random(n) < 0.7, pop["home"][user], rng.choice(len(partitions), n, p=shares))
+
+    ncpus = np.ones(n, dtype=np.int64)
+    limit_h = np.ones(n)
+    for i, name in enumerate(partitions):
+        rows = np.flatnonzero(part == i)
+        _, cores, weights, limits = PARTITIONS[name]
+        ncpus[rows] = rng.choice(cores, len(rows), p=np.array(weights) / sum(weights))
+        limit_h[rows] = rng.choice(limits, len(rows))
+    nnodes = -(-ncpus // CORES_PER_NODE)
+    limit = (limit_h * 3600).astype(np.int64)
+
+    submit = _submit_times(rng, n, t0, t1)
+    wait = np.minimum(rng.lognormal(5.0, 2.2, n), 14 * 86400).astype(np.int64)
+    wait = np.where(partitions.index("gpu") == part, wait * 3, wait)
+    elapsed = (limit * rng.beta(0.8, 3.0, n)).astype(np.int64) + 1
+
+    state_names = list(STATES)
+    state = rng.choice(len(state_names), n, p=np.array([STATES[s][0] for s in state_names]) /
+                       sum(STATES[s][0] for s in state_names))
+    timeout = state == state_names.index("TIMEOUT")
+    elapsed = np.where(timeout, limit + rng.integers(0, 120, n), elapsed)
+    cancelled = state == state_names.index("CANCELLED")
+    # a third of the cancellations happen in the queue
+    never_started = cancelled & (rng.random(n) < 0.35)
+
+    start = (submit + wait).astype(float)
+    end = start + elapsed
+    recent = submit >= now - OPEN_DAYS * 86400
+    pending = recent & (rng.random(n) < 0.15) | (start >= now)
+    running = ~pending & (end >= now)
+    start[never_started | pending] = np.nan
+    end[pending] = np.nan
+    end[never_started] = (submit + np.minimum(wait, 3600))[never_started]
+    end[running] = np.nan
+    elapsed = np.where(never_started | pending, 0, np.where(running, now - submit - wait, elapsed))
+    state = np.where(pending, -1, np.where(running, -2, state))
+
+    app_slot = rng.integers(0, 3, n) % pop["n_apps"][user]
+    app = pop["apps"][user, app_slot]
+    efficiency = rng.beta(*np.array(list(APPLICATIONS.values())).T[:, app])
+
+    per_core = rng.random(n) < 0.5
+    mem_choice = np.where(per_core, rng.choice(len(MEM_PER_CORE_MB), n, p=MEM_PER_CORE_SHARE),
+                          rng.choice(len(MEM_PER_NODE_GB), n, p=MEM_PER_NODE_SHARE))
+    mem_choice = np.where(part == partitions.index("bigmem"), len(MEM_PER_NODE_GB) - 1, mem_choice)
+    per_core &= part != partitions.index("bigmem")
+    req_mb = np.where(per_core, np.take(MEM_PER_CORE_MB, mem_choice.clip(0, len(MEM_PER_CORE_MB) - 1)) * ncpus,
+                      np.take(MEM_PER_NODE_GB, mem_choice) * 1024 * nnodes)
+    oom = state == state_names.index("OUT_OF_MEMORY")
+    used = np.where(oom, 1.0, np.clip(rng.lognormal(np.log(0.25), 0.9, n), 0.001, 1.0))
+    maxrss_kb = np.where(np.isnan(start), 0, req_mb * 1024 / nnodes * used).astype(np.int64)
+
+    return pd.DataFrame({
+        "jobid": first_id + np.arange(n),
+        "array_task": np.where(rng.random(n) < 0.08, rng.integers(0, 100, n), -1),
+        "user": user,
+        "uid": pop["uid"][user],
+        "account": pop["account"][user],
+        "partition": part,
+        "app": app,
+        "name_suffix": np.where(rng.random(n) < 0.5, rng.integers(0, NAME_SUFFIXES, n), -1),
+        "submit": submit,
+        "start": start,
+        "end": end,
+        "elapsed": elapsed,
+        "limit": limit,
+        "ncpus": ncpus,
+        "nnodes": nnodes,
+        "ntasks": np.where(efficiency > 0.6, ncpus, 1),
+        "efficiency": efficiency,
+        "mem_per_core": per_core,
+        "mem_choice": mem_choice,
+        "req_mb": req_mb,
+        "maxrss_kb": maxrss_kb,
+        "disk_read_mb": np.where(np.isnan(start), 0, rng.lognormal(3, 2.5, n)),
+        "disk_write_mb": np.where(np.isnan(start), 0, rng.lognormal(2, 2.5, n)),
+        "state": state,
+        "exit_pick": rng.integers(0, 5, n),
+    })
+
+
+def _text(values):
+    return pa.array(values).cast(pa.string())
+
+
+def _join(*parts):
+    return pc.binary_join_element_wise(*parts, "")
+
+
+def _pick(options, index):
+    """options[index] as an Arrow string array (a dictionary take, no per-row Python)."""
+    return pa.DictionaryArray.from_arrays(pa.array(index, pa.int32()), pa.array(options)).cast(pa.string())
+
+
+def _times(seconds, sep, missing):
+    """Epoch seconds -> 'YYYY-MM-DD<sep>HH:MM:SS'; dates are formatted once per day."""
+    seconds = np.asarray(seconds, dtype=float)
+    valid = ~np.isnan(seconds)
+    day, time_of_day = np.divmod(np.where(valid, seconds, 0).astype(np.int64), 86400)
+    days, codes = np.unique(day, return_inverse=True)
+    dates = pd.to_datetime(days, unit="D").strftime("%Y-%m-%d")
+    text = _join(_pick(list(dates), codes), pa.scalar(sep), _duration(time_of_day))
+    return pc.if_else(pa.array(valid), text, pa.scalar(missing))
+
+
+def _duration(seconds):
+    return pa.array(seconds_to_slurm_str_series(seconds).to_numpy(dtype=object), pa.string())
+
+
+def _job_names(jobs):
+    names = np.array(list(APPLICATIONS))
+    suffixed = [f"{a}_{i:04d}" for a in names for i in range(NAME_SUFFIXES)]
+    index = np.where(jobs["name_suffix"] >= 0, len(names) + jobs["app"] * NAME_SUFFIXES + jobs["name_suffix"],
+                     jobs["app"])
+    return _pick(list(names) + suffixed, index)
+
+
+def _state_names(jobs, cancelled_by):
+    names = list(STATES) + ["RUNNING", "PENDING"]
+    state = _pick(names, np.asarray(jobs["state"]) % len(names))
+    if not cancelled_by:
+        return state
+    cancelled = pa.array(jobs["state"] == list(STATES).index("CANCELLED"))
+    return pc.if_else(cancelled, _join(pa.scalar("CANCELLED by "), _text(jobs["uid"])), state)
+
+
+def sacct_table(jobs):
+    """Raw `sacct -P` columns (SACCT_COLS) of sampled jobs, all strings."""
+    jobid = _text(jobs["jobid"])
+    task = jobs["array_task"].to_numpy()
+    jobid = pc.if_else(pa.array(task >= 0), _join(jobid, pa.scalar("_"), _text(np.maximum(task, 0))), jobid)
+
+    elapsed = jobs["elapsed"].to_numpy()
+    cpu_seconds = elapsed * jobs["ncpus"].to_numpy()
+    total_cpu = (cpu_seconds * jobs["efficiency"].to_numpy()).astype(np.int64)
+    mem = pc.if_else(
+        pa.array(jobs["mem_per_core"]),
+        _join(_pick([str(m) for m in MEM_PER_CORE_MB], jobs["mem_choice"].clip(0, len(MEM_PER_CORE_MB) - 1)),
+              pa.scalar("Mc")),
+        _join(_pick([str(m) for m in MEM_PER_NODE_GB], jobs["mem_choice"]), pa.scalar("Gn")),
+    )
+    maxrss = jobs["maxrss_kb"].to_numpy()
+    ave_rss = (maxrss * 0.7).astype(np.int64)
+    read_kb = (jobs["disk_read_mb"].to_numpy() * 1024).astype(np.int64)
+    write_kb = (jobs["disk_write_mb"].to_numpy() * 1024).astype(np.int64)
+    # ExitCode: one of (up to) 5 codes per state, RUNNING/PENDING last
+    exits = [codes for _, codes in STATES.values()] + [["0:0"], ["0:0"]]
+    exit_options = [codes[min(k, len(codes) - 1)] for codes in exits for k in range(5)]
+    exit_index = np.asarray(jobs["state"]) % len(exits) * 5 + jobs["exit_pick"].to_numpy()
+
+    columns = {
+        "JobID": jobid,
+        "JobName": _job_names(jobs),
+        "UID": _text(jobs["uid"]),
+        "Partition": _pick(list(PARTITIONS), jobs["partition"]),
+        "Account": _join(pa.scalar("acct"), _text(jobs["account"])),
+        "Submit": _times(jobs["submit"], "T", "Unknown"),
+        "Start": _times(jobs["start"], "T", "Unknown"),
+        "End": _times(jobs["end"], "T", "Unknown"),
+        "Elapsed": _duration(elapsed),
+        "UserCPU": _duration((total_cpu * 0.95).astype(np.int64)),
+        "SystemCPU": _duration((total_cpu * 0.05).astype(np.int64)),
+        "TotalCPU": _duration(total_cpu),
+        "CPUTime": _duration(cpu_seconds),
+        "NCPUS": _text(jobs["ncpus"]),
+        "ReqMem": mem,
+        "AveRSS": _join(_text(ave_rss), pa.scalar("K")),
+        "MaxRSS": _join(_text(maxrss), pa.scalar("K")),
+        "AveDiskRead": _join(_text(read_kb * 4 // 5), pa.scalar("K")),
+        "MaxDiskRead": _join(_text(read_kb), pa.scalar("K")),
+        "AveDiskWrite": _join(_text(write_kb * 4 // 5), pa.scalar("K")),
+        "MaxDiskWrite": _join(_text(write_kb), pa.scalar("K")),
+        "AvePages": pa.array(np.full(len(jobs), "0")),
+        "MaxPages": pa.array(np.full(len(jobs), "0")),
+        "State": _state_names(jobs, cancelled_by=True),
+        "ExitCode": _pick(exit_options, exit_index),
+        "NNodes": _text(jobs["nnodes"]),
+        "NTasks": _text(jobs["ntasks"]),
+        "TimeLimit": _duration(jobs["limit"].to_numpy()),
+    }
+    return pa.table({c: columns[c] for c in SACCT_COLS})
+
+
+def legacy_table(jobs):
+    """Columns of the legacy jobs_table export of sampled jobs (codes and TRES ids)."""
+    names = {v: k for k, v in LEGACY_COLUMNS.items()}
+    # the legacy table predates OUT_OF_MEMORY: those jobs were recorded as FAILED
+    states = [LEGACY_STATE_CODES.get(s, LEGACY_STATE_CODES["FAILED"]) for s in STATES]
+    states += [LEGACY_STATE_CODES["RUNNING"], LEGACY_STATE_CODES["PENDING"]]
+    state = np.take(states, np.asarray(jobs["state"]) % len(states))
+    tres = _join(pa.scalar("1="), _text(jobs["ncpus"]), pa.scalar(",2="), _text(jobs["req_mb"].astype(np.int64)),
+                 pa.scalar(",4="), _text(jobs["nnodes"]))
+    return pa.table({
+        names["JobID"]: pa.array(jobs["jobid"]),
+        names["JobName"]: _job_names(jobs),
+        names["UID"]: pa.array(jobs["uid"]),
+        names["Partition"]: _pick(list(PARTITIONS), jobs["partition"]),
+        names["Account"]: _join(pa.scalar("acct"), _text(jobs["account"])),
+        names["Submit"]: _times(jobs["submit"], " ", ""),
+        names["Start"]: _times(jobs["start"], " ", ""),
+        names["End"]: _times(jobs["end"], " ", ""),
+        names["TimeLimit"]: pa.array(jobs["limit"] // 60),
+        names["State"]: pa.array(state),
+        names["ExitCode"]: pa.array(np.where(state == LEGACY_STATE_CODES["COMPLETED"], 0, 1)),
+        "tres_alloc": tres,
+    })
+
+
+def _chunks(rows, chunk_rows, t0, t1):
+    """(rows, window start, window end) of consecutive time windows."""
+    n_chunks = max(1, -(-rows // chunk_rows))
+    edges = pd.date_range(t0, t1, periods=n_chunks + 1)
+    sizes = np.diff(np.linspace(0, rows, n_chunks + 1).astype(np.int64))
+    return list(zip(sizes, edges[:-1], edges[1:]))
+
+
+def write_jobs(path_of, table_of, rows, pop, rng, t0, t1, chunk_rows, options, first_id=100_000):
+    """
+    Generate `rows` jobs in chunks and write them; `path_of(frame)` gives
+    one output path per row (a constant or the month), `table_of` formats,
+    `options` are the pyarrow CSV WriteOptions. Returns the paths written.
+    """
+    writers, next_id = {}, first_id
+    now = pd.Timestamp(t1).value // 10 ** 9
+    try:
+        for n, lo, hi in _chunks(rows, chunk_rows, t0, t1):
+            jobs = sample_jobs(rng, pop, int(n), lo, hi, now, next_id)
+            next_id += int(n)
+            table = table_of(jobs)
+            paths = path_of(jobs)
+            for path in pd.unique(paths):
+                part = table.filter(pa.array(paths == path)) if len(set(paths)) > 1 else table
+                if path not in writers:
+                    writers[path] = pacsv.CSVWriter(path, table.schema, write_options=options)
+                writers[path].write_table(part)
+            logging.info(f"  {next_id - first_id:,} / {rows:,} jobs")
+    finally:
+        for writer in writers.values():
+            writer.close()
+    return sorted(writers)
+
+
+def write_synthetic(out_dir, rows, legacy_rows=None, users=600, accounts=80, start="2021-07-01",
+                    end="2025-06-30", seed=0, monthly=False, chunk_rows=CHUNK_ROWS):
+    """Write the synthetic exports (see module docstring) to `out_dir`; returns their paths."""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    pop = make_population(rng, users, accounts)
+    legacy_rows = rows // 5 if legacy_rows is None else legacy_rows
+
+    if monthly:
+        def path_of(jobs):
+            month = pd.to_datetime(jobs["submit"], unit="s").dt.strftime("%Y-%m").to_numpy()
+            return np.array([str(out_dir / f"sacct_{m}.csv") for m in month], dtype=object)
+    else:
+        def path_of(jobs):
+            return np.full(len(jobs), str(out_dir / "sacct.csv"), dtype=object)
+    # sacct -P quotes nothing; the legacy CSV quotes its text (tres_alloc holds commas)
+    sacct_csv = pacsv.WriteOptions(delimiter=READ_CSV_KW["sep"], quoting_style="none", quoting_header="none")
+    legacy_csv = pacsv.WriteOptions(quoting_header="none")
+    # job ids grow with time: the legacy period comes first
+    paths = write_jobs(path_of, sacct_table, rows, pop, rng, start, end, chunk_rows, sacct_csv,
+                       first_id=100_000 + legacy_rows)
+    if legacy_rows:
+        legacy = str(out_dir / "jobs_table.csv")
+        paths += write_jobs(lambda jobs: np.full(len(jobs), legacy, dtype=object), legacy_table,
+                            legacy_rows, pop, rng, "2018-01-01", start, chunk_rows, legacy_csv)
+    return [Path(p) for p in paths]
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    args = parse_args()
+    paths = write_synthetic(args.out_dir, args.rows, args.legacy_rows, args.users, args.accounts,
+                            args.start, args.end, args.seed, args.monthly, args.chunk_rows)
+    logging.info(f"✅ Wrote {len(paths)} file(s) to {args.out_dir}")
+
+
+if __name__ == "__main__":
+    main()
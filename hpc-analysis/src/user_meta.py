@@ -0,0 +1,109 @@
+# src/user_meta.py
+"""
+UID -> user metadata (application, research topic, institution) lookup.
+
+The dashboard used to attach the SQL metadata with
+`jobs.merge(meta, on="UID", how="left")`, which copies every job column
+into a second frame. `UserMeta` keeps the metadata columnar instead:
+
+    uids                   sorted distinct UIDs; key of a UID = its position
+    offsets                metadata rows of key k: offsets[k]:offsets[k + 1]
+    codes[col], values[col]  one categorical lookup array per attribute
+
+A user may have several metadata rows (one per application); lookups
+follow the left-join semantics of the merge: a job of such a user counts
+once per row, a job of an unknown user once with missing attributes.
+Attributes are gathered only for the rows and columns asked for.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+class UserMeta:
+    """Columnar metadata keyed by UID (see the module docstring)."""
+
+    def __init__(self, meta, uid_col="UID"):
+        uid = pd.to_numeric(meta[uid_col], errors="coerce")
+        known = uid.notna().to_numpy()
+        uid = uid.to_numpy()[known].astype(np.int64)
+        order = np.argsort(uid, kind="stable")
+        meta = meta.iloc[np.flatnonzero(known)[order]]
+        self.uids, first = np.unique(uid[order], return_index=True)
+        self.offsets = np.r_[first, len(order)]
+        self.codes, self.values = {}, {}
+        for col in meta.columns.drop(uid_col):
+            cat = pd.Categorical(meta[col])
+            self.codes[col] = cat.codes.astype(np.int32)
+            self.values[col] = cat.categories
+
+    @property
+    def columns(self):
+        return list(self.codes)
+
+    def keys(self, uids):
+        """Key of each UID (-1 when the user has no metadata); categoricals are looked up per category."""
+        uids = pd.Series(uids, copy=False)
+        if isinstance(uids.dtype, pd.CategoricalDtype):
+            cat_keys = self.keys(uids.cat.categories.to_numpy())
+            codes = uids.cat.codes.to_numpy()
+            return np.where(codes >= 0, cat_keys[codes], -1).astype(np.int32)
+        uids = pd.to_numeric(uids, errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+        valid = ~np.isnan(uids)
+        pos = self.uids.searchsorted(np.where(valid, uids, 0).astype(np.int64))
+        pos = np.minimum(pos, max(len(self.uids) - 1, 0))
+        found = valid & (len(self.uids) > 0)
+        found[found] &= self.uids[pos[found]] == uids[found]
+        return np.where(found, pos, -1).astype(np.int32)
+
+    def rows(self, keys):
+        """
+        Left-join pairs for an array of keys: (position in `keys`, metadata
+        row or -1), one pair per metadata row of each key.
+        """
+        keys = np.asarray(keys)
+        known = keys >= 0
+        begin = np.where(known, self.offsets[np.where(known, keys, 0)], -1)
+        count = np.where(known, self.offsets[np.where(known, keys, 0) + 1] - begin, 1)
+        pos = np.repeat(np.arange(len(keys)), count)
+        within = np.arange(len(pos)) - np.repeat(np.cumsum(count) - count, count)
+        meta_row = np.where(np.repeat(known, count), np.repeat(begin, count) + within, -1)
+        return pos, meta_row
+
+    def gather(self, col, meta_rows):
+        """Categorical of `col` for metadata rows (-1: missing)."""
+        meta_rows = np.asarray(meta_rows)
+        codes = np.where(meta_rows >= 0, self.codes[col][np.maximum(meta_rows, 0)], -1)
+        return pd.Categorical.from_codes(codes, self.values[col])
+
+    def join(self, df, columns=None, uid_col="UID"):
+        """`df.merge(meta[columns], on=uid_col, how="left")` for a (small) frame such as one export chunk."""
+        pos, meta_row = self.rows(self.keys(df[uid_col]))
+        out = df.take(pos).reset_index(drop=True)
+        for col in columns or self.columns:
+            out[col] = self.gather(col, meta_row)
+        return out
+
+    def totals(self, uids, weights, col, fill=None):
+        """
+        Sum of `weights` (one per UID in `uids`) per value of `col`, largest
+        first: e.g. jobs per application from jobs per user. Users without
+        metadata or without a value count under `fill`, or are left out.
+        """
+        pos, meta_row = self.rows(self.keys(uids))
+        codes = np.asarray(self.gather(col, meta_row).codes)
+        weights = np.asarray(weights)
+        w = weights.astype(float)[pos]
+        index = list(self.values[col])
+        if fill is not None:
+            fill_at = index.index(fill) if fill in index else len(index)
+            if fill_at == len(index):
+                index.append(fill)
+            codes = np.where(codes >= 0, codes, fill_at)
+        keep = codes >= 0
+        sums = np.bincount(codes[keep], weights=w[keep], minlength=len(index))
+        if np.issubdtype(weights.dtype, np.integer):
+            sums = sums.round().astype(np.int64)
+        totals = pd.Series(sums, index=pd.Index(index, name=col))
+        seen = np.bincount(codes[keep], minlength=len(index)) > 0
+        return totals[seen].sort_values(ascending=False, kind="stable")
@@ -0,0 +1,172 @@
+# src/wait_times.py
+"""
+Queue wait-time percentiles from mergeable sketches in the rollups.
+
+Next to the daily cube, rollups.py writes a wait sketch table: the jobs
+counted per wait_time_sec bucket of quantile_sketch.py, for every month
+(of Start) and value of the dimensions of one of the WAIT_SKETCHES:
+
+    "size_class"  month × UID × State × Partition × size_class
+    "hour"        month × Partition × hour (of Submit)
+
+    sketch, WAIT_DIMENSIONS..., bucket, jobs     (`day`: first of the month)
+
+The size_class sketch keeps the dashboard's filter dimensions (UID, State,
+Partition); the hour sketch only Partition, so it answers selections
+whose user and state filters leave out no job. The time grain is kept
+coarse on purpose: a sketch row per bucket of every day would hold about
+one job each, i.e. as many rows as the jobs table. Here the rows grow with
+the users and states active in a month, not with the jobs they run.
+
+Selecting the rows of one sketch (`wait_sketch`), filtering them like the
+cube (rollups.select; whole months) and merging the sketches of a grouping
+(a groupby-sum per bucket) gives p50/p90/p99 waits within the sketch
+accuracy of the exact percentiles, without sorting job rows:
+
+    wait_quantiles(wait_sketch(waits, "size_class"), "Partition")
+    wait_quantiles(wait_sketch(waits, "size_class"), "size_class")
+    wait_quantiles(wait_sketch(waits, "size_class"), "month")   month of the day column
+    wait_quantiles(wait_sketch(waits, "hour"), "hour")
+
+Selections the sketches cannot answer (days of a month, users or states
+on the hourly waits) take the exact percentiles of the job rows instead,
+`job_wait_quantiles`, grouped the same way.
+
+Size classes bucket single-node jobs by NCPUS and multi-node jobs by
+NNODES (SIZE_CLASSES). Jobs that never started have no wait and are not
+counted.
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from quantile_sketch import bucket_of, quantiles
+
+# sketch -> its dimensions; the other WAIT_DIMENSIONS are NaN in its rows
+WAIT_SKETCHES = {
+    "size_class": ["day", "UID", "State", "Partition", "size_class"],
+    "hour": ["day", "Partition", "hour"],
+}
+WAIT_DIMENSIONS = ["day", "sketch", "UID", "State", "Partition", "size_class", "hour"]
+SOURCE_COLS = ["Start", "Submit", "UID", "State", "Partition", "NCPUS", "NNODES", "wait_time_sec"]
+QUANTILES = [0.5, 0.9, 0.99]
+
+# single-node jobs by cores, multi-node jobs by nodes
+CORE_BINS = [1, 2, 9, 33, np.inf]
+NODE_BINS = [2, 5, np.inf]
+SIZE_CLASSES = ["1 core", "2–8 cores", "9–32 cores", "33+ cores", "2–4 nodes", "5+ nodes"]
+
+
+def size_class(ncpus, nnodes):
+    """Ordered categorical of SIZE_CLASSES; NaN when NCPUS is unknown."""
+    ncpus = pd.to_numeric(pd.Series(ncpus, copy=False), errors="coerce").astype(float).to_numpy()
+    nnodes = pd.to_numeric(pd.Series(nnodes, copy=False), errors="coerce").astype(float).to_numpy()
+    multi = nnodes > 1
+    by_cores = np.digitize(ncpus, CORE_BINS) - 1          # 0..3, -1 below 1 core
+    by_nodes = np.digitize(nnodes, NODE_BINS) - 1 + len(CORE_BINS) - 1
+    codes = np.where(multi, by_nodes, by_cores)
+    codes = np.where(np.isnan(ncpus) & ~multi, -1, codes)
+    return pd.Categorical.from_codes(codes.clip(-1, len(SIZE_CLASSES) - 1), SIZE_CLASSES, ordered=True)
+
+
+def wait_frame(df):
+    """Sketch rows (WAIT_DIMENSIONS, bucket, jobs) of one jobs frame (SOURCE_COLS)."""
+    bucket = bucket_of(df["wait_time_sec"].astype(float).to_numpy())
+    counted = bucket >= 0
+    month = df["Start"].dt.to_period("M").dt.start_time.astype(df["Start"].dtype)
+    dims = pd.DataFrame({
+        "day": month,
+        "UID": df["UID"].astype(object),
+        "State": df["State"].astype(object),
+        "Partition": df["Partition"].astype(object),
+        "size_class": size_class(df["NCPUS"], df["NNODES"]).astype(object),
+        "hour": pd.to_datetime(df["Submit"]).dt.hour.astype(float),
+        "bucket": bucket,
+        "jobs": np.ones(len(df), dtype=np.int64),
+    }, index=df.index)[counted]
+    frames = [dims[cols + ["bucket", "jobs"]].assign(sketch=name) for name, cols in WAIT_SKETCHES.items()]
+    frame = pd.concat(frames, ignore_index=True)
+    return combine_waits(frame.reindex(columns=WAIT_DIMENSIONS + ["bucket", "jobs"]))
+
+
+def combine_waits(sketch):
+    """Merge sketch rows with equal dimensions and bucket (sum of jobs)."""
+    return (
+        sketch.groupby(WAIT_DIMENSIONS + ["bucket"], observed=True, dropna=False, sort=False)["jobs"]
+        .sum()
+        .reset_index()
+    )
+
+
+def finish_waits(sketch):
+    """Compact dtypes: categorical dimensions, int8 hour, int16 bucket."""
+    sketch["sketch"] = pd.Categorical(sketch["sketch"], list(WAIT_SKETCHES))
+    for col in ("UID", "State", "Partition"):
+        sketch[col] = sketch[col].astype("category")
+    sketch["size_class"] = pd.Categorical(sketch["size_class"], SIZE_CLASSES, ordered=True)
+    sketch["hour"] = sketch["hour"].astype("Int8")
+    sketch["bucket"] = sketch["bucket"].astype(np.int16)
+    return sketch[WAIT_DIMENSIONS + ["bucket", "jobs"]].sort_values("day", ignore_index=True)
+
+
+def wait_path(cube_path):
+    """The wait sketch file written next to the rollup cube `cube_path`."""
+    cube_path = Path(cube_path)
+    return cube_path.with_name(f"{cube_path.stem}_wait{cube_path.suffix}")
+
+
+def load_waits(path):
+    """Wait sketch table as a DataFrame (compact dtypes)."""
+    return finish_waits(pd.read_parquet(path))
+
+
+def wait_sketch(waits, name):
+    """The rows of the sketch `name` (a key of WAIT_SKETCHES) of the wait sketch table."""
+    return waits[(waits["sketch"] == name).to_numpy()]
+
+
+def wait_quantiles(sketch, by, qs=QUANTILES):
+    """
+    jobs and p50/p90/p99 wait (seconds) per value of `by`: sketch column
+    name(s), "month", or a Series aligned with the sketch.
+    """
+    if isinstance(by, str) and by == "month":
+        by = sketch["day"].dt.to_period("M").rename("month")
+    return quantiles(sketch, by, qs)
+
+
+def _job_key(jobs, by):
+    if isinstance(by, pd.Series):
+        return by
+    if by == "month":
+        return jobs["Start"].dt.to_period("M").rename("month")
+    if by == "hour":
+        return pd.to_datetime(jobs["Submit"]).dt.hour.rename("hour")
+    if by == "size_class":
+        return pd.Series(size_class(jobs["NCPUS"], jobs["NNODES"]), index=jobs.index, name="size_class")
+    return jobs[by]
+
+
+def job_wait_quantiles(jobs, by, qs=QUANTILES):
+    """
+    wait_quantiles from job rows (SOURCE_COLS) instead of sketches: the
+    exact percentiles (inverted CDF, what the sketches approximate). by:
+    column name(s), "month", "hour", "size_class", or a Series aligned with
+    `jobs`.
+    """
+    keys = [_job_key(jobs, b) for b in ([by] if isinstance(by, (str, pd.Series)) else by)]
+    names = [k.name for k in keys]
+    frame = pd.DataFrame({n: k.to_numpy() for n, k in zip(names, keys)})
+    frame["wait"] = jobs["wait_time_sec"].astype(float).to_numpy()
+    frame = frame.dropna(subset=["wait"]).sort_values(names + ["wait"], kind="stable")
+    groups = frame.groupby(names, observed=True, sort=True)
+    rank = groups.cumcount().to_numpy()
+    total = groups["wait"].transform("size").to_numpy()
+    out = {"jobs": groups.size()}
+    for q in qs:
+        # the ⌈q·n⌉-th wait of each group
+        nth = frame[rank == np.ceil(q * total).clip(min=1) - 1]
+        out[f"p{q * 100:g}"] = nth.set_index(names)["wait"]
+    return pd.DataFrame(out)
@@ -0,0 +1,6 @@
+import sys
+from pathlib import Path
+
+# The src/ scripts import each other as top-level modules (`from clean_jobs import ...`), and so do
+# the tests: one copy of each module, under pytest and `python -m unittest` alike
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
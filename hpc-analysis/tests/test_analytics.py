@@ -0,0 +1,64 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from analytics import group_metrics, recommendations, user_metrics
+from rollups import rollup_frame
+
+class TestAnalytics(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        n = 3000
+        uid = rng.choice([1001, 1002, 1003, 1004], n)
+        elapsed = rng.integers(60, 36000, n).astype(float)
+        ncpus = rng.choice([1, 8, 32], n)
+        eff = np.where(uid == 1002, 0.1, rng.uniform(0.6, 1.0, n))
+        req = rng.choice([4000.0, 16000.0, np.nan], n)
+        rss = np.where(uid == 1003, req / 8, req * 0.9)
+        rss[rng.random(n) < 0.2] = np.nan
+        state = np.where((uid == 1004) & (rng.random(n) < 0.6), "FAILED", "COMPLETED")
+        self.df = pd.DataFrame({
+            "Start": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 60 * 86400, n), unit="s"),
+            "UID": pd.Categorical(uid),
+            "Partition": pd.Categorical(rng.choice(["defq", "gpu"], n)),
+            "State": pd.Categorical(state),
+            "JobName_Grouped": pd.Categorical(rng.choice(["bash", "qe"], n)),
+            "Elapsed_sec": elapsed,
+            "core_seconds": elapsed * ncpus,
+            "CPUTime_sec": elapsed * ncpus * eff,
+            "efficiency": eff,
+            "ReqMem_MB": req,
+            "MaxRSS_MB": rss,
+        })
+        self.cube = rollup_frame(self.df)
+
+    def test_metrics_match_raw_groupby(self):
+        got = user_metrics(self.cube)
+        g = self.df.groupby("UID", observed=True)
+        # what the dashboard computed with one Python call per user
+        eff = g.apply(lambda d: np.nanmean(d["CPUTime_sec"] / d["core_seconds"]), include_groups=False)
+        np.testing.assert_allclose(got.loc[eff.index, "efficiency"], eff)
+        failed = self.df["State"] == "FAILED"
+        np.testing.assert_allclose(got.loc[eff.index, "failure_rate"], g["State"].apply(lambda s: (s == "FAILED").mean()))
+        idle = (self.df["core_seconds"] - self.df["CPUTime_sec"]).where(~failed, self.df["core_seconds"])
+        np.testing.assert_allclose(got.loc[eff.index, "wasted_core_hours"],
+                                   idle.groupby(self.df["UID"], observed=True).sum() / 3600)
+        both = self.df.dropna(subset=["ReqMem_MB", "MaxRSS_MB"]).groupby("UID", observed=True)
+        np.testing.assert_allclose(got.loc[eff.index, "mem_overrequest"],
+                                   both["ReqMem_MB"].sum() / both["MaxRSS_MB"].sum())
+        parts = group_metrics(self.cube, "Partition")
+        self.assertEqual(int(parts["jobs"].sum()), len(self.df))
+
+    def test_recommendations_flag_and_rank(self):
+        rec = recommendations(user_metrics(self.cube), scope="user")
+        flagged = {(r.key, r.issue) for r in rec.itertuples()}
+        self.assertEqual(flagged, {(1002, "low_efficiency"), (1003, "memory_overrequest"),
+                                   (1004, "high_failure_rate")})
+        self.assertTrue(rec["share"].is_monotonic_decreasing)
+        self.assertTrue(rec["message"].str.len().gt(0).all())
+        strict = recommendations(user_metrics(self.cube), "user", thresholds={"min_jobs": 10_000})
+        self.assertTrue(strict.empty)
+
+if __name__ == "__main__":
+    unittest.main()
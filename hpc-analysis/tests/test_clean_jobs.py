@@ -1,6 +1,10 @@
 import unittest
 import numpy as np
-from src.clean_jobs import parse_hms_or_dhms, parse_reqmem
+import pandas as pd
+from clean_jobs import (
+    parse_hms_or_dhms, parse_hms_or_dhms_series, parse_reqmem,
+    seconds_to_slurm_str, seconds_to_slurm_str_series,
+)
 
 class TestCleanJobs(unittest.TestCase):
     def test_parse_hms_or_dhms(self):
@@ -9,6 +13,27 @@ class TestCleanJobs(unittest.TestCase):
         self.assertTrue(np.isnan(parse_hms_or_dhms("")))
         self.assertTrue(np.isnan(parse_hms_or_dhms(None)))
         self.assertTrue(np.isnan(parse_hms_or_dhms("not-a-time")))
+        self.assertEqual(parse_hms_or_dhms("05:30.250"), 330.25)
+        self.assertTrue(np.isnan(parse_hms_or_dhms("UNLIMITED")))
+
+    def test_parse_hms_or_dhms_series_matches_scalar(self):
+        values = pd.Series([
+            "01:02:03", "2-00:00:00", "10-23:59:59", "05:30.250", "00:00",
+            "", None, np.nan, "UNLIMITED", "not-a-time", "2-05:30", "01:02:03",
+        ])
+        expected = values.map(parse_hms_or_dhms)
+        pd.testing.assert_series_equal(parse_hms_or_dhms_series(values), expected)
+        pd.testing.assert_series_equal(
+            parse_hms_or_dhms_series(values.astype("string")), expected
+        )
+        self.assertEqual(len(parse_hms_or_dhms_series(pd.Series([], dtype=object))), 0)
+
+    def test_seconds_to_slurm_str_series_matches_scalar(self):
+        values = pd.Series([0, 59, 3723, 86399, 86400, 172800.7, 900000, np.nan, 3723])
+        expected = values.map(seconds_to_slurm_str)
+        result = seconds_to_slurm_str_series(values)
+        self.assertEqual(result.tolist(), expected.tolist())
+        self.assertEqual(result.tolist()[5], "2-00:00:00")
 
     def test_parse_reqmem(self):
         self.assertEqual(parse_reqmem("4Gn", nnodes=2, ncpus=1), 8192)
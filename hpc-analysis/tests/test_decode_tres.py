@@ -0,0 +1,60 @@
+import unittest
+import numpy as np
+import pandas as pd
+from decode_tres import decode_reqmem, decode_size_bytes, decode_tres
+from convert_jobs2018_2021 import parse_tres_alloc
+
+class TestDecodeReqMem(unittest.TestCase):
+    def test_decode_reqmem_columns(self):
+        out = decode_reqmem(
+            pd.Series(["4Gn", "4000M", "2Gc", "8K", "", None, "bad", "1Tn", "0", "4Gn"]),
+            nnodes=pd.Series([2, 1, 1, 1, 1, 1, 1, np.nan, 1, 3]),
+            ncpus=pd.Series([1, 1, 4, 1, 1, 1, 1, 1, 1, 1]),
+        )
+        self.assertEqual(out["ReqMem_scope"].tolist()[:3], ["n", "", "c"])
+        self.assertEqual(out["ReqMem_unit"].tolist()[:4], ["G", "M", "G", "K"])
+        mb = out["ReqMem_MB"].tolist()
+        self.assertEqual(mb[:3], [8192, 4000, 8192])
+        self.assertAlmostEqual(mb[3], 8 / 1024)
+        self.assertTrue(np.isnan(mb[4:7]).all())
+        self.assertEqual(mb[7], 1024 ** 2)  # missing NNODES scales by 1
+        self.assertTrue(np.isnan(mb[8]))
+        self.assertEqual(mb[9], 3 * 4096)
+
+    def test_decode_reqmem_without_counts(self):
+        out = decode_reqmem(["16G", "100Mc"])
+        self.assertEqual(out["ReqMem_MB"].tolist(), [16384, 100])
+
+    def test_decode_size_bytes(self):
+        out = decode_size_bytes(pd.Series(["2536K", "1.5G", "0", "512", "0.04M", "", None, "n/a", "2536K"]))
+        self.assertEqual(out.tolist()[:4], [2536 * 1024, 1.5 * 1024 ** 3, 0, 512])
+        self.assertAlmostEqual(out[4], 0.04 * 1024 ** 2)
+        self.assertTrue(out[5:8].isna().all())
+        self.assertEqual(out[8], out[0])
+
+class TestDecodeTres(unittest.TestCase):
+    def test_numeric_ids(self):
+        out = decode_tres(pd.Series(["1=16,2=64000,4=3,5=16,1001=2", "1=1,4=1", "", None]))
+        self.assertEqual(out.loc[0].tolist(), [16, 64000, 3, 2, 16])
+        self.assertEqual(out.loc[1, "tres_cpu"], 1)
+        self.assertTrue(np.isnan(out.loc[1, "tres_gpu"]))
+        self.assertTrue(out.loc[2:].isna().all().all())
+
+    def test_named_tres(self):
+        out = decode_tres([
+            "cpu=32,mem=128G,node=2,billing=32,gres/gpu:a100=2,gres/gpu:v100=1",
+            # sacct AllocTRES: the untyped total next to the typed counts
+            "cpu=8,gres/gpu=1,gres/gpu:a100=1",
+            "cpu=8,gres/gpu:a100=1,gres/gpu=1",
+            "cpu=8,1001=2,gres/gpu:a100=2",
+        ])
+        self.assertEqual(out.loc[0].tolist(), [32, 131072, 2, 3, 32])
+        self.assertEqual(out["tres_gpu"].tolist()[1:], [1, 1, 2])
+
+    def test_parse_tres_alloc_wrapper(self):
+        self.assertEqual(parse_tres_alloc("1=16,4=3"), (16, 3))
+        ncpus, nnodes = parse_tres_alloc("")
+        self.assertTrue(np.isnan(ncpus) and np.isnan(nnodes))
+
+if __name__ == "__main__":
+    unittest.main()
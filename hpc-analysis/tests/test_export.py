@@ -0,0 +1,62 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from export import ExportCache, export_key, iter_chunks, write_export
+
+class TestExport(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = Path(self._tmp.name)
+        n = 250
+        self.df = pd.DataFrame({
+            "JobID": np.arange(n),
+            "UID": pd.Categorical(np.resize([1001, 1002, 1003], n)),
+            "State": pd.Categorical(np.resize(["COMPLETED", "FAILED", None], n)),
+            "Start": pd.date_range("2024-01-01", periods=n, freq="h"),
+            "efficiency": np.linspace(0, 1, n),
+        })
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_formats_roundtrip(self):
+        for fmt, read in [("csv", pd.read_csv), ("csv.gz", pd.read_csv), ("parquet", pd.read_parquet)]:
+            with self.subTest(fmt=fmt):
+                path = self.tmp / f"out.{fmt}"
+                self.assertEqual(write_export(iter_chunks(self.df, rows=60), path, fmt), len(self.df))
+                back = read(path)
+                self.assertEqual(list(back.columns), list(self.df.columns))
+                self.assertEqual(back["JobID"].tolist(), self.df["JobID"].tolist())
+                self.assertEqual(back["State"].astype(object).fillna("-").tolist(),
+                                 self.df["State"].astype(object).fillna("-").tolist())
+        header_only = self.tmp / "empty.csv"
+        write_export(iter_chunks(self.df.head(0)), header_only, "csv")
+        self.assertEqual(header_only.read_text().strip(), ",".join(self.df.columns))
+        with self.assertRaises(ValueError):
+            write_export([], self.tmp / "x", "xlsx")
+
+    def test_cache_builds_once_and_evicts(self):
+        cache = ExportCache(self.tmp / "cache", max_files=2)
+        built = []
+
+        def chunks(tag):
+            built.append(tag)
+            return iter_chunks(self.df, rows=100)
+
+        key = export_key(start=pd.Timestamp("2024-01-01").date(), filters={"UID": [1001]}, fmt="csv")
+        self.assertEqual(key, export_key(fmt="csv", filters={"UID": [1001]}, start="2024-01-01"))
+        first = cache.get(key, "csv", lambda: chunks("a"))
+        self.assertEqual(cache.get(key, "csv", lambda: chunks("b")), first)
+        self.assertEqual(built, ["a"])
+
+        for i in range(3):
+            cache.get(export_key(i=i), "parquet", lambda: chunks(i))
+        self.assertEqual(len(list((self.tmp / "cache").iterdir())), 2)
+        self.assertFalse(first.exists())
+
+if __name__ == "__main__":
+    unittest.main()
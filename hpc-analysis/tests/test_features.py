@@ -0,0 +1,84 @@
+import re
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from features import FEATURE_COLS, add_features, jobname_grouped, partition_main, state_clean
+
+# the per-row versions the dashboard used to run on every rerun
+def normalize_state(state):
+    if isinstance(state, str) and re.match(r"CANCELLED by \d+", state):
+        return "CANCELLED"
+    return state
+
+def group_jobname(name):
+    if isinstance(name, str):
+        name_lower = name.lower()
+        if name_lower.startswith("jupyter"):
+            return "jupyter"
+        elif name_lower.startswith("bash"):
+            return "bash"
+        elif name_lower.startswith("test"):
+            return "test"
+        elif name_lower.startswith("qe"):
+            return "qe"
+        elif name_lower in {"stream", "linpack", "osu", "iozone"}:
+            return name_lower
+        elif len(name) < 4:
+            return "short_code"
+        else:
+            return "other"
+    return "unknown"
+
+class TestFeatures(unittest.TestCase):
+    def test_labels_match_row_functions(self):
+        names = pd.Series(["Jupyter-lab", "bash", "TEST_1", "qe.x", "OSU", "abc", "lammps_run", None, "ab"])
+        self.assertEqual(jobname_grouped(names).tolist(), [group_jobname(n) for n in names])
+        self.assertEqual(jobname_grouped(names.astype("category")).tolist(), [group_jobname(n) for n in names])
+
+        states = pd.Series(["COMPLETED", "CANCELLED by 1001", "CANCELLED", None, "FAILED"])
+        got = state_clean(states)
+        self.assertIsInstance(got.dtype, pd.CategoricalDtype)
+        self.assertEqual(got.astype(object).fillna("-").tolist(),
+                         [normalize_state(s) for s in states.fillna("-")])
+
+        parts = pd.Series(["gpu,defq", " defq ", None]).astype("category")
+        self.assertEqual(partition_main(parts).tolist()[:2], ["gpu", "defq"])
+        self.assertTrue(pd.isna(partition_main(parts).iloc[2]))
+
+    def test_add_features(self):
+        df = pd.DataFrame({
+            "Submit": pd.to_datetime(["2024-01-01 00:00", "2024-01-01 00:00"]),
+            "Start": pd.to_datetime(["2024-01-01 00:10", pd.NaT]),
+            "Elapsed": pd.Series(["1-00:00:10", "00:00:00"]).astype("category"),
+            "CPUTime": ["2-00:00:20", "00:00:00"],
+            "NCPUS": [4.0, 1.0],
+            "NNODES": [2.0, 1.0],
+            "ReqMem": ["4000Mn", "2Gc"],
+            "State": ["COMPLETED", "CANCELLED by 5"],
+            "Partition": ["gpu,defq", "defq"],
+            "JobName": ["bash", "qe"],
+            "MaxRSS": ["2048K", "1.5G"],
+            "AveDiskRead": ["0.50M", "0"],
+        })
+        add_features(df)
+        self.assertTrue(set(FEATURE_COLS) <= set(df.columns))
+        self.assertEqual(df.loc[0, "wait_time_sec"], 600)
+        self.assertEqual(df.loc[0, "Elapsed_sec"], 86410)  # the D- prefix counts
+        self.assertEqual(df.loc[0, "ReqMem_MB"], 8000)
+        self.assertAlmostEqual(df.loc[0, "efficiency"], 0.5)
+        self.assertEqual(df["MaxRSS_bytes"].tolist(), [2 * 1024 ** 2, 1.5 * 1024 ** 3])
+        self.assertEqual(df["MaxRSS_MB"].tolist(), [2, 1536])
+        self.assertEqual(df["AveDiskRead_bytes"].tolist(), [512 * 1024, 0])
+        self.assertTrue(df["MaxDiskWrite_bytes"].isna().all())
+        self.assertTrue(np.isnan(df.loc[1, "core_seconds"]))
+        self.assertEqual(df["State_Clean"].tolist(), ["COMPLETED", "CANCELLED"])
+
+    def test_missing_inputs_give_nan(self):
+        df = add_features(pd.DataFrame({"Start": pd.to_datetime(["2024-01-01"]), "State": ["FAILED"]}))
+        self.assertTrue(df[["wait_time_sec", "Elapsed_sec", "ReqMem_MB", "efficiency"]].isna().all(axis=None))
+        self.assertEqual(df.loc[0, "JobName_Grouped"], "unknown")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from filter_index import FilterIndex
+
+class TestFilterIndex(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        n = 5000
+        start = pd.Timestamp("2024-01-01") + pd.to_timedelta(np.sort(rng.integers(0, 90 * 86400, n)), unit="s")
+        self.df = pd.DataFrame({
+            "Start": pd.Series(start).where(rng.random(n) > 0.05).sort_values(na_position="last",
+                                                                            ignore_index=True),
+            "Partition": pd.Categorical(rng.choice(["defq", "gpu", "shortq", None], n, p=[.6, .2, .15, .05])),
+            "UID": pd.Categorical(rng.integers(1000, 1050, n)),
+            "State": rng.choice(["COMPLETED", "FAILED", "TIMEOUT"], n),  # not a categorical
+        })
+        self.index = FilterIndex(self.df)
+
+    def expected(self, start=None, end=None, **values):
+        mask = pd.Series(True, index=self.df.index)
+        if start is not None:
+            mask &= self.df["Start"] >= start
+        if end is not None:
+            mask &= self.df["Start"] < pd.Timestamp(end) + pd.Timedelta(days=1)
+        if start is None and end is None:
+            mask &= self.df["Start"].notna()
+        for col, allowed in values.items():
+            mask &= self.df[col].isin(allowed)
+        return np.flatnonzero(mask)
+
+    def test_matches_isin_masks(self):
+        cases = [
+            {},
+            dict(Partition=["gpu"]),
+            dict(Partition=["defq", "gpu", "shortq"]),  # all but the missing rows
+            dict(Partition=["defq", "gpu"], UID=[1001, 1002, 1040], State=["FAILED"]),
+            dict(UID=list(range(1000, 1045)), State=["COMPLETED", "TIMEOUT"]),
+            dict(Partition=["nope"]),
+            dict(Partition=[]),
+        ]
+        for values in cases:
+            for start, end in [(None, None), ("2024-02-01", "2024-02-10"), ("2024-03-30", None)]:
+                with self.subTest(values=values, start=start, end=end):
+                    got = self.index.select(start, end, **values)
+                    np.testing.assert_array_equal(got, self.expected(start, end, **values))
+
+    def test_value_rows_and_errors(self):
+        rows = self.index.value_rows("UID", [1003, 1007])
+        np.testing.assert_array_equal(rows, np.flatnonzero(self.df["UID"].isin([1003, 1007])))
+        self.assertIsNone(self.index._mask("UID", list(range(1000, 1050)), 0, len(self.df)))
+        with self.assertRaises(KeyError):
+            self.index.select(JobName=["bash"])
+        with self.assertRaises(ValueError):
+            FilterIndex(self.df.iloc[::-1])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+import pandas as pd
+
+from incremental import ingest_increment
+from jobs_dataset import dataset_version, read_jobs, temp_path, write_partitioned
+from tests.test_make_dataset import write_raw_sacct
+
+class TestIncremental(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = Path(self._tmp.name)
+        self.out = self.tmp / "jobs"
+        full = write_raw_sacct(self.tmp / "all.csv", n=60)
+        full = full.sort_values("End").reset_index(drop=True)
+        full = full[full["End"] != "Unknown"].reset_index(drop=True)
+        self.full = full
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def pull(self, name, df):
+        df.to_csv(self.tmp / name, sep="|", index=False)
+        return ingest_increment(self.tmp / name, self.out)
+
+    def test_only_new_rows_and_open_jobs_are_replaced(self):
+        day1 = self.full.iloc[:30].copy()
+        running = self.full.iloc[30].copy()
+        running["End"], running["State"] = "Unknown", "RUNNING"
+        day1 = pd.concat([day1, running.to_frame().T])
+        s1 = self.pull("day1.csv", day1)
+        self.assertEqual(s1["rows_written"], 31)
+        self.assertEqual(s1["open_jobs"], 1)
+
+        # overlapping second pull: 10 old rows again, the running job finished
+        s2 = self.pull("day2.csv", self.full.iloc[20:])
+        self.assertEqual(s2["rows_written"], len(self.full) - 30)
+        self.assertEqual(s2["jobs_updated"], 1)
+        self.assertEqual(s2["open_jobs"], 0)
+
+        df = read_jobs(self.out)
+        self.assertEqual(len(df), len(self.full))
+        self.assertFalse(df["JobID"].duplicated().any())
+        done = df.set_index("JobID").loc[int(running["JobID"])]
+        self.assertNotEqual(done["State"], "RUNNING")
+        self.assertTrue(pd.notna(done["End"]))
+
+        # a rewrite interrupted before its rename leaves a temp file that is not data
+        version = dataset_version(self.out)
+        part = next(self.out.rglob("*.parquet"))
+        temp_path(part).write_bytes(part.read_bytes())
+        self.assertEqual(len(read_jobs(self.out)), len(self.full))
+        self.assertEqual(dataset_version(self.out), version)
+        temp_path(part).unlink()
+
+        state = json.loads((self.out / "_ingest_state.json").read_text())
+        self.assertEqual(pd.Timestamp(state["last_end"]), df["End"].max())
+
+        # re-running the same pull is a no-op
+        s3 = self.pull("day2.csv", self.full.iloc[20:])
+        self.assertEqual(s3["rows_written"], 0)
+        self.assertIsNone(s3["part"])
+        self.assertEqual(len(read_jobs(self.out)), len(self.full))
+
+    def test_bootstrap_from_existing_dataset(self):
+        from src.make_dataset import build_dataset
+        self.full.iloc[:40].to_csv(self.tmp / "hist.csv", sep="|", index=False)
+        build_dataset(self.tmp / "hist.csv", self.tmp / "hist.parquet")
+        write_partitioned(pd.read_parquet(self.tmp / "hist.parquet"), self.out, overwrite=True)
+
+        s = self.pull("day.csv", self.full.iloc[35:])
+        self.assertEqual(s["rows_written"], len(self.full) - 40)
+        df = read_jobs(self.out)
+        self.assertEqual(len(df), len(self.full))
+        self.assertFalse(df["JobID"].duplicated().any())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import json
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+import instrument
+from instrument import records, stage, timed, timed_iter, write_trace
+from make_dataset import build_dataset
+from tests.test_make_dataset import write_raw_sacct
+
+class TestInstrument(unittest.TestCase):
+    def setUp(self):
+        instrument.clear()
+        instrument.enable()
+
+    def tearDown(self):
+        instrument.disable()
+        instrument.clear()
+
+    def test_disabled_records_nothing(self):
+        instrument.disable()
+        calls = []
+        f = timed("f", rows=len)(lambda n: calls.append(n) or [0] * n)
+        with stage("outer") as s:
+            s.rows = 5
+            self.assertEqual(f(3), [0, 0, 0])
+        self.assertEqual(list(timed_iter("it", [1, 2])), [1, 2])
+        self.assertEqual(calls, [3])
+        self.assertEqual(records(), [])
+
+    def test_nested_stages_and_peak_rss(self):
+        @timed("inner", rows=len)
+        def allocate(mb):
+            block = np.ones(mb * 2**20 // 8)
+            return block[:10]
+
+        mark = instrument.mark()
+        with stage("outer") as s:
+            allocate(200)
+            s.rows = 1000
+        inner, outer = records(since=mark)
+        self.assertEqual((inner["name"], inner["parent"], inner["rows"]), ("inner", "outer", 10))
+        self.assertEqual((outer["name"], outer["parent"], outer["rows"]), ("outer", None, 1000))
+        self.assertGreater(outer["wall_s"], 0)
+        self.assertAlmostEqual(outer["rows_per_s"], 1000 / outer["wall_s"])
+        # the 200 MB freed inside are still in both peaks
+        self.assertGreaterEqual(outer["peak_rss_mb"], inner["peak_rss_mb"])
+        self.assertGreater(inner["peak_rss_mb"] - instrument._rss_kb() / 1024, 150)
+
+        with self.assertRaises(ValueError), stage("fails"):
+            raise ValueError
+        self.assertEqual(records(since=mark)[-1]["error"], "ValueError")
+
+    def test_records_of_one_thread(self):
+        # like concurrent Streamlit sessions: script threads with the same name
+        barrier, idents = threading.Barrier(2), {}
+
+        def run(tag):
+            idents[tag] = threading.get_ident()
+            with stage(f"run.{tag}"):
+                barrier.wait()  # both running at once
+
+        threads = [threading.Thread(target=run, args=(tag,), name="ScriptRunner.scriptThread") for tag in "ab"]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual({r["thread"] for r in records()}, {"ScriptRunner.scriptThread"})
+        for tag in "ab":
+            self.assertEqual([r["name"] for r in records(thread_id=idents[tag])], [f"run.{tag}"])
+
+    def test_etl_stages_and_trace(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            write_raw_sacct(tmp / "raw.csv")
+            n = build_dataset(tmp / "raw.csv", tmp / "jobs.parquet", chunksize=20)
+            trace = json.loads(write_trace(tmp / "trace.json").read_text())
+
+        summary = instrument.summary(records())
+        self.assertEqual(summary["make_dataset"]["rows"], n)
+        for name in ("read_csv", "transform", "compact", "write_parquet"):
+            self.assertEqual(summary[f"make_dataset.{name}"]["rows"], n)
+        events = trace["traceEvents"]
+        self.assertEqual(len(events), len(records()))
+        self.assertTrue(all(e["ph"] == "X" and e["dur"] >= 0 for e in events))
+        self.assertEqual(events[-1]["name"], "make_dataset")
+        self.assertEqual(events[-1]["args"]["rows"], n)
+
+if __name__ == "__main__":
+    unittest.main()
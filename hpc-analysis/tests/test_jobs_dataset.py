@@ -0,0 +1,77 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import pandas as pd
+
+from jobs_dataset import (
+    dataset_version, date_bounds, jobs_dataset, read_jobs, start_range, write_partitioned,
+)
+
+class TestJobsDataset(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name) / "jobs_all"
+        start = pd.date_range("2021-01-15", "2021-06-15", freq="6h")
+        self.df = pd.DataFrame({
+            "JobID": [str(i) for i in range(len(start))],
+            "Start": start,
+            "End": start + pd.Timedelta(hours=1),
+            "Partition": ["defq", "gpu"] * (len(start) // 2) + ["defq"] * (len(start) % 2),
+        })
+        pending = pd.DataFrame({"JobID": ["p1"], "Start": [pd.NaT], "End": [pd.NaT], "Partition": ["defq"]})
+        self.df = pd.concat([self.df.iloc[::-1], pending], ignore_index=True)
+        write_partitioned(self.df, self.root, row_group_size=50)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_layout_and_roundtrip(self):
+        self.assertTrue((self.root / "year=2021" / "month=3").is_dir())
+        self.assertTrue((self.root / "year=__HIVE_DEFAULT_PARTITION__").is_dir())
+        df = read_jobs(self.root)
+        self.assertEqual(len(df), len(self.df))
+        self.assertEqual(df["year"].dropna().unique().tolist(), [2021])
+        march = read_jobs(self.root, "2021-03-01", "2021-03-31")
+        self.assertTrue(march["Start"].is_monotonic_increasing)
+
+    def test_repeated_index_labels(self):
+        # chunks concatenated without ignore_index: labels repeat across partitions
+        df = pd.concat([self.df.iloc[:300], self.df.iloc[300:].reset_index(drop=True)])
+        self.assertFalse(df.index.is_unique)
+        root = self.root.parent / "repeated"
+        write_partitioned(df, root)
+        got = read_jobs(root)
+        self.assertEqual(sorted(got["JobID"]), sorted(self.df["JobID"]))
+        self.assertTrue((got["Start"].dt.month == got["month"]).dropna().all())
+
+    def test_date_range_reads_matching_partitions_and_columns(self):
+        df = read_jobs(self.root, "2021-03-10", "2021-04-02", columns=["JobID", "Start"])
+        self.assertEqual(list(df.columns), ["JobID", "Start"])
+        expected = self.df[(self.df["Start"] >= "2021-03-10") & (self.df["Start"] < "2021-04-03")]
+        self.assertEqual(sorted(df["JobID"]), sorted(expected["JobID"]))
+
+        from src.jobs_dataset import date_filter
+        frags = list(jobs_dataset(self.root).get_fragments(filter=date_filter("2021-03-10", "2021-04-02")))
+        self.assertEqual(len(frags), 2)
+
+    def test_date_bounds_from_statistics(self):
+        lo, hi = date_bounds(self.root)
+        self.assertEqual(lo, self.df["Start"].min())
+        self.assertEqual(hi, self.df["End"].max())
+
+    def test_start_range_matches_read_filter(self):
+        df = read_jobs(self.root).sort_values("Start", na_position="last", ignore_index=True)
+        sub = start_range(df, "2021-03-10", "2021-04-02")
+        expected = read_jobs(self.root, "2021-03-10", "2021-04-02")
+        self.assertEqual(sorted(sub["JobID"]), sorted(expected["JobID"]))
+        self.assertEqual(len(start_range(df)), df["Start"].notna().sum())
+
+    def test_dataset_version_follows_files(self):
+        v1 = dataset_version(self.root)
+        self.assertEqual(dataset_version(self.root), v1)
+        write_partitioned(self.df.iloc[:3], self.root, basename="part-000001.parquet")
+        self.assertNotEqual(dataset_version(self.root), v1)
+
+if __name__ == "__main__":
+    unittest.main()
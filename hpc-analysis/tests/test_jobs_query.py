@@ -0,0 +1,92 @@
+import importlib.util
+import tempfile
+import unittest
+from pathlib import Path
+
+import pandas as pd
+
+from filter_index import FilterIndex
+from jobs_dataset import read_jobs, write_partitioned
+from jobs_query import PandasQuery, open_query
+from make_dataset import build_dataset
+from tests.test_make_dataset import write_raw_sacct
+
+HAVE_DUCKDB = importlib.util.find_spec("duckdb") is not None
+
+MEASURES = {
+    "jobs": (None, "size"),
+    "cpu": ("CPUTime_sec", "sum"),
+    "elapsed": ("Elapsed_sec", "mean"),
+    "longest": ("Elapsed_sec", "max"),
+    "with_rss": ("MaxRSS_MB", "count"),
+}
+QUERIES = [
+    # (by, start, end, filters)
+    (["Partition"], None, None, None),
+    (["month", "Partition"], "2023-01-10", "2023-02-20", {"State": ["COMPLETED", "FAILED"]}),
+    (["UID", "day"], "2023-02-01", None, {"Partition": ["gpu"], "UID": None}),
+    (["State"], None, "2023-03-01", {"UID": [1001, 1003]}),
+]
+
+class TestJobsQuery(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        tmp = Path(cls._tmp.name)
+        write_raw_sacct(tmp / "raw.csv", n=600)
+        build_dataset(tmp / "raw.csv", tmp / "jobs.parquet")
+        df = pd.read_parquet(tmp / "jobs.parquet")
+        df.loc[df.index[::50], "Start"] = pd.NaT  # never started: never selected
+        cls.root = tmp / "jobs_all"
+        # two files per month: their dictionaries differ
+        write_partitioned(df.iloc[::2], cls.root)
+        write_partitioned(df.iloc[1::2], cls.root, basename="part-000001.parquet")
+
+        jobs = read_jobs(cls.root).sort_values("Start", kind="stable", na_position="last",
+                                                ignore_index=True)
+        cls.engines = {"pandas": PandasQuery(jobs), "index": PandasQuery(jobs, FilterIndex(jobs)),
+                       "arrow": open_query("arrow", cls.root)}
+        if HAVE_DUCKDB:
+            cls.engines["duckdb"] = open_query("duckdb", cls.root)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._tmp.cleanup()
+
+    def test_engines_agree(self):
+        reference = self.engines["pandas"]
+        for name, engine in self.engines.items():
+            for by, start, end, filters in QUERIES:
+                with self.subTest(engine=name, by=by):
+                    self.assertEqual(engine.count(start, end, filters), reference.count(start, end, filters))
+                    expected = reference.aggregate(by, MEASURES, start, end, filters)
+                    self.assertGreater(len(expected), 0)
+                    pd.testing.assert_frame_equal(engine.aggregate(by, MEASURES, start, end, filters),
+                                                  expected, check_dtype=False, check_index_type=False)
+
+    def test_scan_chunks(self):
+        filters = {"Partition": ["defq", "shortq"], "State": None}
+        n = self.engines["pandas"].count("2023-01-15", "2023-03-15", filters)
+        for name, engine in self.engines.items():
+            with self.subTest(engine=name):
+                chunks = list(engine.scan(["JobID", "Start", "Partition", "Nope"], "2023-01-15", "2023-03-15",
+                                          filters, rows=40))
+                self.assertEqual([len(c) for c in chunks[:-1]], [40] * (len(chunks) - 1))
+                df = pd.concat(chunks)
+                self.assertEqual(list(df.columns), ["JobID", "Start", "Partition"])
+                self.assertEqual(len(df), n)
+                self.assertTrue(df["Partition"].isin(["defq", "shortq"]).all())
+                self.assertTrue(df["Start"].between("2023-01-15", "2023-03-16").all())
+                # nothing selected: one empty chunk, so exports still get a header
+                empty = list(engine.scan(["JobID"], filters={"UID": []}))
+                self.assertEqual([len(c) for c in empty], [0])
+                self.assertEqual(list(empty[0].columns), ["JobID"])
+
+    def test_unknown_engine_and_function(self):
+        with self.assertRaises(ValueError):
+            open_query("spark", self.root)
+        with self.assertRaises(ValueError):
+            self.engines["arrow"].aggregate(["UID"], {"x": ("CPUTime_sec", "median")})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from jobs_dataset import read_jobs, write_partitioned
+from jobs_schema import compact_frame, compact_table, drop_unused_categories, job_keys
+
+def object_jobs(n=2000, seed=0):
+    """Jobs frame the way merge_jobs_all.py used to hand it to the app."""
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp("2022-01-01") + pd.to_timedelta(rng.integers(0, 300 * 86400, n), unit="s")
+    return pd.DataFrame({
+        "JobID": [f"{100 + i}_{i % 3}" if i % 4 else str(100 + i) for i in range(n)],
+        "UID": rng.choice([1001, 1002, 1003, 1010], n).astype(str),
+        "Partition": rng.choice(["defq", "gpu", "shortq"], n),
+        "State": rng.choice(["COMPLETED", "FAILED", "CANCELLED by 1001"], n),
+        "Start": start,
+        "NCPUS": rng.choice([1.0, 4.0, np.nan], n),
+        "Elapsed_sec": rng.integers(0, 86400, n).astype(float),
+        "efficiency": rng.random(n),
+    }).astype({c: object for c in ["JobID", "UID", "Partition", "State"]})
+
+class TestJobsSchema(unittest.TestCase):
+    def test_compact_dtypes_and_memory(self):
+        df = object_jobs()
+        compact = compact_frame(df)
+        self.assertEqual(list(compact.columns[:3]), ["JobID", "ArrayTaskID", "HetJobOffset"])
+        self.assertEqual(compact["JobID"].dtype, "Int64")
+        for col in ("UID", "Partition", "State"):
+            self.assertIsInstance(compact[col].dtype, pd.CategoricalDtype)
+        self.assertEqual(compact["NCPUS"].dtype, "Int32")
+        self.assertEqual(compact["NCPUS"].isna().sum(), df["NCPUS"].isna().sum())
+        self.assertEqual(compact["efficiency"].dtype, np.float32)
+        self.assertEqual(compact["Start"].dtype, "datetime64[ms]")
+        self.assertEqual(job_keys(compact).tolist(), df["JobID"].tolist())
+        self.assertLess(compact.memory_usage(deep=True).sum() * 3, df.memory_usage(deep=True).sum())
+
+    def test_jobid_forms(self):
+        table = compact_table(pa.table({"JobID": ["12", "12_3", "12_[1-4%2]", "13+1", None]}))
+        self.assertEqual(table["JobID"].to_pylist(), [12, 12, 12, 13, None])
+        self.assertEqual(table["ArrayTaskID"].to_pylist(), [None, 3, None, None, None])
+        self.assertEqual(table["HetJobOffset"].to_pylist(), [None, None, None, 1, None])
+        with self.assertRaises(ValueError):
+            compact_table(pa.table({"JobID": ["12.batch"]}))
+
+    def test_unsafe_casts_raise(self):
+        with self.assertRaises(pa.ArrowInvalid):
+            compact_table(pa.table({"NNODES": [1.0, 70000.0]}))
+
+    def test_read_jobs_preserves_schema(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            df = compact_frame(object_jobs(300))
+            write_partitioned(df, Path(tmp), schema=compact_table(
+                pa.Table.from_pandas(object_jobs(1), preserve_index=False)).schema)
+            back = read_jobs(tmp).drop(columns=["year", "month"]).sort_values(["Start", "JobID"])
+            expected = df.sort_values(["Start", "JobID"])
+            self.assertEqual(back.dtypes.astype(str).tolist(), expected.dtypes.astype(str).tolist())
+            self.assertEqual(job_keys(back).tolist(), job_keys(expected).tolist())
+
+            subset = drop_unused_categories(back[back["Partition"] == "gpu"])
+            self.assertEqual(subset["Partition"].cat.categories.tolist(), ["gpu"])
+            self.assertTrue(back["Partition"].isin(["gpu", "defq"]).any())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import pandas as pd
+
+from jobs_dataset import dataset_version, read_jobs, write_partitioned
+from jobs_snapshot import read_snapshot, snapshot_path, snapshot_version, write_snapshot
+from make_dataset import build_dataset
+from tests.test_make_dataset import write_raw_sacct
+
+class TestJobsSnapshot(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        tmp = Path(self._tmp.name)
+        write_raw_sacct(tmp / "raw.csv", n=300)
+        build_dataset(tmp / "raw.csv", tmp / "jobs.parquet")
+        df = pd.read_parquet(tmp / "jobs.parquet")
+        df.loc[df.index[::40], "Start"] = pd.NaT
+        self.df = df
+        self.root = tmp / "jobs_all"
+        # two files per month: their dictionaries differ
+        write_partitioned(df.iloc[::2], self.root)
+        write_partitioned(df.iloc[1::2], self.root, basename="part-000001.parquet")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_same_frame_as_parquet(self):
+        self.assertEqual(write_snapshot(self.root), len(self.df))
+        path = snapshot_path(self.root)
+        self.assertEqual(path, self.root.parent / "jobs_all.arrow")
+
+        expected = read_jobs(self.root).sort_values("Start", kind="stable", na_position="last",
+                                                     ignore_index=True)
+        df = read_snapshot(path)
+        pd.testing.assert_frame_equal(df, expected)
+        columns = ["Start", "UID", "CPUTime_sec", "Elapsed_sec", "Nope"]
+        pd.testing.assert_frame_equal(read_snapshot(path, columns), expected[columns[:-1]])
+
+        # views of the mapped file: read-only, slices copy on write
+        for col in ("Start", "CPUTime_sec"):
+            self.assertFalse(df[col].to_numpy().flags.writeable)
+        with self.assertRaises(ValueError):
+            df.loc[0, "CPUTime_sec"] = -1.0
+        part = df.iloc[:5]
+        part.loc[0, "CPUTime_sec"] = -1.0
+        self.assertEqual(read_snapshot(path)["CPUTime_sec"].iloc[0], expected["CPUTime_sec"].iloc[0])
+
+    def test_version(self):
+        path = snapshot_path(self.root)
+        self.assertIsNone(snapshot_version(path))
+        write_snapshot(self.root)
+        self.assertEqual(snapshot_version(path), dataset_version(self.root))
+        # a new part file: the snapshot is stale until rewritten
+        old = read_snapshot(path)
+        write_partitioned(self.df.iloc[:10], self.root, basename="part-000002.parquet")
+        self.assertNotEqual(snapshot_version(path), dataset_version(self.root))
+        write_snapshot(self.root)
+        self.assertEqual(snapshot_version(path), dataset_version(self.root))
+        self.assertEqual(len(read_snapshot(path)), len(self.df) + 10)
+        # the frame mapped before the rewrite still reads the old file
+        self.assertEqual(len(old), len(self.df))
+        self.assertEqual(int(old["JobID"].sum()), int(self.df["JobID"].sum()))
+
+if __name__ == "__main__":
+    unittest.main()
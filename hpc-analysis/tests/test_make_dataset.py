@@ -0,0 +1,123 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from make_dataset import REQUIRED_COLS, build_dataset
+
+def write_raw_sacct(path, n=50, seed=0):
+    """Small pipe-delimited `sacct -P` style export."""
+    rng = np.random.default_rng(seed)
+    submit = pd.Timestamp("2023-01-01") + pd.to_timedelta(rng.integers(0, 90 * 86400, n), unit="s")
+    start = submit + pd.to_timedelta(rng.integers(0, 7200, n), unit="s")
+    elapsed = rng.integers(0, 3 * 86400, n)
+    ncpus = rng.choice([1, 4, 16, 64], n)
+    df = pd.DataFrame({c: "" for c in REQUIRED_COLS}, index=range(n))
+    df["JobID"] = [str(1000 + i) for i in range(n)]
+    df["JobName"] = rng.choice(["bash", "jupyter", "qe_run", "lmp"], n)
+    df["UID"] = rng.choice([1001, 1002, 1003], n)
+    df["Partition"] = rng.choice(["defq", "gpu", "shortq"], n)
+    df["Submit"] = submit.strftime("%Y-%m-%dT%H:%M:%S")
+    df["Start"] = start.strftime("%Y-%m-%dT%H:%M:%S")
+    df["End"] = (start + pd.to_timedelta(elapsed, unit="s")).strftime("%Y-%m-%dT%H:%M:%S")
+    df["Elapsed"] = [f"{s // 86400}-{s % 86400 // 3600:02}:{s % 3600 // 60:02}:{s % 60:02}"
+                     if s >= 86400 else f"{s // 3600:02}:{s % 3600 // 60:02}:{s % 60:02}"
+                     for s in elapsed]
+    df["CPUTime"] = df["Elapsed"]
+    df["NCPUS"] = ncpus
+    df["NNodes"] = 1
+    df["ReqMem"] = rng.choice(["4000Mn", "2Gc", "16G", ""], n)
+    df["State"] = rng.choice(["COMPLETED", "FAILED", "CANCELLED by 1001", "TIMEOUT"], n)
+    df["ExitCode"] = "0:0"
+    # a couple of jobs that never started
+    df.loc[df.index[::17], ["Start", "End", "Elapsed", "CPUTime"]] = ["Unknown", "Unknown", "00:00:00", "00:00:00"]
+    df.to_csv(path, sep="|", index=False)
+    return df
+
+class TestMakeDataset(unittest.TestCase):
+    def test_chunked_matches_in_memory(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            write_raw_sacct(tmp / "raw.csv")
+            n_full = build_dataset(tmp / "raw.csv", tmp / "full.parquet")
+            n_chunked = build_dataset(tmp / "raw.csv", tmp / "chunked.parquet", chunksize=7)
+
+            self.assertEqual(n_full, 50)
+            self.assertEqual(n_chunked, 50)
+            self.assertEqual(pq.ParquetFile(tmp / "chunked.parquet").num_row_groups, 8)
+            full = pd.read_parquet(tmp / "full.parquet")
+            pd.testing.assert_frame_equal(pd.read_parquet(tmp / "chunked.parquet"), full)
+
+    def test_derived_columns(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            raw = write_raw_sacct(tmp / "raw.csv")
+            build_dataset(tmp / "raw.csv", tmp / "out.parquet", chunksize=10)
+            df = pd.read_parquet(tmp / "out.parquet")
+            self.assertIn("NNODES", df.columns)
+            self.assertTrue(df.loc[::17, "Start"].isna().all())
+            self.assertTrue(df.loc[::17, "year"].isna().all())
+            row = df.loc[1]
+            self.assertEqual(row["core_seconds"], row["Elapsed_sec"] * raw.loc[1, "NCPUS"])
+
+    def test_job_steps_are_dropped(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            raw = write_raw_sacct(tmp / "raw.csv")
+            # an export made without -X: steps follow their job
+            steps = raw.iloc[[3, 3, 8]].assign(JobID=["1003.batch", "1003.extern", "1008.0"])
+            pd.concat([raw, steps]).sort_values("JobID", kind="stable").to_csv(
+                tmp / "raw.csv", sep="|", index=False)
+            self.assertEqual(build_dataset(tmp / "raw.csv", tmp / "out.parquet", chunksize=7), 50)
+            df = pd.read_parquet(tmp / "out.parquet")
+            self.assertEqual(sorted(df["JobID"]), [1000 + i for i in range(50)])
+
+    def test_step_usage_rolls_up_to_job(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            raw = write_raw_sacct(tmp / "raw.csv", n=10)
+            # as sacct lists it without -X: usage on the steps, empty on the job
+            steps = raw.iloc[[3, 3, 3, 6, 6, 9]].assign(
+                JobID=["1003.batch", "1003.extern", "1003.0", "1006.batch", "1006.extern", "1009.batch"],
+                MaxRSS=["2536K", "8K", "1.5G", "", "4K", "0"],
+                AveRSS=["1024K", "8K", "1G", "", "4K", "0"],
+                MaxDiskRead=["3M", "0", "1M", "", "", ""],
+            )
+            raw.loc[9, "MaxRSS"] = "512M"
+            raw = pd.concat([raw, steps]).sort_values("JobID", kind="stable")
+            raw.to_csv(tmp / "raw.csv", sep="|", index=False)
+            # chunks of 4 split 1003 and 1006 from some of their steps
+            for chunksize in (None, 4):
+                with self.subTest(chunksize=chunksize):
+                    build_dataset(tmp / "raw.csv", tmp / "out.parquet", chunksize=chunksize)
+                    df = pd.read_parquet(tmp / "out.parquet").set_index("JobID")
+                    self.assertEqual(len(df), 10)
+                    self.assertEqual(df.loc[1003, "MaxRSS"], "1.5G")
+                    self.assertEqual(df.loc[1003, "MaxRSS_MB"], 1536)
+                    self.assertEqual(df.loc[1003, "AveRSS_bytes"], 1024 ** 3)
+                    self.assertEqual(df.loc[1003, "MaxDiskRead_bytes"], 3 * 1024 ** 2)
+                    self.assertEqual(df.loc[1006, "MaxRSS_MB"], 4 / 1024)
+                    self.assertTrue(pd.isna(df.loc[1006, "MaxDiskRead_bytes"]))
+                    # the job's own value is kept when its steps report less
+                    self.assertEqual(df.loc[1009, "MaxRSS_MB"], 512)
+                    self.assertTrue(df.drop([1003, 1006, 1009])["MaxRSS_MB"].isna().all())
+
+    def test_failed_build_keeps_previous_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            raw = write_raw_sacct(tmp / "raw.csv")
+            build_dataset(tmp / "raw.csv", tmp / "out.parquet")
+            before = pd.read_parquet(tmp / "out.parquet")
+            # the bad JobID is in the last chunk, after earlier chunks were written
+            raw.loc[45, "JobID"] = "12a"
+            raw.to_csv(tmp / "raw.csv", sep="|", index=False)
+            with self.assertRaisesRegex(ValueError, "12a"):
+                build_dataset(tmp / "raw.csv", tmp / "out.parquet", chunksize=7)
+            pd.testing.assert_frame_equal(pd.read_parquet(tmp / "out.parquet"), before)
+            self.assertEqual(sorted(p.name for p in tmp.iterdir()), ["out.parquet", "raw.csv"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import importlib.util
+import tempfile
+import unittest
+from pathlib import Path
+
+import pandas as pd
+
+from make_dataset import READ_CSV_KW, REQUIRED_COLS, build_dataset
+from synthetic_jobs import write_synthetic
+from tests.test_make_dataset import write_raw_sacct
+
+LEGACY = Path(__file__).resolve().parent.parent / "data" / "processed" / "jobs_2018_2021_clean.parquet"
+
+
+def write_legacy_sacct(path):
+    """The shipped 2018-2021 table written back as a sacct export."""
+    legacy = pd.read_parquet(LEGACY)
+    for col in ("Submit", "Start", "End"):
+        legacy[col] = legacy[col].dt.strftime("%Y-%m-%dT%H:%M:%S")
+    legacy["ReqMem"] = "4000Mn"
+    legacy[REQUIRED_COLS + ["NNODES", "NTASKS", "TimeLimit"]].to_csv(path, sep=READ_CSV_KW["sep"], index=False)
+
+
+@unittest.skipUnless(importlib.util.find_spec("polars"), "polars is not installed")
+class TestPolarsEngine(unittest.TestCase):
+    def assert_same_dataset(self, raw_csv, tmp, chunksize=None):
+        n_pandas = build_dataset(raw_csv, tmp / "pandas.parquet")
+        n_polars = build_dataset(raw_csv, tmp / "polars.parquet", chunksize=chunksize, engine="polars")
+        self.assertEqual(n_polars, n_pandas)
+        expected = pd.read_parquet(tmp / "pandas.parquet")
+        got = pd.read_parquet(tmp / "polars.parquet")
+        self.assertEqual(list(got.columns), list(expected.columns))
+        for col in expected.columns:
+            with self.subTest(column=col):
+                self.assertEqual(str(got[col].dtype), str(expected[col].dtype))
+                # categories may be listed in another order
+                pd.testing.assert_series_equal(got[col].astype(object), expected[col].astype(object))
+        return expected
+
+    def test_matches_pandas_engine(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            write_raw_sacct(tmp / "raw.csv", n=300)
+            self.assert_same_dataset(tmp / "raw.csv", tmp, chunksize=64)
+
+    def test_matches_pandas_engine_on_synthetic_jobs(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            (raw,) = write_synthetic(tmp / "raw", rows=20_000, legacy_rows=0)
+            self.assert_same_dataset(raw, tmp)
+
+    @unittest.skipUnless(LEGACY.exists(), "shipped legacy table not present")
+    def test_matches_pandas_engine_on_shipped_jobs(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            write_legacy_sacct(tmp / "raw.csv")
+            # non-ASCII job names: both engines decode the file as latin1
+            df = self.assert_same_dataset(tmp / "raw.csv", tmp)
+            self.assertFalse(df["JobName"].dropna().map(str.isascii).all())
+
+    def test_job_steps_bad_jobid_and_unknown_engine(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            df = write_raw_sacct(tmp / "raw.csv", n=20)
+            steps = df.iloc[[3, 3, 8]].assign(JobID=["1003.batch", "1003.extern", "1008.0"],
+                                              MaxRSS=["2536K", "1.5G", "12M"], AveDiskRead=["", "0", "3M"])
+            df = pd.concat([df, steps], ignore_index=True)
+            df.to_csv(tmp / "raw.csv", sep=READ_CSV_KW["sep"], index=False)
+            # steps are dropped by both engines
+            # and their usage is carried over to the job by both
+            out = self.assert_same_dataset(tmp / "raw.csv", tmp).set_index("JobID")
+            self.assertEqual(len(out), 20)
+            self.assertEqual(list(out.loc[[1003, 1008], "MaxRSS_MB"]), [1536, 12])
+
+            df.loc[5, "JobID"] = "12a"
+            df.to_csv(tmp / "raw.csv", sep=READ_CSV_KW["sep"], index=False)
+            for engine in ("pandas", "polars"):
+                before = pd.read_parquet(tmp / f"{engine}.parquet")
+                with self.assertRaisesRegex(ValueError, "12a"):
+                    build_dataset(tmp / "raw.csv", tmp / f"{engine}.parquet", engine=engine)
+                # the previous output is kept and no partial file is left behind
+                pd.testing.assert_frame_equal(pd.read_parquet(tmp / f"{engine}.parquet"), before)
+            self.assertEqual(sorted(p.name for p in tmp.iterdir()),
+                             ["pandas.parquet", "polars.parquet", "raw.csv"])
+            with self.assertRaises(ValueError):
+                build_dataset(tmp / "raw.csv", tmp / "jobs.parquet", engine="spark")
+
+if __name__ == "__main__":
+    unittest.main()
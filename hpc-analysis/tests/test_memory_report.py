@@ -0,0 +1,66 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from analytics import user_metrics
+from memory_report import REPORT_COLS, job_memory, memory_waste, ratio_histogram
+from rollups import MEM_RATIO_BIN_COLS, rollup_frame
+
+class TestMemoryReport(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(1)
+        n = 2000
+        uid = rng.choice([1001, 1002, 1003], n)
+        req = rng.choice([4096.0, 32768.0, np.nan], n)
+        peak = np.where(uid == 1002, req / 10, req * rng.uniform(0.5, 1.1, n))
+        peak[rng.random(n) < 0.1] = np.nan
+        peak[:5] = 0.0
+        self.df = pd.DataFrame({
+            "Start": pd.Timestamp("2024-03-01") + pd.to_timedelta(rng.integers(0, 20 * 86400, n), unit="s"),
+            "UID": pd.Categorical(uid),
+            "Partition": pd.Categorical(rng.choice(["defq", "bigmem"], n)),
+            "State": pd.Categorical(rng.choice(["COMPLETED", "FAILED"], n)),
+            "JobName_Grouped": pd.Categorical(rng.choice(["bash", "qe"], n)),
+            "Elapsed_sec": rng.integers(60, 7200, n).astype(float),
+            "core_seconds": np.nan,
+            "CPUTime_sec": np.nan,
+            "efficiency": np.nan,
+            "ReqMem_MB": req,
+            "MaxRSS_MB": peak,
+        })
+
+    def test_job_figures(self):
+        job = job_memory(pd.DataFrame({"ReqMem_MB": [8192, 1024, np.nan, 2048], "MaxRSS_MB": [2048, 2048, 10, 0],
+                                       "Elapsed_sec": [3600, 3600, 3600, np.nan]}))
+        self.assertEqual(job["ratio"].tolist()[:2], [4, 0.5])
+        self.assertEqual(job["unused_gb_hours"].tolist()[:2], [6, 0])
+        self.assertTrue(job.loc[2].isna().all())
+        self.assertTrue(np.isinf(job.loc[3, "ratio"]))
+        self.assertEqual(job.loc[3, "reserved_gb_hours"], 0)  # no Elapsed: no time held
+        self.assertEqual(ratio_histogram(job["ratio"]).tolist(), [1, 0, 0, 0, 1, 0, 1])
+
+    def test_report_matches_rows_and_cube(self):
+        report = memory_waste(self.df, "UID")
+        self.assertEqual(list(report.columns), REPORT_COLS)
+        self.assertEqual(report.index[0], 1002)  # requests 10× its peak
+        self.assertTrue(report["unused_gb_hours"].is_monotonic_decreasing)
+
+        paired = self.df.dropna(subset=["ReqMem_MB", "MaxRSS_MB"])
+        for uid, rows in paired.groupby("UID", observed=True):
+            ratio = rows["ReqMem_MB"] / rows["MaxRSS_MB"]
+            unused = (rows["ReqMem_MB"] - rows["MaxRSS_MB"]).clip(lower=0) * rows["Elapsed_sec"] / 3600 / 1024
+            self.assertEqual(report.loc[uid, "paired_jobs"], len(rows))
+            self.assertAlmostEqual(report.loc[uid, "unused_gb_hours"], unused.sum())
+            self.assertEqual(report.loc[uid, "ratio_p50"], ratio.quantile(0.5, interpolation="lower"))
+            self.assertEqual(report.loc[uid, MEM_RATIO_BIN_COLS].sum(), len(rows))
+
+        # the dashboard's figures from the rollup cube agree with the job-level report
+        cube = user_metrics(rollup_frame(self.df))
+        np.testing.assert_allclose(cube.loc[report.index, "mem_unused_gb_hours"], report["unused_gb_hours"])
+        np.testing.assert_allclose(cube.loc[report.index, "mem_reserved_gb_hours"], report["reserved_gb_hours"])
+        hist = rollup_frame(self.df).groupby("UID", observed=True)[MEM_RATIO_BIN_COLS].sum()
+        np.testing.assert_array_equal(hist.loc[report.index].to_numpy(), report[MEM_RATIO_BIN_COLS].to_numpy())
+
+if __name__ == "__main__":
+    unittest.main()
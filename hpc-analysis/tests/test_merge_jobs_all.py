@@ -0,0 +1,72 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from jobs_dataset import jobs_dataset, read_jobs
+from jobs_schema import job_keys
+from merge_jobs_all import merge_jobs, unify_schemas
+
+def make_source(n, seed, legacy):
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp("2021-01-01") + pd.to_timedelta(rng.integers(0, 200 * 86400, n), unit="s")
+    df = pd.DataFrame({
+        "JobID": rng.integers(1, 10**6, n) if legacy else [f"{i}_{seed}" for i in range(n)],
+        "UID": rng.integers(1000, 1010, n),
+        "Start": start,
+        "End": start + pd.Timedelta(hours=1),
+        "NCPUS": rng.integers(1, 64, n) if legacy else rng.integers(1, 64, n).astype(float),
+        "ExitCode": 0 if legacy else "0:0",
+        "Partition": "defq",
+    })
+    df.loc[df.index[::13], ["Start", "End"]] = pd.NaT
+    if not legacy:
+        df["efficiency"] = rng.random(n)
+    return df
+
+class TestMergeJobsAll(unittest.TestCase):
+    def test_streaming_merge_matches_in_memory_sort(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            a, b = make_source(700, 1, legacy=False), make_source(500, 2, legacy=True)
+            a.to_parquet(tmp / "a.parquet", index=False)
+            b.to_parquet(tmp / "b.parquet", index=False)
+
+            n = merge_jobs([tmp / "a.parquet", tmp / "b.parquet"], tmp / "jobs_all", batch_rows=97,
+                           row_group_size=40)
+            self.assertEqual(n, 1200)
+
+            merged = read_jobs(tmp / "jobs_all").drop(columns=["year", "month"])
+            self.assertEqual(len(merged), 1200)
+            self.assertTrue(merged["Start"].dropna().is_monotonic_increasing)
+            self.assertEqual(merged["JobID"].dtype, "Int64")
+            self.assertIsInstance(merged["UID"].dtype, pd.CategoricalDtype)
+            self.assertEqual(merged["Start"].dtype, "datetime64[ms]")
+
+            expected = pd.concat([a, b.astype({"JobID": str})], ignore_index=True)
+            self.assertEqual(sorted(job_keys(merged)), sorted(expected["JobID"]))
+            self.assertEqual(
+                merged["Start"].dropna().tolist(), sorted(expected["Start"].dropna().tolist())
+            )
+            self.assertEqual(merged["Start"].isna().sum(), expected["Start"].isna().sum())
+
+            # only the last row group of each partition may be short
+            for frag in jobs_dataset(tmp / "jobs_all").get_fragments():
+                md = frag.metadata
+                sizes = [md.row_group(i).num_rows for i in range(md.num_row_groups)]
+                self.assertTrue(all(s == 40 for s in sizes[:-1]))
+
+    def test_unify_schemas(self):
+        s1 = pa.schema([("JobID", pa.string()), ("NCPUS", pa.float64()), ("CPUTime", pa.string()),
+                        ("year", pa.int16())])
+        s2 = pa.schema([("JobID", pa.int64()), ("NCPUS", pa.int64()), ("CPUTime", pa.float64()),
+                        ("Extra", pa.null())])
+        unified = unify_schemas([s1, s2])
+        self.assertEqual(unified.names, ["JobID", "NCPUS", "CPUTime", "Extra"])
+        self.assertEqual(unified.types, [pa.string(), pa.float64(), pa.string(), pa.string()])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import sqlite3
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from metadata_service import ConnectionPool, MetadataService
+
+ROWS = [
+    (1001, "qe", "UM5 , Rabat", "2024-01-01 00:00:00"),
+    (1002, "lammps", "UCA , Marrakech", "2024-01-02 00:00:00"),
+    (1002, "gromacs", "UCA , Marrakech", "2024-01-02 00:00:00"),
+    (1003, "vasp", "UIT , Kenitra", "2024-01-03 00:00:00"),
+]
+
+class TestMetadataService(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = Path(self._tmp.name)
+        self.db = self.tmp / "stage.db"
+        with sqlite3.connect(self.db) as conn:
+            conn.execute("CREATE TABLE v_user_apps (id_utilisateur INTEGER, lib_application TEXT, "
+                         "etablissement TEXT, updated_at TEXT)")
+            conn.executemany("INSERT INTO v_user_apps VALUES (?, ?, ?, ?)", ROWS)
+        self.connects = 0
+        self.down = False
+        pool = ConnectionPool(self.connect, size=2)
+        self.service = MetadataService(pool, self.tmp / "snapshots", changed_col="updated_at",
+                                       placeholder="?", interval=0.05, full_every=3)
+
+    def tearDown(self):
+        self.service.stop()
+        self._tmp.cleanup()
+
+    def connect(self):
+        if self.down:
+            raise sqlite3.OperationalError("server has gone away")
+        self.connects += 1
+        return sqlite3.connect(self.db, check_same_thread=False)
+
+    def execute(self, sql, *params):
+        with sqlite3.connect(self.db) as conn:
+            conn.execute(sql, params)
+
+    def apps(self):
+        df = self.service.snapshot()
+        return sorted(zip(df["id_utilisateur"], df["lib_application"]))
+
+    def test_incremental_refresh_replaces_changed_users(self):
+        self.assertTrue(self.service.refresh())
+        self.assertEqual(self.service.status()["version"], 1)
+        self.assertFalse(self.service.refresh())  # unchanged: same version
+        self.assertEqual(self.connects, 1)  # pooled connection reused
+
+        self.execute("UPDATE v_user_apps SET lib_application = 'cp2k', updated_at = '2024-02-01' "
+                     "WHERE lib_application = 'gromacs'")
+        self.execute("DELETE FROM v_user_apps WHERE id_utilisateur = 1003")
+        self.assertTrue(self.service.refresh())
+        # 1002 re-fetched whole; 1003 did not change, so the incremental fetch keeps it
+        self.assertEqual(self.apps(), [(1001, "qe"), (1002, "cp2k"), (1002, "lammps"), (1003, "vasp")])
+
+        self.assertTrue(self.service.refresh(full=True))
+        self.assertEqual(self.apps(), [(1001, "qe"), (1002, "cp2k"), (1002, "lammps")])
+        self.assertEqual(len(list((self.tmp / "snapshots").glob("*.parquet"))), 3)  # keep=3
+
+    def test_serves_last_snapshot_when_db_is_down(self):
+        self.service.refresh()
+        self.service.pool.close()
+        self.down = True
+        self.assertFalse(self.service.refresh(full=True))
+        self.assertIn("gone away", self.service.status()["last_error"])
+        self.assertEqual(len(self.service.snapshot()), len(ROWS))
+
+        fresh = MetadataService(ConnectionPool(self.connect), self.tmp / "empty")
+        with self.assertRaises(ConnectionError):
+            fresh.start()
+
+    def test_background_refresh(self):
+        self.service.start()
+        self.assertEqual(self.service.status()["version"], 1)
+        self.execute("INSERT INTO v_user_apps VALUES (1004, 'orca', 'UM5 , Rabat', '2024-03-01')")
+        deadline = time.monotonic() + 5
+        while self.service.status()["version"] == 1 and time.monotonic() < deadline:
+            time.sleep(0.02)
+        self.assertIn((1004, "orca"), self.apps())
+
+if __name__ == "__main__":
+    unittest.main()
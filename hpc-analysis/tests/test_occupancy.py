@@ -0,0 +1,64 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from occupancy import Occupancy
+
+NOW = pd.Timestamp("2024-01-04")
+
+def brute(df, t, partition, now=NOW):
+    """Cores running and jobs pending at time t, by scanning every job."""
+    d = df[df["Partition"] == partition]
+    end = d["End"].fillna(now)
+    running = d["Start"].notna() & (d["Start"] <= t) & (end > t)
+    pend_end = d["Start"].fillna(end)
+    pending = (d["Submit"] <= t) & (pend_end > t)
+    return d.loc[running, "NCPUS"].sum(), int(pending.sum())
+
+class TestOccupancy(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(2)
+        n = 400
+        submit = pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 2 * 86400, n) // 600 * 600, unit="s")
+        start = submit + pd.to_timedelta(rng.integers(0, 3 * 3600, n) // 600 * 600, unit="s")
+        end = start + pd.to_timedelta(rng.integers(1, 12, n) * 600, unit="s")
+        self.df = pd.DataFrame({
+            "Submit": submit, "Start": start, "End": end,
+            "NCPUS": rng.choice([1, 4, 32], n), "NNODES": 1, "ReqMem_MB": rng.choice([1000.0, np.nan], n),
+            "Partition": pd.Categorical(rng.choice(["defq", "gpu"], n)),
+        })
+        self.df.loc[::40, "Start"] = pd.NaT          # cancelled in the queue
+        self.df.loc[5::60, "End"] = pd.NaT            # still running
+        self.occ = Occupancy(self.df, now=NOW)
+
+    def test_matches_scan_at_any_resolution(self):
+        for freq in ["10min", "1h"]:
+            at = self.occ.series("cores", freq, "2024-01-01", "2024-01-03", stat="start")
+            pending = self.occ.series("pending", freq, "2024-01-01", "2024-01-03", stat="start")
+            for t in at.index[::7]:
+                for p in ["defq", "gpu"]:
+                    self.assertEqual((at.loc[t, p], pending.loc[t, p]), brute(self.df, t, p))
+
+        # 10-minute steps: the hourly mean is the mean of the six 10-minute values
+        fine = self.occ.series("cores", "10min", "2024-01-01", "2024-01-03 23:59", stat="start")
+        hourly = self.occ.series("cores", "1h", "2024-01-01", "2024-01-03 23:59")
+        np.testing.assert_allclose(hourly.to_numpy(), fine.resample("1h").mean().to_numpy())
+        peak = self.occ.series("cores", "1h", "2024-01-01", "2024-01-03 23:59", stat="max")
+        np.testing.assert_array_equal(peak.to_numpy(), fine.resample("1h").max().to_numpy())
+
+    def test_back_to_back_jobs_do_not_overlap(self):
+        t = pd.Timestamp("2024-01-01 01:00")
+        df = pd.DataFrame({"Submit": [t, t], "Start": [t, t + pd.Timedelta("1h")],
+                           "End": [t + pd.Timedelta("1h"), t + pd.Timedelta("2h")], "NCPUS": [8, 8],
+                           "NNODES": [1, 1], "ReqMem_MB": [1024.4, np.nan], "Partition": [None, None]})
+        occ = Occupancy(df, by=None)
+        self.assertEqual(occ.series("cores", "1D", stat="max").iloc[0, 0], 8)
+        self.assertEqual(occ.series("cores", "1D").iloc[0, 0], 16 * 3600 / 86400)
+        self.assertEqual(occ.series("mem_MB", "30min", stat="start").iloc[:, 0].tolist(), [1024, 1024, 0, 0, 0])
+        self.assertEqual(Occupancy(df).series("pending", "1h", stat="start").columns.tolist(), ["unknown"])
+        with self.assertRaises(KeyError):
+            occ.series("gpus")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,173 @@
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from jobs_dataset import read_jobs
+from jobs_schema import job_keys
+from parallel_etl import MANIFEST_NAME, detect_format, expand_inputs, input_key, run_etl
+from tests.test_make_dataset import write_raw_sacct
+
+def write_raw_legacy(path, n=40, seed=0):
+    """Small export of the legacy jobs_table."""
+    rng = np.random.default_rng(seed)
+    submit = pd.Timestamp("2019-06-01") + pd.to_timedelta(rng.integers(0, 60 * 86400, n), unit="s")
+    start = submit + pd.to_timedelta(rng.integers(0, 3600, n), unit="s")
+    pd.DataFrame({
+        "id_job": np.arange(n) + 500,
+        "job_name": rng.choice(["bash", "vasp"], n),
+        "id_user": rng.choice([2001, 2002], n),
+        "partition": rng.choice(["defq", "gpu"], n),
+        "account": "lab",
+        "from_unixtime(time_submit)": submit.strftime("%Y-%m-%d %H:%M:%S"),
+        "from_unixtime(time_start)": start.strftime("%Y-%m-%d %H:%M:%S"),
+        "from_unixtime(time_end)": (start + pd.Timedelta(hours=2)).strftime("%Y-%m-%d %H:%M:%S"),
+        "timelimit": 1440,
+        "state": rng.choice([3, 5, 6], n),
+        "exit_code": 0,
+        "tres_alloc": [f"1={c},4=1" for c in rng.choice([1, 8, 32], n)],
+    }).to_csv(path, index=False)
+
+def write_raw_sacct_from(path, first, **kw):
+    """write_raw_sacct with JobIDs from `first` on (an export of other jobs)."""
+    df = write_raw_sacct(path, **kw)
+    df["JobID"] = [str(first + i) for i in range(len(df))]
+    df.to_csv(path, sep="|", index=False)
+    return df
+
+def read_sorted(root):
+    df = read_jobs(root)
+    df["key"] = job_keys(df).to_numpy()
+    return df.sort_values("key", ignore_index=True)
+
+class TestParallelEtl(unittest.TestCase):
+    def make_inputs(self, raw):
+        raw.mkdir()
+        write_raw_sacct(raw / "sacct_2023-01.csv", n=60, seed=1)
+        write_raw_sacct_from(raw / "sacct_2023-02.csv", 5000, n=30, seed=2)
+        write_raw_legacy(raw / "jobs_table.csv")
+        return expand_inputs([str(raw)])
+
+    def test_parallel_matches_serial(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            inputs = self.make_inputs(tmp / "raw")
+            self.assertEqual([detect_format(p) for p in inputs], ["legacy", "sacct", "sacct"])
+
+            serial = run_etl(inputs, tmp / "serial", workers=1)
+            parallel = run_etl(inputs, tmp / "parallel", workers=2)
+            self.assertEqual(serial["rows"], 130)
+            self.assertEqual(parallel["rows"], 130)
+            self.assertEqual(serial["months"], parallel["months"])
+            a, b = read_sorted(tmp / "serial"), read_sorted(tmp / "parallel")
+            pd.testing.assert_frame_equal(a, b)
+            self.assertEqual(set(a["UID"].astype(int)), {1001, 1002, 1003, 2001, 2002})
+            legacy = a[a["UID"].astype(int) > 2000]
+            self.assertTrue((legacy["Elapsed_sec"] == 7200).all())
+            self.assertEqual(legacy["State"].astype(str).isin(["COMPLETED", "FAILED", "TIMEOUT"]).sum(), 40)
+
+    def test_rerun_only_processes_changed_inputs(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            inputs = self.make_inputs(tmp / "raw")
+            run_etl(inputs, tmp / "out", workers=1)
+            again = run_etl(inputs, tmp / "out", workers=1)
+            self.assertEqual((again["processed"], again["skipped"]), (0, 3))
+
+            # a month re-exported with fewer jobs replaces its earlier rows
+            write_raw_sacct_from(tmp / "raw" / "sacct_2023-02.csv", 5000, n=10, seed=3)
+            os.utime(tmp / "raw" / "sacct_2023-02.csv", ns=(0, 10 ** 18))
+            changed = run_etl(inputs, tmp / "out", workers=1)
+            self.assertEqual((changed["processed"], changed["skipped"]), (1, 2))
+            self.assertEqual(len(read_jobs(tmp / "out")), 110)
+
+            manifest = json.loads((tmp / "out" / MANIFEST_NAME).read_text())
+            self.assertEqual(manifest["rows"], 110)
+            self.assertEqual(sorted(e["rows"] for e in manifest["inputs"].values()), [10, 40, 60])
+            files = {f for e in manifest["inputs"].values() for f in e["files"]}
+            on_disk = {str(p.relative_to(tmp / "out")) for p in (tmp / "out").rglob("*.parquet")}
+            self.assertEqual(files, on_disk)
+
+    def test_overlapping_inputs_keep_latest_row_per_job(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            (tmp / "raw").mkdir()
+            first = write_raw_sacct(tmp / "raw" / "sacct_a.csv", n=50)
+            # the same jobs exported again; each export has the later End of half of them
+            end = {"format": "%Y-%m-%dT%H:%M:%S", "errors": "coerce"}
+            later = pd.to_datetime(first["End"], **end) + pd.Timedelta(hours=1)
+            second = first.copy()
+            even = np.arange(len(first)) % 2 == 0
+            second.loc[even & later.notna(), "End"] = later[even].dt.strftime("%Y-%m-%dT%H:%M:%S")
+            first.loc[~even & later.notna(), "End"] = later[~even].dt.strftime("%Y-%m-%dT%H:%M:%S")
+            first.to_csv(tmp / "raw" / "sacct_a.csv", sep="|", index=False)
+            second.to_csv(tmp / "raw" / "sacct_b.csv", sep="|", index=False)
+            inputs = expand_inputs([str(tmp / "raw")])
+
+            for workers in (1, 2):
+                out = tmp / f"out{workers}"
+                summary = run_etl(inputs, out, workers=workers)
+                self.assertEqual((summary["rows"], summary["duplicates"]), (100, 50))
+                df = read_sorted(out)
+                self.assertEqual(len(df), 50)
+                self.assertFalse(df["key"].duplicated().any())
+                a, b = pd.to_datetime(first["End"], **end), pd.to_datetime(second["End"], **end)
+                want = a.where(a >= b, b)
+                got = df.set_index("key")["End"]
+                np.testing.assert_array_equal(got.loc[first["JobID"]].to_numpy(), want.to_numpy())
+
+                manifest = json.loads((out / MANIFEST_NAME).read_text())
+                self.assertEqual(manifest["rows"], 50)
+                files = {f for e in manifest["inputs"].values() for f in e["files"]}
+                self.assertEqual(files, {str(p.relative_to(out)) for p in out.rglob("*.parquet")})
+                again = run_etl(inputs, out, workers=workers)
+                self.assertEqual((again["processed"], again["skipped"], again["duplicates"]), (0, 2, 0))
+
+    def test_job_dropped_from_newer_export_comes_back(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            (tmp / "raw").mkdir()
+            a = write_raw_sacct(tmp / "raw" / "sacct_a.csv", n=10)
+            # b exports job 1001 again, finished later, and jobs 2000.. of its own
+            b = pd.concat([a.iloc[[1]].assign(Start="2023-12-30T00:00:00", End="2023-12-31T00:00:00"),
+                           write_raw_sacct_from(tmp / "raw" / "sacct_b.csv", 2000, n=5)])
+            b.to_csv(tmp / "raw" / "sacct_b.csv", sep="|", index=False)
+            inputs = expand_inputs([str(tmp / "raw")])
+            out = tmp / "out"
+            self.assertEqual(run_etl(inputs, out, workers=1)["duplicates"], 1)
+            df = read_sorted(out).set_index("key")
+            self.assertEqual(len(df), 15)
+            self.assertEqual(df.loc["1001", "End"], pd.Timestamp("2023-12-31"))
+            manifest = json.loads((out / MANIFEST_NAME).read_text())
+            loser = manifest["inputs"][input_key(tmp / "raw" / "sacct_a.csv")]
+            self.assertEqual((loser["rows"], loser["superseded_by"]), (9, [input_key(tmp / "raw" / "sacct_b.csv")]))
+
+            # b is exported again without job 1001: a is cleaned again and its row is back
+            b.iloc[1:].to_csv(tmp / "raw" / "sacct_b.csv", sep="|", index=False)
+            summary = run_etl(inputs, out, workers=1)
+            self.assertEqual((summary["processed"], summary["skipped"], summary["duplicates"]), (2, 0, 0))
+            df = read_sorted(out).set_index("key")
+            self.assertEqual(len(df), 15)
+            self.assertEqual(df.loc["1001", "End"], pd.to_datetime(a.loc[1, "End"], format="%Y-%m-%dT%H:%M:%S"))
+            manifest = json.loads((out / MANIFEST_NAME).read_text())
+            self.assertEqual(manifest["rows"], 15)
+            self.assertNotIn("superseded_by", manifest["inputs"][input_key(tmp / "raw" / "sacct_a.csv")])
+            again = run_etl(inputs, out, workers=1)
+            self.assertEqual((again["processed"], again["skipped"]), (0, 2))
+
+    def test_refuses_files_it_did_not_write(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            inputs = self.make_inputs(tmp / "raw")
+            (tmp / "out" / "year=2020" / "month=1").mkdir(parents=True)
+            pd.DataFrame({"JobID": [1]}).to_parquet(tmp / "out" / "year=2020" / "month=1" / "part-000000.parquet")
+            with self.assertRaises(RuntimeError):
+                run_etl(inputs, tmp / "out", workers=1)
+            self.assertEqual(run_etl(inputs, tmp / "out", workers=1, rebuild=True)["rows"], 130)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from incremental import ingest_increment
+from jobs_dataset import partition_of, read_jobs
+from rollups import build_rollups, load_rollups, monthly_path, select, select_rollups, summarize
+from wait_times import WAIT_DIMENSIONS, load_waits, wait_path
+from tests.test_make_dataset import write_raw_sacct
+
+class TestRollups(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = Path(self._tmp.name)
+        self.jobs = self.tmp / "jobs"
+        self.cube_path = self.tmp / "daily.parquet"
+        write_raw_sacct(self.tmp / "raw.csv", n=200)
+        summary = ingest_increment(self.tmp / "raw.csv", self.jobs)
+        self.months = summary["months"]
+        self.cube = build_rollups(self.jobs, self.cube_path)
+        self.df = read_jobs(self.jobs)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_totals_match_raw_groupby(self):
+        cube = load_rollups(self.cube_path)
+        self.assertEqual(int(cube["jobs"].sum()), len(self.df))
+        self.assertEqual(int(cube["failed"].sum()),
+                         int(self.df["State"].astype(str).str.contains("FAIL|CANCEL").sum()))
+
+        by_user = summarize(cube, "UID")
+        raw = self.df.groupby("UID", observed=True).agg(
+            jobs=("JobID", "size"), elapsed_max=("Elapsed_sec", "max"),
+            elapsed_mean=("Elapsed_sec", "mean"), eff=("efficiency", "mean"))
+        np.testing.assert_array_equal(by_user.loc[raw.index, "jobs"], raw["jobs"])
+        np.testing.assert_allclose(by_user.loc[raw.index, "Elapsed_sec_max"], raw["elapsed_max"])
+        np.testing.assert_allclose(by_user.loc[raw.index, "Elapsed_sec_mean"], raw["elapsed_mean"])
+        np.testing.assert_allclose(by_user.loc[raw.index, "efficiency_mean"], raw["eff"])
+
+    def test_select_matches_filtered_jobs(self):
+        sub = select(self.cube, "2023-02-01", "2023-02-28", Partition=["gpu"], UID=[1001, 1002])
+        mask = (self.df["Start"].between("2023-02-01", "2023-02-28 23:59:59")
+                & (self.df["Partition"] == "gpu") & self.df["UID"].isin([1001, 1002]))
+        self.assertEqual(int(sub["jobs"].sum()), int(mask.sum()))
+        self.assertAlmostEqual(sub["core_seconds_sum"].sum(), self.df.loc[mask, "core_seconds"].sum())
+
+    def test_select_rollups_matches_select(self):
+        monthly = load_rollups(monthly_path(self.cube_path))
+        self.assertLess(len(monthly), len(self.cube))
+        self.assertTrue((monthly["day"].dropna().dt.day == 1).all())
+        filters = dict(Partition=["gpu", "cpu"], UID=[1001, 1002, 1003])
+        ranges = [(None, None), ("2023-01-01", "2023-03-31"), ("2023-01-15", "2023-03-10"),
+                  ("2023-02-03", "2023-02-20"), (None, "2023-02-10"), ("2023-01-20", None)]
+        cols = ["jobs", "core_seconds_sum", "Elapsed_sec_n", "Elapsed_sec_min", "Elapsed_sec_max"]
+        for start, end in ranges:
+            for values in ({}, filters):
+                with self.subTest(start=start, end=end, filtered=bool(values)):
+                    got = summarize(select_rollups(self.cube, monthly, start, end, **values), "UID", cols)
+                    want = summarize(select(self.cube, start, end, **values), "UID", cols)
+                    self.assertGreater(want["jobs"].sum(), 0)
+                    pd.testing.assert_frame_equal(got.sort_index()[cols], want.sort_index()[cols])
+
+    def test_partial_refresh_equals_full_rebuild(self):
+        write_raw_sacct(self.tmp / "more.csv", n=40, seed=1)
+        more = pd.read_csv(self.tmp / "more.csv", sep="|", dtype=str)
+        more["JobID"] = [str(5000 + i) for i in range(len(more))]
+        more["End"] = more["End"].str.replace("2023-", "2024-")  # after the first pull
+        more.to_csv(self.tmp / "more.csv", sep="|", index=False)
+        summary = ingest_increment(self.tmp / "more.csv", self.jobs)
+        self.assertEqual(summary["months"],
+                         sorted({m for m in map(partition_of, summary["files"]) if m}))
+
+        partial = build_rollups(self.jobs, self.cube_path, months=summary["months"])
+        full = build_rollups(self.jobs, self.tmp / "full.parquet")
+        self.assertEqual(int(partial["jobs"].sum()), len(read_jobs(self.jobs)))
+        key = ["day", "UID", "Partition", "State", "JobName_Grouped"]
+        a = partial.astype({c: object for c in key[1:]}).sort_values(key, ignore_index=True)
+        b = full.astype({c: object for c in key[1:]}).sort_values(key, ignore_index=True)
+        pd.testing.assert_frame_equal(a[b.columns], b, check_categorical=False)
+
+        key = WAIT_DIMENSIONS + ["bucket"]
+        a, b = load_waits(wait_path(self.cube_path)), load_waits(wait_path(self.tmp / "full.parquet"))
+        a, b = (w.astype({c: object for c in key[1:5]}).sort_values(key, ignore_index=True) for w in (a, b))
+        pd.testing.assert_frame_equal(a, b, check_categorical=False)
+
+if __name__ == "__main__":
+    unittest.main()
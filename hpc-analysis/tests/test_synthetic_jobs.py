@@ -0,0 +1,57 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import pandas as pd
+
+from convert_jobs2018_2021 import convert_legacy, read_legacy
+from make_dataset import build_dataset
+from parallel_etl import detect_format
+from synthetic_jobs import write_synthetic
+
+class TestSyntheticJobs(unittest.TestCase):
+    def test_exports_go_through_the_etl(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            paths = write_synthetic(tmp / "raw", rows=3000, legacy_rows=500, users=50,
+                                    start="2024-01-01", end="2024-03-01", chunk_rows=1000)
+            self.assertEqual([p.name for p in paths], ["sacct.csv", "jobs_table.csv"])
+            self.assertEqual([detect_format(p) for p in paths], ["sacct", "legacy"])
+
+            self.assertEqual(build_dataset(paths[0], tmp / "jobs.parquet"), 3000)
+            df = pd.read_parquet(tmp / "jobs.parquet")
+            self.assertTrue(df["JobID"].astype(str).is_unique)
+            self.assertLessEqual(df["UID"].nunique(), 50)
+            self.assertTrue(df["Submit"].between("2024-01-01", "2024-03-01").all())
+            self.assertTrue((df["Start"].dropna() >= df.loc[df["Start"].notna(), "Submit"]).all())
+            self.assertGreater((df["State_Clean"] == "COMPLETED").mean(), 0.6)
+            self.assertTrue(df["State"].astype(str).str.startswith("CANCELLED by ").any())
+            started = df["Start"].notna() & df["End"].notna()
+            self.assertTrue(df.loc[started, "Elapsed_sec"].gt(0).all())
+            self.assertTrue(df.loc[started, "ReqMem_MB"].notna().all())
+            self.assertTrue((df.loc[started, "MaxRSS_MB"] <= df.loc[started, "ReqMem_MB"] + 1).all())
+
+            legacy = convert_legacy(read_legacy(paths[1]))
+            self.assertEqual(len(legacy), 500)
+            self.assertTrue(legacy["End"].max() <= pd.Timestamp("2024-01-01"))
+            self.assertTrue(legacy["NCPUS"].notna().all())
+            self.assertLess(legacy["JobID"].max(), df["JobID"].astype(int).min())
+
+    def test_monthly_files_and_seed(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            kw = dict(rows=2000, legacy_rows=0, users=20, start="2024-01-15", end="2024-04-10",
+                      chunk_rows=700, monthly=True)
+            paths = write_synthetic(tmp / "a", **kw)
+            self.assertEqual([p.name for p in paths],
+                             ["sacct_2024-01.csv", "sacct_2024-02.csv", "sacct_2024-03.csv", "sacct_2024-04.csv"])
+            frames = [pd.read_csv(p, sep="|") for p in paths]
+            self.assertEqual(sum(map(len, frames)), 2000)
+            for path, frame in zip(paths, frames):
+                self.assertTrue((frame["Submit"].str[:7] == path.stem[-7:]).all())
+            # same seed, same files
+            again = write_synthetic(tmp / "b", **kw)
+            self.assertEqual([p.read_bytes() for p in paths], [p.read_bytes() for p in again])
+
+if __name__ == "__main__":
+    unittest.main()
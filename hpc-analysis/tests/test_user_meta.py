@@ -0,0 +1,55 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from user_meta import UserMeta
+
+class TestUserMeta(unittest.TestCase):
+    def setUp(self):
+        self.meta = pd.DataFrame({
+            "UID": [1002, 1001, 1002, 1004, None],
+            "lib_application": ["lammps", "qe", "gromacs", None, "vasp"],
+            "institution_city": ["UM5 , Rabat", "UCA , Marrakech", "UM5 , Rabat", "", "X"],
+        })
+        self.lookup = UserMeta(self.meta)
+        rng = np.random.default_rng(0)
+        self.jobs = pd.DataFrame({
+            "JobID": np.arange(200),
+            "UID": pd.Categorical(rng.choice([1001, 1002, 1003, 1004], 200)),
+            "Elapsed_sec": rng.integers(0, 1000, 200),
+        })
+
+    def merged(self, df):
+        meta = self.meta.dropna(subset=["UID"]).astype({"UID": "int64"})
+        return df.astype({"UID": "int64"}).merge(meta, on="UID", how="left")
+
+    def test_keys(self):
+        keys = self.lookup.keys([1001, 1003, None, 1004, 1002])
+        self.assertEqual(keys.tolist(), [0, -1, -1, 2, 1])
+        np.testing.assert_array_equal(self.lookup.keys(self.jobs["UID"]),
+                                      self.lookup.keys(self.jobs["UID"].astype(int)))
+
+    def test_join_matches_merge(self):
+        got = self.lookup.join(self.jobs)
+        expected = self.merged(self.jobs)
+        self.assertEqual(len(got), len(expected))
+        for col in ["JobID", "Elapsed_sec", "lib_application", "institution_city"]:
+            self.assertEqual(got[col].astype(object).fillna("-").tolist(),
+                             expected[col].astype(object).fillna("-").tolist(), col)
+        self.assertEqual(list(self.lookup.join(self.jobs.head(0), ["lib_application"]).columns),
+                         ["JobID", "UID", "Elapsed_sec", "lib_application"])
+
+    def test_totals_match_merge_groupby(self):
+        per_user = self.jobs.groupby("UID", observed=True).size()
+        linked = self.merged(per_user.rename("jobs").reset_index())
+        for col, fill in [("lib_application", None), ("institution_city", ""), ("lib_application", "n/a")]:
+            with self.subTest(col=col, fill=fill):
+                exp = linked.assign(**{col: linked[col].fillna(fill)}) if fill is not None else linked
+                exp = exp.groupby(col)["jobs"].sum()
+                got = self.lookup.totals(per_user.index, per_user.to_numpy(), col, fill=fill)
+                self.assertEqual(got.to_dict(), exp.to_dict())
+                self.assertTrue(got.is_monotonic_decreasing)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from incremental import ingest_increment
+from jobs_dataset import read_jobs
+from parallel_etl import run_etl
+from quantile_sketch import RELATIVE_ACCURACY, bucket_of, bucket_value, quantiles
+from rollups import build_rollups, select
+from synthetic_jobs import write_synthetic
+from wait_times import job_wait_quantiles, load_waits, size_class, wait_path, wait_quantiles, wait_sketch
+from tests.test_make_dataset import write_raw_sacct
+
+def exact(values, q):
+    return np.quantile(values, q, method="inverted_cdf")
+
+class TestQuantileSketch(unittest.TestCase):
+    def test_merged_sketches_match_exact_quantiles(self):
+        rng = np.random.default_rng(0)
+        x = np.r_[np.zeros(500), rng.uniform(0, 1, 100), rng.lognormal(7, 2, 20000)]
+        group = rng.choice(["a", "b", "c"], len(x))
+        self.assertTrue((np.abs(bucket_value(bucket_of(x[x >= 1])) / x[x >= 1] - 1) <= RELATIVE_ACCURACY).all())
+        # one sketch row per value, merged by the groupby
+        got = quantiles(pd.DataFrame({"g": group, "bucket": bucket_of(x), "jobs": 1}), "g", [0.02, 0.5, 0.99])
+        for g in "abc":
+            self.assertEqual(got.loc[g, "jobs"], (group == g).sum())
+            self.assertEqual(got.loc[g, "p2"], 0)  # waits under a second
+            for q in [0.5, 0.99]:
+                self.assertAlmostEqual(got.loc[g, f"p{q * 100:g}"] / exact(x[group == g], q), 1,
+                                       delta=RELATIVE_ACCURACY)
+
+    def test_size_classes(self):
+        got = size_class([1, 4, 16, 64, 8, np.nan, 128], [1, 1, 1, 1, 2, 1, 6])
+        self.assertEqual(list(got.astype(object)[:5]), ["1 core", "2–8 cores", "9–32 cores", "33+ cores", "2–4 nodes"])
+        self.assertTrue(pd.isna(got[5]))
+        self.assertEqual(got[6], "5+ nodes")
+
+class TestWaitTimes(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        tmp = Path(self._tmp.name)
+        write_raw_sacct(tmp / "raw.csv", n=600)
+        ingest_increment(tmp / "raw.csv", tmp / "jobs")
+        build_rollups(tmp / "jobs", tmp / "daily.parquet")
+        self.waits = load_waits(wait_path(tmp / "daily.parquet"))
+        self.df = read_jobs(tmp / "jobs")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def check(self, got, rows):
+        for q in [0.5, 0.9, 0.99]:
+            want = exact(rows["wait_time_sec"].astype(float), q)
+            self.assertLessEqual(abs(got[f"p{q * 100:g}"] - want), RELATIVE_ACCURACY * want + 1e-9)
+
+    def test_filtered_percentiles_match_job_rows(self):
+        started = self.df[self.df["wait_time_sec"].notna()]
+        sizes = select(wait_sketch(self.waits, "size_class"), "2023-02-01", "2023-03-31", Partition=["gpu", "defq"])
+        rows = started[started["Start"].between("2023-02-01", "2023-03-31 23:59:59")
+                       & started["Partition"].isin(["gpu", "defq"])]
+        by_part = wait_quantiles(sizes, "Partition")
+        for part, group in rows.groupby("Partition", observed=True):
+            self.assertEqual(by_part.loc[part, "jobs"], len(group))
+            self.check(by_part.loc[part], group)
+        by_size = wait_quantiles(sizes, "size_class")
+        for size, group in rows.groupby(size_class(rows["NCPUS"], rows["NNODES"]), observed=True):
+            self.assertEqual(by_size.loc[size, "jobs"], len(group))
+            self.check(by_size.loc[size], group)
+
+        by_month = wait_quantiles(wait_sketch(self.waits, "size_class"), "month")
+        self.assertEqual(int(by_month["jobs"].sum()), len(started))
+        for month, group in started.groupby(started["Start"].dt.to_period("M")):
+            self.check(by_month.loc[month], group)
+
+        hours = select(wait_sketch(self.waits, "hour"), Partition=["gpu"])
+        by_hour = wait_quantiles(hours, "hour")
+        gpu = started[started["Partition"] == "gpu"]
+        self.assertEqual(int(by_hour["jobs"].sum()), len(gpu))
+        for hour, group in gpu.groupby(gpu["Submit"].dt.hour):
+            self.check(by_hour.loc[hour], group)
+
+    def test_user_and_state_filters(self):
+        started = self.df[self.df["wait_time_sec"].notna()]
+        sizes = select(wait_sketch(self.waits, "size_class"), UID=[1001, 1003], State=["COMPLETED", "FAILED"])
+        rows = started[started["UID"].isin([1001, 1003]) & started["State"].isin(["COMPLETED", "FAILED"])]
+        by_part = wait_quantiles(sizes, "Partition")
+        self.assertEqual(int(by_part["jobs"].sum()), len(rows))
+        for part, group in rows.groupby("Partition", observed=True):
+            self.assertEqual(by_part.loc[part, "jobs"], len(group))
+            self.check(by_part.loc[part], group)
+
+    def test_job_rows_give_exact_percentiles(self):
+        rows = self.df[self.df["Start"].between("2023-01-10", "2023-02-20")]
+        started = rows[rows["wait_time_sec"].notna()]
+        for by, keys in [("Partition", started["Partition"]), ("month", started["Start"].dt.to_period("M")),
+                         ("hour", started["Submit"].dt.hour),
+                         ("size_class", size_class(started["NCPUS"], started["NNODES"]))]:
+            with self.subTest(by=by):
+                got = job_wait_quantiles(rows, by)
+                self.assertEqual(int(got["jobs"].sum()), len(started))
+                for key, group in started.groupby(keys, observed=True):
+                    self.assertEqual(got.loc[key, "jobs"], len(group))
+                    for q in [0.5, 0.9, 0.99]:
+                        self.assertEqual(got.loc[key, f"p{q * 100:g}"], exact(group["wait_time_sec"].astype(float), q))
+
+    def test_sketch_rows_stay_well_below_jobs(self):
+        tmp = Path(self._tmp.name)
+        rows = {}
+        for n in (40_000, 80_000):
+            # a dozen users with thousands of jobs each in the month
+            inputs = write_synthetic(tmp / f"raw{n}", rows=n, legacy_rows=0, users=12,
+                                     start="2024-01-01", end="2024-02-01")
+            run_etl(inputs, tmp / f"jobs{n}", workers=1)
+            build_rollups(tmp / f"jobs{n}", tmp / f"cube{n}.parquet")
+            waits = load_waits(wait_path(tmp / f"cube{n}.parquet"))
+            self.assertEqual(int(wait_sketch(waits, "hour")["jobs"].sum()),
+                             int(wait_sketch(waits, "size_class")["jobs"].sum()))
+            rows[n] = len(waits)
+        # one row per bucket of a month and sketch value, not per job
+        self.assertLess(rows[80_000], 80_000 / 2)
+        self.assertLess(rows[80_000], 1.5 * rows[40_000])
+
+if __name__ == "__main__":
+    unittest.main()